@@ -47,6 +47,14 @@ CONFIG = {
 
     "timeframes": ["S1", "M1", "M5", "M15", "M30", "H1", "H4", "D1"],
 
+    # ✅ Timeframes maiores montados localmente a partir do M1 (data/derived_timeframes.py)
+    # em vez de buscados um a um nos provedores
+    "timeframe_derivation": {
+        "enabled": True,
+        "base": "M1",
+        "derived": ["M5", "M15", "M30", "H1", "H4", "D1"]
+    },
+
     # ✅ Model retraining triggers after at least N rows
     "min_train_rows": 50,
 
@@ -221,8 +229,96 @@ CONFIG = {
     "hybrid_or_uncertain": [
         "harami_cross"
     ]
-}
-    
+},
+
+    # PROVEDORES DE DADOS (AsyncFallbackDataClient)
+    "data_providers": {
+        "hedge_enabled": True,
+        # Latência p90 (s) de cada provedor: sem resposta nesse tempo, o próximo provedor
+        # elegível é disparado em paralelo e vale a primeira resposta válida
+        "p90_latency": {
+            "Dukascopy": 2.5,
+            "PocketOptionClient": 3.0,
+            "TwelveDataClient": 1.5,
+            "TiingoClient": 1.5,
+            "PolygonClient": 2.0
+        },
+        "default_p90_latency": 2.0,
+        "request_timeout": 30         # Tempo máximo total de uma busca com hedging
+    },
+
+    # RATE LIMIT DOS PROVEDORES REST (data/rate_governor.py)
+    "rate_limits": {
+        # Limites documentados dos planos gratuitos: [requisições, janela em segundos];
+        # todas as janelas valem ao mesmo tempo. Cabeçalhos das respostas corrigem isso.
+        "providers": {
+            "TwelveData": [[8, 60], [800, 86400]],
+            "Tiingo": [[50, 3600], [1000, 86400]],
+            "Polygon": [[5, 60]],
+            "Dukascopy": [[600, 60]]       # sem limite documentado: só para não martelar o datafeed
+        },
+        # Fração de cada bucket que só requisições mais prioritárias podem consumir
+        "reserves": {"scheduled": 0.25, "backfill": 0.5},
+        # Espera máxima (s) pela cota antes de desistir do provedor
+        "max_wait": {"interactive": 5, "scheduled": 300, "backfill": 1800}
+    },
+
+    # UPLOADS PARA O GOOGLE DRIVE EM SEGUNDO PLANO (data/drive_sync.py)
+    "drive_sync": {
+        "interval": 30,               # s: gravações do mesmo arquivo nesse intervalo viram um upload
+        "max_concurrency": 4,         # uploads simultâneos
+        "exit_timeout": 30            # s esperando a fila esvaziar ao encerrar o processo
+    },
+
+    # ARMAZENAMENTO DE ARTEFATOS (data/blob_store.py): modelos, pedaços de candles, COT, estado
+    "blob_store": {
+        "backend": get_env("BLOB_BACKEND", "drive"),   # drive | local | s3
+        "max_concurrency": 4,                          # transferências simultâneas (lotes e segundo plano)
+        "local_root": get_env("BLOB_LOCAL_ROOT", "data/blobs"),
+        # Pasta do Drive de cada bucket (None = raiz do Drive)
+        "drive_folders": {
+            "candles": "1-2NSyy8C4kuBt_Rb6KKB42CVOxJLzTq8",
+            "models": "1-9FzKbCYdYuS2peZ5WlCTdtR7ayJZPH9",
+            "cot_raw": "17Ok0Eo53XvoUYKtr5iMPgd_NkXLtDT85",
+            "cot_csv": "1Bv5rwzYMUVuRNSXKSz9zAFidDTCjY8g6",
+            "state": None
+        },
+        # S3 compatível (AWS, MinIO local); credenciais pelas variáveis padrão AWS_*
+        "s3": {
+            "endpoint_url": get_env("S3_ENDPOINT_URL"),
+            "bucket": get_env("S3_BUCKET", "tradingbot"),
+            "prefix": get_env("S3_PREFIX", "")
+        }
+    },
+
+    # BACKFILL HISTÓRICO (data/backfill.py)
+    "backfill": {
+        "max_workers": 8,
+        # Tamanho de cada pedaço (s) por timeframe: o que o provedor serve numa requisição
+        "chunk_seconds": {"s1": 3600, "default": 86400},
+        "manifest": "data/backfill_manifest.json"
+    },
+
+    # JANELAS DE CANDLES EM MEMÓRIA (data/candle_cache.py)
+    "candle_cache": {
+        "min_window": 200,            # N mínimo de candles por (símbolo, intervalo)
+        "lookback_multiplier": 4,     # N = max(min_window, multiplicador * maior lookback)
+        "max_series": 64,             # séries mantidas em memória (LRU)
+        "topup_wait": 10              # s máximos esperando um top-up antes de servir a janela atual
+    },
+
+    # FEED AO VIVO (data/live_feed.py): candles montados a partir do stream de preços
+    # e sinais calculados uma vez por candle fechado, em vez de a cada clique
+    "live_feed": {
+        "enabled": get_env("LIVE_FEED", "0") == "1",
+        "source": get_env("LIVE_FEED_SOURCE", "pocketoption"),   # pocketoption | replay
+        "signal_timeframes": ["M1", "M5", "M15"],
+        "history": 300,               # candles fechados mantidos por (símbolo, timeframe)
+        "min_history": 50,            # abaixo disso a série é semeada via data_client
+        "close_grace": 1.0,           # s após o fim do candle para fechá-lo sem novo tick
+        "max_concurrent_signals": 2
+    },
+
     "languages": {
         "en": {
             "start": "Welcome! Tap 📈 Start to generate a signal.",
@@ -0,0 +1,200 @@
+# data/async_data_client.py
+# Versão asyncio do FallbackDataClient para o servidor/bot: nenhum provedor bloqueia o
+# event loop (aiohttp com conector compartilhado, websocket async para PocketOption,
+# asyncio.subprocess para o worker Dukascopy). Mesmo mapeamento de símbolo/timeframe
+# (_map_symbol/_map_timeframe) e mesmo formato de retorno do cliente síncrono.
+
+import time
+import asyncio
+from datetime import datetime, timedelta
+
+from data.data_client import FallbackDataClient, _map_timeframe, _derived_timeframes
+from data.candle_store import get_candle_store
+from data.candle_cache import interval_seconds
+from data.provider_health import get_scoreboard
+from data.dukascopy_data import DukascopyClient
+from data.dukascopy_pool import AsyncDukascopyWorker
+from data.pocketoption_data import AsyncPocketOptionClient, PocketOptionAuthError
+from data.pocketoption_session import close_session
+from data.twelvedata_data import AsyncTwelveDataClient
+from data.tiingo_data import AsyncTiingoClient
+from data.polygon_data import AsyncPolygonClient
+from data.http_session import close_http_session
+from utils.telegram_alert import send_telegram_alert
+from utils.single_flight import SingleFlight
+from config import CONFIG
+
+
+class AsyncFallbackDataClient(FallbackDataClient):
+    def __init__(self):
+        self.store = get_candle_store()
+        self.scoreboard = get_scoreboard()
+        self.dukascopy = DukascopyClient()
+        self.derived_timeframes = _derived_timeframes(self.store)
+        self.dukascopy_worker = AsyncDukascopyWorker()
+        self.providers = [
+            AsyncPocketOptionClient(),
+            AsyncTwelveDataClient(),
+            AsyncTiingoClient(),
+            AsyncPolygonClient()
+        ]
+        self._background = set()
+        # Buscas idênticas (símbolo, intervalo, limite, barra atual) simultâneas viram uma só
+        self._fetch_flight = SingleFlight("fetch_candles")
+
+    def _in_background(self, func, *args):
+        """Upload para o Drive / retreino rodam fora do caminho da resposta."""
+        task = asyncio.create_task(asyncio.to_thread(func, *args))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    async def _persist(self, symbol, interval, limit, result):
+        written = await asyncio.to_thread(self._append_to_store, symbol, interval, result["history"])
+        if written:
+            # Regravar o pedaço do dia fica fora da resposta; o upload é da thread do drive_sync
+            self._in_background(self._upload_store_files, symbol, interval)
+        return await asyncio.to_thread(self._read_through, symbol, interval, limit, result)
+
+    def _dukascopy_call(self, symbol, interval, limit):
+        return lambda: self._fetch_from_dukascopy_async(symbol, interval, limit)
+
+    async def fetch_candles(self, symbol, interval="1min", limit=5, prefer_pocket=False):
+        period = interval_seconds(interval)
+        bar = int(time.time()) // period * period
+        return await self._fetch_flight.do(
+            (symbol, interval, limit, bar),
+            lambda: self._fetch_candles(symbol, interval, limit)
+        )
+
+    async def _fetch_candles(self, symbol, interval, limit):
+        """
+        Busca com hedging: dispara o provedor preferido e, se ele não responder dentro
+        do seu p90 de latência (CONFIG["data_providers"]), dispara o próximo em paralelo.
+        Vale o primeiro `history` válido; os demais são cancelados.
+        """
+        candidates = self._candidates(symbol, interval, limit)
+        winner = await self._hedged_fetch(candidates, symbol, _map_timeframe(interval, "Dukascopy"))
+        if winner is None:
+            print("❌ All providers failed.")
+            return None
+        name, result, report = winner
+        persisted = await self._persist(symbol, interval, limit, result)
+        if name == "Dukascopy":
+            self._in_background(self._maybe_retrain)
+        persisted = dict(persisted)
+        persisted["provider"] = name
+        persisted["latency_saved"] = report["saved_lower_bound"]
+        return persisted
+
+    async def _hedged_fetch(self, candidates, symbol, tf):
+        cfg = CONFIG.get("data_providers", {})
+        hedge = cfg.get("hedge_enabled", True)
+        p90 = cfg.get("p90_latency", {})
+        default_p90 = cfg.get("default_p90_latency", 2.0)
+        deadline_total = cfg.get("request_timeout", 30)
+
+        loop = asyncio.get_running_loop()
+        t0 = loop.time()
+        pending = {}   # task -> (nome, início)
+        finished = []  # (nome, início, fim) dos que falharam
+        queue = list(candidates)
+
+        def launch():
+            # Circuito pode ter aberto (ou a sonda do meio-aberto já estar em uso) entretanto
+            while queue:
+                name, factory = queue.pop(0)
+                if self.scoreboard.allow(name, symbol, tf):
+                    print(f"⚙️ Trying {name}" + (" (hedge)" if pending else ""))
+                    pending[asyncio.create_task(factory())] = (name, loop.time())
+                    return
+
+        try:
+            while pending or queue:
+                if not pending:
+                    launch()
+                    if not pending:
+                        break
+                remaining = deadline_total - (loop.time() - t0)
+                if remaining <= 0:
+                    print(f"⏱ Tempo total de busca esgotado ({deadline_total}s)")
+                    return None
+                wait = remaining
+                if hedge and queue:
+                    last_name, last_start = max(pending.values(), key=lambda v: v[1])
+                    hedge_at = last_start + p90.get(last_name, default_p90)
+                    wait = max(0.0, min(remaining, hedge_at - loop.time()))
+                done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if hedge and queue:
+                        launch()
+                    continue
+                for task in done:
+                    name, started = pending.pop(task)
+                    ended = loop.time()
+                    result, error = None, None
+                    try:
+                        result = task.result()
+                    except PocketOptionAuthError as e:
+                        msg = f"❗ <b>ERRO PocketOption SSID</b>\n{e}\nHora: {datetime.utcnow()}"
+                        print(msg)
+                        self._in_background(send_telegram_alert, msg)
+                        error = str(e)
+                    except Exception as e:
+                        print(f"❌ {name} error: {e}")
+                        error = str(e)
+                    ok = bool(result and "history" in result and result["history"])
+                    self.scoreboard.record(name, symbol, tf, ok, ended - started, error)
+                    if ok:
+                        report = _hedge_report(name, started, ended, t0, finished, pending.values())
+                        print(
+                            f"✅ Success from {name} em {report['latency']:.2f}s "
+                            f"(economia ≥ {report['saved_lower_bound']:.2f}s vs. sequencial)"
+                        )
+                        return name, result, report
+                    finished.append((name, started, ended))
+                # Falha libera a vez: o próximo provedor não espera o p90
+                if queue:
+                    launch()
+            return None
+        finally:
+            # Perdedores cancelados não contam como falha, mas o tempo que já gastaram
+            # é um limite inferior da latência deles
+            for task, (name, started) in pending.items():
+                task.cancel()
+                self.scoreboard.record_cancelled(name, symbol, tf, loop.time() - started)
+
+    async def _fetch_from_dukascopy_async(self, symbol, interval, limit):
+        now = datetime.utcnow()
+        await asyncio.to_thread(self._pull_history, symbol, interval, limit)
+        native = await asyncio.to_thread(self.dukascopy.fetch_candles, symbol, interval, limit)
+        if native and native["history"]:
+            return native
+        from_dt = now - timedelta(minutes=limit)
+        candles = await self.dukascopy_worker.request(symbol, interval, from_dt.isoformat(), now.isoformat())
+        return {
+            "history": candles,
+            "close": candles[-1]["close"] if candles else None
+        }
+
+    async def close(self):
+        await self.dukascopy_worker.close()
+        await close_session()
+        await close_http_session()
+
+
+def _hedge_report(name, started, ended, t0, finished, still_pending):
+    """
+    Limite inferior da latência economizada: no modo sequencial, cada provedor anterior
+    teria rodado pelo menos o tempo observado (inteiro se já terminou, até agora se ainda
+    pendente) antes de o vencedor sequer começar.
+    """
+    before = [(s, e) for _, s, e in finished if s < started]
+    before += [(s, ended) for _, s in still_pending if s < started]
+    sequential = sum(e - s for s, e in before) + (ended - started)
+    latency = ended - t0
+    return {
+        "winner": name,
+        "latency": latency,
+        "saved_lower_bound": max(0.0, sequential - latency),
+    }
@@ -0,0 +1,229 @@
+# data/backfill.py
+# Backfill histórico com lacunas, retomável e paralelo. Em vez de pedir 7 dias de uma
+# vez por (símbolo, timeframe), a store é varrida em busca de lacunas, cada lacuna é
+# cortada em pedaços do tamanho que o provedor serve numa requisição (1 hora de ticks
+# para S1, 1 dia de minutos para o resto, como os arquivos bi5 da Dukascopy) e os
+# pedaços rodam em paralelo sob o governador de rate limit (prioridade BACKFILL).
+# Cada pedaço concluído fica registrado num manifesto, então um processo interrompido
+# retoma exatamente de onde parou.
+#
+#   python -m data.backfill --days 7 --symbols EURUSD,GBPUSD --timeframes M1,S1
+
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import CONFIG
+from data.candle_store import get_candle_store, series_key
+from data.dukascopy_data import DukascopyClient, TF_SECONDS, PUBLICATION_GRACE
+from data.rate_governor import get_limiter, fetch_priority, BACKFILL, RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_PATH = os.path.join("data", "backfill_manifest.json")
+DEFAULT_CHUNK = 86400
+
+Range = Tuple[int, int]   # [início, fim) em segundos
+
+
+def _merge(ranges: List[Range]) -> List[Range]:
+    merged: List[Range] = []
+    for lo, hi in sorted(ranges):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def _subtract(ranges: List[Range], covered: List[Range]) -> List[Range]:
+    """Partes de `ranges` fora de `covered` (ambas ordenadas e sem sobreposição)."""
+    out = []
+    for lo, hi in ranges:
+        cursor = lo
+        for clo, chi in covered:
+            if chi <= cursor or clo >= hi:
+                continue
+            if clo > cursor:
+                out.append((cursor, clo))
+            cursor = max(cursor, chi)
+        if cursor < hi:
+            out.append((cursor, hi))
+    return out
+
+
+def find_gaps(timestamps: np.ndarray, start: int, end: int, step: int) -> List[Range]:
+    """Trechos de [start, end) sem nenhum candle (timestamps ordenados, em segundos)."""
+    ts = timestamps[(timestamps >= start) & (timestamps < end)]
+    edges = np.concatenate([[start - step], ts, [end]])
+    diffs = np.diff(edges)
+    idx = np.flatnonzero(diffs > step)
+    return [(int(edges[i] + step), int(edges[i + 1])) for i in idx]
+
+
+class BackfillManifest:
+    """Pedaços concluídos por série ({série: [[início, fim), ...]}), gravado atomicamente."""
+
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done: Dict[str, List[Range]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    raw = json.load(f)
+                self.done = {k: [tuple(r) for r in v] for k, v in raw.get("done", {}).items()}
+            except Exception as e:
+                logger.warning(f"Manifesto de backfill ilegível ({e}); recomeçando do zero")
+
+    def covered(self, key: str) -> List[Range]:
+        with self._lock:
+            return list(self.done.get(key, []))
+
+    def mark(self, key: str, chunk: Range):
+        with self._lock:
+            self.done[key] = _merge(self.done.get(key, []) + [chunk])
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"version": 1, "done": self.done}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+
+
+class BackfillEngine:
+    def __init__(self, store=None, source=None, manifest: Optional[BackfillManifest] = None,
+                 recent_fetch: Optional[Callable] = None, max_workers: Optional[int] = None):
+        cfg = CONFIG.get("backfill", {})
+        self.store = store or get_candle_store()
+        self.source = source or DukascopyClient()
+        self.manifest = manifest or BackfillManifest(cfg.get("manifest", MANIFEST_PATH))
+        # Símbolos sem fonte por intervalo (OTC): só o trecho mais recente, via data_client
+        self.recent_fetch = recent_fetch
+        self.max_workers = max_workers or cfg.get("max_workers", 8)
+        self.chunk_seconds = cfg.get("chunk_seconds", {"s1": 3600})
+        self.limiter = get_limiter("Dukascopy")
+
+    def _chunk_size(self, tf: str) -> int:
+        return int(self.chunk_seconds.get(tf, self.chunk_seconds.get("default", DEFAULT_CHUNK)))
+
+    def plan(self, symbol: str, tf: str, start: int, end: int) -> List[Range]:
+        """Pedaços alinhados que ainda faltam: lacunas da store menos o que o manifesto já cobre."""
+        step = TF_SECONDS[tf]
+        size = self._chunk_size(tf)
+        stored = self.store.read(symbol, tf, start=start, end=end)["timestamp"]
+        gaps = _subtract(find_gaps(stored, start, end, step), self.manifest.covered(series_key(symbol, tf)))
+        chunks = set()
+        for lo, hi in gaps:
+            first = lo - lo % size
+            for chunk_start in range(first, hi, size):
+                chunks.add((max(chunk_start, start), min(chunk_start + size, end)))
+        return sorted(chunks)
+
+    def _run_chunk(self, symbol: str, tf: str, chunk: Range, now: int) -> int:
+        with fetch_priority(BACKFILL):
+            self.limiter.acquire()
+        lo, hi = chunk
+        candles = self.source.fetch_range(
+            symbol, tf,
+            datetime.fromtimestamp(lo, tz=timezone.utc),
+            datetime.fromtimestamp(hi - 1, tz=timezone.utc),
+        )
+        if candles:
+            self.store.append(symbol, tf, candles)
+        # O pedaço que contém o "agora" ainda vai crescer: não entra no manifesto. Vazio
+        # dentro da carência de publicação pode ser arquivo que ainda não saiu: refaz depois
+        published = len(candles) > 0 or hi <= now - PUBLICATION_GRACE.total_seconds()
+        if hi <= now - TF_SECONDS[tf] and published:
+            self.manifest.mark(series_key(symbol, tf), chunk)
+        return len(candles)
+
+    def _run_recent(self, symbol: str, tf: str, start: int, end: int) -> int:
+        if self.recent_fetch is None:
+            logger.info(f"{symbol} {tf}: sem fonte histórica por intervalo; pulando")
+            return 0
+        step = TF_SECONDS[tf]
+        stored = self.store.read(symbol, tf, start=start, end=end)["timestamp"]
+        gaps = find_gaps(stored, start, end, step)
+        if not gaps:
+            return 0
+        limit = (end - gaps[0][0]) // step + 1
+        with fetch_priority(BACKFILL):
+            result = self.recent_fetch(symbol, tf, limit)
+        return len(result["history"]) if result and result.get("history") else 0
+
+    def run(self, symbols: List[str], timeframes: List[str], days: float,
+            end: Optional[datetime] = None) -> Dict:
+        """Preenche as lacunas dos últimos `days` dias; devolve o relatório (linhas/s etc.)."""
+        end_dt = end or datetime.now(timezone.utc)
+        end_ts = int(end_dt.timestamp())
+        start_ts = int((end_dt - timedelta(days=days)).timestamp())
+        tfs = [tf.lower() for tf in timeframes]
+        report = {"chunks": 0, "done": 0, "failed": 0, "rows": 0, "skipped_series": 0, "recent_only": 0}
+        started = time.monotonic()
+
+        jobs = []
+        for symbol in symbols:
+            for tf in tfs:
+                if "otc" in symbol.lower():
+                    jobs.append((symbol, tf, None))
+                    continue
+                chunks = self.plan(symbol, tf, start_ts, end_ts)
+                if not chunks:
+                    report["skipped_series"] += 1
+                jobs.extend((symbol, tf, chunk) for chunk in chunks)
+        report["chunks"] = sum(1 for job in jobs if job[2] is not None)
+        logger.info(f"Backfill: {report['chunks']} pedaços em {len(symbols)} símbolos x {len(tfs)} timeframes")
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._run_chunk, symbol, tf, chunk, end_ts) if chunk is not None
+                else executor.submit(self._run_recent, symbol, tf, start_ts, end_ts): (symbol, tf, chunk)
+                for symbol, tf, chunk in jobs
+            }
+            for future in as_completed(futures):
+                symbol, tf, chunk = futures[future]
+                try:
+                    report["rows"] += future.result()
+                    report["done" if chunk is not None else "recent_only"] += 1
+                except RateLimitExceeded as e:
+                    report["failed"] += 1
+                    logger.warning(str(e))
+                except Exception as e:
+                    report["failed"] += 1
+                    logger.warning(f"Backfill {symbol} {tf} {chunk}: {e}")
+
+        report["seconds"] = round(time.monotonic() - started, 2)
+        report["rows_per_sec"] = round(report["rows"] / report["seconds"], 1) if report["seconds"] else 0.0
+        return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill retomável da candle store")
+    parser.add_argument("--days", type=float, default=7)
+    parser.add_argument("--symbols", default=",".join(CONFIG["symbols"]))
+    parser.add_argument("--timeframes", default=",".join(CONFIG["timeframes"]))
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    engine = BackfillEngine(max_workers=args.workers)
+    symbols = [s.strip() for s in args.symbols.split(",") if s.strip()]
+    timeframes = [t.strip() for t in args.timeframes.split(",") if t.strip()]
+    report = engine.run(symbols, timeframes, args.days)
+    print(f"✅ Backfill: {report['rows']} linhas em {report['seconds']}s "
+          f"({report['rows_per_sec']} linhas/s), {report['done']}/{report['chunks']} pedaços, "
+          f"{report['failed']} falhas")
+    return report
+
+
+if __name__ == "__main__":
+    main()
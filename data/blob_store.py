@@ -0,0 +1,360 @@
+# data/blob_store.py
+# Armazenamento de artefatos (modelos, pedaços de candles, COT, estado) atrás de uma
+# interface única: get/put/list/stat/delete, variantes em lote (com concorrência limitada) e
+# assíncronas. Os arquivos são organizados em "buckets" lógicos (candles, models,
+# cot_raw, cot_csv, state); cada backend decide onde eles moram:
+#   - drive: uma pasta do Google Drive por bucket (CONFIG["blob_store"]["drive_folders"])
+#   - local: um diretório por bucket, para rodar/benchmarkar o pipeline offline
+#   - s3:    prefixos num bucket S3 compatível (AWS, MinIO local...), via boto3
+# O backend vem de CONFIG["blob_store"]["backend"] (env BLOB_BACKEND).
+
+import os
+import shutil
+import hashlib
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import CONFIG
+
+logger = logging.getLogger(__name__)
+
+CANDLES = "candles"
+MODELS = "models"
+COT_RAW = "cot_raw"
+COT_CSV = "cot_csv"
+STATE = "state"
+
+CANDLE_SUFFIXES = ('.csv', '.npy', '.manifest.json', '.npz', '.cndl', '.index.json')
+COPY_BUFFER = 1 << 20
+
+
+def bucket_for(filename: str) -> str:
+    """Bucket padrão de um arquivo pelo nome (mesma regra das pastas do Drive)."""
+    name = filename.lower()
+    if name.endswith(CANDLE_SUFFIXES):
+        return CANDLES
+    if name.endswith('.pkl'):
+        return MODELS
+    return STATE
+
+
+def _file_md5(path: str) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(COPY_BUFFER), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    """
+    Interface comum. Subclasses implementam get/put/list/stat/delete; lotes, versões
+    assíncronas e uploads em segundo plano (put_later) vêm prontos daqui.
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None):
+        self.max_concurrency = max_concurrency or CONFIG.get("blob_store", {}).get("max_concurrency", 4)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="blob")
+        self._lock = threading.Lock()
+        self._queued = set()
+        self._futures = set()
+
+    # ---------- operações básicas ----------
+
+    def get(self, bucket: str, name: str, destination: str) -> str:
+        """Baixa `name` para `destination`; FileNotFoundError se não existir."""
+        raise NotImplementedError
+
+    def put(self, bucket: str, path: str, name: Optional[str] = None) -> str:
+        """Envia o arquivo local `path` (com o nome `name` ou o basename); devolve o identificador remoto."""
+        raise NotImplementedError
+
+    def list(self, bucket: str, prefix: str = "") -> List[Dict]:
+        """Metadados ({name, size, md5, modified}) dos arquivos do bucket."""
+        raise NotImplementedError
+
+    def stat(self, bucket: str, name: str) -> Optional[Dict]:
+        """Metadados de um arquivo, ou None se não existir."""
+        raise NotImplementedError
+
+    def delete(self, bucket: str, name: str) -> bool:
+        """Apaga `name` do bucket; False se ele já não existia."""
+        raise NotImplementedError
+
+    # ---------- lotes ----------
+
+    def get_many(self, items: Iterable[Tuple[str, str, str]]) -> Dict[str, Optional[Exception]]:
+        """Baixa (bucket, name, destination) em paralelo; devolve {name: None ou a exceção}."""
+        jobs = {name: self._executor.submit(self.get, bucket, name, dest) for bucket, name, dest in items}
+        return {name: job.exception() for name, job in jobs.items()}
+
+    def put_many(self, items: Iterable[Tuple[str, str]]) -> Dict[str, Optional[Exception]]:
+        """Envia (bucket, path) em paralelo; devolve {path: None ou a exceção}."""
+        jobs = {path: self._executor.submit(self.put, bucket, path) for bucket, path in items}
+        return {path: job.exception() for path, job in jobs.items()}
+
+    # ---------- segundo plano ----------
+
+    def put_later(self, bucket: str, path: str):
+        """
+        Agenda o envio de `path` e volta na hora. Pedidos repetidos enquanto o envio
+        ainda não começou viram um só.
+        """
+        key = (bucket, path)
+        with self._lock:
+            if key in self._queued:
+                return
+            self._queued.add(key)
+
+        def run():
+            with self._lock:
+                self._queued.discard(key)
+            try:
+                self.put(bucket, path)
+            except Exception as e:
+                logger.warning(f"Falha ao enviar {os.path.basename(path)} ({bucket}): {e}")
+
+        future = self._executor.submit(run)
+        with self._lock:
+            self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Espera os envios agendados (True se todos terminaram)."""
+        with self._lock:
+            pending = list(self._futures)
+        return not wait(pending, timeout=timeout).not_done
+
+    # ---------- assíncrono ----------
+
+    async def aget(self, bucket: str, name: str, destination: str) -> str:
+        return await asyncio.to_thread(self.get, bucket, name, destination)
+
+    async def aput(self, bucket: str, path: str, name: Optional[str] = None) -> str:
+        return await asyncio.to_thread(self.put, bucket, path, name)
+
+    async def alist(self, bucket: str, prefix: str = "") -> List[Dict]:
+        return await asyncio.to_thread(self.list, bucket, prefix)
+
+    async def astat(self, bucket: str, name: str) -> Optional[Dict]:
+        return await asyncio.to_thread(self.stat, bucket, name)
+
+    async def _gather_limited(self, calls):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def limited(call):
+            async with semaphore:
+                return await call
+
+        return await asyncio.gather(*(limited(c) for c in calls), return_exceptions=True)
+
+    async def aget_many(self, items: Iterable[Tuple[str, str, str]]) -> Dict[str, Optional[Exception]]:
+        items = list(items)
+        results = await self._gather_limited([self.aget(b, n, d) for b, n, d in items])
+        return {n: r if isinstance(r, Exception) else None for (_, n, _), r in zip(items, results)}
+
+    async def aput_many(self, items: Iterable[Tuple[str, str]]) -> Dict[str, Optional[Exception]]:
+        items = list(items)
+        results = await self._gather_limited([self.aput(b, p) for b, p in items])
+        return {p: r if isinstance(r, Exception) else None for (_, p), r in zip(items, results)}
+
+
+class LocalBlobStore(BlobStore):
+    """Um diretório por bucket sob `root`. Escritas atômicas (cópia em streaming + rename)."""
+
+    def __init__(self, root: Optional[str] = None, max_concurrency: Optional[int] = None):
+        super().__init__(max_concurrency)
+        self.root = root or CONFIG.get("blob_store", {}).get("local_root", os.path.join("data", "blobs"))
+
+    def _path(self, bucket: str, name: str) -> str:
+        return os.path.join(self.root, bucket, name)
+
+    @staticmethod
+    def _copy(src: str, dst: str):
+        os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+        tmp = f"{dst}.tmp"
+        with open(src, "rb") as fin, open(tmp, "wb") as fout:
+            shutil.copyfileobj(fin, fout, COPY_BUFFER)
+            fout.flush()
+            os.fsync(fout.fileno())
+        os.replace(tmp, dst)
+
+    def get(self, bucket, name, destination):
+        src = self._path(bucket, name)
+        if not os.path.exists(src):
+            raise FileNotFoundError(f"{bucket}/{name} não existe em {self.root}")
+        if not (os.path.exists(destination) and os.path.samefile(src, destination)):
+            self._copy(src, destination)
+        return destination
+
+    def put(self, bucket, path, name=None):
+        dst = self._path(bucket, name or os.path.basename(path))
+        self._copy(path, dst)
+        return dst
+
+    def stat(self, bucket, name):
+        path = self._path(bucket, name)
+        if not os.path.exists(path):
+            return None
+        st = os.stat(path)
+        return {"name": name, "size": st.st_size, "md5": _file_md5(path), "modified": st.st_mtime}
+
+    def delete(self, bucket, name):
+        try:
+            os.remove(self._path(bucket, name))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def list(self, bucket, prefix=""):
+        folder = os.path.join(self.root, bucket)
+        if not os.path.isdir(folder):
+            return []
+        return [self.stat(bucket, n) for n in sorted(os.listdir(folder))
+                if n.startswith(prefix) and not n.endswith(".tmp")]
+
+
+class DriveBlobStore(BlobStore):
+    """Buckets = pastas do Drive. Reaproveita o manifesto de pastas e a fila do drive_sync."""
+
+    def __init__(self, folders: Optional[Dict[str, Optional[str]]] = None, max_concurrency: Optional[int] = None):
+        super().__init__(max_concurrency)
+        self.folders = folders if folders is not None else CONFIG.get("blob_store", {}).get("drive_folders", {})
+
+    @staticmethod
+    def _info(f: Dict) -> Dict:
+        return {"name": f["name"], "size": int(f.get("size", 0) or 0), "md5": f.get("md5Checksum"),
+                "modified": f.get("modifiedTime"), "id": f.get("id")}
+
+    def get(self, bucket, name, destination):
+        from data.google_drive_client import download_file
+        download_file(name, destination, drive_folder_id=self.folders.get(bucket))
+        return destination
+
+    def put(self, bucket, path, name=None):
+        from data.google_drive_client import upload_or_update_file
+        if name and name != os.path.basename(path):
+            raise ValueError("DriveBlobStore envia com o nome do arquivo local")
+        return upload_or_update_file(path, drive_folder_id=self.folders.get(bucket))
+
+    def stat(self, bucket, name):
+        from data.google_drive_client import find_file_id, get_folder_manifest
+        folder = self.folders.get(bucket)
+        if folder:
+            info = get_folder_manifest().get(name, folder)
+            return self._info(info) if info else None
+        file_id = find_file_id(name)
+        return {"name": name, "id": file_id} if file_id else None
+
+    def delete(self, bucket, name):
+        from data.google_drive_client import delete_file
+        return delete_file(name, drive_folder_id=self.folders.get(bucket))
+
+    def list(self, bucket, prefix=""):
+        from data.google_drive_client import get_folder_manifest
+        files = get_folder_manifest().folder(self.folders.get(bucket) or "root").values()
+        return [self._info(f) for f in files if f["name"].startswith(prefix)]
+
+    def put_later(self, bucket, path):
+        # A fila do drive_sync já agrupa, deduplica e compartilha em lote
+        from data.drive_sync import get_drive_sync
+        get_drive_sync().enqueue(path, self.folders.get(bucket))
+
+    def flush(self, timeout=None):
+        from data.drive_sync import get_drive_sync
+        return get_drive_sync().flush(timeout) and super().flush(timeout)
+
+
+class S3BlobStore(BlobStore):
+    """
+    Buckets lógicos = prefixos `{bucket}/` num bucket S3 compatível (MinIO serve de
+    substituto local). Transferências multipart em streaming pelo TransferManager do boto3.
+    """
+
+    def __init__(self, bucket: Optional[str] = None, endpoint_url: Optional[str] = None,
+                 prefix: Optional[str] = None, max_concurrency: Optional[int] = None):
+        super().__init__(max_concurrency)
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError as e:
+            raise ImportError("Backend s3 do blob_store requer o pacote boto3 (pip install boto3)") from e
+        cfg = CONFIG.get("blob_store", {}).get("s3", {})
+        self.bucket = bucket or cfg.get("bucket")
+        self.prefix = prefix if prefix is not None else cfg.get("prefix", "")
+        # Credenciais pela cadeia padrão do boto3 (AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY...)
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or cfg.get("endpoint_url"))
+        self.transfer = TransferConfig(max_concurrency=self.max_concurrency, multipart_chunksize=8 * COPY_BUFFER)
+
+    def _key(self, bucket: str, name: str) -> str:
+        return f"{self.prefix}{bucket}/{name}"
+
+    def _is_missing(self, error) -> bool:
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def get(self, bucket, name, destination):
+        os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+        tmp = f"{destination}.tmp"
+        try:
+            self.client.download_file(self.bucket, self._key(bucket, name), tmp, Config=self.transfer)
+        except Exception as e:
+            if self._is_missing(e):
+                raise FileNotFoundError(f"{bucket}/{name} não existe no bucket {self.bucket}") from e
+            raise
+        os.replace(tmp, destination)
+        return destination
+
+    def put(self, bucket, path, name=None):
+        key = self._key(bucket, name or os.path.basename(path))
+        self.client.upload_file(path, self.bucket, key, Config=self.transfer)
+        return key
+
+    def stat(self, bucket, name):
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(bucket, name))
+        except Exception as e:
+            if self._is_missing(e):
+                return None
+            raise
+        etag = head.get("ETag", "").strip('"')
+        return {"name": name, "size": head.get("ContentLength", 0),
+                "md5": etag if "-" not in etag else None, "modified": head.get("LastModified")}
+
+    def delete(self, bucket, name):
+        # DeleteObject não falha para chave ausente: só o stat antes distingue os casos
+        existed = self.stat(bucket, name) is not None
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(bucket, name))
+        return existed
+
+    def list(self, bucket, prefix=""):
+        base = self._key(bucket, "")
+        out = []
+        for page in self.client.get_paginator("list_objects_v2").paginate(Bucket=self.bucket, Prefix=base + prefix):
+            for obj in page.get("Contents", []):
+                etag = obj.get("ETag", "").strip('"')
+                out.append({"name": obj["Key"][len(base):], "size": obj.get("Size", 0),
+                            "md5": etag if "-" not in etag else None, "modified": obj.get("LastModified")})
+        return out
+
+
+BACKENDS = {"drive": DriveBlobStore, "local": LocalBlobStore, "s3": S3BlobStore}
+
+_default_store: Optional[BlobStore] = None
+_default_guard = threading.Lock()
+
+
+def get_blob_store() -> BlobStore:
+    """Backend configurado em CONFIG["blob_store"]["backend"], compartilhado pelo processo."""
+    global _default_store
+    with _default_guard:
+        if _default_store is None:
+            backend = CONFIG.get("blob_store", {}).get("backend", "drive")
+            if backend not in BACKENDS:
+                raise ValueError(f"Backend de blob_store desconhecido: {backend}")
+            _default_store = BACKENDS[backend]()
+            logger.info(f"Blob store: {backend}")
+        return _default_store
@@ -0,0 +1,216 @@
+# data/candle_cache.py
+# Janelas de candles em memória por (símbolo, intervalo): ring buffer numpy com os
+# últimos N candles, onde N vem do maior lookback dos indicadores. Depois da carga
+# inicial só são buscados os candles mais novos que o último guardado (top-up de 1-2
+# barras); enquanto um top-up está em voo os demais chamadores recebem a janela atual
+# (stale-while-revalidate). O total de séries em memória é limitado por LRU.
+
+import math
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from data.candle_store import CANDLE_DTYPE, candles_to_array, array_to_candles
+from data.dukascopy_data import TF_SECONDS, INTERVAL_ALIASES
+from config import CONFIG
+
+logger = logging.getLogger(__name__)
+
+FEATURE_LOOKBACK = 50   # maior janela em prepare_universal_features (sma_50, bb_*_50)
+LOOKBACK_KEYS = ("period", "slow", "window", "lookback")
+# Seções do CONFIG que não são de estratégia/indicador
+NON_STRATEGY_SECTIONS = {"telegram", "languages", "data_providers", "candle_cache", "live_feed"}
+
+
+def interval_seconds(interval: str) -> int:
+    tf = INTERVAL_ALIASES.get(interval, interval).lower()
+    return TF_SECONDS.get(tf, 60)
+
+
+def max_indicator_lookback(config: Dict = CONFIG) -> int:
+    """Maior período/janela configurado nas estratégias (ou das features universais)."""
+    best = FEATURE_LOOKBACK
+    stack = [v for k, v in config.items() if isinstance(v, dict) and k not in NON_STRATEGY_SECTIONS]
+    while stack:
+        node = stack.pop()
+        for key, value in node.items():
+            if isinstance(value, dict):
+                stack.append(value)
+            elif isinstance(value, int) and not isinstance(value, bool) \
+                    and any(k in key for k in LOOKBACK_KEYS):
+                best = max(best, value)
+    return best
+
+
+def default_window() -> int:
+    cfg = CONFIG.get("candle_cache", {})
+    # EMAs e desvios precisam de aquecimento além do próprio período
+    return max(cfg.get("min_window", 200), cfg.get("lookback_multiplier", 4) * max_indicator_lookback())
+
+
+class CandleRing:
+    """Ring buffer de capacidade fixa com candles em ordem crescente de timestamp."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.buf = np.zeros(capacity, dtype=CANDLE_DTYPE)
+        self.start = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def last_ts(self) -> Optional[int]:
+        if not self.size:
+            return None
+        return int(self.buf["timestamp"][(self.start + self.size - 1) % self.capacity])
+
+    def view(self, n: Optional[int] = None) -> np.ndarray:
+        """Cópia ordenada dos últimos n candles (todos se n=None)."""
+        n = self.size if n is None else min(n, self.size)
+        first = (self.start + self.size - n) % self.capacity
+        idx = (first + np.arange(n)) % self.capacity
+        return self.buf[idx]
+
+    def extend(self, arr: np.ndarray) -> int:
+        """
+        Acrescenta candles novos. O candle no último timestamp é substituído (a barra
+        em formação muda); timestamps mais antigos que ele são ignorados.
+        Devolve quantas barras novas entraram.
+        """
+        if not len(arr):
+            return 0
+        arr = np.sort(arr, order="timestamp", kind="stable")
+        last = self.last_ts
+        added = 0
+        if last is not None:
+            same = arr[arr["timestamp"] == last]
+            if len(same):
+                self.buf[(self.start + self.size - 1) % self.capacity] = same[-1]
+            arr = arr[arr["timestamp"] > last]
+        if len(arr):
+            _, keep = np.unique(arr["timestamp"][::-1], return_index=True)
+            arr = arr[len(arr) - 1 - keep]  # último de cada timestamp, em ordem
+        for row in arr[-self.capacity:]:
+            pos = (self.start + self.size) % self.capacity
+            self.buf[pos] = row
+            if self.size < self.capacity:
+                self.size += 1
+            else:
+                self.start = (self.start + 1) % self.capacity
+            added += 1
+        return added
+
+
+class _Entry:
+    __slots__ = ("ring", "fetched_at", "refresh")
+
+    def __init__(self, capacity: int):
+        self.ring = CandleRing(capacity)
+        self.fetched_at = 0.0
+        self.refresh: Optional[asyncio.Task] = None
+
+
+class RollingCandleCache:
+    """
+    Frente assíncrona para data_client.fetch_candles que mantém as últimas N barras de
+    cada (símbolo, intervalo) em memória e só busca as que faltam.
+    """
+
+    def __init__(self, data_client, window: Optional[int] = None, max_series: Optional[int] = None):
+        cfg = CONFIG.get("candle_cache", {})
+        self.data_client = data_client
+        self.window = window or default_window()
+        self.max_series = max_series or cfg.get("max_series", 64)
+        self.wait_timeout = cfg.get("topup_wait", 10)
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self.stats = {"hits": 0, "stale_served": 0, "topups": 0, "full_loads": 0,
+                      "bars_fetched": 0, "evictions": 0}
+
+    def _entry(self, symbol: str, interval: str) -> _Entry:
+        key = (symbol, interval)
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _Entry(self.window)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_series:
+                (old_sym, old_int), old = self._entries.popitem(last=False)
+                if old.refresh is not None and not old.refresh.done():
+                    old.refresh.cancel()
+                self.stats["evictions"] += 1
+                logger.debug(f"Janela {old_sym} {old_int} removida da memória (LRU)")
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _is_fresh(self, entry: _Entry, period: int, now: float) -> bool:
+        # Atual enquanto nenhuma barra nova pode ter fechado desde a última busca
+        if not len(entry.ring):
+            return False
+        return int(now // period) == int(entry.fetched_at // period)
+
+    def _missing_bars(self, entry: _Entry, period: int, now: float) -> int:
+        last = entry.ring.last_ts
+        if last is None:
+            return self.window
+        # +1: a última barra guardada pode ter mudado desde então
+        return int(math.ceil((now - last) / period)) + 1
+
+    async def _refresh(self, symbol: str, interval: str, entry: _Entry, limit: int):
+        full = limit >= self.window or not len(entry.ring)
+        data = await self.data_client.fetch_candles(symbol, interval=interval, limit=min(limit, self.window))
+        if not data or not data.get("history"):
+            return
+        arr = candles_to_array(data["history"])
+        last = entry.ring.last_ts
+        # Buraco entre a janela e a resposta também exige recomeçar a janela
+        gap = last is not None and len(arr) and arr["timestamp"].min() > last + interval_seconds(interval)
+        if full or gap:
+            self.stats["full_loads" if full else "topups"] += 1
+            ring = CandleRing(self.window)
+            ring.extend(arr)
+            entry.ring = ring
+        else:
+            self.stats["topups"] += 1
+            entry.ring.extend(arr)
+        self.stats["bars_fetched"] += len(arr)
+        entry.fetched_at = time.time()
+
+    async def get(self, symbol: str, interval: str = "1min", limit: Optional[int] = None) -> Optional[Dict]:
+        """
+        Últimos `limit` candles (padrão: a janela inteira) no formato dos provedores
+        ({"history", "close"}). None se não houver dados.
+        """
+        limit = min(limit or self.window, self.window)
+        period = interval_seconds(interval)
+        now = time.time()
+        entry = self._entry(symbol, interval)
+
+        if self._is_fresh(entry, period, now) and len(entry.ring) >= limit:
+            self.stats["hits"] += 1
+        elif entry.refresh is not None and not entry.refresh.done() and len(entry.ring) >= limit:
+            # Outro chamador já está atualizando: serve o que há (stale-while-revalidate)
+            self.stats["stale_served"] += 1
+        else:
+            if entry.refresh is None or entry.refresh.done():
+                missing = self.window if len(entry.ring) < limit else self._missing_bars(entry, period, now)
+                entry.refresh = asyncio.ensure_future(self._refresh(symbol, interval, entry, missing))
+            try:
+                await asyncio.wait_for(asyncio.shield(entry.refresh), timeout=self.wait_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Top-up de {symbol} {interval} demorando; servindo janela atual")
+            except Exception as e:
+                logger.warning(f"Falha ao atualizar {symbol} {interval}: {e}")
+
+        if not len(entry.ring):
+            return None
+        candles = array_to_candles(entry.ring.view(limit))
+        return {"history": candles, "close": candles[-1]["close"]}
+
+    def invalidate(self, symbol: str, interval: str):
+        self._entries.pop((symbol, interval), None)
@@ -0,0 +1,242 @@
+# data/candle_codec.py
+# Formato binário compacto para histórico de candles (.cndl). Cada coluna é gravada
+# separadamente e comprimida em bloco:
+#   - timestamp: valor inicial + deltas inteiros (quase sempre constantes) no menor
+#     tipo inteiro que cabe;
+#   - preços/volume: inteiros escalados (pips: 10^casas decimais) com delta, quando a
+#     conversão é exata; senão float32 (se pedido) ou float64 cru.
+# Compressão zstd > lz4 > zlib, conforme o que estiver instalado. A leitura volta
+# direto para um array CANDLE_DTYPE (np.frombuffer + cumsum), sem objetos Python.
+#
+#   python -m data.candle_codec data/*.csv --store           # migra CSVs legados
+#   python -m data.candle_codec data/*.csv --out data/cndl   # gera arquivos .cndl
+
+import os
+import glob
+import zlib
+import struct
+import logging
+import argparse
+from typing import Optional
+
+import numpy as np
+
+from data.candle_store import get_candle_store, candles_to_array, split_series_key, series_key, CANDLE_DTYPE, CANDLE_COLUMNS
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+logger = logging.getLogger(__name__)
+
+CODEC_SUFFIX = ".cndl"
+MAGIC = b"CNDL"
+VERSION = 1
+MAX_DECIMALS = 8
+
+FILE_HEADER = struct.Struct("<4sBBxxQ")     # magic, versão, compressor, linhas
+COLUMN_HEADER = struct.Struct("<BbBxqI")    # tipo, casas decimais, bytes por inteiro, base, tamanho
+
+# Tipos de coluna
+DELTA_INT, FLOAT32, FLOAT64 = 0, 1, 2
+# Compressores
+NONE, ZLIB, ZSTD, LZ4 = 0, 1, 2, 3
+COMPRESSOR_NAMES = {"none": NONE, "zlib": ZLIB, "zstd": ZSTD, "lz4": LZ4}
+
+
+def default_compressor() -> int:
+    if zstandard is not None:
+        return ZSTD
+    if lz4_frame is not None:
+        return LZ4
+    return ZLIB
+
+
+def _compress(data: bytes, compressor: int) -> bytes:
+    if compressor == ZSTD:
+        return zstandard.ZstdCompressor(level=9).compress(data)
+    if compressor == LZ4:
+        return lz4_frame.compress(data, compression_level=9)
+    if compressor == ZLIB:
+        return zlib.compress(data, 6)
+    return data
+
+
+def _decompress(data: bytes, compressor: int) -> bytes:
+    if compressor == ZSTD:
+        if zstandard is None:
+            raise ImportError("Arquivo .cndl comprimido com zstd: instale o pacote zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if compressor == LZ4:
+        if lz4_frame is None:
+            raise ImportError("Arquivo .cndl comprimido com lz4: instale o pacote lz4")
+        return lz4_frame.decompress(data)
+    if compressor == ZLIB:
+        return zlib.decompress(data)
+    return data
+
+
+def _int_width(values: np.ndarray) -> np.dtype:
+    if not len(values):
+        return np.dtype(np.int8)
+    lo, hi = int(values.min()), int(values.max())
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _exact_decimals(values: np.ndarray) -> Optional[int]:
+    """Menor número de casas decimais em que o float volta idêntico de um inteiro escalado."""
+    if not np.all(np.isfinite(values)):
+        return None
+    for decimals in range(MAX_DECIMALS + 1):
+        scale = 10.0 ** decimals
+        scaled = np.round(values * scale)
+        if np.abs(scaled).max(initial=0) >= 2 ** 53:
+            return None
+        if np.array_equal(scaled / scale, values):
+            return decimals
+    return None
+
+
+def _encode_column(values: np.ndarray, kind: int, decimals: int, compressor: int) -> bytes:
+    base, width = 0, 0
+    if kind == DELTA_INT:
+        ints = values if values.dtype.kind == "i" else np.round(values * 10.0 ** decimals).astype(np.int64)
+        base = int(ints[0]) if len(ints) else 0
+        deltas = np.diff(ints)
+        dtype = _int_width(deltas)
+        width = dtype.itemsize
+        raw = deltas.astype(dtype.newbyteorder("<")).tobytes()
+    elif kind == FLOAT32:
+        raw = values.astype("<f4").tobytes()
+    else:
+        raw = values.astype("<f8").tobytes()
+    payload = _compress(raw, compressor)
+    return COLUMN_HEADER.pack(kind, decimals, width, base, len(payload)) + payload
+
+
+def encode_candles(candles, price_mode: str = "auto", compressor: Optional[int] = None) -> bytes:
+    """
+    Candles (array CANDLE_DTYPE, DataFrame ou lista de dicts) -> bytes .cndl.
+    price_mode: "auto" (pips quando exato, senão float64), "f32" (float32, com perda) ou "f8".
+    """
+    arr = candles_to_array(candles)
+    compressor = default_compressor() if compressor is None else compressor
+    parts = [FILE_HEADER.pack(MAGIC, VERSION, compressor, len(arr))]
+    parts.append(_encode_column(arr["timestamp"], DELTA_INT, 0, compressor))
+    for name in CANDLE_COLUMNS[1:]:
+        values = np.ascontiguousarray(arr[name])
+        decimals = _exact_decimals(values) if price_mode == "auto" else None
+        if decimals is not None:
+            parts.append(_encode_column(values, DELTA_INT, decimals, compressor))
+        elif price_mode == "f32":
+            parts.append(_encode_column(values, FLOAT32, 0, compressor))
+        else:
+            parts.append(_encode_column(values, FLOAT64, 0, compressor))
+    return b"".join(parts)
+
+
+def decode_candles(data: bytes) -> np.ndarray:
+    """Bytes .cndl -> array CANDLE_DTYPE."""
+    magic, version, compressor, rows = FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Não é um arquivo .cndl")
+    if version > VERSION:
+        raise ValueError(f"Versão .cndl {version} não suportada")
+    out = np.empty(rows, dtype=CANDLE_DTYPE)
+    offset = FILE_HEADER.size
+    for name in CANDLE_COLUMNS:
+        kind, decimals, width, base, length = COLUMN_HEADER.unpack_from(data, offset)
+        offset += COLUMN_HEADER.size
+        raw = _decompress(data[offset:offset + length], compressor)
+        offset += length
+        if kind == DELTA_INT:
+            deltas = np.frombuffer(raw, dtype=np.dtype(f"<i{width}"))
+            ints = np.empty(rows, dtype=np.int64)
+            if rows:
+                ints[0] = base
+                np.cumsum(deltas, dtype=np.int64, out=ints[1:])
+                ints[1:] += base
+            out[name] = ints if name == "timestamp" else ints / 10.0 ** decimals
+        else:
+            out[name] = np.frombuffer(raw, dtype="<f4" if kind == FLOAT32 else "<f8")
+    return out
+
+
+def write_candles(path: str, candles, **kwargs) -> str:
+    return _write_bytes(path, encode_candles(candles, **kwargs))
+
+
+def _write_bytes(path: str, payload: bytes) -> str:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return path
+
+
+def read_candles(path: str) -> np.ndarray:
+    with open(path, "rb") as f:
+        return decode_candles(f.read())
+
+
+# ---------- conversor de CSVs legados ----------
+
+def convert_csv(path: str, out_dir: Optional[str] = None, to_store: bool = False,
+                compressor: Optional[int] = None) -> dict:
+    """Converte um data/{symbol}_{tf}.csv; devolve {linhas, bytes do CSV, bytes .cndl}."""
+    import pandas as pd
+
+    symbol, tf = split_series_key(os.path.splitext(os.path.basename(path))[0])
+    if symbol is None:
+        raise ValueError(f"Nome de arquivo sem símbolo/timeframe: {path}")
+    df = pd.read_csv(path)
+    if df.empty or "timestamp" not in df.columns:
+        return {"rows": 0, "csv_bytes": os.path.getsize(path), "cndl_bytes": 0}
+    arr = candles_to_array(df)
+    payload = encode_candles(arr, compressor=compressor)
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+        _write_bytes(os.path.join(out_dir, series_key(symbol, tf) + CODEC_SUFFIX), payload)
+    if to_store:
+        get_candle_store().append(symbol, tf, arr)
+    return {"rows": len(arr), "csv_bytes": os.path.getsize(path), "cndl_bytes": len(payload)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Converte CSVs de candles para .cndl / candle store")
+    parser.add_argument("paths", nargs="+", help="CSVs (aceita glob, ex.: data/*.csv)")
+    parser.add_argument("--out", default=None, help="diretório de saída dos .cndl")
+    parser.add_argument("--store", action="store_true", help="também grava as séries na candle store")
+    parser.add_argument("--compressor", choices=sorted(COMPRESSOR_NAMES), default=None)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    files = sorted({p for pattern in args.paths for p in (glob.glob(pattern) or [pattern])})
+    total_csv = total_cndl = 0
+    for path in files:
+        try:
+            stats = convert_csv(path, args.out, args.store, COMPRESSOR_NAMES.get(args.compressor))
+        except Exception as e:
+            print(f"❌ {path}: {e}")
+            continue
+        total_csv += stats["csv_bytes"]
+        total_cndl += stats["cndl_bytes"]
+        ratio = stats["csv_bytes"] / stats["cndl_bytes"] if stats["cndl_bytes"] else 0
+        print(f"✅ {path}: {stats['rows']} linhas, {stats['csv_bytes']} -> {stats['cndl_bytes']} bytes ({ratio:.1f}x)")
+    if total_cndl:
+        print(f"Total: {total_csv} -> {total_cndl} bytes ({total_csv / total_cndl:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+# data/candle_store.py
+# Armazenamento colunar e append-only de candles por (símbolo, timeframe).
+# Cada série é um manifesto JSON + segmentos .npy imutáveis e tipados
+# (timestamp int64 em segundos, OHLCV float64). Gravar custa O(candles novos);
+# a compactação periódica (maintain(), fora do caminho de gravação) junta os
+# segmentos num só.
+
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+STORE_DIR = os.path.join("data", "store")
+CANDLE_DTYPE = np.dtype([
+    ("timestamp", "<i8"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+CANDLE_COLUMNS = CANDLE_DTYPE.names
+MANIFEST_SUFFIX = ".manifest.json"
+SEGMENT_SUFFIX = ".npy"
+MAX_SEGMENTS = 32  # Acima disso maintain() compacta a série
+
+
+def series_key(symbol: str, timeframe: str) -> str:
+    """Chave canônica da série: eurusd_m1, eurusdotc_h4, ..."""
+    return f"{symbol.lower().replace(' ', '').replace('/', '')}_{timeframe.lower()}"
+
+
+def split_series_key(key: str) -> Tuple[Optional[str], Optional[str]]:
+    if "_" not in key:
+        return None, None
+    symbol, tf = key.rsplit("_", 1)
+    return symbol, tf
+
+
+def _normalize_timestamps(values) -> np.ndarray:
+    """Converte timestamps (s, ms, ISO ou datetime) para int64 em segundos."""
+    arr = np.asarray(values)
+    if arr.dtype.kind in "iuf":
+        ts = arr.astype(np.int64)
+        # Alguns provedores (Dukascopy) devolvem milissegundos
+        return np.where(ts > 10**11, ts // 1000, ts)
+    dt = pd.to_datetime(pd.Series(arr), utc=True)
+    return (dt.astype("int64") // 10**9).to_numpy(dtype=np.int64)
+
+
+def timestamps_to_datetime(values) -> np.ndarray:
+    """Timestamps em qualquer formato aceito pela store -> datetime64[ns] (UTC, sem fuso)."""
+    return _normalize_timestamps(values).astype("datetime64[s]").astype("datetime64[ns]")
+
+
+def candles_to_array(candles) -> np.ndarray:
+    """Lista de dicts, DataFrame ou array estruturado -> array CANDLE_DTYPE."""
+    if isinstance(candles, np.ndarray) and candles.dtype == CANDLE_DTYPE:
+        return candles
+    if isinstance(candles, pd.DataFrame):
+        df = candles
+    else:
+        df = pd.DataFrame(list(candles))
+    out = np.empty(len(df), dtype=CANDLE_DTYPE)
+    if len(df) == 0:
+        return out
+    out["timestamp"] = _normalize_timestamps(df["timestamp"].to_numpy())
+    for col in CANDLE_COLUMNS[1:]:
+        if col in df.columns:
+            out[col] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+        else:
+            out[col] = 0.0
+    return out
+
+
+def array_to_candles(arr: np.ndarray) -> List[Dict]:
+    """Array estruturado -> lista de dicts no formato usado pelos provedores."""
+    cols = {name: arr[name].tolist() for name in CANDLE_COLUMNS}
+    return [
+        {name: cols[name][i] for name in CANDLE_COLUMNS}
+        for i in range(len(arr))
+    ]
+
+
+def _dedupe_keep_last(arr: np.ndarray) -> np.ndarray:
+    """Ordena por timestamp e mantém a última ocorrência de cada timestamp."""
+    if len(arr) < 2:
+        return arr
+    order = np.argsort(arr["timestamp"], kind="stable")
+    arr = arr[order]
+    ts = arr["timestamp"]
+    keep = np.empty(len(arr), dtype=bool)
+    keep[:-1] = ts[1:] != ts[:-1]
+    keep[-1] = True
+    return arr[keep]
+
+
+def _atomic_write_bytes(path: str, write_fn: Callable) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        write_fn(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class CandleStore:
+    """Séries de candles append-only com segmentos .npy imutáveis + manifesto."""
+
+    def __init__(self, root: str = STORE_DIR, max_segments: int = MAX_SEGMENTS):
+        self.root = root
+        self.max_segments = max_segments
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    # ---------- caminhos / manifesto ----------
+
+    def _lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def manifest_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}{MANIFEST_SUFFIX}")
+
+    def segment_path(self, key: str, seq: int) -> str:
+        return os.path.join(self.root, f"{key}.{seq:06d}{SEGMENT_SUFFIX}")
+
+    def _load_manifest(self, key: str) -> Dict:
+        path = self.manifest_path(key)
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                return json.load(f)
+        return {"key": key, "next_seq": 0, "last_ts": None, "segments": []}
+
+    def _save_manifest(self, key: str, manifest: Dict) -> str:
+        manifest["updated_at"] = datetime.utcnow().isoformat()
+        payload = json.dumps(manifest, indent=1).encode("utf-8")
+        path = self.manifest_path(key)
+        _atomic_write_bytes(path, lambda f: f.write(payload))
+        return path
+
+    def _write_segment(self, key: str, manifest: Dict, arr: np.ndarray) -> str:
+        seq = manifest["next_seq"]
+        path = self.segment_path(key, seq)
+        _atomic_write_bytes(path, lambda f: np.save(f, arr, allow_pickle=False))
+        manifest["next_seq"] = seq + 1
+        manifest["segments"].append({
+            "file": os.path.basename(path),
+            "rows": int(len(arr)),
+            "min_ts": int(arr["timestamp"][0]),
+            "max_ts": int(arr["timestamp"][-1]),
+        })
+        last = manifest.get("last_ts")
+        manifest["last_ts"] = int(arr["timestamp"][-1]) if last is None else max(last, int(arr["timestamp"][-1]))
+        return path
+
+    def _load_segments(self, segments: Iterable[Dict]) -> np.ndarray:
+        parts = [
+            np.load(os.path.join(self.root, seg["file"]), mmap_mode="r", allow_pickle=False)
+            for seg in segments
+        ]
+        if not parts:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        return np.concatenate(parts)
+
+    # ---------- API pública ----------
+
+    def series(self) -> List[str]:
+        """Lista as chaves de todas as séries com manifesto local."""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name[: -len(MANIFEST_SUFFIX)]
+            for name in os.listdir(self.root)
+            if name.endswith(MANIFEST_SUFFIX)
+        )
+
+    def has_series(self, symbol: str, timeframe: str) -> bool:
+        return os.path.exists(self.manifest_path(series_key(symbol, timeframe)))
+
+    def files(self, symbol: str, timeframe: str) -> List[str]:
+        """Manifesto + segmentos da série (para sincronização remota)."""
+        key = series_key(symbol, timeframe)
+        manifest = self._load_manifest(key)
+        paths = [os.path.join(self.root, seg["file"]) for seg in manifest["segments"]]
+        if os.path.exists(self.manifest_path(key)):
+            paths.append(self.manifest_path(key))
+        return paths
+
+    def segments(self, symbol: str, timeframe: str) -> List[Dict]:
+        """Segmentos da série ({file, rows, min_ts, max_ts}) segundo o manifesto local."""
+        return list(self._load_manifest(series_key(symbol, timeframe))["segments"])
+
+    def last_timestamp(self, symbol: str, timeframe: str) -> Optional[int]:
+        return self._load_manifest(series_key(symbol, timeframe)).get("last_ts")
+
+    def append(self, symbol: str, timeframe: str, candles) -> List[str]:
+        """
+        Acrescenta candles à série. Só grava linhas novas: timestamps ainda não
+        armazenados ou >= último candle (o candle em formação pode ser revisado).
+        Retorna os caminhos escritos (segmento novo + manifesto).
+        """
+        arr = _dedupe_keep_last(candles_to_array(candles))
+        if len(arr) == 0:
+            return []
+        key = series_key(symbol, timeframe)
+        with self._lock(key):
+            manifest = self._load_manifest(key)
+            last_ts = manifest.get("last_ts")
+            if last_ts is not None:
+                arr = arr[self._new_rows_mask(manifest, arr, last_ts)]
+                if len(arr) == 0:
+                    return []
+            written = [self._write_segment(key, manifest, arr)]
+            written.append(self._save_manifest(key, manifest))
+            return written
+
+    def _new_rows_mask(self, manifest: Dict, arr: np.ndarray, last_ts: int) -> np.ndarray:
+        ts = arr["timestamp"]
+        mask = ts >= last_ts
+        same = ts == last_ts
+        if same.any():
+            # Candle igual ao último gravado não gera segmento novo
+            seg = [s for s in manifest["segments"] if s["max_ts"] == last_ts][-1:]
+            stored = self._load_segments(seg)
+            stored = stored[stored["timestamp"] == last_ts][-1:]
+            if len(stored) and arr[same][-1].tolist() == stored[0].tolist():
+                mask &= ~same
+        older = ts < last_ts
+        if not older.any():
+            return mask
+        lo, hi = int(ts[older].min()), int(ts[older].max())
+        overlapping = [s for s in manifest["segments"] if s["max_ts"] >= lo and s["min_ts"] <= hi]
+        existing = self._load_segments(overlapping)["timestamp"]
+        mask[older] = ~np.isin(ts[older], existing)
+        return mask
+
+    def read(self, symbol: str, timeframe: str, start: Optional[int] = None,
+             end: Optional[int] = None) -> np.ndarray:
+        """Lê a série (opcionalmente [start, end] em segundos), ordenada e sem duplicatas."""
+        key = series_key(symbol, timeframe)
+        # Sob o lock da série: a compactação apaga os segmentos que o manifesto lido citaria
+        with self._lock(key):
+            return self._read_locked(key, start, end)
+
+    def _read_locked(self, key: str, start: Optional[int], end: Optional[int]) -> np.ndarray:
+        manifest = self._load_manifest(key)
+        segments = [
+            s for s in manifest["segments"]
+            if (start is None or s["max_ts"] >= start) and (end is None or s["min_ts"] <= end)
+        ]
+        arr = _dedupe_keep_last(self._load_segments(segments))
+        if start is not None or end is not None:
+            ts = arr["timestamp"]
+            mask = np.ones(len(arr), dtype=bool)
+            if start is not None:
+                mask &= ts >= start
+            if end is not None:
+                mask &= ts <= end
+            arr = arr[mask]
+        return np.ascontiguousarray(arr)
+
+    def tail(self, symbol: str, timeframe: str, n: int) -> np.ndarray:
+        """Últimos n candles da série, lendo só os segmentos mais recentes."""
+        key = series_key(symbol, timeframe)
+        with self._lock(key):
+            segments = sorted(self._load_manifest(key)["segments"], key=lambda s: s["max_ts"], reverse=True)
+            taken = 0
+            start = None
+            for idx, seg in enumerate(segments):
+                taken += seg["rows"]
+                start = seg["min_ts"] if start is None else min(start, seg["min_ts"])
+                if taken >= n or idx == len(segments) - 1:
+                    arr = self._read_locked(key, start, None)
+                    if len(arr) >= n or idx == len(segments) - 1:
+                        return arr[-n:] if n > 0 else arr[:0]
+        return np.empty(0, dtype=CANDLE_DTYPE)
+
+    def read_df(self, symbol: str, timeframe: str, start: Optional[int] = None,
+                end: Optional[int] = None) -> pd.DataFrame:
+        return pd.DataFrame(self.read(symbol, timeframe, start=start, end=end))
+
+    def compact(self, symbol: str, timeframe: str) -> List[str]:
+        """Reescreve a série num único segmento (custo O(histórico), uso periódico)."""
+        key = series_key(symbol, timeframe)
+        with self._lock(key):
+            return self._compact_locked(key, self._load_manifest(key))
+
+    def maintain(self, delete_remote: Optional[Callable[[str], None]] = None) -> Dict[str, List[str]]:
+        """
+        Manutenção periódica (ciclo do autotrainer, nunca dentro de append): compacta
+        as séries com mais de max_segments segmentos e, com `delete_remote(filename)`,
+        apaga do armazenamento remoto os segmentos aposentados pela compactação.
+        Devolve {série: arquivos escritos} das séries compactadas.
+        """
+        compacted = {}
+        for key in self.series():
+            with self._lock(key):
+                manifest = self._load_manifest(key)
+                if len(manifest["segments"]) > self.max_segments:
+                    compacted[key] = self._compact_locked(key, manifest)
+                if delete_remote is not None and manifest.get("retired"):
+                    self._delete_retired_locked(key, manifest, delete_remote)
+        return compacted
+
+    def _delete_retired_locked(self, key: str, manifest: Dict, delete_remote: Callable[[str], None]):
+        # Quem falhar fica no manifesto para a próxima manutenção
+        remaining = []
+        for name in manifest["retired"]:
+            try:
+                delete_remote(name)
+            except Exception:
+                remaining.append(name)
+        manifest["retired"] = remaining
+        self._save_manifest(key, manifest)
+
+    def _compact_locked(self, key: str, manifest: Dict) -> List[str]:
+        old_files = [seg["file"] for seg in manifest["segments"]]
+        if len(old_files) <= 1:
+            return []
+        arr = _dedupe_keep_last(self._load_segments(manifest["segments"]))
+        manifest["segments"] = []
+        manifest["last_ts"] = None
+        # Cópias remotas dos segmentos antigos são apagadas depois, por maintain()
+        manifest["retired"] = sorted(set(manifest.get("retired", [])) | set(old_files))
+        written = [self._write_segment(key, manifest, np.ascontiguousarray(arr))]
+        written.append(self._save_manifest(key, manifest))
+        for name in old_files:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
+        return written
+
+    def import_csv(self, filepath: str, symbol: str, timeframe: str) -> List[str]:
+        """Migra um CSV legado data/{symbol}_{tf}.csv para a store."""
+        df = pd.read_csv(filepath)
+        if df.empty or "timestamp" not in df.columns:
+            return []
+        return self.append(symbol, timeframe, df)
+
+    def pull(self, symbol: str, timeframe: str, fetch: Callable[[str, str], None]) -> bool:
+        """
+        Baixa manifesto e segmentos ausentes de um armazenamento remoto.
+        `fetch(filename, destination_path)` faz a transferência de um arquivo.
+        """
+        key = series_key(symbol, timeframe)
+        with self._lock(key):
+            manifest_file = os.path.basename(self.manifest_path(key))
+            tmp_manifest = self.manifest_path(key) + ".remote"
+            try:
+                fetch(manifest_file, tmp_manifest)
+                with open(tmp_manifest, "r") as f:
+                    remote = json.load(f)
+                for seg in remote["segments"]:
+                    path = os.path.join(self.root, seg["file"])
+                    if not os.path.exists(path):
+                        fetch(seg["file"], path)
+                os.replace(tmp_manifest, self.manifest_path(key))
+                return True
+            finally:
+                if os.path.exists(tmp_manifest):
+                    os.remove(tmp_manifest)
+
+
+_default_store: Optional[CandleStore] = None
+_default_store_guard = threading.Lock()
+
+
+def get_candle_store() -> CandleStore:
+    """Instância compartilhada da store do processo."""
+    global _default_store
+    with _default_store_guard:
+        if _default_store is None:
+            _default_store = CandleStore()
+        return _default_store
@@ -0,0 +1,232 @@
+# data/chunk_sync.py
+# Cópia remota do histórico em pedaços diários: cada série vira arquivos
+# {série}.{AAAAMMDD}.cndl (formato binário de data/candle_codec.py) mais um índice {série}.index.json com
+# linhas, intervalo e md5 de cada dia. Um dia fechado nunca muda, então só sobem os
+# pedaços novos ou alterados (na prática, o dia corrente) e quem lê um intervalo baixa
+# só os pedaços que o cobrem. O tráfego fica proporcional aos dados novos, não ao
+# tamanho do histórico.
+
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from data.candle_store import get_candle_store, series_key, split_series_key, CANDLE_DTYPE, _dedupe_keep_last
+from data.blob_store import get_blob_store, CANDLES
+from data.candle_codec import read_candles, write_candles, CODEC_SUFFIX
+
+logger = logging.getLogger(__name__)
+
+CHUNK_DIR = os.path.join("data", "chunks")
+CHUNK_SUFFIX = CODEC_SUFFIX
+LEGACY_CHUNK_SUFFIX = ".npz"
+INDEX_SUFFIX = ".index.json"
+DAY = 86400
+
+
+def chunk_name(key: str, day: int) -> str:
+    return f"{key}.{datetime.fromtimestamp(day * DAY, tz=timezone.utc):%Y%m%d}{CHUNK_SUFFIX}"
+
+
+def index_name(key: str) -> str:
+    return f"{key}{INDEX_SUFFIX}"
+
+
+def _array_md5(arr: np.ndarray) -> str:
+    return hashlib.md5(np.ascontiguousarray(arr).tobytes()).hexdigest()
+
+
+def _default_upload(path: str):
+    get_blob_store().put_later(CANDLES, path)
+
+
+def _default_download(filename: str, destination: str):
+    get_blob_store().get(CANDLES, filename, destination)
+
+
+class ChunkSync:
+    def __init__(self, store=None, root: str = CHUNK_DIR,
+                 upload: Optional[Callable[[str], None]] = None,
+                 download: Optional[Callable[[str, str], None]] = None):
+        self.store = store or get_candle_store()
+        self.root = root
+        self.upload = upload or _default_upload
+        self.download = download or _default_download
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def _lock(self, key: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.root, filename)
+
+    def _load_index(self, path: str) -> Dict:
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                return json.load(f)
+        return {"chunks": {}, "pushed_segments": [], "synced": {}}
+
+    def _save_index(self, key: str, index: Dict) -> str:
+        path = self._path(index_name(key))
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(index, f, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        return path
+
+    def _remote_index(self, key: str) -> Dict:
+        """Índice remoto atual (vazio se a série ainda não existe lá)."""
+        remote_path = self._path(index_name(key)) + ".remote"
+        try:
+            self.download(index_name(key), remote_path)
+            return self._load_index(remote_path)
+        except FileNotFoundError:
+            return {"chunks": {}}
+        finally:
+            if os.path.exists(remote_path):
+                os.remove(remote_path)
+
+    def _remote_chunk(self, entry: Dict) -> np.ndarray:
+        """Linhas de um pedaço remoto (baixado para um arquivo temporário)."""
+        tmp = self._path(entry["file"]) + ".remote"
+        if entry["file"].endswith(LEGACY_CHUNK_SUFFIX):
+            tmp = self._path(entry["file"][:-len(LEGACY_CHUNK_SUFFIX)]) + ".remote" + LEGACY_CHUNK_SUFFIX
+        try:
+            self.download(entry["file"], tmp)
+            return self._read_chunk(tmp)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _write_chunk(self, key: str, day: int, arr: np.ndarray) -> str:
+        return write_candles(self._path(chunk_name(key, day)), arr)
+
+    @staticmethod
+    def _read_chunk(path: str) -> np.ndarray:
+        if path.endswith(LEGACY_CHUNK_SUFFIX):
+            with np.load(path, allow_pickle=False) as data:
+                return data["candles"].astype(CANDLE_DTYPE, copy=False)
+        return read_candles(path)
+
+    # ---------- envio ----------
+
+    def push(self, symbol: str, timeframe: str) -> List[str]:
+        """
+        Regrava e agenda o envio só dos dias tocados por segmentos novos da store
+        (e cujo conteúdo de fato mudou), mais o índice. Devolve os arquivos enviados.
+
+        `pushed_segments` e `synced` (dia -> md5 cujo conteúdo esta store já contém)
+        são estado só deste disco -- nomes de segmento se repetem entre máquinas -- e
+        nunca vêm do remoto. Um dia que o remoto tem em outra versão é baixado,
+        gravado na store e mesclado (dedup por timestamp) antes de ser regravado; o
+        índice enviado parte do remoto atual.
+        """
+        key = series_key(symbol, timeframe)
+        with self._lock(key):
+            local = self._load_index(self._path(index_name(key)))
+            segments = self.store.segments(symbol, timeframe)
+            pushed = set(local.get("pushed_segments", []))
+            synced = local.get("synced", {})
+            fresh = [seg for seg in segments if seg["file"] not in pushed]
+            if not fresh:
+                return []
+            remote = self._remote_index(key)
+            index = {"chunks": {**local["chunks"], **remote["chunks"]}}
+            first = min(seg["min_ts"] for seg in fresh) // DAY
+            last = max(seg["max_ts"] for seg in fresh) // DAY
+            arr = self.store.read(symbol, timeframe, start=first * DAY, end=(last + 1) * DAY - 1)
+            days = arr["timestamp"] // DAY
+            written = []
+            for day in np.unique(days):
+                day_key = str(int(day))
+                part = np.ascontiguousarray(arr[days == day])
+                entry = index["chunks"].get(day_key)
+                if entry and entry["md5"] != synced.get(day_key):
+                    # Versão remota que esta store não tem: as linhas dela entram antes das locais
+                    theirs = self._remote_chunk(entry)
+                    self.store.append(symbol, timeframe, theirs)
+                    part = np.ascontiguousarray(_dedupe_keep_last(np.concatenate([theirs, part])))
+                digest = _array_md5(part)
+                synced[day_key] = digest
+                if entry and entry["md5"] == digest:
+                    continue
+                path = self._write_chunk(key, int(day), part)
+                index["chunks"][day_key] = {
+                    "file": os.path.basename(path),
+                    "rows": int(len(part)),
+                    "min_ts": int(part["timestamp"][0]),
+                    "max_ts": int(part["timestamp"][-1]),
+                    "md5": digest,
+                }
+                written.append(path)
+            index["pushed_segments"] = [seg["file"] for seg in segments]
+            index["synced"] = synced
+            index_path = self._save_index(key, index)
+            if written:
+                written.append(index_path)
+        for path in written:
+            self.upload(path)
+        return written
+
+    def push_all(self) -> int:
+        """Envia o que mudou em todas as séries da store; devolve quantos arquivos."""
+        total = 0
+        for key in self.store.series():
+            symbol, tf = split_series_key(key)
+            if symbol is None:
+                continue
+            try:
+                total += len(self.push(symbol, tf))
+            except Exception as e:
+                logger.warning(f"Falha ao enviar pedaços de {key}: {e}")
+        return total
+
+    # ---------- leitura ----------
+
+    def pull(self, symbol: str, timeframe: str, start: Optional[int] = None, end: Optional[int] = None) -> int:
+        """
+        Baixa o índice remoto e só os pedaços que cobrem [start, end] e faltam (ou
+        diferem) localmente; grava as linhas na store. Devolve quantos pedaços baixou.
+        """
+        key = series_key(symbol, timeframe)
+        with self._lock(key):
+            remote = self._remote_index(key)
+            local = self._load_index(self._path(index_name(key)))
+            synced = local.setdefault("synced", {})
+            fetched = 0
+            for day, entry in sorted(remote["chunks"].items(), key=lambda kv: int(kv[0])):
+                if (start is not None and entry["max_ts"] < start) or (end is not None and entry["min_ts"] > end):
+                    continue
+                path = self._path(entry["file"])
+                if synced.get(day) != entry["md5"] or not os.path.exists(path):
+                    self.download(entry["file"], path)
+                    fetched += 1
+                part = self._read_chunk(path)
+                self.store.append(symbol, timeframe, part)
+                local["chunks"][day] = entry
+                synced[day] = entry["md5"]
+            self._save_index(key, local)
+        logger.info(f"{key}: {fetched} pedaços baixados do remoto")
+        return fetched
+
+
+_default_sync: Optional[ChunkSync] = None
+_default_guard = threading.Lock()
+
+
+def get_chunk_sync() -> ChunkSync:
+    global _default_sync
+    with _default_guard:
+        if _default_sync is None:
+            _default_sync = ChunkSync()
+        return _default_sync
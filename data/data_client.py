@@ -1,8 +1,6 @@
 #data/data_client.py
-import subprocess
-import json
 import os
-import pandas as pd
+import time
 import joblib
 from datetime import datetime, timedelta
 from data.pocketoption_data import PocketOptionClient, PocketOptionAuthError
@@ -10,29 +8,19 @@ from data.twelvedata_data import TwelveDataClient
 from data.tiingo_data import TiingoClient
 from data.polygon_data import PolygonClient
 from strategy.train_model_historic import main as run_training
-from data.google_drive_client import upload_or_update_file as upload_file, download_file, find_file_id, get_folder_id_for_file
+from data.candle_store import get_candle_store, array_to_candles
+from data.dukascopy_pool import get_dukascopy_pool
+from data.dukascopy_data import DukascopyClient, TF_SECONDS
+from data.provider_health import get_scoreboard
+from data.blob_store import get_blob_store, bucket_for, STATE
+from data.chunk_sync import get_chunk_sync
+from data.derived_timeframes import TimeframeDeriver, derivation_config
 
 # Adicione para alerta Telegram
 from utils.telegram_alert import send_telegram_alert
 
 LAST_RETRAIN_PATH = "last_retrain.txt"
 
-def merge_and_save_csv(filepath, new_candles):
-    if os.path.exists(filepath):
-        df_old = pd.read_csv(filepath)
-    else:
-        df_old = pd.DataFrame()
-    df_new = pd.DataFrame(new_candles)
-    if df_new.empty:
-        return
-    if not df_old.empty:
-        df_all = pd.concat([df_old, df_new], ignore_index=True)
-    else:
-        df_all = df_new
-    df_all.drop_duplicates(subset=['timestamp'], keep='last', inplace=True)
-    df_all.sort_values('timestamp', inplace=True)
-    df_all.to_csv(filepath, index=False)
-
 def _map_symbol(symbol, provider):
     """
     Adapta o símbolo para o formato correto de cada provedor.
@@ -104,9 +92,36 @@ def _map_timeframe(interval, provider):
         return tf_map.get(interval, interval)
     return interval
 
+# Timeframes que cada provedor alternativo entrega de fato; fora deles _map_timeframe
+# cai no mais próximo (s1 vira 1min) e o lote gravaria candles do tamanho errado
+NATIVE_TIMEFRAMES = {
+    "TwelveDataClient": {"m1", "m5", "m15", "m30", "h1", "h4", "d1"},
+    "TiingoClient": {"m1", "m5", "m15", "m30", "h1", "h4", "d1"},
+    "PolygonClient": {"m1", "m5", "m15", "m30", "h1", "h4", "d1"},
+}
+
+def _serves_natively(interval, provider):
+    """True se o provedor tem o timeframe sem arredondar para outro."""
+    natives = NATIVE_TIMEFRAMES.get(provider)
+    return natives is None or _map_timeframe(interval, "Dukascopy") in natives
+
+def _provider_name(provider):
+    """Nome do provedor síncrono equivalente (AsyncTiingoClient -> TiingoClient)."""
+    name = provider.__class__.__name__
+    return name[len("Async"):] if name.startswith("Async") else name
+
+def _derived_timeframes(store):
+    """Timeframes montados do M1 pelo autotrainer: a série da store é só derivada."""
+    derivation = derivation_config()
+    return set(TimeframeDeriver(store, derivation["base"] or "M1", derivation["derived"]).targets)
+
 class FallbackDataClient:
     IN_ROWS_BEFORE_RETRAIN = 50
     def __init__(self):
+        self.store = get_candle_store()
+        self.scoreboard = get_scoreboard()
+        self.dukascopy = DukascopyClient()
+        self.derived_timeframes = _derived_timeframes(self.store)
         self.providers = [
             PocketOptionClient(),
             TwelveDataClient(),
@@ -114,25 +129,20 @@ class FallbackDataClient:
             PolygonClient()
         ]
 
-    def fetch_candles(self, symbol, interval="1min", limit=5, prefer_pocket=False):
-        tested = set()
-        # 1. Sempre tente Dukascopy primeiro (até mesmo no prefer_pocket), se possível
+    def _dukascopy_call(self, symbol, interval, limit):
+        return lambda: self._fetch_from_dukascopy(symbol, interval, limit)
+
+    def _candidates(self, symbol, interval, limit):
+        """
+        (nome, chamada) dos provedores elegíveis: Dukascopy + alternativos respeitando OTC,
+        ordenados pelo placar de saúde (custo esperado) e sem os de circuito aberto.
+        """
         dsymbol = _map_symbol(symbol, "Dukascopy")
         dinterval = _map_timeframe(interval, "Dukascopy")
-        print(f"📡 [Dukascopy] Trying symbol={dsymbol}, interval={dinterval}, limit={limit}")
-        try:
-            candles = self._fetch_from_dukascopy(dsymbol, dinterval, limit)
-            if candles and "history" in candles and candles["history"]:
-                print("✅ Dukascopy succeeded.")
-                self._save_to_csv(symbol, interval, candles["history"])
-                self._maybe_retrain()
-                return candles
-        except Exception as e:
-            print(f"❌ Dukascopy failed: {e}")
-
-        # 2. Depois, tente os providers alternativos, respeitando OTC
-        for i, provider in enumerate(self.providers):
-            name = provider.__class__.__name__
+        candidates = [("Dukascopy", self._dukascopy_call(dsymbol, dinterval, limit))]
+        tested = set()
+        for provider in self.providers:
+            name = _provider_name(provider)
             psymbol = _map_symbol(symbol, name)
             if psymbol is None:
                 print(f"⚠️ [{name}] Não suporta esse símbolo: {symbol}")
@@ -140,61 +150,172 @@ class FallbackDataClient:
             pinterval = _map_timeframe(interval, name)
             if (name, psymbol, pinterval) in tested:
                 continue
-            print(f"⚙️ Trying {name} with symbol={psymbol}, interval={pinterval}, limit={limit}")
+            tested.add((name, psymbol, pinterval))
+            candidates.append((name, lambda p=provider, s=psymbol, i=pinterval: p.fetch_candles(s, interval=i, limit=limit)))
+        return self.scoreboard.order(candidates, symbol, dinterval)
+
+    def fetch_candles(self, symbol, interval="1min", limit=5, prefer_pocket=False):
+        tf = _map_timeframe(interval, "Dukascopy")
+        for name, call in self._candidates(symbol, interval, limit):
+            if not self.scoreboard.allow(name, symbol, tf):
+                continue
+            print(f"⚙️ Trying {name} for {symbol} {tf}, limit={limit}")
+            started = time.monotonic()
+            result, error = None, None
             try:
-                result = provider.fetch_candles(psymbol, interval=pinterval, limit=limit)
-                if result and "history" in result and result["history"]:
-                    print(f"✅ Success from {name}")
-                    self._save_to_csv(symbol, interval, result["history"])
-                    return result
+                result = call()
             except PocketOptionAuthError as e:
                 msg = f"❗ <b>ERRO PocketOption SSID</b>\n{e}\nHora: {datetime.utcnow()}"
                 print(msg)
                 send_telegram_alert(msg)
+                error = str(e)
             except Exception as e:
                 print(f"❌ {name} error: {e}")
-            tested.add((name, psymbol, pinterval))
+                error = str(e)
+            ok = bool(result and "history" in result and result["history"])
+            self.scoreboard.record(name, symbol, tf, ok, time.monotonic() - started, error)
+            if ok:
+                print(f"✅ Success from {name}")
+                self._save_candles(symbol, interval, result["history"])
+                if name == "Dukascopy":
+                    self._maybe_retrain()
+                return self._read_through(symbol, interval, limit, result)
 
         print("❌ All providers failed.")
         return None
 
-    def _fetch_from_dukascopy(self, symbol, interval, limit):
-        now = datetime.utcnow()
-        filename = f"{symbol}_{interval}.csv"
-        filepath = f"data/{filename}"
-        if not os.path.exists(filepath):
+    def fetch_many(self, symbols, interval="1min", limit=5):
+        """
+        Busca vários símbolos com o mínimo de requisições: os símbolos cujo primeiro
+        provedor no placar de saúde tem endpoint de lote (e serve o timeframe sem
+        arredondar) são agrupados por provedor e buscados juntos. Se o primeiro é outro
+        (Dukascopy, PocketOption), ou o símbolo falta numa resposta parcial, segue por
+        fetch_candles símbolo a símbolo. Devolve {símbolo: resultado de fetch_candles}.
+        """
+        tf = _map_timeframe(interval, "Dukascopy")
+        batchable = {_provider_name(p): p for p in self.providers
+                     if hasattr(p, "fetch_many") and _serves_natively(interval, _provider_name(p))}
+        groups, results = {}, {}
+        for symbol in dict.fromkeys(symbols):
+            names = [("Dukascopy", None)] + [(_provider_name(p), p) for p in self.providers
+                                             if _map_symbol(symbol, _provider_name(p))]
+            ranked = self.scoreboard.order(names, symbol, tf)
+            if ranked and ranked[0][0] in batchable:
+                groups.setdefault(ranked[0][0], []).append(symbol)
+
+        for name, group in groups.items():
+            if not self.scoreboard.allow(name, group[0], tf):
+                continue
+            mapped = {_map_symbol(s, name): s for s in group}
+            print(f"⚙️ Trying {name} batch for {len(mapped)} symbols {tf}, limit={limit}")
+            started = time.monotonic()
+            fetched, error = {}, None
             try:
-                print(f"⬇️ Baixando {filename} do Google Drive...")
-                download_file(filename, filepath, drive_folder_id=get_folder_id_for_file(filename))
-                print(f"✅ Baixado {filename} do Google Drive.")
+                fetched = batchable[name].fetch_many(list(mapped), interval=_map_timeframe(interval, name), limit=limit)
             except Exception as e:
-                print(f"⚠️ Não foi possível baixar {filename}: {e}")
+                print(f"❌ {name} batch error: {e}")
+                error = str(e)
+            if not fetched and error is None:
+                # Lote não se aplica (ex.: Polygon fora do diário): não conta como falha,
+                # mas libera a sonda do meio-aberto reservada pelo allow()
+                self.scoreboard.record_cancelled(name, group[0], tf, time.monotonic() - started)
+                continue
+            self.scoreboard.record(name, group[0], tf, bool(fetched), time.monotonic() - started, error)
+            received = 0
+            for psymbol, result in fetched.items():
+                symbol = mapped.get(psymbol)
+                if symbol is None or not result or not result.get("history"):
+                    continue
+                self._save_candles(symbol, interval, result["history"])
+                results[symbol] = self._read_through(symbol, interval, limit, result)
+                received += 1
+            print(f"✅ {name} batch: {received}/{len(mapped)} symbols")
+
+        # Fallback por símbolo só para o que o lote não trouxe
+        for symbol in dict.fromkeys(symbols):
+            if symbol not in results:
+                results[symbol] = self.fetch_candles(symbol, interval=interval, limit=limit)
+        return results
+
+    def _fetch_from_dukascopy(self, symbol, interval, limit):
+        now = datetime.utcnow()
+        self._pull_history(symbol, interval, limit)
+        # Cliente bi5 nativo (com cache de horas fechadas); o worker Node fica como reserva
+        native = self.dukascopy.fetch_candles(symbol, interval=interval, limit=limit)
+        if native and native["history"]:
+            return native
         from_dt = now - timedelta(minutes=limit)
-        cmd = [
-            "node", "--max-old-space-size=1024", "data/dukascopy_client.cjs",
-            symbol, interval,
-            from_dt.isoformat(), now.isoformat()
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
-        if result.returncode != 0:
-            raise RuntimeError(result.stderr)
-        candles = json.loads(result.stdout)
+        # Worker Node persistente: sem cold start por requisição
+        candles = get_dukascopy_pool().request(symbol, interval, from_dt.isoformat(), now.isoformat())
         return {
             "history": candles,
             "close": candles[-1]["close"] if candles else None
         }
 
-    def _save_to_csv(self, symbol, interval, candles):
-        if not candles:
+    def _pull_history(self, symbol, interval, limit):
+        """Série ausente na store: baixa do Drive só os pedaços diários que cobrem os últimos `limit` candles."""
+        tf = _map_timeframe(interval, "Dukascopy")
+        if self.store.has_series(symbol, tf):
             return
-        filename = f"{symbol.lower().replace(' ', '').replace('/', '')}_{_map_timeframe(interval, 'Dukascopy')}.csv"
-        path = f"data/{filename}"
-        merge_and_save_csv(path, candles)
+        start = int(time.time()) - limit * TF_SECONDS.get(tf, 60)
         try:
-            file_id = upload_file(path)
-            print(f"☁️ Arquivo {filename} enviado ao Google Drive! ID: {file_id}")
+            print(f"⬇️ Baixando série {symbol}_{tf} do Google Drive...")
+            try:
+                get_chunk_sync().pull(symbol, tf, start=start)
+            except FileNotFoundError:
+                # Série enviada antes dos pedaços diários: formato antigo (segmentos + manifesto)
+                self.store.pull(symbol, tf, self._download_store_file)
+            print(f"✅ Série {symbol}_{tf} baixada do Google Drive.")
         except Exception as e:
-            print(f"⚠️ Falha ao enviar {filename} ao Google Drive: {e}")
+            print(f"⚠️ Não foi possível baixar a série {symbol}_{tf}: {e}")
+
+    @staticmethod
+    def _download_store_file(filename, destination_path):
+        get_blob_store().get(bucket_for(filename), filename, destination_path)
+
+    def _save_candles(self, symbol, interval, candles):
+        if self._append_to_store(symbol, interval, candles):
+            self._upload_store_files(symbol, interval)
+
+    def _append_to_store(self, symbol, interval, candles):
+        if not candles:
+            return []
+        tf = _map_timeframe(interval, "Dukascopy")
+        if tf in self.derived_timeframes:
+            # Candles de provedor não se misturam aos derivados (alinhamento/volume diferem)
+            return []
+        try:
+            return self.store.append(symbol, tf, candles)
+        except Exception as e:
+            print(f"⚠️ Falha ao gravar candles de {symbol} {tf} na store: {e}")
+            return []
+
+    def _upload_store_files(self, symbol, interval):
+        # Só os pedaços diários que mudaram (na prática, o de hoje) e o índice sobem para
+        # o Drive, em segundo plano: a requisição volta assim que a gravação local terminou
+        tf = _map_timeframe(interval, "Dukascopy")
+        try:
+            get_chunk_sync().push(symbol, tf)
+        except Exception as e:
+            print(f"⚠️ Falha ao preparar pedaços de {symbol} {tf} para o Drive: {e}")
+
+    def _read_through(self, symbol, interval, limit, result):
+        """Devolve o histórico canônico da store (deduplicado, completa até `limit`)."""
+        tf = _map_timeframe(interval, "Dukascopy")
+        if tf in self.derived_timeframes:
+            return result
+        try:
+            tail = self.store.tail(symbol, tf, max(limit, len(result["history"])))
+        except Exception as e:
+            print(f"⚠️ Falha ao ler {symbol} {tf} da store: {e}")
+            return result
+        if len(tail) < len(result["history"]):
+            return result
+        history = array_to_candles(tail)
+        merged = dict(result)
+        merged["history"] = history
+        merged["close"] = history[-1]["close"] if history else result.get("close")
+        return merged
 
     def _maybe_retrain(self):
         from strategy.train_model_historic import main as run_training
@@ -208,7 +329,7 @@ class FallbackDataClient:
     def _load_last_retrain_time(self):
         try:
             if not os.path.exists(LAST_RETRAIN_PATH):
-                download_file(LAST_RETRAIN_PATH, LAST_RETRAIN_PATH, drive_folder_id=get_folder_id_for_file(LAST_RETRAIN_PATH))
+                get_blob_store().get(STATE, LAST_RETRAIN_PATH, LAST_RETRAIN_PATH)
         except Exception as e:
             pass
         if not os.path.exists(LAST_RETRAIN_PATH):
@@ -223,7 +344,6 @@ class FallbackDataClient:
     def _store_last_retrain_time(self, dt):
         with open(LAST_RETRAIN_PATH, "w") as f:
             f.write(dt.isoformat())
-        try:
-            upload_file(LAST_RETRAIN_PATH)
-        except Exception as e:
-            print(f"⚠️ Falha ao enviar {LAST_RETRAIN_PATH} ao Google Drive: {e}")
+            f.flush()
+            os.fsync(f.fileno())
+        get_blob_store().put_later(STATE, LAST_RETRAIN_PATH)
@@ -0,0 +1,105 @@
+# data/derived_timeframes.py
+# Derivação local de timeframes: só a resolução base (M1) vem dos provedores; M5…D1
+# são montados a partir dela na candle store. Cada (símbolo, timeframe) tem um
+# IncrementalResampler, então a cada ciclo só as linhas base novas e o balde em
+# aberto são reprocessados. As séries derivadas são só derivadas: candles de
+# provedor para esses timeframes não são gravados nelas (ver FallbackDataClient).
+
+import math
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+
+from config import CONFIG
+from data.candle_store import get_candle_store, CANDLE_DTYPE
+from data.dukascopy_data import TF_SECONDS
+from utils.aggregation import IncrementalResampler
+
+logger = logging.getLogger(__name__)
+
+# Dias corridos por dia de pregão (forex fecha no fim de semana)
+CALENDAR_PER_TRADING_DAY = 7 / 5
+
+
+def derivation_config() -> Dict:
+    cfg = CONFIG.get("timeframe_derivation", {})
+    if not cfg.get("enabled"):
+        return {"base": None, "derived": []}
+    return {"base": cfg.get("base", "M1"), "derived": list(cfg.get("derived", []))}
+
+
+class TimeframeDeriver:
+    def __init__(self, store=None, base: str = "m1", targets: Optional[Iterable[str]] = None):
+        self.store = store or get_candle_store()
+        self.base = base.lower()
+        base_period = TF_SECONDS[self.base]
+        self.targets = [
+            tf.lower() for tf in (targets or [])
+            if TF_SECONDS.get(tf.lower(), 0) > base_period and TF_SECONDS[tf.lower()] % base_period == 0
+        ]
+        self._resamplers: Dict[tuple, IncrementalResampler] = {}
+        # Balde inicial parcial de cada série (a base começa no meio dele): nunca é gravado
+        self._partial: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def history_days(self, min_bars: int) -> float:
+        """
+        Dias de histórico base para o maior alvo ter `min_bars` baldes (com folga para
+        fins de semana e o balde inicial descartado). 0 sem alvos.
+        """
+        if not self.targets:
+            return 0.0
+        period = max(TF_SECONDS[tf] for tf in self.targets)
+        return math.ceil((min_bars + 1) * period / 86400 * CALENDAR_PER_TRADING_DAY)
+
+    def _start_for(self, symbol: str, tf: str) -> Optional[int]:
+        """Primeiro timestamp base que ainda precisa ser lido para (symbol, tf)."""
+        resampler = self._resamplers.get((symbol, tf))
+        if resampler is not None and resampler.last_ts is not None:
+            return resampler.last_ts  # a última linha base pode ter sido revisada
+        # Processo novo: recomeça do último balde já gravado (ou da série inteira)
+        return self.store.last_timestamp(symbol, tf)
+
+    def derive(self, symbol: str) -> Dict[str, int]:
+        """
+        Atualiza os timeframes derivados de `symbol` na store a partir da série base.
+        Devolve {timeframe: baldes gravados/revisados}.
+        """
+        if not self.targets or not self.store.has_series(symbol, self.base):
+            return {}
+        with self._lock:
+            starts = {tf: self._start_for(symbol, tf) for tf in self.targets}
+            known = [s for s in starts.values() if s is not None]
+            # Uma leitura da série base cobre todos os alvos
+            first = min(known) if len(known) == len(starts) else None
+            rows = self.store.read(symbol, self.base, start=first)
+            counts = {}
+            for tf, start in starts.items():
+                period = TF_SECONDS[tf]
+                resampler = self._resamplers.get((symbol, tf))
+                if resampler is None:
+                    resampler = self._resamplers[(symbol, tf)] = IncrementalResampler(period)
+                    if start is None and len(rows) and int(rows["timestamp"][0]) % period:
+                        # Série derivada do zero e a base começa no meio do balde: o
+                        # primeiro balde seria parcial (e revisado para sempre errado)
+                        self._partial[(symbol, tf)] = int(rows["timestamp"][0]) // period * period
+                subset = rows if start is None else rows[rows["timestamp"] >= start]
+                bars = resampler.update(subset.astype(CANDLE_DTYPE, copy=False))
+                partial = self._partial.get((symbol, tf))
+                if partial is not None and len(bars):
+                    bars = bars[bars["timestamp"] != partial]
+                if len(bars):
+                    self.store.append(symbol, tf, bars)
+                counts[tf] = len(bars)
+        logger.debug(f"{symbol}: derivados de {self.base} -> {counts}")
+        return counts
+
+    def derive_all(self, symbols: Iterable[str]) -> Dict[str, Dict[str, int]]:
+        results = {}
+        for symbol in symbols:
+            try:
+                results[symbol] = self.derive(symbol)
+            except Exception as e:
+                logger.error(f"Falha ao derivar timeframes de {symbol}: {e}", exc_info=True)
+                results[symbol] = {}
+        return results
@@ -0,0 +1,231 @@
+# data/drive_sync.py
+# Sincronização com o Google Drive fora do caminho das requisições. Quem grava um
+# arquivo só chama enqueue(path) e segue; uma thread em segundo plano junta os pedidos
+# e, a cada `interval` segundos, sobe cada arquivo pendente uma única vez (dez escritas
+# do mesmo manifesto viram um upload). Os IDs vêm do manifesto da pasta (uma listagem)
+# e as permissões vão em lotes pela batch API do Drive; os uploads de mídia (que a batch
+# API não aceita) rodam com concorrência limitada, um serviço por thread.
+
+import os
+import atexit
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from config import CONFIG
+from data.google_drive_client import (
+    get_drive_service, get_folder_id_for_file, get_folder_manifest, is_shared, remember_shared,
+    DEFAULT_SHARE_EMAIL, FILE_FIELDS,
+)
+
+logger = logging.getLogger(__name__)
+
+BATCH_LIMIT = 100  # máximo de chamadas por requisição batch do Drive
+
+
+class DriveSyncService:
+    def __init__(self, interval: Optional[float] = None, max_concurrency: Optional[int] = None,
+                 share_with_email: Optional[str] = DEFAULT_SHARE_EMAIL):
+        cfg = CONFIG.get("drive_sync", {})
+        self.interval = interval if interval is not None else cfg.get("interval", 30)
+        self.max_concurrency = max_concurrency or cfg.get("max_concurrency", 4)
+        self.share_with_email = share_with_email
+        self._pending: Dict[str, Optional[str]] = {}
+        self._file_ids: Dict[Tuple[Optional[str], str], str] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._stop = False
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+        # Pool fixo: as threads (e o serviço do Drive de cada uma) duram entre os ciclos
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="drive-upload")
+        self.stats = {"enqueued": 0, "collapsed": 0, "uploaded": 0, "failed": 0, "batches": 0}
+
+    # ---------- API ----------
+
+    def enqueue(self, path: str, drive_folder_id: Optional[str] = None):
+        """Agenda o upload de `path` (já gravado em disco); volta imediatamente."""
+        with self._lock:
+            self.stats["enqueued"] += 1
+            if path in self._pending:
+                self.stats["collapsed"] += 1
+            self._pending[path] = drive_folder_id or get_folder_id_for_file(os.path.basename(path))
+            self._idle.clear()
+        self._ensure_thread()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Sobe o que estiver pendente agora e espera terminar (True se esvaziou)."""
+        self._wake.set()
+        return self._idle.wait(timeout)
+
+    def close(self, timeout: float = 60):
+        # Na saída o executor pode já estar desligado pelo interpretador: o último
+        # flush sobe os arquivos em série, na própria thread de sincronização
+        self._closing = True
+        self.flush(timeout)
+        self._stop = True
+        self._wake.set()
+        self._executor.shutdown(wait=False)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, pending=len(self._pending))
+
+    # ---------- worker ----------
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="drive-sync", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stop:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if batch:
+                try:
+                    self._sync(batch)
+                except Exception as e:
+                    logger.error(f"Falha na sincronização com o Drive: {e}", exc_info=True)
+                    with self._lock:
+                        for path, folder in batch.items():
+                            self._pending.setdefault(path, folder)
+            with self._lock:
+                if not self._pending:
+                    self._idle.set()
+
+    def _execute_batch(self, requests: List[Tuple[str, object]], callback):
+        service = get_drive_service()
+        for start in range(0, len(requests), BATCH_LIMIT):
+            batch = service.new_batch_http_request(callback=callback)
+            for request_id, request in requests[start:start + BATCH_LIMIT]:
+                batch.add(request, request_id=request_id)
+            batch.execute()
+            self.stats["batches"] += 1
+
+    def _lookup_ids(self, files: Dict[str, Optional[str]]):
+        """
+        IDs dos arquivos ainda desconhecidos: pelo manifesto da pasta (uma listagem) e,
+        para arquivos sem pasta, numa única batch de files().list.
+        """
+        service = get_drive_service()
+        unknown = {}
+        for path, folder in files.items():
+            name = os.path.basename(path)
+            if (folder, name) in self._file_ids:
+                continue
+            if folder:
+                info = get_folder_manifest().get(name, folder)
+                if info:
+                    self._file_ids[(folder, name)] = info["id"]
+                continue
+            unknown[str(len(unknown))] = (folder, name)
+        if not unknown:
+            return
+
+        def on_result(request_id, response, exception):
+            if exception is None and response.get("files"):
+                self._file_ids[unknown[request_id]] = response["files"][0]["id"]
+
+        requests = []
+        for request_id, (folder, name) in unknown.items():
+            query = f"name = '{name}'" + (f" and '{folder}' in parents" if folder else "")
+            requests.append((request_id, service.files().list(q=query, fields="files(id, name)")))
+        self._execute_batch(requests, on_result)
+
+    def _upload(self, path: str, folder: Optional[str]) -> Optional[str]:
+        """Sobe um arquivo; devolve o ID se o arquivo foi criado agora (precisa de permissão)."""
+        from googleapiclient.http import MediaFileUpload
+
+        name = os.path.basename(path)
+        file_id = self._file_ids.get((folder, name))
+        media = MediaFileUpload(path, resumable=True)
+        files = get_drive_service().files()
+        if file_id:
+            get_folder_manifest().record(folder, files.update(fileId=file_id, media_body=media, fields=FILE_FIELDS).execute())
+            return None
+        metadata = {"name": name, "parents": [folder]} if folder else {"name": name}
+        info = files.create(body=metadata, media_body=media, fields=FILE_FIELDS).execute()
+        get_folder_manifest().record(folder, info)
+        file_id = info.get("id")
+        self._file_ids[(folder, name)] = file_id
+        return file_id
+
+    def _start_upload(self, path: str, folder: Optional[str]) -> Future:
+        """Upload no pool; inline (Future já resolvido) no fechamento ou com o pool desligado."""
+        if not self._closing:
+            try:
+                return self._executor.submit(self._upload, path, folder)
+            except RuntimeError:
+                # "cannot schedule new futures after (interpreter) shutdown"
+                self._closing = True
+        job = Future()
+        try:
+            job.set_result(self._upload(path, folder))
+        except Exception as e:
+            job.set_exception(e)
+        return job
+
+    def _sync(self, batch: Dict[str, Optional[str]]):
+        files = {path: folder for path, folder in batch.items() if os.path.exists(path)}
+        if not files:
+            return
+        self._lookup_ids(files)
+        created, failed = [], []
+        jobs = [(path, folder, self._start_upload(path, folder)) for path, folder in files.items()]
+        for path, folder, job in jobs:
+            try:
+                file_id = job.result()
+                self.stats["uploaded"] += 1
+                if file_id:
+                    created.append(file_id)
+            except Exception as e:
+                self.stats["failed"] += 1
+                failed.append((path, folder))
+                logger.warning(f"Falha ao enviar {os.path.basename(path)} ao Drive: {e}")
+        if created and self.share_with_email:
+            self._share(created)
+        if failed:
+            # Volta para a fila: tenta de novo no próximo intervalo (sem sobrescrever pedido mais novo)
+            with self._lock:
+                for path, folder in failed:
+                    self._pending.setdefault(path, folder)
+        logger.info(f"☁️ Drive sync: {len(files) - len(failed)}/{len(files)} arquivos enviados")
+
+    def _share(self, file_ids: List[str]):
+        service = get_drive_service()
+        email = self.share_with_email
+        permission = {"type": "user", "role": "writer", "emailAddress": email}
+
+        def on_result(request_id, response, exception):
+            if exception is not None:
+                logger.warning(f"Falha ao compartilhar {request_id}: {exception}")
+            else:
+                remember_shared(request_id, email)
+
+        self._execute_batch(
+            [(fid, service.permissions().create(fileId=fid, body=permission, sendNotificationEmail=False))
+             for fid in file_ids if not is_shared(fid, email)],
+            on_result,
+        )
+
+
+_default_sync: Optional[DriveSyncService] = None
+_default_guard = threading.Lock()
+
+
+def get_drive_sync() -> DriveSyncService:
+    """Serviço de sincronização compartilhado do processo (esvaziado na saída)."""
+    global _default_sync
+    with _default_guard:
+        if _default_sync is None:
+            _default_sync = DriveSyncService()
+            atexit.register(_default_sync.close, CONFIG.get("drive_sync", {}).get("exit_timeout", 30))
+        return _default_sync
@@ -1,27 +1,320 @@
 # data/dukascopy_data.py
-import dayjs
-import pandas as pd
-from dukascopy_node import getHistoricalRates
+# Cliente Dukascopy nativo em Python (sem Node): baixa os arquivos .bi5 (LZMA) do
+# datafeed, decodifica com lzma + numpy.frombuffer direto para arrays tipados e
+# agrega em candles. Horas/dias já fechados são imutáveis e ficam num cache em disco
+# endereçado por conteúdo (sha256), então janelas repetidas não voltam à rede.
+# Timestamps saem em milissegundos, como no worker Node (dukascopy-node).
+#
+# DUKASCOPY_BASE_URL pode apontar para um diretório local com a mesma estrutura
+# ({SYM}/{YYYY}/{MM-1}/{DD}/...) para testes com fixtures.
+
+import os
+import json
+import lzma
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = "https://datafeed.dukascopy.com/datafeed"
+CACHE_DIR = os.path.join("data", "cache", "dukascopy")
+# O datafeed publica os arquivos com atraso: um 404/arquivo vazio de um período recém
+# fechado ainda pode virar dados. Vazio só entra no cache depois dessa carência
+PUBLICATION_GRACE = timedelta(hours=6)
+
+# Registro de tick: ms desde o início da hora, ask, bid (inteiros em pontos), volumes
+TICK_DTYPE = np.dtype([
+    ("ms", ">u4"), ("ask", ">u4"), ("bid", ">u4"),
+    ("ask_volume", ">f4"), ("bid_volume", ">f4"),
+])
+# Registro de candle de minuto (arquivo diário): segundos desde 00:00, O, C, L, H, volume
+MINUTE_DTYPE = np.dtype([
+    ("sec", ">u4"), ("open", ">u4"), ("close", ">u4"),
+    ("low", ">u4"), ("high", ">u4"), ("volume", ">f4"),
+])
+
+TF_SECONDS = {
+    "s1": 1, "m1": 60, "m5": 300, "m15": 900,
+    "m30": 1800, "h1": 3600, "h4": 14400, "d1": 86400,
+}
+INTERVAL_ALIASES = {
+    "1s": "s1", "1min": "m1", "5min": "m5", "15min": "m15",
+    "30min": "m30", "1h": "h1", "4h": "h4", "1day": "d1",
+}
+
+# Casas decimais por instrumento (pares JPY e metais têm 3)
+POINT_OVERRIDES = {"xauusd": 1e3, "xagusd": 1e3}
+
+
+def point_value(symbol: str) -> float:
+    sym = symbol.lower()
+    if sym in POINT_OVERRIDES:
+        return POINT_OVERRIDES[sym]
+    return 1e3 if "jpy" in sym else 1e5
+
+
+def decode_ticks(raw: bytes) -> np.ndarray:
+    """bi5 de ticks -> array TICK_DTYPE (view sobre o buffer descomprimido, sem cópia)."""
+    if not raw:
+        return np.empty(0, dtype=TICK_DTYPE)
+    data = lzma.decompress(raw)
+    return np.frombuffer(data, dtype=TICK_DTYPE, count=len(data) // TICK_DTYPE.itemsize)
+
+
+def decode_minutes(raw: bytes) -> np.ndarray:
+    """bi5 de candles de minuto -> array MINUTE_DTYPE (view, sem cópia)."""
+    if not raw:
+        return np.empty(0, dtype=MINUTE_DTYPE)
+    data = lzma.decompress(raw)
+    return np.frombuffer(data, dtype=MINUTE_DTYPE, count=len(data) // MINUTE_DTYPE.itemsize)
+
+
+def encode_bi5(records: np.ndarray) -> bytes:
+    """Inverso de decode_*: útil para gerar fixtures locais."""
+    return lzma.compress(records.tobytes(), format=lzma.FORMAT_ALONE)
+
+
+def hour_path(symbol: str, hour: datetime) -> str:
+    # Mês é 0-based no datafeed da Dukascopy
+    return f"{symbol.upper()}/{hour.year:04d}/{hour.month - 1:02d}/{hour.day:02d}/{hour.hour:02d}h_ticks.bi5"
+
+
+def day_path(symbol: str, day: datetime) -> str:
+    return f"{symbol.upper()}/{day.year:04d}/{day.month - 1:02d}/{day.day:02d}/BID_candles_min_1.bi5"
+
+
+class Bi5Cache:
+    """Cache endereçado por conteúdo: objects/{sha[:2]}/{sha} + índice caminho -> sha."""
+
+    def __init__(self, root: str = CACHE_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, "index.json")
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+        self._index = self._load_index()
+
+    def _load_index(self) -> Dict[str, str]:
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r") as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.warning(f"Índice do cache Dukascopy inválido, recriando: {e}")
+        return {}
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def get(self, key: str) -> Optional[bytes]:
+        digest = self._index.get(key)
+        if digest is None:
+            return None
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def put(self, key: str, raw: bytes):
+        digest = hashlib.sha256(raw).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(raw)
+            os.replace(tmp, path)
+        with self._lock:
+            self._index[key] = digest
+            tmp = f"{self.index_path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self._index, f)
+            os.replace(tmp, self.index_path)
+
 
 class DukascopyClient:
+    def __init__(self, base_url: Optional[str] = None, cache_dir: str = CACHE_DIR, max_workers: int = 8):
+        self.base_url = (base_url or os.getenv("DUKASCOPY_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.is_remote = self.base_url.startswith(("http://", "https://"))
+        self.cache = Bi5Cache(cache_dir)
+        self.max_workers = max_workers
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": "TradingBot"})
+
+    def _download(self, rel_path: str, immutable: bool, settled: bool = True) -> bytes:
+        """
+        Baixa um arquivo bi5 (b"" quando não há dados naquele período). immutable: o
+        período fechou e o conteúdo pode ir para o cache; settled: passou também da
+        carência de publicação, então até a ausência de dados é definitiva.
+        """
+        if immutable:
+            cached = self.cache.get(rel_path)
+            if cached is not None:
+                return cached
+        if self.is_remote:
+            response = self.session.get(f"{self.base_url}/{rel_path}", timeout=30)
+            if response.status_code == 404:
+                raw = b""
+            else:
+                response.raise_for_status()
+                raw = response.content
+        else:
+            path = os.path.join(self.base_url, rel_path)
+            raw = b""
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    raw = f.read()
+        if immutable and (raw or settled):
+            self.cache.put(rel_path, raw)
+        return raw
+
+    def hour_ticks(self, symbol: str, hour: datetime, now: Optional[datetime] = None):
+        """(timestamps em ms, bid em preço) de uma hora de ticks."""
+        now = now or datetime.now(timezone.utc)
+        closes = hour + timedelta(hours=1)
+        raw = self._download(hour_path(symbol, hour), immutable=closes <= now,
+                             settled=closes + PUBLICATION_GRACE <= now)
+        ticks = decode_ticks(raw)
+        base_ms = int(hour.timestamp() * 1000)
+        ts = ticks["ms"].astype(np.int64) + base_ms
+        bid = ticks["bid"] / point_value(symbol)
+        return ts, bid, ticks["bid_volume"].astype(np.float64)
+
+    def day_minutes(self, symbol: str, day: datetime, now: Optional[datetime] = None) -> np.ndarray:
+        """Candles de 1 minuto de um dia fechado (arquivo diário, bid)."""
+        now = now or datetime.now(timezone.utc)
+        raw = self._download(day_path(symbol, day), immutable=True,
+                             settled=day + timedelta(days=1) + PUBLICATION_GRACE <= now)
+        return decode_minutes(raw)
+
+    @staticmethod
+    def _aggregate_ticks(ts_ms: np.ndarray, price: np.ndarray, volume: np.ndarray, step: int) -> Dict[str, np.ndarray]:
+        if len(ts_ms) == 0:
+            return {k: np.empty(0) for k in ("timestamp", "open", "high", "low", "close", "volume")}
+        order = np.argsort(ts_ms, kind="stable")
+        ts_ms, price, volume = ts_ms[order], price[order], volume[order]
+        buckets = (ts_ms // 1000 // step) * step
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(buckets)] - 1
+        return {
+            "timestamp": buckets[starts],
+            "open": price[starts],
+            "high": np.maximum.reduceat(price, starts),
+            "low": np.minimum.reduceat(price, starts),
+            "close": price[ends],
+            "volume": np.add.reduceat(volume, starts),
+        }
+
+    @staticmethod
+    def _aggregate_candles(c: Dict[str, np.ndarray], step: int) -> Dict[str, np.ndarray]:
+        if len(c["timestamp"]) == 0 or step == 60:
+            return c
+        buckets = (c["timestamp"] // step) * step
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(buckets)] - 1
+        return {
+            "timestamp": buckets[starts],
+            "open": c["open"][starts],
+            "high": np.maximum.reduceat(c["high"], starts),
+            "low": np.minimum.reduceat(c["low"], starts),
+            "close": c["close"][ends],
+            "volume": np.add.reduceat(c["volume"], starts),
+        }
+
+    def _minute_candles(self, symbol: str, start: datetime, end: datetime, now: datetime) -> Dict[str, np.ndarray]:
+        """Candles de 1 minuto: arquivos diários para dias fechados, ticks para o dia corrente."""
+        point = point_value(symbol)
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        days, hours = [], []
+        cursor = start.replace(hour=0, minute=0, second=0, microsecond=0)
+        while cursor <= end:
+            if cursor < today:
+                days.append(cursor)
+            else:
+                hour = max(cursor, start.replace(minute=0, second=0, microsecond=0))
+                while hour <= end:
+                    hours.append(hour)
+                    hour += timedelta(hours=1)
+            cursor += timedelta(days=1)
+
+        parts = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            day_jobs = [(d, executor.submit(self.day_minutes, symbol, d, now)) for d in days]
+            hour_jobs = [executor.submit(self.hour_ticks, symbol, h, now) for h in hours]
+            for day, job in day_jobs:
+                m = job.result()
+                base = int(day.timestamp())
+                parts.append({
+                    "timestamp": m["sec"].astype(np.int64) + base,
+                    "open": m["open"] / point, "high": m["high"] / point,
+                    "low": m["low"] / point, "close": m["close"] / point,
+                    "volume": m["volume"].astype(np.float64),
+                })
+            if hour_jobs:
+                results = [job.result() for job in hour_jobs]
+                ts = np.concatenate([r[0] for r in results])
+                bid = np.concatenate([r[1] for r in results])
+                vol = np.concatenate([r[2] for r in results])
+                parts.append(self._aggregate_ticks(ts, bid, vol, 60))
+        if not parts:
+            return self._aggregate_ticks(np.empty(0, np.int64), np.empty(0), np.empty(0), 60)
+        return {k: np.concatenate([p[k] for p in parts]) for k in parts[0]}
+
+    def fetch_range(self, symbol: str, interval: str, start: datetime, end: datetime) -> List[Dict]:
+        """Candles no intervalo [start, end] (UTC), timestamps em ms."""
+        tf = INTERVAL_ALIASES.get(interval, interval).lower()
+        step = TF_SECONDS.get(tf, 60)
+        now = datetime.now(timezone.utc)
+        start = start if start.tzinfo else start.replace(tzinfo=timezone.utc)
+        end = end if end.tzinfo else end.replace(tzinfo=timezone.utc)
+        sym = symbol.lower().replace(" ", "").replace("/", "")
+
+        if step < 60:
+            hours = []
+            hour = start.replace(minute=0, second=0, microsecond=0)
+            while hour <= end:
+                hours.append(hour)
+                hour += timedelta(hours=1)
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(lambda h: self.hour_ticks(sym, h, now), hours))
+            ts = np.concatenate([r[0] for r in results]) if results else np.empty(0, np.int64)
+            bid = np.concatenate([r[1] for r in results]) if results else np.empty(0)
+            vol = np.concatenate([r[2] for r in results]) if results else np.empty(0)
+            candles = self._aggregate_ticks(ts, bid, vol, step)
+        else:
+            candles = self._aggregate_candles(self._minute_candles(sym, start, end, now), step)
+
+        lo, hi = int(start.timestamp()), int(end.timestamp())
+        mask = (candles["timestamp"] >= lo - lo % step) & (candles["timestamp"] <= hi)
+        # ignoreFlats, como no dukascopy-node: descarta minutos sem negociação
+        mask &= candles["volume"] > 0
+        cols = {k: v[mask].tolist() for k, v in candles.items()}
+        return [
+            {
+                "timestamp": int(cols["timestamp"][i]) * 1000,
+                "open": cols["open"][i], "high": cols["high"][i],
+                "low": cols["low"][i], "close": cols["close"][i],
+                "volume": cols["volume"][i],
+            }
+            for i in range(len(cols["timestamp"]))
+        ]
+
     def fetch_candles(self, symbol, interval="1min", limit=300):
         try:
-            now = pd.Timestamp.utcnow()
-            from_time = now - pd.Timedelta(minutes=limit)
-            tf_map = {
-                "1s": "s1", "1min": "m1", "5min": "m5", "15min": "m15",
-                "30min": "m30", "1h": "h1", "4h": "h4", "1day": "d1"
-            }
-            candles = getHistoricalRates({
-                "instrument": symbol.lower(),
-                "dates": {
-                    "from": from_time.to_pydatetime(),
-                    "to": now.to_pydatetime()
-                },
-                "timeframe": tf_map.get(interval, "m1"),
-                "format": "json",
-                "volumes": True
-            })
+            if "otc" in symbol.lower():
+                return None  # Dukascopy não tem ativos OTC
+            tf = INTERVAL_ALIASES.get(interval, interval).lower()
+            step = TF_SECONDS.get(tf, 60)
+            end = datetime.now(timezone.utc)
+            start = end - timedelta(seconds=step * limit)
+            candles = self.fetch_range(symbol, tf, start, end)[-limit:]
             if not candles:
                 return None
             return {
@@ -0,0 +1,400 @@
+# data/dukascopy_pool.py
+# Pool de workers Dukascopy persistentes (Node) falando JSON por linha via stdin/stdout.
+# Evita o cold start do node + carga do dukascopy-node a cada fetch: requisições
+# "quentes" pagam só o tempo de rede. Cada worker aceita várias requisições em voo,
+# identificadas por id; o supervisor reinicia workers que caírem (com backoff).
+# AsyncDukascopyWorker é a variante asyncio usada pelo AsyncFallbackDataClient.
+
+import os
+import asyncio
+import json
+import time
+import shlex
+import atexit
+import logging
+import itertools
+import threading
+import subprocess
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKER_CMD = ["node", "--max-old-space-size=1024", "data/dukascopy_worker.cjs"]
+DEFAULT_POOL_SIZE = int(os.getenv("DUKASCOPY_WORKERS", "2"))
+DEFAULT_TIMEOUT = 60
+READY_TIMEOUT = 30
+MAX_RESTART_BACKOFF = 30
+# Limite de linha do StreamReader (padrão asyncio: 64 KB). Uma resposta é uma linha JSON
+# com todos os candles da janela -- m1/ticks de dias passam fácil de alguns MB
+STREAM_LIMIT = 64 * 1024 * 1024
+
+
+class DukascopyWorkerError(Exception):
+    """Erro retornado pelo worker ou queda do processo"""
+    pass
+
+
+class DukascopyWorkerCrashed(DukascopyWorkerError):
+    """O processo worker caiu com a requisição em voo"""
+    pass
+
+
+def _worker_command() -> List[str]:
+    # DUKASCOPY_WORKER_CMD permite trocar o worker (ex.: o fake em data/fake_dukascopy_worker.py)
+    cmd = os.getenv("DUKASCOPY_WORKER_CMD")
+    return shlex.split(cmd) if cmd else list(DEFAULT_WORKER_CMD)
+
+
+class _Worker:
+    """Um processo worker com um thread leitor que resolve futures por id."""
+
+    def __init__(self, command: List[str], name: str):
+        self.name = name
+        self.pending: Dict[int, Future] = {}
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.alive = True
+        self.stopping = False
+        self.proc = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            bufsize=1,
+        )
+        threading.Thread(target=self._read_stdout, name=f"{name}-stdout", daemon=True).start()
+        threading.Thread(target=self._read_stderr, name=f"{name}-stderr", daemon=True).start()
+
+    @property
+    def load(self) -> int:
+        return len(self.pending)
+
+    def _read_stdout(self):
+        for line in self.proc.stdout:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                msg = json.loads(line)
+            except ValueError:
+                logger.warning(f"[{self.name}] Linha inválida do worker: {line[:200]}")
+                continue
+            if msg.get("ready"):
+                self.ready.set()
+                continue
+            with self.lock:
+                future = self.pending.pop(msg.get("id"), None)
+            if future is None or future.done():
+                continue
+            if "error" in msg:
+                future.set_exception(DukascopyWorkerError(msg["error"]))
+            else:
+                future.set_result(msg.get("result"))
+        self._on_exit()
+
+    def _read_stderr(self):
+        for line in self.proc.stderr:
+            if line.strip():
+                logger.warning(f"[{self.name}] {line.rstrip()}")
+
+    def _on_exit(self):
+        self.alive = False
+        self.ready.set()
+        code = self.proc.wait()
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(DukascopyWorkerCrashed(f"Worker {self.name} encerrou (código {code})"))
+        if not self.stopping:
+            logger.warning(f"[{self.name}] Worker encerrado (código {code}, {len(pending)} requisições perdidas)")
+
+    def submit(self, req_id: int, payload: Dict) -> Future:
+        future = Future()
+        line = json.dumps(dict(payload, id=req_id)) + "\n"
+        with self.lock:
+            if not self.alive:
+                raise DukascopyWorkerError(f"Worker {self.name} não está ativo")
+            self.pending[req_id] = future
+            try:
+                self.proc.stdin.write(line)
+                self.proc.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                self.pending.pop(req_id, None)
+                raise DukascopyWorkerError(f"Falha ao escrever no worker {self.name}: {e}")
+        return future
+
+    def cancel(self, req_id: int):
+        with self.lock:
+            self.pending.pop(req_id, None)
+
+    def stop(self):
+        self.stopping = True
+        self.alive = False
+        try:
+            self.proc.stdin.close()
+        except Exception:
+            pass
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+class DukascopyWorkerPool:
+    """Supervisor de N workers Dukascopy com escolha do menos carregado."""
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, command: Optional[List[str]] = None,
+                 timeout: float = DEFAULT_TIMEOUT):
+        self.size = max(1, size)
+        self.command = command or _worker_command()
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._workers: List[Optional[_Worker]] = [None] * self.size
+        self._starting = [False] * self.size
+        self._restarts = [0] * self.size
+        self._next_start = [0.0] * self.size
+        self._closed = False
+
+    def _spawn(self, slot: int) -> Optional[_Worker]:
+        now = time.monotonic()
+        if now < self._next_start[slot]:
+            return None
+        try:
+            worker = _Worker(self.command, name=f"dukascopy-worker-{slot}")
+        except OSError as e:
+            logger.error(f"Falha ao iniciar worker Dukascopy: {e}")
+            worker = None
+        if worker is None or (not worker.ready.wait(READY_TIMEOUT) or not worker.alive):
+            if worker is not None:
+                worker.stop()
+            self._restarts[slot] += 1
+            backoff = min(MAX_RESTART_BACKOFF, 2 ** self._restarts[slot])
+            self._next_start[slot] = now + backoff
+            logger.warning(f"Worker Dukascopy {slot} não ficou pronto; nova tentativa em {backoff}s")
+            return None
+        if self._restarts[slot]:
+            logger.info(f"♻️ Worker Dukascopy {slot} reiniciado")
+        self._restarts[slot] = 0
+        return worker
+
+    def _reserve_slots(self) -> List[int]:
+        """Slots sem worker vivo que ninguém está subindo (chamado com o lock)."""
+        now = time.monotonic()
+        slots = []
+        for slot, worker in enumerate(self._workers):
+            if (worker is None or not worker.alive) and not self._starting[slot] and now >= self._next_start[slot]:
+                self._starting[slot] = True
+                slots.append(slot)
+        return slots
+
+    def _submit(self, payload: Dict):
+        with self._lock:
+            if self._closed:
+                raise DukascopyWorkerError("Pool Dukascopy encerrado")
+            slots = self._reserve_slots()
+        # Subir um worker leva até READY_TIMEOUT: fora do lock, para as requisições que
+        # já têm worker vivo não ficarem esperando o spawn
+        spawned = {slot: self._spawn(slot) for slot in slots}
+        # Escolha + envio sob o mesmo lock para a carga refletir requisições concorrentes
+        with self._cond:
+            for slot, worker in spawned.items():
+                self._starting[slot] = False
+                self._workers[slot] = worker
+            if spawned:
+                self._cond.notify_all()
+            if self._closed:
+                orphans = [w for w in spawned.values() if w is not None]
+            else:
+                orphans = []
+                alive = [w for w in self._workers if w is not None and w.alive]
+                deadline = time.monotonic() + READY_TIMEOUT
+                while not alive and any(self._starting) and time.monotonic() < deadline:
+                    # Outra thread está subindo o worker: espera por ele em vez de falhar
+                    self._cond.wait(deadline - time.monotonic())
+                    alive = [w for w in self._workers if w is not None and w.alive]
+                if alive:
+                    worker = min(alive, key=lambda w: w.load)
+                    req_id = next(self._ids)
+                    return worker, req_id, worker.submit(req_id, payload)
+        for worker in orphans:
+            worker.stop()
+        if orphans or self._closed:
+            raise DukascopyWorkerError("Pool Dukascopy encerrado")
+        raise DukascopyWorkerError("Nenhum worker Dukascopy disponível")
+
+    def request(self, symbol: str, timeframe: str, from_iso: str, to_iso: str,
+                timeout: Optional[float] = None, retries: int = 1) -> list:
+        """Envia uma requisição e bloqueia até a resposta (ou timeout).
+        Se o worker cair com a requisição em voo, ela é reenviada a outro worker."""
+        timeout = timeout or self.timeout
+        payload = {"symbol": symbol, "timeframe": timeframe, "from": from_iso, "to": to_iso}
+        for attempt in range(retries + 1):
+            worker, req_id, future = self._submit(payload)
+            try:
+                return future.result(timeout=timeout)
+            except FutureTimeout:
+                worker.cancel(req_id)
+                raise TimeoutError(f"Dukascopy não respondeu em {timeout}s ({symbol} {timeframe})")
+            except DukascopyWorkerCrashed:
+                if attempt >= retries:
+                    raise
+                logger.warning(f"Reenviando {symbol} {timeframe} após queda do worker")
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            workers, self._workers = self._workers, [None] * self.size
+        for worker in workers:
+            if worker is not None:
+                worker.stop()
+
+
+_default_pool: Optional[DukascopyWorkerPool] = None
+_default_pool_guard = threading.Lock()
+
+
+def get_dukascopy_pool() -> DukascopyWorkerPool:
+    """Pool compartilhado do processo (encerrado no atexit)."""
+    global _default_pool
+    with _default_pool_guard:
+        if _default_pool is None:
+            _default_pool = DukascopyWorkerPool()
+            atexit.register(_default_pool.close)
+        return _default_pool
+
+
+class AsyncDukascopyWorker:
+    """Mesmo protocolo do pool, mas com asyncio.subprocess: um worker por event loop,
+    requisições concorrentes por id e reinício automático se o processo cair."""
+
+    def __init__(self, command: Optional[List[str]] = None, timeout: float = DEFAULT_TIMEOUT):
+        self.command = command or _worker_command()
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+        self._proc: Optional[asyncio.subprocess.Process] = None
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._tasks: List[asyncio.Task] = []
+        self._restarts = 0
+        self._next_start = 0.0
+
+    async def _ensure_started(self):
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._proc is not None and self._proc.returncode is None:
+                return
+            loop = asyncio.get_running_loop()
+            if loop.time() < self._next_start:
+                raise DukascopyWorkerError("Worker Dukascopy em backoff após falhas")
+            try:
+                self._proc = await asyncio.create_subprocess_exec(
+                    *self.command,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    limit=STREAM_LIMIT,
+                )
+                line = await asyncio.wait_for(self._proc.stdout.readline(), timeout=READY_TIMEOUT)
+                if not line or not json.loads(line).get("ready"):
+                    raise DukascopyWorkerError("Worker não sinalizou ready")
+            except (OSError, ValueError, asyncio.TimeoutError, DukascopyWorkerError) as e:
+                self._restarts += 1
+                backoff = min(MAX_RESTART_BACKOFF, 2 ** self._restarts)
+                self._next_start = loop.time() + backoff
+                if self._proc is not None and self._proc.returncode is None:
+                    self._proc.kill()
+                self._proc = None
+                raise DukascopyWorkerError(f"Falha ao iniciar worker Dukascopy (nova tentativa em {backoff}s): {e}")
+            if self._restarts:
+                logger.info("♻️ Worker Dukascopy async reiniciado")
+            self._restarts = 0
+            self._tasks = [
+                asyncio.create_task(self._read_stdout(self._proc)),
+                asyncio.create_task(self._read_stderr(self._proc)),
+            ]
+
+    async def _read_stdout(self, proc):
+        try:
+            while True:
+                line = await proc.stdout.readline()
+                if not line:
+                    break
+                try:
+                    msg = json.loads(line)
+                except ValueError:
+                    logger.warning(f"[dukascopy-async] Linha inválida do worker: {line[:200]!r}")
+                    continue
+                future = self._pending.pop(msg.get("id"), None)
+                if future is None or future.done():
+                    continue
+                if "error" in msg:
+                    future.set_exception(DukascopyWorkerError(msg["error"]))
+                else:
+                    future.set_result(msg.get("result"))
+        except Exception as e:
+            # Leitor morto deixaria as requisições seguintes esperando até o timeout:
+            # descarta o processo (a próxima requisição sobe outro) e falha as pendentes.
+            # Sem proc.wait(): com o stdout parado no limite, o pipe nunca chega ao EOF
+            logger.error(f"[dukascopy-async] Falha lendo o worker, reiniciando: {e!r}")
+            if self._proc is proc:
+                self._proc = None
+            if proc.returncode is None:
+                proc.kill()
+            reason = f"leitura falhou: {e}"
+        else:
+            reason = f"código {await proc.wait()}"
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(DukascopyWorkerCrashed(f"Worker Dukascopy async encerrou ({reason})"))
+        if pending:
+            logger.warning(f"[dukascopy-async] Worker encerrado ({reason}, {len(pending)} requisições perdidas)")
+
+    async def _read_stderr(self, proc):
+        while True:
+            line = await proc.stderr.readline()
+            if not line:
+                break
+            if line.strip():
+                logger.warning(f"[dukascopy-async] {line.decode(errors='ignore').rstrip()}")
+
+    async def request(self, symbol: str, timeframe: str, from_iso: str, to_iso: str,
+                      timeout: Optional[float] = None, retries: int = 1) -> list:
+        timeout = timeout or self.timeout
+        for attempt in range(retries + 1):
+            await self._ensure_started()
+            req_id = next(self._ids)
+            future = asyncio.get_running_loop().create_future()
+            self._pending[req_id] = future
+            line = json.dumps({"id": req_id, "symbol": symbol, "timeframe": timeframe,
+                               "from": from_iso, "to": to_iso}) + "\n"
+            try:
+                self._proc.stdin.write(line.encode())
+                await self._proc.stdin.drain()
+                return await asyncio.wait_for(future, timeout=timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Dukascopy não respondeu em {timeout}s ({symbol} {timeframe})")
+            except (DukascopyWorkerCrashed, ConnectionError) as e:
+                if attempt >= retries:
+                    raise DukascopyWorkerCrashed(str(e))
+                logger.warning(f"Reenviando {symbol} {timeframe} após queda do worker")
+            finally:
+                self._pending.pop(req_id, None)
+
+    async def close(self):
+        proc, self._proc = self._proc, None
+        if proc is not None and proc.returncode is None:
+            proc.stdin.close()
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                proc.kill()
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
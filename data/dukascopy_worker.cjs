@@ -0,0 +1,48 @@
+// data/dukascopy_worker.cjs
+// Worker persistente: lê requisições JSON (uma por linha) no stdin e responde no stdout.
+// Requisição: {"id": 1, "symbol": "eurusd", "timeframe": "m1", "from": ISO, "to": ISO}
+// Resposta:   {"id": 1, "result": [...candles]}  ou  {"id": 1, "error": "mensagem"}
+const readline = require("readline");
+const { getHistoricalRates } = require("dukascopy-node");
+
+function reply(payload) {
+  process.stdout.write(JSON.stringify(payload) + "\n");
+}
+
+async function handle(req) {
+  try {
+    const data = await getHistoricalRates({
+      instrument: String(req.symbol).toLowerCase(),
+      dates: {
+        from: new Date(req.from),
+        to: new Date(req.to)
+      },
+      timeframe: String(req.timeframe).toLowerCase(),
+      format: "json",
+      volumes: true,
+      ignoreFlats: true
+    });
+    reply({ id: req.id, result: data });
+  } catch (error) {
+    reply({ id: req.id, error: error.message || String(error) });
+  }
+}
+
+const rl = readline.createInterface({ input: process.stdin, terminal: false });
+
+rl.on("line", (line) => {
+  if (!line.trim()) return;
+  let req;
+  try {
+    req = JSON.parse(line);
+  } catch (error) {
+    reply({ id: null, error: "JSON inválido: " + error.message });
+    return;
+  }
+  // Sem await: várias requisições ficam em voo ao mesmo tempo
+  handle(req);
+});
+
+rl.on("close", () => process.exit(0));
+
+reply({ ready: true });
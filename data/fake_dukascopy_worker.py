@@ -0,0 +1,92 @@
+# data/fake_dukascopy_worker.py
+# Worker falso com o mesmo protocolo do data/dukascopy_worker.cjs, para testes locais
+# sem Node/rede. Gera candles sintéticos determinísticos para a janela pedida.
+#
+#   DUKASCOPY_WORKER_CMD="python data/fake_dukascopy_worker.py" python server.py
+#
+# Variáveis opcionais:
+#   FAKE_DUKASCOPY_DELAY        segundos de "rede" por requisição (padrão 0.05)
+#   FAKE_DUKASCOPY_CRASH_AFTER  encerra o processo após N requisições (simula queda)
+#   FAKE_DUKASCOPY_FAIL_SYMBOL  símbolo que sempre responde com erro
+
+import os
+import sys
+import json
+import math
+import time
+import threading
+from datetime import datetime
+
+TF_SECONDS = {
+    "s1": 1, "m1": 60, "m5": 300, "m15": 900,
+    "m30": 1800, "h1": 3600, "h4": 14400, "d1": 86400,
+}
+
+DELAY = float(os.getenv("FAKE_DUKASCOPY_DELAY", "0.05"))
+CRASH_AFTER = int(os.getenv("FAKE_DUKASCOPY_CRASH_AFTER", "0"))
+FAIL_SYMBOL = os.getenv("FAKE_DUKASCOPY_FAIL_SYMBOL", "")
+
+_out_lock = threading.Lock()
+_count = 0
+
+
+def _reply(payload):
+    with _out_lock:
+        sys.stdout.write(json.dumps(payload) + "\n")
+        sys.stdout.flush()
+
+
+def _to_epoch(value):
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+
+
+def _synthetic_candles(symbol, timeframe, start, end):
+    step = TF_SECONDS.get(str(timeframe).lower(), 60)
+    first = int(math.ceil(start / step) * step)
+    seed = sum(ord(c) for c in symbol)
+    candles = []
+    for ts in range(first, int(end), step):
+        base = 1.0 + (seed % 50) / 100 + 0.001 * math.sin(ts / (step * 10.0))
+        candles.append({
+            "timestamp": ts * 1000,  # ms, como o dukascopy-node
+            "open": round(base, 5),
+            "high": round(base + 0.0005, 5),
+            "low": round(base - 0.0005, 5),
+            "close": round(base + 0.0002 * math.cos(ts / step), 5),
+            "volume": float((ts // step) % 100 + 1),
+        })
+    return candles
+
+
+def _handle(req):
+    time.sleep(DELAY)
+    if FAIL_SYMBOL and str(req.get("symbol", "")).lower() == FAIL_SYMBOL.lower():
+        _reply({"id": req.get("id"), "error": f"Instrument {req.get('symbol')} not supported"})
+        return
+    try:
+        candles = _synthetic_candles(str(req["symbol"]), req["timeframe"],
+                                     _to_epoch(req["from"]), _to_epoch(req["to"]))
+        _reply({"id": req.get("id"), "result": candles})
+    except Exception as e:
+        _reply({"id": req.get("id"), "error": str(e)})
+
+
+def main():
+    global _count
+    _reply({"ready": True})
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            req = json.loads(line)
+        except ValueError as e:
+            _reply({"id": None, "error": f"JSON inválido: {e}"})
+            continue
+        _count += 1
+        if CRASH_AFTER and _count > CRASH_AFTER:
+            os._exit(3)
+        threading.Thread(target=_handle, args=(req,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# data/fake_pocketoption_server.py
+# Servidor Socket.IO (Engine.IO v4 sobre websocket) falso, com o subconjunto do protocolo
+# PocketOption que o bot usa: handshake "0{...}", 42["auth",...], 42["get-candles",...]
+# e ping "2" / pong "3". Para testes locais sem rede nem SSID real:
+#
+#   python data/fake_pocketoption_server.py --port 8765
+#   POCKETOPTION_WS_URL="ws://127.0.0.1:8765/socket.io/?EIO=4&transport=websocket" python server.py
+#
+# Variáveis opcionais:
+#   FAKE_PO_SSID          único SSID aceito (padrão: qualquer um diferente de "invalid")
+#   FAKE_PO_DELAY         atraso máximo (s) por resposta; respostas saem fora de ordem
+#   FAKE_PO_PING          intervalo (s) entre pings do servidor (padrão 25)
+#   FAKE_PO_DROP_AFTER    derruba a conexão após N get-candles (simula queda)
+#   FAKE_PO_ANONYMOUS     "1" = respostas sem asset/period, em ordem (correlação por ordem)
+#   FAKE_PO_TICK          intervalo (s) entre ticks do updateStream dos ativos assinados
+#                         via changeSymbol (padrão 0.5)
+
+import os
+import json
+import math
+import random
+import time
+import asyncio
+import argparse
+
+import websockets
+
+SSID = os.getenv("FAKE_PO_SSID", "")
+DELAY = float(os.getenv("FAKE_PO_DELAY", "0.05"))
+PING_INTERVAL = float(os.getenv("FAKE_PO_PING", "25"))
+DROP_AFTER = int(os.getenv("FAKE_PO_DROP_AFTER", "0"))
+ANONYMOUS = os.getenv("FAKE_PO_ANONYMOUS", "") == "1"
+TICK_INTERVAL = float(os.getenv("FAKE_PO_TICK", "0.5"))
+
+stats = {"connections": 0, "auths": 0, "requests": 0, "pongs": 0, "ticks": 0}
+
+
+def synthetic_candles(asset: str, period: int, limit: int, end: int):
+    """Candles determinísticos por ativo/período, terminando no último período fechado."""
+    seed = sum(ord(c) for c in asset)
+    last = end - end % period
+    candles = []
+    for i in range(limit):
+        t = last - (limit - 1 - i) * period
+        base = 1.0 + (seed % 50) / 100 + 0.01 * math.sin(t / (period * 7.0) + seed)
+        candles.append({
+            "time": t,
+            "open": round(base, 5),
+            "high": round(base + 0.0005, 5),
+            "low": round(base - 0.0005, 5),
+            "close": round(base + 0.0002 * math.cos(t / period), 5),
+            "volume": float((t // period) % 100)
+        })
+    return candles
+
+
+def synthetic_price(asset: str, ts: float) -> float:
+    seed = sum(ord(c) for c in asset)
+    return round(1.0 + (seed % 50) / 100 + 0.01 * math.sin(ts / 420.0 + seed) + random.uniform(-2e-4, 2e-4), 5)
+
+
+async def handle(ws):
+    stats["connections"] += 1
+    await ws.send('0' + json.dumps({
+        "sid": f"fake{stats['connections']}",
+        "upgrades": [],
+        "pingInterval": int(PING_INTERVAL * 1000),
+        "pingTimeout": 20000
+    }))
+    authed = False
+    served = 0
+    tasks = set()
+
+    async def pinger():
+        while True:
+            await asyncio.sleep(PING_INTERVAL)
+            await ws.send("2")
+
+    async def reply(payload):
+        await asyncio.sleep(random.uniform(0, DELAY))
+        asset, period = payload["asset"], int(payload["period"])
+        body = {"data": synthetic_candles(asset, period, int(payload["limit"]), int(payload["end"]))}
+        if not ANONYMOUS:
+            body.update({"asset": asset, "period": period})
+        await ws.send('42' + json.dumps(["get-candles", body]))
+
+    async def streamer():
+        # Como a PocketOption: evento anunciado em texto (451-) e payload em frame binário
+        while True:
+            await asyncio.sleep(TICK_INTERVAL)
+            if not subscribed:
+                continue
+            now = time.time()
+            rows = [[asset, round(now, 3), synthetic_price(asset, now)] for asset in sorted(subscribed)]
+            await ws.send('451-' + json.dumps(["updateStream", {"_placeholder": True, "num": 0}]))
+            await ws.send(json.dumps(rows).encode("utf-8"))
+            stats["ticks"] += len(rows)
+
+    subscribed = set()
+    ping_task = asyncio.create_task(pinger())
+    stream_task = asyncio.create_task(streamer())
+    try:
+        async for msg in ws:
+            if msg == "3":
+                stats["pongs"] += 1
+                continue
+            if not msg.startswith("42"):
+                continue
+            event, payload = json.loads(msg[2:])[:2]
+            if event == "auth":
+                session = payload.get("session", "")
+                ok = session == SSID if SSID else session != "invalid"
+                stats["auths"] += ok
+                authed = ok
+                await ws.send('42' + json.dumps(["auth", {"success": ok}], separators=(",", ":")))
+            elif event == "changeSymbol" and authed:
+                subscribed.add(payload["asset"])
+            elif event == "get-candles" and authed:
+                stats["requests"] += 1
+                served += 1
+                if DROP_AFTER and served > DROP_AFTER:
+                    await ws.close()
+                    return
+                if ANONYMOUS:
+                    # Sem asset/period o cliente só pode correlacionar pela ordem
+                    await reply(payload)
+                    continue
+                task = asyncio.create_task(reply(payload))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+    except websockets.ConnectionClosed:
+        pass
+    finally:
+        ping_task.cancel()
+        stream_task.cancel()
+        for task in tasks:
+            task.cancel()
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765):
+    async with websockets.serve(handle, host, port):
+        print(f"Fake PocketOption em ws://{host}:{port}/socket.io/?EIO=4&transport=websocket", flush=True)
+        await asyncio.Future()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor PocketOption falso para testes")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port))
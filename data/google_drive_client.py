@@ -2,7 +2,9 @@
 import os
 import json
 import io
+import hashlib
 import logging
+import threading
 import time
 from datetime import datetime
 
@@ -22,25 +24,165 @@ DEFAULT_SHARE_EMAIL = "kendeabreu24@gmail.com"
 CSV_FOLDER_ID = "1-2NSyy8C4kuBt_Rb6KKB42CVOxJLzTq8"
 PKL_FOLDER_ID = "1-9FzKbCYdYuS2peZ5WlCTdtR7ayJZPH9"
 
-def get_drive_service():
-    try:
-        creds = None
-        if os.path.exists(TOKEN_FILE):
-            creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-        if not creds or not creds.valid:
-            if creds and creds.expired and creds.refresh_token:
-                creds.refresh(Request())
+# Permissões já concedidas (arquivo -> e-mails), para não recriar a cada download/upload
+STATE_FILE = os.path.join(os.path.dirname(__file__), 'cache', 'drive_state.json')
+MANIFEST_TTL = 300  # s até a próxima consulta à changes API
+FILE_FIELDS = 'id, name, mimeType, md5Checksum, modifiedTime, size'
+CHANGE_FIELDS = f'nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}, parents, trashed))'
+
+_creds = None
+_creds_lock = threading.Lock()
+_local = threading.local()
+
+def _get_credentials():
+    """Credenciais lidas do token.json uma vez e renovadas só quando expiram."""
+    global _creds
+    with _creds_lock:
+        if _creds is None and os.path.exists(TOKEN_FILE):
+            _creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+        if not _creds or not _creds.valid:
+            if _creds and _creds.expired and _creds.refresh_token:
+                _creds.refresh(Request())
             else:
                 flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
-                creds = flow.run_local_server(port=0)
+                _creds = flow.run_local_server(port=0)
             with open(TOKEN_FILE, 'w') as token:
-                token.write(creds.to_json())
-        return build('drive', 'v3', credentials=creds)
+                token.write(_creds.to_json())
+        return _creds
+
+def get_drive_service():
+    # Um cliente por thread (httplib2 não é thread-safe), reaproveitado entre chamadas
+    try:
+        creds = _get_credentials()
+        service = getattr(_local, 'service', None)
+        if service is None or getattr(_local, 'creds', None) is not creds:
+            service = build('drive', 'v3', credentials=creds)
+            _local.service, _local.creds = service, creds
+        return service
     except Exception as e:
         logging.error(f"Erro ao obter serviço do Google Drive: {e}")
         raise
 
+class DriveFolderManifest:
+    """
+    nome -> {id, md5Checksum, modifiedTime, size} por pasta. A primeira consulta de uma
+    pasta é uma listagem paginada; depois ela é atualizada pela changes API a cada
+    MANIFEST_TTL segundos, em vez de um files().list por arquivo.
+    """
+
+    def __init__(self, ttl=MANIFEST_TTL):
+        self.ttl = ttl
+        self._folders = {}
+        self._page_token = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def _list_folder(self, service, folder_id):
+        files, page_token = {}, None
+        while True:
+            response = service.files().list(
+                q=f"'{folder_id}' in parents and trashed = false",
+                spaces='drive',
+                fields=f'nextPageToken, files({FILE_FIELDS})',
+                pageSize=1000,
+                pageToken=page_token
+            ).execute()
+            for f in response.get('files', []):
+                files[f['name']] = f
+            page_token = response.get('nextPageToken')
+            if page_token is None:
+                return files
+
+    def _apply_changes(self, service):
+        page_token = self._page_token
+        while page_token:
+            response = service.changes().list(pageToken=page_token, spaces='drive', fields=CHANGE_FIELDS).execute()
+            for change in response.get('changes', []):
+                for files in self._folders.values():
+                    for name in [n for n, f in files.items() if f['id'] == change['fileId']]:
+                        del files[name]
+                info = change.get('file') or {}
+                if change.get('removed') or info.get('trashed'):
+                    continue
+                for parent in info.get('parents', []):
+                    if parent in self._folders:
+                        self._folders[parent][info['name']] = {k: v for k, v in info.items() if k not in ('parents', 'trashed')}
+            if 'newStartPageToken' in response:
+                self._page_token = response['newStartPageToken']
+            page_token = response.get('nextPageToken')
+
+    def folder(self, folder_id, force=False):
+        """Arquivos da pasta (dict nome -> metadados), listando ou aplicando mudanças se preciso."""
+        with self._lock:
+            service = get_drive_service()
+            if self._page_token is None:
+                self._page_token = service.changes().getStartPageToken().execute().get('startPageToken')
+                self._checked_at = time.monotonic()
+            if force or folder_id not in self._folders:
+                self._folders[folder_id] = self._list_folder(service, folder_id)
+            elif time.monotonic() - self._checked_at > self.ttl:
+                self._apply_changes(service)
+                self._checked_at = time.monotonic()
+            return self._folders[folder_id]
+
+    def get(self, filename, folder_id):
+        return self.folder(folder_id).get(filename)
+
+    def record(self, folder_id, info):
+        """Registra o resultado de um upload (evita listar de novo para achar o ID)."""
+        if not folder_id or not info or 'name' not in info:
+            return
+        with self._lock:
+            if folder_id in self._folders:
+                self._folders[folder_id][info['name']] = info
+
+    def forget(self, folder_id, filename):
+        """Remove um arquivo apagado do cache da pasta."""
+        with self._lock:
+            self._folders.get(folder_id, {}).pop(filename, None)
+
+_manifest = DriveFolderManifest()
+
+def get_folder_manifest():
+    return _manifest
+
+_state_lock = threading.Lock()
+_shared = None
+
+def _shared_files():
+    global _shared
+    if _shared is None:
+        try:
+            with open(STATE_FILE, 'r') as f:
+                _shared = {k: set(v) for k, v in json.load(f).get('shared', {}).items()}
+        except (OSError, ValueError):
+            _shared = {}
+    return _shared
+
+def is_shared(file_id, user_email=DEFAULT_SHARE_EMAIL):
+    with _state_lock:
+        return user_email in _shared_files().get(file_id, ())
+
+def remember_shared(file_id, user_email=DEFAULT_SHARE_EMAIL):
+    with _state_lock:
+        shared = _shared_files()
+        shared.setdefault(file_id, set()).add(user_email)
+        os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+        tmp = STATE_FILE + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'shared': {k: sorted(v) for k, v in shared.items()}}, f)
+        os.replace(tmp, STATE_FILE)
+
+def local_md5(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 def share_file_with_user(file_id, user_email=DEFAULT_SHARE_EMAIL):
+    if is_shared(file_id, user_email):
+        return
     try:
         service = get_drive_service()
         permission = {
@@ -49,12 +191,14 @@ def share_file_with_user(file_id, user_email=DEFAULT_SHARE_EMAIL):
             'emailAddress': user_email
         }
         service.permissions().create(fileId=file_id, body=permission, sendNotificationEmail=False).execute()
+        remember_shared(file_id, user_email)
         print(f"✅ Arquivo compartilhado com {user_email} (ID: {file_id})")
     except Exception as e:
         print(f"⚠️ Falha ao compartilhar arquivo {file_id} com {user_email}: {e}")
 
 def get_folder_id_for_file(filename):
-    if filename.lower().endswith('.csv'):
+    # Segmentos/manifestos da candle store e pedaços diários ficam junto com os CSVs de candles
+    if filename.lower().endswith(('.csv', '.npy', '.manifest.json', '.npz', '.cndl', '.index.json')):
         return CSV_FOLDER_ID
     elif filename.lower().endswith('.pkl'):
         return PKL_FOLDER_ID
@@ -62,6 +206,9 @@ def get_folder_id_for_file(filename):
 
 def find_file_id(filename, drive_folder_id=None):
     try:
+        if drive_folder_id:
+            info = get_folder_manifest().get(filename, drive_folder_id)
+            return info['id'] if info else None
         service = get_drive_service()
         query = f"name = '{filename}'"
         if drive_folder_id:
@@ -92,14 +239,17 @@ def upload_or_update_file(filepath, drive_folder_id=None, share_with_email=DEFAU
             if file_id:
                 updated_file = service.files().update(
                     fileId=file_id,
-                    media_body=media
+                    media_body=media,
+                    fields=FILE_FIELDS
                 ).execute()
+                get_folder_manifest().record(drive_folder_id, updated_file)
                 print(f"📝 Atualização concluída: {filename} (ID: {file_id})")
                 if share_with_email:
                     share_file_with_user(file_id, share_with_email)
                 return file_id
             else:
-                file = service.files().create(body=file_metadata, media_body=media, fields='id').execute()
+                file = service.files().create(body=file_metadata, media_body=media, fields=FILE_FIELDS).execute()
+                get_folder_manifest().record(drive_folder_id, file)
                 file_id = file.get('id')
                 print(f"✅ Upload concluído: {filename} (ID: {file_id})")
                 if share_with_email:
@@ -153,9 +303,15 @@ def upload_or_update_all_files_in_directory(local_dir, share_with_email=DEFAULT_
 def download_file(filename, destination_path, drive_folder_id=None, share_with_email=DEFAULT_SHARE_EMAIL):
     try:
         service = get_drive_service()
-        file_id = find_file_id(filename, drive_folder_id)
+        info = get_folder_manifest().get(filename, drive_folder_id) if drive_folder_id else None
+        file_id = info['id'] if info else find_file_id(filename, drive_folder_id)
         if not file_id:
             raise FileNotFoundError(f"Arquivo '{filename}' não encontrado no Google Drive na pasta {drive_folder_id}.")
+        # Download condicional: cópia local com o mesmo checksum não é baixada de novo
+        if info and info.get('md5Checksum') and os.path.exists(destination_path) \
+                and local_md5(destination_path) == info['md5Checksum']:
+            print(f"✔️ {filename} já está atualizado localmente (ID: {file_id})")
+            return
         request = service.files().get_media(fileId=file_id)
         fh = io.FileIO(destination_path, 'wb')
         downloader = MediaIoBaseDownload(fh, request)
@@ -170,22 +326,23 @@ def download_file(filename, destination_path, drive_folder_id=None, share_with_e
         print(f"❌ Erro ao baixar arquivo {filename}: {e}")
         raise
 
+def delete_file(filename, drive_folder_id=None):
+    """Apaga o arquivo do Drive; False se ele não existia."""
+    file_id = find_file_id(filename, drive_folder_id)
+    if not file_id:
+        return False
+    try:
+        get_drive_service().files().delete(fileId=file_id).execute()
+    except Exception as e:
+        print(f"❌ Erro ao apagar arquivo {filename}: {e}")
+        raise
+    get_folder_manifest().forget(drive_folder_id, filename)
+    print(f"🗑️ Arquivo apagado do Drive: {filename} (ID: {file_id})")
+    return True
+
 def list_files_in_drive_folder(drive_folder_id):
     try:
-        service = get_drive_service()
-        files = []
-        page_token = None
-        while True:
-            response = service.files().list(
-                q=f"'{drive_folder_id}' in parents and trashed = false",
-                spaces='drive',
-                fields='nextPageToken, files(id, name, mimeType, modifiedTime, size)',
-                pageToken=page_token
-            ).execute()
-            files.extend(response.get('files', []))
-            page_token = response.get('nextPageToken', None)
-            if page_token is None:
-                break
+        files = list(get_folder_manifest().folder(drive_folder_id).values())
         print(f"\nArquivos na pasta {drive_folder_id}:")
         for f in files:
             print(f"- {f['name']} (ID: {f['id']}, Modificado: {f.get('modifiedTime', '-')}, Tamanho: {f.get('size', '-')} bytes)")
@@ -0,0 +1,27 @@
+# data/http_session.py
+# Sessão aiohttp compartilhada pelos provedores async: um único conector (pool de
+# conexões keep-alive + cache de DNS) por event loop, em vez de um por requisição.
+
+import asyncio
+from typing import Dict, Optional
+
+import aiohttp
+
+_sessions: Dict[int, aiohttp.ClientSession] = {}
+
+
+async def get_http_session() -> aiohttp.ClientSession:
+    loop = asyncio.get_running_loop()
+    session: Optional[aiohttp.ClientSession] = _sessions.get(id(loop))
+    if session is None or session.closed:
+        connector = aiohttp.TCPConnector(limit=100, limit_per_host=20, ttl_dns_cache=300)
+        session = aiohttp.ClientSession(connector=connector)
+        _sessions[id(loop)] = session
+    return session
+
+
+async def close_http_session():
+    loop = asyncio.get_running_loop()
+    session = _sessions.pop(id(loop), None)
+    if session is not None and not session.closed:
+        await session.close()
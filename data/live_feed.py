@@ -0,0 +1,377 @@
+# data/live_feed.py
+# Modo streaming: preços ao vivo (stream da PocketOption pela sessão persistente, ou um
+# replay local do CandleStore) são agregados em memória em candles de todos os
+# CONFIG["timeframes"]. Cada candle fechado vira um evento "bar closed"; o
+# BarSignalRunner roda o ensemble/ML uma vez por candle e guarda o último sinal, que o
+# bot do Telegram reaproveita em vez de buscar e calcular a cada clique.
+
+import copy
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import CONFIG
+from data.rate_governor import fetch_priority, SCHEDULED
+from strategy.indicator_stream import IndicatorStreams
+
+logger = logging.getLogger(__name__)
+
+TF_SECONDS = {
+    "S1": 1, "M1": 60, "M5": 300, "M15": 900,
+    "M30": 1800, "H1": 3600, "H4": 14400, "D1": 86400,
+}
+
+# Timeframe do usuário -> intervalo usado por data_client/estratégias
+TF_INTERVAL = {
+    "S1": "s1", "M1": "1min", "M5": "5min", "M15": "15min",
+    "M30": "30min", "H1": "1h", "H4": "4h", "D1": "1day",
+}
+
+
+def po_asset(symbol: str) -> str:
+    """'EURUSD OTC' -> 'EURUSD_otc' (nome do ativo no stream da PocketOption)."""
+    base = symbol.upper().replace(" OTC", "").replace("/", "").replace(" ", "")
+    return f"{base}_otc" if "OTC" in symbol.upper() else base
+
+
+class CandleAggregator:
+    """Candles em construção e histórico de candles fechados de um símbolo, por timeframe."""
+
+    def __init__(self, timeframes: List[str], history: int = 300):
+        self.timeframes = [tf for tf in timeframes if tf in TF_SECONDS]
+        self.current: Dict[str, Dict] = {}
+        self.closed: Dict[str, deque] = {tf: deque(maxlen=history) for tf in self.timeframes}
+        self.last_ts = 0.0
+        self.late_ticks = 0
+
+    def update(self, ts: float, price: float, volume: float = 1.0) -> List[Tuple[str, Dict]]:
+        """Aplica um tick; devolve [(timeframe, candle)] dos candles que ele fechou."""
+        if ts < self.last_ts - 1:
+            # Tick atrasado (ex.: reenvio após reconexão): não reabre candle já fechado
+            self.late_ticks += 1
+            return []
+        self.last_ts = max(self.last_ts, ts)
+        closed = []
+        for tf in self.timeframes:
+            start = int(ts) - int(ts) % TF_SECONDS[tf]
+            bar = self.current.get(tf)
+            if bar is not None and start > bar["timestamp"]:
+                closed.append((tf, self._close(tf)))
+                bar = None
+            if bar is None:
+                if self.closed[tf] and start <= self.closed[tf][-1]["timestamp"]:
+                    continue
+                self.current[tf] = {
+                    "timestamp": start, "open": price, "high": price,
+                    "low": price, "close": price, "volume": volume,
+                }
+            else:
+                bar["high"] = max(bar["high"], price)
+                bar["low"] = min(bar["low"], price)
+                bar["close"] = price
+                bar["volume"] += volume
+        return closed
+
+    def flush(self, now: float, grace: float = 0.0) -> List[Tuple[str, Dict]]:
+        """Fecha candles cujo período já terminou mesmo sem tick novo (mercado parado)."""
+        closed = []
+        for tf in self.timeframes:
+            bar = self.current.get(tf)
+            if bar is not None and bar["timestamp"] + TF_SECONDS[tf] + grace <= now:
+                closed.append((tf, self._close(tf)))
+        return closed
+
+    def _close(self, tf: str) -> Dict:
+        bar = self.current.pop(tf)
+        self.closed[tf].append(bar)
+        return bar
+
+    def seed(self, tf: str, candles: List[Dict]):
+        """Preenche o histórico (antes do primeiro candle ao vivo) com candles já fechados."""
+        if tf not in self.closed:
+            return
+        live = list(self.closed[tf])
+        first_live = live[0]["timestamp"] if live else float("inf")
+        current = self.current.get(tf)
+        if current is not None:
+            first_live = min(first_live, current["timestamp"])
+        older = [dict(c) for c in candles if c["timestamp"] < first_live]
+        self.closed[tf].clear()
+        self.closed[tf].extend(older + live)
+
+
+class LiveFeed:
+    """Agrega ticks de vários símbolos e publica eventos de candle fechado."""
+
+    def __init__(self, timeframes: Optional[List[str]] = None, history: Optional[int] = None):
+        cfg = CONFIG.get("live_feed", {})
+        self.timeframes = timeframes or CONFIG["timeframes"]
+        self.history_size = history or cfg.get("history", 300)
+        self.aggregators: Dict[str, CandleAggregator] = {}
+        self._subscribers: List[Callable] = []
+        self._clock: Optional[asyncio.Task] = None
+        self.ticks = 0
+
+    def subscribe(self, callback: Callable):
+        """callback(symbol, timeframe, candle); pode ser função comum ou coroutine."""
+        self._subscribers.append(callback)
+
+    def _aggregator(self, symbol: str) -> CandleAggregator:
+        if symbol not in self.aggregators:
+            self.aggregators[symbol] = CandleAggregator(self.timeframes, self.history_size)
+        return self.aggregators[symbol]
+
+    def ingest(self, symbol: str, ts: float, price: float, volume: float = 1.0):
+        self.ticks += 1
+        for tf, candle in self._aggregator(symbol).update(ts, price, volume):
+            self._publish(symbol, tf, candle)
+
+    def flush(self, now: Optional[float] = None, grace: float = 0.0):
+        now = time.time() if now is None else now
+        for symbol, agg in list(self.aggregators.items()):
+            for tf, candle in agg.flush(now, grace):
+                self._publish(symbol, tf, candle)
+
+    def history(self, symbol: str, tf: str) -> List[Dict]:
+        agg = self.aggregators.get(symbol)
+        return list(agg.closed.get(tf, [])) if agg else []
+
+    def current(self, symbol: str, tf: str) -> Optional[Dict]:
+        """Cópia do candle ainda em formação (None se não há)."""
+        agg = self.aggregators.get(symbol)
+        bar = agg.current.get(tf) if agg else None
+        return dict(bar) if bar is not None else None
+
+    def seed(self, symbol: str, tf: str, candles: List[Dict]):
+        self._aggregator(symbol).seed(tf, candles)
+
+    def _publish(self, symbol: str, tf: str, candle: Dict):
+        for callback in self._subscribers:
+            try:
+                result = callback(symbol, tf, candle)
+                if asyncio.iscoroutine(result):
+                    asyncio.ensure_future(result)
+            except Exception as e:
+                logger.warning(f"Assinante do feed falhou ({symbol} {tf}): {e}")
+
+    async def run_clock(self, grace: Optional[float] = None):
+        """Fecha candles pelo relógio (fontes ao vivo), um segundo de resolução."""
+        grace = CONFIG.get("live_feed", {}).get("close_grace", 1.0) if grace is None else grace
+        while True:
+            await asyncio.sleep(1.0 - time.time() % 1.0)
+            self.flush(grace=grace)
+
+    def start_clock(self):
+        if self._clock is None or self._clock.done():
+            self._clock = asyncio.create_task(self.run_clock())
+
+    async def stop(self):
+        if self._clock is not None:
+            self._clock.cancel()
+            try:
+                await self._clock
+            except asyncio.CancelledError:
+                pass
+
+
+# ---------- fontes ----------
+
+class PocketOptionStream:
+    """
+    Stream de preços da PocketOption pela sessão persistente: assina cada ativo com
+    42["changeSymbol",{"asset","period"}] e recebe updateStream (texto ou binário
+    anunciado por 451-) no formato [[asset, timestamp, price], ...].
+    """
+
+    def __init__(self, feed: LiveFeed, symbols: List[str], session=None):
+        self.feed = feed
+        self.symbols = symbols
+        self.session = session
+        self._by_asset = {po_asset(s).lower(): s for s in symbols}
+
+    def _on_update(self, payload):
+        if not isinstance(payload, list):
+            return
+        rows = payload if payload and isinstance(payload[0], list) else [payload]
+        for row in rows:
+            try:
+                asset, ts, price = row[0], float(row[1]), float(row[2])
+            except (IndexError, TypeError, ValueError):
+                continue
+            symbol = self._by_asset.get(str(asset).lower())
+            if symbol is not None:
+                self.feed.ingest(symbol, ts, price)
+
+    async def start(self):
+        if self.session is None:
+            from data.pocketoption_session import get_session
+            self.session = get_session()
+        self.session.add_listener("updateStream", self._on_update)
+        self.session.add_listener("connected", self._subscribe_all)
+        await self._subscribe_all()
+        self.feed.start_clock()
+        logger.info(f"📡 Stream PocketOption assinado para {len(self.symbols)} símbolos")
+
+    async def _subscribe_all(self, *_):
+        for symbol in self.symbols:
+            await self.session.emit("changeSymbol", {"asset": po_asset(symbol), "period": 60})
+
+    async def stop(self):
+        if self.session is not None:
+            self.session.remove_listener("updateStream", self._on_update)
+            self.session.remove_listener("connected", self._subscribe_all)
+        await self.feed.stop()
+
+
+class ReplaySource:
+    """
+    Substituto local do stream: reproduz candles M1 do CandleStore como ticks
+    (open, high/low, close dentro de cada minuto). `speed` = minutos por segundo;
+    0 reproduz o mais rápido possível. Os candles fecham pelo tempo dos ticks.
+    """
+
+    def __init__(self, feed: LiveFeed, symbols: List[str], speed: float = 0.0,
+                 candles: Optional[Dict[str, List[Dict]]] = None, limit: int = 1000):
+        self.feed = feed
+        self.symbols = symbols
+        self.speed = speed
+        self.candles = candles
+        self.limit = limit
+        self._task: Optional[asyncio.Task] = None
+
+    def _load(self) -> Dict[str, List[Dict]]:
+        if self.candles is not None:
+            return self.candles
+        from data.candle_store import get_candle_store, array_to_candles
+        store = get_candle_store()
+        return {s: array_to_candles(store.tail(s, "1min", self.limit)) for s in self.symbols}
+
+    async def run(self):
+        series = await asyncio.to_thread(self._load)
+        last_ts = 0
+        length = max((len(c) for c in series.values()), default=0)
+        for i in range(length):
+            for symbol, candles in series.items():
+                if i >= len(candles):
+                    continue
+                c = candles[i]
+                ts = int(c["timestamp"])
+                first, second = (c["low"], c["high"]) if c["close"] >= c["open"] else (c["high"], c["low"])
+                share = float(c.get("volume", 0)) / 4 or 1.0
+                for offset, price in ((0, c["open"]), (15, first), (30, second), (59, c["close"])):
+                    self.feed.ingest(symbol, ts + offset, price, share)
+                last_ts = max(last_ts, ts)
+            if self.speed:
+                await asyncio.sleep(1.0 / self.speed)
+            elif i % 100 == 0:
+                await asyncio.sleep(0)
+        # Fecha o que ficou aberto no fim do replay
+        self.feed.flush(now=last_ts + max(TF_SECONDS.values()) + 60)
+
+    async def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+# ---------- sinais por candle ----------
+
+class BarSignalRunner:
+    """Roda strategy.generate_signal uma vez por candle fechado de cada (símbolo, timeframe)."""
+
+    def __init__(self, feed: LiveFeed, strategy, data_client=None,
+                 timeframes: Optional[List[str]] = None, indicators=None):
+        cfg = CONFIG.get("live_feed", {})
+        self.feed = feed
+        self.strategy = strategy
+        self.data_client = data_client
+        self.indicators = indicators
+        self.timeframes = set(timeframes or cfg.get("signal_timeframes", ["M1"]))
+        self.min_history = cfg.get("min_history", 50)
+        self._semaphore = asyncio.Semaphore(cfg.get("max_concurrent_signals", 2))
+        self._latest: Dict[Tuple[str, str], Dict] = {}
+        self._seeded = set()
+        self._tasks = set()
+        self.runs = 0
+        feed.subscribe(self.on_bar_closed)
+
+    def on_bar_closed(self, symbol: str, tf: str, candle: Dict):
+        if tf not in self.timeframes:
+            return
+        task = asyncio.ensure_future(self._run(symbol, tf, candle))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _seed(self, symbol: str, tf: str):
+        if (symbol, tf) in self._seeded or self.data_client is None:
+            return
+        self._seeded.add((symbol, tf))
+        try:
+            with fetch_priority(SCHEDULED):
+                data = await self.data_client.fetch_candles(
+                    symbol, interval=TF_INTERVAL[tf], limit=self.feed.history_size
+                )
+            if data and data.get("history"):
+                self.feed.seed(symbol, tf, data["history"])
+        except Exception as e:
+            logger.warning(f"Não foi possível semear {symbol} {tf}: {e}")
+
+    async def _run(self, symbol: str, tf: str, candle: Dict):
+        async with self._semaphore:
+            if len(self.feed.history(symbol, tf)) < self.min_history:
+                await self._seed(symbol, tf)
+            history = self.feed.history(symbol, tf)
+            if history and history[-1]["timestamp"] > candle["timestamp"]:
+                return  # já existe candle mais novo; este sinal nasceria velho
+            data = {"symbol": symbol, "history": history, "close": candle["close"]}
+            if self.indicators is not None:
+                data["indicators"] = self.indicators.latest(symbol, tf)
+            try:
+                signal = await asyncio.to_thread(self.strategy.generate_signal, data, TF_INTERVAL[tf])
+            except Exception as e:
+                logger.warning(f"Sinal falhou para {symbol} {tf}: {e}")
+                signal = None
+            self.runs += 1
+            self._latest[(symbol, tf)] = {"bar": candle["timestamp"], "signal": signal, "at": time.time()}
+
+    def latest(self, symbol: str, tf: str, max_age: Optional[float] = None) -> Optional[Dict]:
+        """
+        Último sinal de (símbolo, timeframe) se calculado sobre o candle fechado mais
+        recente; cópia, porque quem envia a mensagem acrescenta campos no dicionário.
+        """
+        entry = self._latest.get((symbol, tf))
+        if entry is None or entry["signal"] is None:
+            return None
+        period = TF_SECONDS.get(tf, 60)
+        age = time.time() - (entry["bar"] + period)
+        if age > (max_age if max_age is not None else period):
+            return None
+        return copy.deepcopy(entry["signal"])
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+
+
+def build_live_feed(strategy, data_client, symbols: Optional[List[str]] = None):
+    """Monta feed + fonte + runner conforme CONFIG["live_feed"]; a fonte ainda precisa de start()."""
+    cfg = CONFIG.get("live_feed", {})
+    symbols = symbols or CONFIG["symbols"] + CONFIG["otc_symbols"]
+    symbols = list(dict.fromkeys(symbols))
+    feed = LiveFeed()
+    # Antes do runner: o estado incremental é atualizado antes do sinal do candle
+    indicators = IndicatorStreams(feed)
+    if cfg.get("source", "pocketoption") == "replay":
+        source = ReplaySource(feed, symbols)
+    else:
+        source = PocketOptionStream(feed, symbols)
+    runner = BarSignalRunner(feed, strategy, data_client, indicators=indicators)
+    return feed, source, runner
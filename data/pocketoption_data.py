@@ -1,12 +1,13 @@
 import os
 import json
-import time
-import socket
-from datetime import datetime
-import websocket
-from websocket import WebSocketTimeoutException, WebSocketConnectionClosedException
 from typing import Optional, Dict, List
 
+DEFAULT_WS_URLS = [
+    "wss://socket.pocketoption.com/socket.io/?EIO=4&transport=websocket",
+    "wss://eu.socket.pocketoption.com/socket.io/?EIO=4&transport=websocket",
+    "wss://us.socket.pocketoption.com/socket.io/?EIO=4&transport=websocket"
+]
+
 class PocketOptionAuthError(Exception):
     """Erro de autenticação/SSID inválido ou expirado."""
     pass
@@ -15,19 +16,38 @@ class PocketOptionNetworkError(Exception):
     """Erro de conexão com o servidor PocketOption."""
     pass
 
+def parse_candles_message(msg: str) -> List[Dict]:
+    """Converte a mensagem Socket.IO 42["get-candles",{"data":[...]}] em candles."""
+    try:
+        arr = json.loads(msg[2:])
+        data = arr[1].get("data", [])
+        return [
+            {
+                "timestamp": int(c["time"]),
+                "open": float(c["open"]),
+                "high": float(c["high"]),
+                "low": float(c["low"]),
+                "close": float(c["close"]),
+                "volume": float(c.get("volume", 0))
+            }
+            for c in data
+        ]
+    except (json.JSONDecodeError, KeyError, ValueError, IndexError, AttributeError) as e:
+        raise PocketOptionNetworkError(f"Erro ao parsear candles: {e}")
+
+def ws_urls() -> List[str]:
+    """URLs em ordem de fallback; POCKETOPTION_WS_URL força uma única (ex.: servidor falso local)."""
+    override = os.getenv("POCKETOPTION_WS_URL")
+    return [override] if override else list(DEFAULT_WS_URLS)
+
 class PocketOptionClient:
     def __init__(self):
         # URL alternativa incluída como fallback
-        self.ws_urls = [
-            "wss://socket.pocketoption.com/socket.io/?EIO=4&transport=websocket",
-            "wss://eu.socket.pocketoption.com/socket.io/?EIO=4&transport=websocket",
-            "wss://us.socket.pocketoption.com/socket.io/?EIO=4&transport=websocket"
-        ]
+        self.ws_urls = ws_urls()
         self.ssid = os.getenv("POCKETOPTION_SSID")
         if not self.ssid:
             raise RuntimeError("POCKETOPTION_SSID não encontrado no .env!")
         self.timeout = 10  # timeout em segundos
-        self.current_ws_url = None
 
     def _to_tf(self, interval: str) -> int:
         mapping = {
@@ -42,33 +62,11 @@ class PocketOptionClient:
         }
         return mapping.get(interval.lower(), 60)
 
-    def _create_connection(self) -> websocket.WebSocket:
-        """Tenta criar conexão com fallback para URLs alternativas"""
-        last_exception = None
-        
-        for url in self.ws_urls:
-            try:
-                self.current_ws_url = url
-                ws = websocket.create_connection(
-                    url,
-                    timeout=self.timeout,
-                    socket=socket.SOL_TCP  # Força uso do protocolo TCP padrão
-                )
-                return ws
-            except (socket.gaierror, WebSocketTimeoutException, 
-                   WebSocketConnectionClosedException) as e:
-                last_exception = e
-                continue
-                
-        raise PocketOptionNetworkError(
-            f"Não foi possível conectar a nenhum servidor PocketOption. Último erro: {last_exception}"
-        )
-
-    def fetch_candles(self, symbol: str, interval: str = "m1", limit: int = 5, 
+    def fetch_candles(self, symbol: str, interval: str = "m1", limit: int = 5,
                      retries: int = 2) -> Optional[Dict[str, List[Dict]]]:
         symbol_api = symbol.lower().replace(" ", "").replace("/", "")
         tf_sec = self._to_tf(interval)
-        
+
         for attempt in range(retries + 1):
             try:
                 candles = self._fetch_ws_candles(symbol_api, tf_sec, limit)
@@ -77,97 +75,36 @@ class PocketOptionClient:
             except PocketOptionAuthError as e:
                 raise  # Erros de auth não devem ser retried
             except (PocketOptionNetworkError, Exception) as e:
+                # A sessão já reconecta com backoff; a nova tentativa espera por ela
                 if attempt == retries:
                     print(f"❌ PocketOption WS error (tentativa {attempt + 1}/{retries + 1}): {e}")
-                time.sleep(1)  # Backoff simples
-                
+
         return None
 
     def _fetch_ws_candles(self, asset: str, period: int, limit: int) -> Optional[List[Dict]]:
-        """Lógica principal de obtenção de candles via WS"""
-        ws = None
-        try:
-            ws = self._create_connection()
-            
-            # Handshake inicial
-            init_msg = ws.recv()
-            if not init_msg.startswith('0'):
-                raise PocketOptionNetworkError("Resposta inicial inesperada do servidor")
-            
-            # Autenticação
-            auth_payload = json.dumps({
-                "session": self.ssid,
-                "isDemo": 0,
-                "platform": 2,
-                "isFastHistory": True,
-                "isOptimized": True
-            })
-            ws.send(f'42["auth",{auth_payload}]')
-            
-            # Verificação de autenticação
-            auth_ok = False
-            start_time = time.time()
-            while time.time() - start_time < self.timeout:
-                try:
-                    msg = ws.recv()
-                    if '"auth"' in msg:
-                        if '"success":true' in msg or "authenticated" in msg:
-                            auth_ok = True
-                            break
-                        elif '"success":false' in msg or "error" in msg:
-                            raise PocketOptionAuthError("Autenticação falhou: SSID inválido ou expirado")
-                except WebSocketTimeoutException:
-                    continue
-                    
-            if not auth_ok:
-                raise PocketOptionNetworkError("Timeout durante autenticação")
-            
-            # Solicitação de candles
-            now = int(time.time())
-            req_payload = json.dumps({
-                "asset": asset,
-                "period": period,
-                "limit": limit,
-                "end": now
-            })
-            ws.send(f'42["get-candles",{req_payload}]')
-            
-            # Processamento da resposta
-            candles = []
-            start_time = time.time()
-            while time.time() - start_time < self.timeout:
-                try:
-                    msg = ws.recv()
-                    if '"get-candles"' in msg:
-                        try:
-                            arr = json.loads(msg[2:])
-                            data = arr[1].get("data", [])
-                            candles = [
-                                {
-                                    "timestamp": int(c["time"]),
-                                    "open": float(c["open"]),
-                                    "high": float(c["high"]),
-                                    "low": float(c["low"]),
-                                    "close": float(c["close"]),
-                                    "volume": float(c.get("volume", 0))
-                                }
-                                for c in data
-                            ]
-                            return candles
-                        except (json.JSONDecodeError, KeyError, ValueError) as e:
-                            raise PocketOptionNetworkError(f"Erro ao parsear candles: {e}")
-                except WebSocketTimeoutException:
-                    continue
-                    
-            raise PocketOptionNetworkError("Timeout ao aguardar candles")
-            
-        finally:
-            if ws:
-                try:
-                    ws.close()
-                except:
-                    pass
+        """get-candles pela sessão persistente (sem handshake/auth por requisição)"""
+        from data.pocketoption_session import fetch_candles_blocking
+        return fetch_candles_blocking(asset, period, limit, timeout=self.timeout)
+
+
+class AsyncPocketOptionClient(PocketOptionClient):
+    """Versão asyncio: usa direto a sessão persistente do event loop corrente."""
 
-    def __del__(self):
-        """Garante que a conexão seja fechada"""
-        pass  # A conexão já é fechada no finally block
+    async def fetch_candles(self, symbol: str, interval: str = "m1", limit: int = 5,
+                            retries: int = 2) -> Optional[Dict[str, List[Dict]]]:
+        from data.pocketoption_session import get_session
+        symbol_api = symbol.lower().replace(" ", "").replace("/", "")
+        tf_sec = self._to_tf(interval)
+        session = get_session()
+
+        for attempt in range(retries + 1):
+            try:
+                candles = await session.get_candles(symbol_api, tf_sec, limit, timeout=self.timeout)
+                if candles:
+                    return {"history": candles, "close": candles[-1]["close"]}
+            except PocketOptionAuthError:
+                raise
+            except Exception as e:
+                if attempt == retries:
+                    print(f"❌ PocketOption WS error (tentativa {attempt + 1}/{retries + 1}): {e}")
+        return None
@@ -0,0 +1,345 @@
+# data/pocketoption_session.py
+# Sessão PocketOption persistente: um websocket (Engine.IO v4 / Socket.IO) autenticado
+# uma única vez, mantido vivo com ping/pong e reconectado com backoff. Vários
+# get-candles concorrentes são multiplexados no mesmo socket e as respostas são
+# correlacionadas por (asset, period) às futures de quem pediu.
+#
+# POCKETOPTION_WS_URL (ver data/pocketoption_data.py) permite apontar para o servidor
+# falso em data/fake_pocketoption_server.py durante testes.
+
+import os
+import json
+import time
+import asyncio
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+import websockets
+
+from data.pocketoption_data import (
+    PocketOptionAuthError,
+    PocketOptionNetworkError,
+    parse_candles_message,
+    ws_urls,
+)
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 10
+REQUEST_TIMEOUT = 10
+MAX_BACKOFF = 60
+
+
+class PocketOptionSession:
+    """Websocket único e autenticado, compartilhado por todas as requisições do loop."""
+
+    def __init__(self, ssid: Optional[str] = None, urls: Optional[List[str]] = None,
+                 is_demo: int = 0):
+        self.ssid = ssid or os.getenv("POCKETOPTION_SSID")
+        if not self.ssid:
+            raise RuntimeError("POCKETOPTION_SSID não encontrado no .env!")
+        self.urls = urls or ws_urls()
+        self.is_demo = is_demo
+        self.current_url: Optional[str] = None
+        self._ws = None
+        self._ready: Optional[asyncio.Event] = None
+        self._auth_error: Optional[Exception] = None
+        self._runner: Optional[asyncio.Task] = None
+        # (asset, period) -> pedidos em voo, na ordem de envio: {"limit", "waiters": [(future, limit)]}
+        self._pending: Dict[Tuple[str, int], Deque[Dict]] = defaultdict(deque)
+        self._order: Deque[Tuple[str, int]] = deque()  # ordem de envio (fallback sem asset/period)
+        self._listeners: Dict[str, List[Callable]] = defaultdict(list)
+        self._binary_event: Optional[str] = None
+        self._closed = False
+        self.stats = {"connects": 0, "requests": 0, "shared": 0}
+
+    # ---------- ciclo de vida ----------
+
+    async def start(self):
+        if self._runner is None or self._runner.done():
+            self._ready = asyncio.Event()
+            self._closed = False
+            self._runner = asyncio.create_task(self._run())
+
+    async def close(self):
+        self._closed = True
+        if self._ws is not None:
+            await self._ws.close()
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._fail_pending(PocketOptionNetworkError("Sessão PocketOption encerrada"))
+
+    async def wait_ready(self, timeout: float = CONNECT_TIMEOUT):
+        await self.start()
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            raise PocketOptionNetworkError("Timeout conectando/autenticando na PocketOption")
+        if self._auth_error is not None:
+            raise self._auth_error
+
+    async def _run(self):
+        backoff = 1
+        while not self._closed:
+            try:
+                await self._connect_and_auth()
+                backoff = 1
+                await self._read_loop()
+            except PocketOptionAuthError as e:
+                # SSID inválido: não adianta reconectar em loop
+                self._auth_error = e
+                self._ready.set()
+                self._fail_pending(e)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Sessão PocketOption caiu: {e}")
+            self._ready.clear()
+            self._fail_pending(PocketOptionNetworkError("Conexão PocketOption perdida"))
+            if self._closed:
+                break
+            logger.info(f"Reconectando à PocketOption em {backoff}s")
+            await asyncio.sleep(backoff)
+            backoff = min(MAX_BACKOFF, backoff * 2)
+
+    async def _connect_and_auth(self):
+        last_exception = None
+        for url in self.urls:
+            try:
+                self._ws = await websockets.connect(url, open_timeout=CONNECT_TIMEOUT, ping_interval=None)
+                self.current_url = url
+                break
+            except (OSError, asyncio.TimeoutError, websockets.WebSocketException) as e:
+                last_exception = e
+        else:
+            raise PocketOptionNetworkError(
+                f"Não foi possível conectar a nenhum servidor PocketOption. Último erro: {last_exception}"
+            )
+
+        init_msg = await asyncio.wait_for(self._ws.recv(), timeout=CONNECT_TIMEOUT)
+        if not str(init_msg).startswith('0'):
+            raise PocketOptionNetworkError("Resposta inicial inesperada do servidor")
+
+        auth_payload = json.dumps({
+            "session": self.ssid,
+            "isDemo": self.is_demo,
+            "platform": 2,
+            "isFastHistory": True,
+            "isOptimized": True
+        })
+        await self._ws.send(f'42["auth",{auth_payload}]')
+        deadline = time.monotonic() + CONNECT_TIMEOUT
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PocketOptionNetworkError("Timeout durante autenticação")
+            msg = await asyncio.wait_for(self._ws.recv(), timeout=remaining)
+            if isinstance(msg, bytes):
+                continue
+            if msg == "2":
+                await self._ws.send("3")
+                continue
+            if '"auth"' in msg:
+                if '"success":true' in msg or "authenticated" in msg:
+                    break
+                if '"success":false' in msg or "error" in msg:
+                    raise PocketOptionAuthError("Autenticação falhou: SSID inválido ou expirado")
+        self.stats["connects"] += 1
+        self._auth_error = None
+        self._ready.set()
+        logger.info(f"🔌 Sessão PocketOption autenticada ({self.current_url})")
+        # Assinaturas (ex.: changeSymbol do stream) precisam ser refeitas a cada reconexão
+        self._emit("connected", None)
+
+    async def _read_loop(self):
+        async for msg in self._ws:
+            if isinstance(msg, bytes):
+                # Payload binário de um evento anunciado por 451-["evento",{"_placeholder":true}]
+                event, self._binary_event = self._binary_event, None
+                if event:
+                    try:
+                        self._emit(event, json.loads(msg.decode("utf-8")))
+                    except ValueError:
+                        pass
+                continue
+            if msg == "2":  # ping do Engine.IO -> pong
+                await self._ws.send("3")
+                continue
+            if msg.startswith("451-"):
+                try:
+                    self._binary_event = json.loads(msg[4:])[0]
+                except (ValueError, IndexError):
+                    self._binary_event = None
+                continue
+            if msg.startswith("42"):
+                self._dispatch(msg)
+
+    # ---------- despacho ----------
+
+    def _dispatch(self, msg: str):
+        try:
+            event, payload = json.loads(msg[2:])[:2]
+        except (ValueError, TypeError):
+            return
+        if event == "get-candles":
+            self._resolve_candles(msg, payload)
+        else:
+            self._emit(event, payload)
+
+    def _resolve_candles(self, msg: str, payload):
+        key = None
+        if isinstance(payload, dict) and "asset" in payload and "period" in payload:
+            key = (str(payload["asset"]).lower(), int(payload["period"]))
+        if key is None or not self._pending.get(key):
+            # Resposta sem asset/period: atende o pedido mais antigo ainda em voo
+            while self._order and not self._pending.get(self._order[0]):
+                self._order.popleft()
+            if not self._order:
+                return
+            key = self._order[0]
+        try:
+            candles = parse_candles_message(msg)
+            error = None
+        except PocketOptionNetworkError as e:
+            candles, error = None, e
+        groups = self._pending[key]
+        # Dois pedidos do mesmo ativo/período com limites diferentes podem voltar fora de
+        # ordem: o tamanho da resposta desempata, senão vale o mais antigo
+        group = next((g for g in groups if candles is not None and g["limit"] == len(candles)), groups[0])
+        self._drop_group(key, group)
+        for future, limit in group["waiters"]:
+            if future.done():
+                continue
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(candles[-limit:])
+
+    def _drop_group(self, key: Tuple[str, int], group: Dict):
+        """Tira o pedido em voo de _pending/_order (respondido ou sem ninguém esperando)."""
+        groups = self._pending.get(key)
+        index = next((i for i, g in enumerate(groups or ()) if g is group), None)
+        if index is None:
+            return
+        del groups[index]
+        if not groups:
+            del self._pending[key]
+        try:
+            self._order.remove(key)
+        except ValueError:
+            pass
+
+    def _emit(self, event: str, payload):
+        for callback in list(self._listeners.get(event, [])):
+            try:
+                result = callback(payload)
+                if asyncio.iscoroutine(result):
+                    asyncio.ensure_future(result)
+            except Exception as e:
+                logger.warning(f"Listener de {event} falhou: {e}")
+
+    def _fail_pending(self, error: Exception):
+        pending, self._pending = self._pending, defaultdict(deque)
+        self._order.clear()
+        for groups in pending.values():
+            for group in groups:
+                for future, _ in group["waiters"]:
+                    if not future.done():
+                        future.set_exception(error)
+
+    # ---------- API ----------
+
+    def add_listener(self, event: str, callback: Callable):
+        """
+        Assina eventos do servidor recebidos nesta sessão (ex.: updateStream), além do
+        evento local "connected", disparado após cada autenticação.
+        """
+        self._listeners[event].append(callback)
+
+    def remove_listener(self, event: str, callback: Callable):
+        if callback in self._listeners.get(event, []):
+            self._listeners[event].remove(callback)
+
+    async def emit(self, event: str, payload):
+        await self.wait_ready()
+        await self._ws.send(f'42{json.dumps([event, payload])}')
+
+    async def get_candles(self, asset: str, period: int, limit: int,
+                          timeout: float = REQUEST_TIMEOUT) -> List[Dict]:
+        await self.wait_ready()
+        asset = asset.lower()
+        key = (asset, int(period))
+        future = asyncio.get_running_loop().create_future()
+        self.stats["requests"] += 1
+        group = next((g for g in self._pending[key] if g["limit"] >= limit), None)
+        if group is not None:
+            # Já existe um pedido em voo que cobre este: pega carona na mesma resposta
+            group["waiters"].append((future, limit))
+            self.stats["shared"] += 1
+        else:
+            group = {"limit": limit, "waiters": [(future, limit)]}
+            self._pending[key].append(group)
+            self._order.append(key)
+            req_payload = json.dumps({
+                "asset": asset,
+                "period": int(period),
+                "limit": limit,
+                "end": int(time.time())
+            })
+            await self._ws.send(f'42["get-candles",{req_payload}]')
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            group["waiters"] = [w for w in group["waiters"] if w[0] is not future]
+            if not group["waiters"]:
+                # Sem ninguém esperando, o grupo não pode continuar aceitando caronas para
+                # uma resposta que talvez nunca venha: o próximo pedido envia um novo
+                self._drop_group(key, group)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            raise PocketOptionNetworkError("Timeout ao aguardar candles")
+
+_sessions: Dict[int, PocketOptionSession] = {}
+_bg_loop: Optional[asyncio.AbstractEventLoop] = None
+_bg_guard = threading.Lock()
+
+
+def get_session() -> PocketOptionSession:
+    """Sessão do event loop corrente (uma por loop)."""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(id(loop))
+    if session is None:
+        session = PocketOptionSession()
+        _sessions[id(loop)] = session
+    return session
+
+
+async def close_session():
+    """Fecha a sessão do loop corrente (no cleanup do servidor)."""
+    session = _sessions.pop(id(asyncio.get_running_loop()), None)
+    if session is not None:
+        await session.close()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    global _bg_loop
+    with _bg_guard:
+        if _bg_loop is None:
+            _bg_loop = asyncio.new_event_loop()
+            threading.Thread(target=_bg_loop.run_forever, name="pocketoption-session", daemon=True).start()
+        return _bg_loop
+
+
+def fetch_candles_blocking(asset: str, period: int, limit: int, timeout: float = REQUEST_TIMEOUT) -> List[Dict]:
+    """Para código síncrono: usa a sessão persistente rodando num loop em background."""
+    async def _call():
+        return await get_session().get_candles(asset, period, limit, timeout=timeout)
+    future = asyncio.run_coroutine_threadsafe(_call(), _background_loop())
+    return future.result(timeout=timeout + CONNECT_TIMEOUT + 1)
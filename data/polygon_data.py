@@ -1,11 +1,16 @@
 import os
 import time
 import logging
+import asyncio
+import aiohttp
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Union
 import requests
 from requests.exceptions import RequestException
 
+from data.http_session import get_http_session
+from data.rate_governor import get_limiter, RateLimitExceeded
+
 class PolygonClient:
     def __init__(self):
         self.api_key = os.getenv("POLYGON_API_KEY")
@@ -20,17 +25,13 @@ class PolygonClient:
         })
         self.logger = logging.getLogger(__name__)
         self.rate_limit_remaining = 5  # Inicializa contador de rate limit
+        self.limiter = get_limiter("Polygon", self.api_key)
 
     def _handle_rate_limit(self, response: requests.Response) -> bool:
         """Monitora e gerencia limites de requisição"""
         self.rate_limit_remaining = int(response.headers.get('x-ratelimit-remaining', 5))
-        
-        if response.status_code == 429:
-            reset_time = int(response.headers.get('x-ratelimit-reset', 60))
-            self.logger.warning(f"Rate limit excedido. Reset em {reset_time}s")
-            time.sleep(reset_time + 1)
-            return True
-        return False
+        # Em 429 o governador pausa o provedor até o reset para todas as threads
+        return self.limiter.observe(response.headers, response.status_code)
 
     def _normalize_symbol(self, symbol: str) -> Optional[str]:
         """Normaliza símbolos para formato Polygon"""
@@ -115,8 +116,7 @@ class PolygonClient:
 
             for attempt in range(1, retries + 1):
                 try:
-                    if self.rate_limit_remaining <= 1:
-                        time.sleep(1)  # Prevenção de rate limit
+                    self.limiter.acquire()  # Prevenção de rate limit (cota compartilhada)
 
                     response = self.session.get(
                         endpoint,
@@ -155,6 +155,9 @@ class PolygonClient:
                         "interval": f"{multiplier}{timespan[0]}"
                     }
 
+                except RateLimitExceeded as e:
+                    self.logger.warning(str(e))
+                    return None
                 except RequestException as e:
                     self.logger.warning(f"Tentativa {attempt}/{retries} - Erro de rede: {e}")
                     time.sleep(2)
@@ -172,7 +175,161 @@ class PolygonClient:
             self.logger.critical(f"Erro crítico: {e}", exc_info=True)
             return None
 
+    def fetch_many(
+        self,
+        symbols: List[str],
+        interval: Union[int, str] = "1440",
+        limit: int = 200,
+        retries: int = 3
+    ) -> Dict[str, Dict]:
+        """
+        Lote do diário pelo caminho mais barato em requisições:
+          - agregados agrupados (/v2/aggs/grouped/.../fx/{data}): uma requisição por
+            dia traz o candle de todos os pares -- vale quando há mais pares que dias;
+          - senão, um único range (/v2/aggs/ticker/{par}/range/1/day/...) por par
+            cobre a janela inteira, em vez de uma requisição por dia.
+        Fora do diário devolve {} e cada símbolo segue pelo fetch_candles.
+        """
+        wanted = {}
+        for symbol in symbols:
+            formatted = self._normalize_symbol(symbol)
+            if formatted and formatted.startswith("C:"):
+                wanted[formatted] = symbol
+        if str(interval) != "1440" or not wanted:
+            return {}
+        if limit + 1 >= len(wanted):
+            results = {}
+            for ticker, symbol in wanted.items():
+                result = self.fetch_candles(ticker, limit=limit, retries=retries, timespan="day")
+                if result and result.get("history"):
+                    results[symbol] = result
+            return results
+
+        series: Dict[str, List[Dict]] = {}
+        today = datetime.utcnow().date()
+        out_of_quota = False
+        for offset in range(limit, -1, -1):
+            if out_of_quota:
+                break
+            day = today - timedelta(days=offset)
+            endpoint = f"{self.base_url}/v2/aggs/grouped/locale/global/market/fx/{day:%Y-%m-%d}"
+            for attempt in range(1, retries + 1):
+                try:
+                    self.limiter.acquire()
+                    response = self.session.get(endpoint, params={"adjusted": "true"}, timeout=15)
+                    if self._handle_rate_limit(response):
+                        continue
+                    if response.status_code != 200:
+                        self.logger.warning(f"Tentativa {attempt}/{retries} - Status {response.status_code}")
+                        time.sleep(1.5 ** attempt)
+                        continue
+                    for item in response.json().get("results") or []:
+                        if item.get("T") in wanted:
+                            series.setdefault(item["T"], []).append({
+                                "timestamp": item["t"] // 1000,
+                                "open": item["o"],
+                                "high": item["h"],
+                                "low": item["l"],
+                                "close": item["c"],
+                                "volume": item["v"],
+                                "transactions": item.get("n", 0)
+                            })
+                    break
+                except RateLimitExceeded as e:
+                    self.logger.warning(str(e))
+                    out_of_quota = True
+                    break
+                except RequestException as e:
+                    self.logger.warning(f"Tentativa {attempt}/{retries} - Erro de rede: {e}")
+                    time.sleep(2)
+
+        return {
+            wanted[ticker]: {
+                "history": candles[-limit:],
+                "close": candles[-1]["close"],
+                "symbol": ticker,
+                "interval": "1d"
+            }
+            for ticker, candles in series.items() if candles
+        }
+
     def __del__(self):
         """Garante que a sessão seja fechada"""
         self.session.close()
         
+
+
+class AsyncPolygonClient(PolygonClient):
+    """Versão asyncio (aiohttp, conector compartilhado) com o mesmo formato de retorno."""
+
+    async def fetch_candles(
+        self,
+        symbol: str,
+        interval: Union[int, str] = "1",
+        limit: int = 200,
+        retries: int = 3,
+        multiplier: int = 1,
+        timespan: str = "minute"
+    ) -> Optional[Dict[str, Union[List[Dict], float]]]:
+        limit = min(max(1, limit), 50000)
+        formatted_symbol = self._normalize_symbol(symbol)
+        if not formatted_symbol:
+            return None
+
+        units = {"minute": "minutes", "hour": "hours", "day": "days"}
+        if timespan not in units:
+            self.logger.error(f"Timespan inválido: {timespan}")
+            return None
+        end_dt = datetime.utcnow()
+        start_dt = end_dt - timedelta(**{units[timespan]: limit * multiplier})
+
+        endpoint = f"{self.base_url}/v2/aggs/ticker/{formatted_symbol}/range/{multiplier}/{timespan}/{start_dt:%Y-%m-%d}/{end_dt:%Y-%m-%d}"
+        params = {"adjusted": "true", "sort": "asc", "limit": limit}
+        self.logger.info(f"Buscando candles (async): {formatted_symbol} {multiplier}{timespan[0]} (limit={limit})")
+
+        session = await get_http_session()
+        for attempt in range(1, retries + 1):
+            try:
+                await self.limiter.acquire_async()  # Prevenção de rate limit (cota compartilhada)
+
+                async with session.get(endpoint, params=params, headers=dict(self.session.headers),
+                                       timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    self.rate_limit_remaining = int(response.headers.get('x-ratelimit-remaining', 5))
+                    if self.limiter.observe(response.headers, response.status):
+                        continue
+                    if response.status != 200:
+                        self.logger.warning(f"Tentativa {attempt}/{retries} - Status {response.status}")
+                        await asyncio.sleep(1.5 ** attempt)
+                        continue
+                    data = await response.json(content_type=None)
+
+                if not data.get("results"):
+                    self.logger.warning(f"Dados vazios para {formatted_symbol}")
+                    return None
+                candles = [{
+                    "timestamp": item["t"] // 1000,
+                    "open": item["o"],
+                    "high": item["h"],
+                    "low": item["l"],
+                    "close": item["c"],
+                    "volume": item["v"],
+                    "transactions": item.get("n", 0)
+                } for item in data["results"]]
+                return {
+                    "history": candles,
+                    "close": candles[-1]["close"],
+                    "symbol": formatted_symbol,
+                    "interval": f"{multiplier}{timespan[0]}"
+                }
+            except RateLimitExceeded as e:
+                self.logger.warning(str(e))
+                return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.logger.warning(f"Tentativa {attempt}/{retries} - Erro de rede: {e}")
+                await asyncio.sleep(2)
+            except KeyError as e:
+                self.logger.error(f"Campo faltando na resposta: {e}")
+                await asyncio.sleep(1)
+
+        self.logger.error(f"Falha após {retries} tentativas")
+        return None
@@ -0,0 +1,218 @@
+# data/provider_health.py
+# Placar de saúde dos provedores por (provedor, classe do símbolo, timeframe):
+# taxa de sucesso (EWMA), latência (EWMA), último erro e circuit breaker
+# (fechado -> aberto após falhas consecutivas -> meio-aberto com uma sonda).
+# A ordem de tentativa passa a ser por custo esperado = latência / P(sucesso).
+# O estado é persistido em JSON para sobreviver a reinícios.
+
+import os
+import json
+import time
+import threading
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PATH = os.path.join("data", "provider_health.json")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+EWMA_ALPHA = 0.2
+FAILURE_THRESHOLD = 5       # falhas consecutivas para abrir o circuito
+BASE_COOLDOWN = 60          # segundos em aberto antes da sonda
+MAX_COOLDOWN = 1800
+MIN_SUCCESS_PROB = 0.05
+MIN_LATENCY = 0.05          # falhas instantâneas não podem parecer "grátis"
+SAVE_EVERY = 20             # grava o JSON a cada N registros (e no close)
+
+
+def symbol_class(symbol: str) -> str:
+    return "otc" if "otc" in symbol.lower() else "fx"
+
+
+def _key(provider: str, symbol: str, timeframe: str) -> str:
+    return f"{provider}|{symbol_class(symbol)}|{timeframe.lower()}"
+
+
+def _new_entry() -> Dict:
+    return {
+        "attempts": 0,
+        "successes": 0,
+        "failures": 0,
+        "consecutive_failures": 0,
+        "success_rate": 1.0,
+        "latency": None,
+        "last_error": None,
+        "last_error_at": None,
+        "last_success_at": None,
+        "state": CLOSED,
+        "opened_at": None,
+        "cooldown": BASE_COOLDOWN,
+        "probe_in_flight": False,
+    }
+
+
+class ProviderScoreboard:
+    def __init__(self, path: str = HEALTH_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self._entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                entries = json.load(f)
+            for entry in entries.values():
+                entry["probe_in_flight"] = False
+            return entries
+        except Exception as e:
+            logger.warning(f"Placar de provedores inválido, recomeçando: {e}")
+            return {}
+
+    def save(self):
+        with self._lock:
+            payload = json.dumps(self._entries, indent=1)
+            self._dirty = 0
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(payload)
+        os.replace(tmp, self.path)
+
+    def _entry(self, key: str) -> Dict:
+        if key not in self._entries:
+            self._entries[key] = _new_entry()
+        return self._entries[key]
+
+    # ---------- circuit breaker ----------
+
+    def allow(self, provider: str, symbol: str, timeframe: str) -> bool:
+        """False se o circuito está aberto; no meio-aberto libera uma única sonda."""
+        with self._lock:
+            entry = self._entry(_key(provider, symbol, timeframe))
+            if entry["state"] == CLOSED:
+                return True
+            if entry["state"] == OPEN and time.time() - entry["opened_at"] >= entry["cooldown"]:
+                entry["state"] = HALF_OPEN
+            if entry["state"] == HALF_OPEN and not entry["probe_in_flight"]:
+                entry["probe_in_flight"] = True
+                return True
+            return False
+
+    def available(self, provider: str, symbol: str, timeframe: str) -> bool:
+        """Como allow(), mas sem reservar a sonda do meio-aberto (só para ordenar)."""
+        with self._lock:
+            entry = self._entries.get(_key(provider, symbol, timeframe))
+            if not entry or entry["state"] == CLOSED:
+                return True
+            if entry["state"] == OPEN:
+                return time.time() - entry["opened_at"] >= entry["cooldown"]
+            return not entry["probe_in_flight"]
+
+    def record_cancelled(self, provider: str, symbol: str, timeframe: str, elapsed: float):
+        """
+        Tentativa cancelada (perdeu o hedge): não conta como sucesso nem falha, mas
+        `elapsed` é um limite inferior da latência e entra na EWMA se for maior que ela.
+        Também libera a sonda do meio-aberto, se reservada.
+        """
+        with self._lock:
+            entry = self._entry(_key(provider, symbol, timeframe))
+            entry["probe_in_flight"] = False
+            prev = entry["latency"]
+            if prev is None:
+                entry["latency"] = elapsed
+            elif elapsed > prev:
+                entry["latency"] = (1 - EWMA_ALPHA) * prev + EWMA_ALPHA * elapsed
+
+    def record(self, provider: str, symbol: str, timeframe: str, success: bool,
+               latency: Optional[float] = None, error: Optional[str] = None):
+        save = False
+        with self._lock:
+            entry = self._entry(_key(provider, symbol, timeframe))
+            entry["attempts"] += 1
+            entry["probe_in_flight"] = False
+            entry["success_rate"] = (1 - EWMA_ALPHA) * entry["success_rate"] + EWMA_ALPHA * (1.0 if success else 0.0)
+            if latency is not None:
+                prev = entry["latency"]
+                entry["latency"] = latency if prev is None else (1 - EWMA_ALPHA) * prev + EWMA_ALPHA * latency
+            now = time.time()
+            if success:
+                entry["successes"] += 1
+                entry["consecutive_failures"] = 0
+                entry["last_success_at"] = now
+                if entry["state"] != CLOSED:
+                    logger.info(f"🟢 Circuito fechado: {provider} ({symbol_class(symbol)}, {timeframe})")
+                entry["state"] = CLOSED
+                entry["cooldown"] = BASE_COOLDOWN
+            else:
+                entry["failures"] += 1
+                entry["consecutive_failures"] += 1
+                entry["last_error"] = (error or "sem dados")[:300]
+                entry["last_error_at"] = now
+                if entry["state"] == HALF_OPEN:
+                    # Sonda falhou: reabre com cooldown dobrado
+                    entry["cooldown"] = min(MAX_COOLDOWN, entry["cooldown"] * 2)
+                    entry["state"] = OPEN
+                    entry["opened_at"] = now
+                elif entry["state"] == CLOSED and entry["consecutive_failures"] >= FAILURE_THRESHOLD:
+                    entry["state"] = OPEN
+                    entry["opened_at"] = now
+                    logger.warning(
+                        f"🔴 Circuito aberto: {provider} ({symbol_class(symbol)}, {timeframe}) "
+                        f"após {entry['consecutive_failures']} falhas: {entry['last_error']}"
+                    )
+            self._dirty += 1
+            save = self._dirty >= SAVE_EVERY
+        if save:
+            try:
+                self.save()
+            except Exception as e:
+                logger.warning(f"Falha ao gravar placar de provedores: {e}")
+
+    # ---------- ordenação ----------
+
+    def expected_cost(self, provider: str, symbol: str, timeframe: str) -> float:
+        """Latência esperada até um sucesso (latência / P(sucesso)). 0 = ainda sem amostras."""
+        with self._lock:
+            entry = self._entries.get(_key(provider, symbol, timeframe))
+            if not entry or entry["latency"] is None:
+                return 0.0
+            return max(entry["latency"], MIN_LATENCY) / max(entry["success_rate"], MIN_SUCCESS_PROB)
+
+    def order(self, candidates: Iterable[Tuple[str, object]], symbol: str, timeframe: str) -> List[Tuple[str, object]]:
+        """
+        Ordena (nome, payload) por custo esperado e remove os de circuito aberto.
+        Provedores sem amostras mantêm a posição original na frente (exploração).
+        Quem for de fato tentar o provedor deve chamar allow() antes.
+        """
+        allowed = [c for c in candidates if self.available(c[0], symbol, timeframe)]
+        return sorted(allowed, key=lambda c: self.expected_cost(c[0], symbol, timeframe))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """Estado atual para métricas (/health/providers)."""
+        with self._lock:
+            out = {}
+            for key, entry in self._entries.items():
+                provider, sclass, tf = key.split("|")
+                item = {k: v for k, v in entry.items() if k != "probe_in_flight"}
+                item.update({"provider": provider, "symbol_class": sclass, "timeframe": tf})
+                out[key] = item
+            return out
+
+
+_default_scoreboard: Optional[ProviderScoreboard] = None
+_default_guard = threading.Lock()
+
+
+def get_scoreboard() -> ProviderScoreboard:
+    global _default_scoreboard
+    with _default_guard:
+        if _default_scoreboard is None:
+            _default_scoreboard = ProviderScoreboard()
+        return _default_scoreboard
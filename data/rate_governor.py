@@ -0,0 +1,280 @@
+# data/rate_governor.py
+# Governador de rate limit compartilhado pelo processo: um conjunto de token buckets
+# por (provedor, chave de API), configurado pelos limites documentados de cada plano
+# (CONFIG["rate_limits"]) e corrigido pelos cabeçalhos das respostas. Em vez de cada
+# thread dormir retry_after ao tomar 429, o provedor inteiro fica pausado e todas as
+# requisições esperam aqui.
+#
+# Classes de prioridade: INTERACTIVE (bot) > SCHEDULED (ciclo do autotrainer) >
+# BACKFILL (bootstrap/backfill). As classes mais baixas só consomem tokens acima de
+# uma reserva e cedem a vez quando há alguém de prioridade maior esperando.
+# A prioridade vem de um contextvar, então quem chama define o contexto e os
+# provedores não precisam de parâmetro novo:
+#
+#   with fetch_priority(BACKFILL):
+#       data_client.fetch_candles(...)
+
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from config import CONFIG
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE = 0
+SCHEDULED = 1
+BACKFILL = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", SCHEDULED: "scheduled", BACKFILL: "backfill"}
+
+REMAINING_HEADERS = ("x-ratelimit-remaining", "api-credits-left", "ratelimit-remaining")
+LIMIT_HEADERS = ("x-ratelimit-limit", "ratelimit-limit")
+RESET_HEADERS = ("retry-after", "x-ratelimit-reset", "ratelimit-reset")
+# Janela a que remaining/limit se referem: cabeçalho próprio ou "w=" da política IETF
+# (ex.: RateLimit-Policy: 100;w=60). Sem ela, vale a janela mais curta
+WINDOW_HEADERS = ("x-ratelimit-window", "ratelimit-window")
+POLICY_HEADERS = ("ratelimit-policy", "x-ratelimit-policy")
+DEFAULT_PENALTY = 60
+MAX_POLL = 1.0
+
+_priority: ContextVar[int] = ContextVar("fetch_priority", default=INTERACTIVE)
+
+
+class RateLimitExceeded(Exception):
+    """A espera pela cota passaria do máximo aceito para a prioridade atual."""
+    pass
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+@contextmanager
+def fetch_priority(level: int):
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def _header_number(headers: Mapping[str, str], names: Tuple[str, ...]) -> Optional[float]:
+    for name in names:
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            # "100, 100;w=60" (lista de políticas): o primeiro número é o da resposta
+            return float(str(value).split(",")[0].split(";")[0])
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _header_window(headers: Mapping[str, str]) -> Optional[float]:
+    window = _header_number(headers, WINDOW_HEADERS)
+    if window is not None:
+        return window
+    for name in POLICY_HEADERS + LIMIT_HEADERS:
+        for param in str(headers.get(name, "")).split(",")[0].split(";")[1:]:
+            key, _, value = param.strip().partition("=")
+            if key == "w":
+                try:
+                    return float(value)
+                except ValueError:
+                    pass
+    return None
+
+
+class ProviderLimiter:
+    """Token buckets de um provedor/chave (ex.: 8/min e 800/dia valem ao mesmo tempo)."""
+
+    def __init__(self, name: str, limits: List[List[float]], reserves: Dict[int, float]):
+        now = time.monotonic()
+        self.name = name
+        # [capacidade, janela (s), tokens, última recarga]
+        self.buckets = [[float(cap), float(period), float(cap), now] for cap, period in limits]
+        self.reserves = reserves
+        self.paused_until = 0.0
+        self.waiting = {INTERACTIVE: 0, SCHEDULED: 0, BACKFILL: 0}
+        self.stats = {"granted": 0, "waited": 0.0, "throttled": 0, "rejected": 0}
+        self._cond = threading.Condition(threading.Lock())
+
+    def _refill(self, now: float):
+        for bucket in self.buckets:
+            cap, period, tokens, updated = bucket
+            bucket[2] = min(cap, tokens + (now - updated) * cap / period)
+            bucket[3] = now
+
+    def _try_take(self, prio: int, now: float, cost: float = 1.0) -> float:
+        """0 se conseguiu os tokens; senão quantos segundos esperar antes de tentar de novo."""
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if any(self.waiting[p] for p in range(prio)):
+            return 0.05  # alguém mais prioritário na fila: cede a vez
+        wait = 0.0
+        for cap, period, tokens, _ in self.buckets:
+            need = cost + self.reserves.get(prio, 0.0) * cap
+            if tokens < need:
+                wait = max(wait, (need - tokens) * period / cap)
+        if wait > 0:
+            return wait
+        for bucket in self.buckets:
+            bucket[2] -= cost
+        self.stats["granted"] += 1
+        return 0.0
+
+    def _max_wait(self, prio: int) -> float:
+        cfg = CONFIG.get("rate_limits", {}).get("max_wait", {})
+        return float(cfg.get(PRIORITY_NAMES[prio], 60))
+
+    def max_cost(self, priority: Optional[int] = None) -> int:
+        """
+        Maior custo que uma requisição pode ter (ex.: créditos de um lote de símbolos)
+        sem esperar para sempre: a capacidade menos a reserva da prioridade.
+        """
+        prio = current_priority() if priority is None else priority
+        reserve = self.reserves.get(prio, 0.0)
+        return max(1, int(min((cap * (1 - reserve) for cap, _, _, _ in self.buckets), default=1)))
+
+    def acquire(self, priority: Optional[int] = None, max_wait: Optional[float] = None, cost: float = 1.0):
+        """
+        Bloqueia (thread) até haver `cost` tokens para `priority`; RateLimitExceeded se
+        passar de max_wait. cost > 1 para lotes cobrados por símbolo.
+        """
+        prio = current_priority() if priority is None else priority
+        max_wait = self._max_wait(prio) if max_wait is None else max_wait
+        start = time.monotonic()
+        with self._cond:
+            self.waiting[prio] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._try_take(prio, now, cost)
+                    if wait <= 0:
+                        self.stats["waited"] += now - start
+                        return
+                    if now - start + wait > max_wait:
+                        self.stats["rejected"] += 1
+                        raise RateLimitExceeded(
+                            f"{self.name}: sem cota para {PRIORITY_NAMES[prio]} nos próximos {max_wait:.0f}s"
+                        )
+                    self._cond.wait(min(wait, MAX_POLL))
+            finally:
+                self.waiting[prio] -= 1
+                self._cond.notify_all()
+
+    async def acquire_async(self, priority: Optional[int] = None, max_wait: Optional[float] = None,
+                            cost: float = 1.0):
+        """Como acquire(), mas espera com asyncio.sleep (não trava o event loop)."""
+        prio = current_priority() if priority is None else priority
+        max_wait = self._max_wait(prio) if max_wait is None else max_wait
+        start = time.monotonic()
+        with self._cond:
+            self.waiting[prio] += 1
+        try:
+            while True:
+                with self._cond:
+                    now = time.monotonic()
+                    wait = self._try_take(prio, now, cost)
+                if wait <= 0:
+                    self.stats["waited"] += now - start
+                    return
+                if now - start + wait > max_wait:
+                    self.stats["rejected"] += 1
+                    raise RateLimitExceeded(
+                        f"{self.name}: sem cota para {PRIORITY_NAMES[prio]} nos próximos {max_wait:.0f}s"
+                    )
+                await asyncio.sleep(min(wait, MAX_POLL))
+        finally:
+            with self._cond:
+                self.waiting[prio] -= 1
+                self._cond.notify_all()
+
+    def _header_bucket(self, window: Optional[float]) -> Optional[list]:
+        """Bucket da janela informada pelo provedor; sem janela, o de janela mais curta."""
+        if not self.buckets:
+            return None
+        if window is not None:
+            for bucket in self.buckets:
+                if abs(bucket[1] - window) < 1e-6:
+                    return bucket
+        return min(self.buckets, key=lambda b: b[1])
+
+    def observe(self, headers: Mapping[str, str], status: int) -> bool:
+        """
+        Ajusta os buckets pelos cabeçalhos da resposta. Devolve True se foi 429
+        (o provedor fica pausado até o reset e a requisição deve ser refeita).
+        """
+        lowered = {k.lower(): v for k, v in headers.items()}
+        now = time.monotonic()
+        with self._cond:
+            self._refill(now)
+            # remaining/limit valem para uma janela só: corrigir os outros buckets com
+            # eles zeraria a cota diária pelo restante do minuto
+            bucket = self._header_bucket(_header_window(lowered))
+            limit = _header_number(lowered, LIMIT_HEADERS)
+            if limit and bucket is not None and int(limit) != int(bucket[0]):
+                # O plano real difere do configurado: aprende a capacidade dessa janela
+                logger.info(f"{self.name}: limite aprendido dos cabeçalhos = {int(limit)}/{bucket[1]:.0f}s")
+                bucket[2] = min(bucket[2], limit)
+                bucket[0] = float(limit)
+            remaining = _header_number(lowered, REMAINING_HEADERS)
+            if remaining is not None and bucket is not None:
+                bucket[2] = min(bucket[2], remaining)
+            if status != 429:
+                return False
+            reset = _header_number(lowered, RESET_HEADERS) or DEFAULT_PENALTY
+            if reset > 1e9:  # epoch em vez de segundos
+                reset = max(1.0, reset - time.time())
+            self.paused_until = max(self.paused_until, now + reset)
+            for bucket in self.buckets:
+                bucket[2] = 0.0
+            self.stats["throttled"] += 1
+            self._cond.notify_all()
+        logger.warning(f"{self.name}: rate limit (429), pausado por {reset:.0f}s")
+        return True
+
+    def snapshot(self) -> Dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            return {
+                "buckets": [{"capacity": c, "window": p, "tokens": round(t, 2)} for c, p, t, _ in self.buckets],
+                "paused_for": max(0.0, round(self.paused_until - time.monotonic(), 1)),
+                "waiting": {PRIORITY_NAMES[p]: n for p, n in self.waiting.items()},
+                **self.stats,
+            }
+
+
+_limiters: Dict[Tuple[str, str], ProviderLimiter] = {}
+_guard = threading.Lock()
+
+
+def get_limiter(provider: str, api_key: Optional[str] = None) -> ProviderLimiter:
+    """Limiter único no processo para (provedor, chave); a chave nunca aparece em logs."""
+    key_id = hashlib.sha1((api_key or "").encode()).hexdigest()[:10]
+    with _guard:
+        limiter = _limiters.get((provider, key_id))
+        if limiter is None:
+            cfg = CONFIG.get("rate_limits", {})
+            limits = cfg.get("providers", {}).get(provider, [[60, 60]])
+            reserves = {
+                INTERACTIVE: 0.0,
+                SCHEDULED: cfg.get("reserves", {}).get("scheduled", 0.25),
+                BACKFILL: cfg.get("reserves", {}).get("backfill", 0.5),
+            }
+            limiter = ProviderLimiter(f"{provider}[{key_id}]", limits, reserves)
+            _limiters[(provider, key_id)] = limiter
+        return limiter
+
+
+def governor_snapshot() -> Dict[str, Dict]:
+    with _guard:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.snapshot() for limiter in limiters}
@@ -4,8 +4,15 @@ import requests
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import logging
+import asyncio
+import aiohttp
 from requests.exceptions import RequestException
 
+from data.http_session import get_http_session
+from data.rate_governor import get_limiter, RateLimitExceeded
+
+MAX_BATCH_TICKERS = 50  # pares por requisição de lote (a URL fica curta o bastante)
+
 class TiingoClient:
     def __init__(self):
         self.api_key = os.getenv("TIINGO_API_KEY")
@@ -20,6 +27,7 @@ class TiingoClient:
         })
         self.logger = logging.getLogger(__name__)
         self.rate_limit_remaining = 500  # Valor inicial padrão
+        self.limiter = get_limiter("Tiingo", self.api_key)
 
     def _validate_symbol(self, symbol: str) -> Optional[str]:
         """Valida e formata o símbolo para a API Tiingo"""
@@ -51,12 +59,13 @@ class TiingoClient:
             "end": end_date.isoformat(timespec='seconds') + 'Z'
         }
 
-    def _handle_rate_limit(self, headers: Dict) -> None:
-        """Atualiza e monitora o rate limit"""
+    def _handle_rate_limit(self, headers: Dict, status: int = 200) -> bool:
+        """Atualiza e monitora o rate limit; True em 429 (provedor pausado no governador)"""
         self.rate_limit_remaining = int(headers.get('X-RateLimit-Remaining', 500))
         
         if self.rate_limit_remaining < 50:
             self.logger.warning(f"Rate limit baixo: {self.rate_limit_remaining} requisições restantes")
+        return self.limiter.observe(headers, status)
 
     def _parse_candle_data(self, data: List[Dict], limit: int) -> Optional[Dict]:
         """Processa e valida os dados dos candles"""
@@ -139,11 +148,8 @@ class TiingoClient:
 
         for attempt in range(1, retries + 1):
             try:
-                # Verificação de rate limit
-                if self.rate_limit_remaining < 10:
-                    wait_time = 60
-                    self.logger.warning(f"Aguardando {wait_time}s por rate limit")
-                    time.sleep(wait_time)
+                # Cota compartilhada pelo processo (espera conforme a prioridade do chamador)
+                self.limiter.acquire()
                 
                 response = self.session.get(
                     f"{self.base_url}/prices",
@@ -151,12 +157,7 @@ class TiingoClient:
                     timeout=10
                 )
                 
-                self._handle_rate_limit(response.headers)
-                
-                if response.status_code == 429:
-                    retry_after = int(response.headers.get('Retry-After', 60))
-                    self.logger.warning(f"Rate limit excedido. Retry após {retry_after}s")
-                    time.sleep(retry_after)
+                if self._handle_rate_limit(response.headers, response.status_code):
                     continue
                     
                 if response.status_code != 200:
@@ -173,6 +174,9 @@ class TiingoClient:
                     
                 time.sleep(retry_delay)
                 
+            except RateLimitExceeded as e:
+                self.logger.warning(str(e))
+                return None
             except RequestException as e:
                 self.logger.warning(f"Tentativa {attempt}/{retries} - Erro de rede: {str(e)}")
                 time.sleep(retry_delay)
@@ -183,5 +187,133 @@ class TiingoClient:
         self.logger.error(f"Falha após {retries} tentativas")
         return None
 
+    def fetch_many(
+        self,
+        symbols: List[str],
+        interval: str = "1min",
+        limit: int = 200,
+        retries: int = 3,
+        retry_delay: float = 1.0
+    ) -> Dict[str, Dict]:
+        """
+        Vários pares numa requisição (`tickers=eurusd,gbpusd` no /fx/prices).
+        As linhas vêm misturadas com o campo "ticker" e são separadas por par.
+
+        Returns:
+            Dict símbolo pedido -> resultado no formato de fetch_candles, só com
+            os pares que vieram válidos
+        """
+        formatted = {}
+        for symbol in symbols:
+            ticker = self._validate_symbol(symbol)
+            if ticker:
+                formatted[ticker] = symbol
+        if not formatted:
+            return {}
+
+        limit = max(1, min(limit, 5000))
+        date_range = self._calculate_date_range(interval, limit)
+        tickers = list(formatted)
+        results: Dict[str, Dict] = {}
+
+        for start in range(0, len(tickers), MAX_BATCH_TICKERS):
+            batch = tickers[start:start + MAX_BATCH_TICKERS]
+            params = {
+                "tickers": ",".join(batch),
+                "startDate": date_range["start"],
+                "endDate": date_range["end"],
+                "resampleFreq": interval,
+                "format": "json",
+                "token": self.api_key
+            }
+            self.logger.info(f"Buscando candles em lote: {len(batch)} pares {interval} (limit={limit})")
+            for attempt in range(1, retries + 1):
+                try:
+                    self.limiter.acquire()
+                    response = self.session.get(f"{self.base_url}/prices", params=params, timeout=30)
+                    if self._handle_rate_limit(response.headers, response.status_code):
+                        continue
+                    if response.status_code != 200:
+                        self.logger.warning(f"Tentativa {attempt}/{retries} - Status {response.status_code}")
+                        time.sleep(retry_delay)
+                        continue
+                    data = response.json()
+                except RateLimitExceeded as e:
+                    self.logger.warning(str(e))
+                    return results
+                except RequestException as e:
+                    self.logger.warning(f"Tentativa {attempt}/{retries} - Erro de rede: {str(e)}")
+                    time.sleep(retry_delay)
+                    continue
+                rows: Dict[str, List[Dict]] = {}
+                for item in data if isinstance(data, list) else []:
+                    rows.setdefault(str(item.get("ticker", "")).lower(), []).append(item)
+                for ticker, items in rows.items():
+                    if ticker not in formatted:
+                        continue
+                    result = self._parse_candle_data(items, limit)
+                    if result:
+                        results[formatted[ticker]] = result
+                break
+        return results
+
     def __del__(self):
         self.session.close()
+
+
+class AsyncTiingoClient(TiingoClient):
+    """Versão asyncio (aiohttp, conector compartilhado) com o mesmo formato de retorno."""
+
+    async def fetch_candles(
+        self,
+        symbol: str,
+        interval: str = "1min",
+        limit: int = 200,
+        retries: int = 3,
+        retry_delay: float = 1.0
+    ) -> Optional[Dict[str, List[Dict]]]:
+        formatted_symbol = self._validate_symbol(symbol)
+        if not formatted_symbol:
+            return None
+
+        limit = max(1, min(limit, 5000))
+        date_range = self._calculate_date_range(interval, limit)
+        params = {
+            "tickers": formatted_symbol,
+            "startDate": date_range["start"],
+            "endDate": date_range["end"],
+            "resampleFreq": interval,
+            "format": "json",
+            "token": self.api_key
+        }
+        self.logger.info(f"Buscando candles (async): {formatted_symbol} {interval} (limit={limit})")
+
+        session = await get_http_session()
+        for attempt in range(1, retries + 1):
+            try:
+                await self.limiter.acquire_async()
+                async with session.get(f"{self.base_url}/prices", params=params,
+                                       headers=dict(self.session.headers),
+                                       timeout=aiohttp.ClientTimeout(total=10)) as response:
+                    if self._handle_rate_limit(response.headers, response.status):
+                        continue
+                    if response.status != 200:
+                        self.logger.warning(f"Tentativa {attempt}/{retries} - Status {response.status}")
+                        await asyncio.sleep(retry_delay)
+                        continue
+                    data = await response.json(content_type=None)
+
+                result = self._parse_candle_data(data, limit)
+                if result:
+                    self.logger.info(f"Sucesso: {result['count']} candles recebidos")
+                    return result
+                await asyncio.sleep(retry_delay)
+            except RateLimitExceeded as e:
+                self.logger.warning(str(e))
+                return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.logger.warning(f"Tentativa {attempt}/{retries} - Erro de rede: {str(e)}")
+                await asyncio.sleep(retry_delay)
+
+        self.logger.error(f"Falha após {retries} tentativas")
+        return None
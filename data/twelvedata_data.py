@@ -4,8 +4,15 @@ import time
 from datetime import datetime
 from typing import Dict, List, Optional
 import logging
+import asyncio
+import aiohttp
 from requests.exceptions import RequestException
 
+from data.http_session import get_http_session
+from data.rate_governor import get_limiter, RateLimitExceeded
+
+MAX_BATCH_SYMBOLS = 120  # máximo de símbolos por requisição de lote
+
 class TwelveDataClient:
     def __init__(self):
         self.api_key = os.getenv("TWELVEDATA_API_KEY")
@@ -15,15 +22,11 @@ class TwelveDataClient:
         self.session = requests.Session()
         self.session.headers.update({"User-Agent": "TradingBot"})
         self.logger = logging.getLogger(__name__)
+        self.limiter = get_limiter("TwelveData", self.api_key)
 
     def _handle_rate_limit(self, response: requests.Response) -> bool:
-        """Verifica e trata limites de requisição"""
-        if response.status_code == 429:
-            retry_after = int(response.headers.get('Retry-After', 60))
-            self.logger.warning(f"Rate limit atingido. Retry após {retry_after}s")
-            time.sleep(retry_after)
-            return True
-        return False
+        """Repassa os cabeçalhos ao governador; em 429 o provedor fica pausado lá"""
+        return self.limiter.observe(response.headers, response.status_code)
 
     def _parse_datetime(self, dt_str: str) -> Optional[int]:
         """Converte múltiplos formatos de data para timestamp"""
@@ -60,6 +63,26 @@ class TwelveDataClient:
             
         return True
 
+    def _parse_values(self, values: List[Dict]) -> List[Dict]:
+        """Converte `values` (mais novo primeiro) em candles em ordem crescente"""
+        candles = []
+        for row in reversed(values):
+            ts = self._parse_datetime(row["datetime"])
+            if ts is None:
+                continue
+            try:
+                candles.append({
+                    "timestamp": ts,
+                    "open": float(row["open"]),
+                    "high": float(row["high"]),
+                    "low": float(row["low"]),
+                    "close": float(row["close"]),
+                    "volume": float(row.get("volume", 0))
+                })
+            except (ValueError, KeyError) as e:
+                self.logger.warning(f"Erro ao processar candle: {e}")
+        return candles
+
     def fetch_candles(
         self,
         symbol: str,
@@ -97,6 +120,7 @@ class TwelveDataClient:
 
         for attempt in range(1, retries + 1):
             try:
+                self.limiter.acquire()
                 response = self.session.get(endpoint, params=params, timeout=15)
                 
                 if self._handle_rate_limit(response):
@@ -113,26 +137,7 @@ class TwelveDataClient:
                     time.sleep(delay)
                     continue
                     
-                candles = []
-                for row in reversed(data["values"]):
-                    ts = self._parse_datetime(row["datetime"])
-                    if ts is None:
-                        continue
-                        
-                    try:
-                        candle = {
-                            "timestamp": ts,
-                            "open": float(row["open"]),
-                            "high": float(row["high"]),
-                            "low": float(row["low"]),
-                            "close": float(row["close"]),
-                            "volume": float(row.get("volume", 0))
-                        }
-                        candles.append(candle)
-                    except (ValueError, KeyError) as e:
-                        self.logger.warning(f"Erro ao processar candle: {e}")
-                        continue
-                        
+                candles = self._parse_values(data["values"])
                 if not candles:
                     self.logger.error("Nenhum candle válido encontrado")
                     return None
@@ -144,6 +149,9 @@ class TwelveDataClient:
                     "interval": interval
                 }
                 
+            except RateLimitExceeded as e:
+                self.logger.warning(str(e))
+                return None
             except RequestException as e:
                 self.logger.warning(f"Tentativa {attempt}/{retries} - Erro de rede: {str(e)}")
                 time.sleep(delay)
@@ -154,5 +162,137 @@ class TwelveDataClient:
         self.logger.error(f"Falha após {retries} tentativas")
         return None
 
+    def fetch_many(
+        self,
+        symbols: List[str],
+        interval: str = "1min",
+        limit: int = 200,
+        retries: int = 3,
+        delay: float = 1.5
+    ) -> Dict[str, Dict]:
+        """
+        Vários símbolos por requisição (`symbol=A,B,C` no /time_series).
+
+        O TwelveData cobra um crédito por símbolo, então os lotes são cortados no
+        maior custo que a cota do governador comporta para a prioridade atual.
+
+        Returns:
+            Dict símbolo pedido -> {'history', 'close', 'symbol', 'interval'}, só com
+            os símbolos que vieram válidos (os demais ficam para o fallback por símbolo)
+        """
+        limit = min(limit, 5000)
+        formatted = {s.replace("/", ""): s for s in symbols}
+        batch_size = max(1, min(MAX_BATCH_SYMBOLS, self.limiter.max_cost()))
+        names = list(formatted)
+        results: Dict[str, Dict] = {}
+
+        for start in range(0, len(names), batch_size):
+            batch = names[start:start + batch_size]
+            params = {
+                "symbol": ",".join(batch),
+                "interval": interval,
+                "outputsize": limit,
+                "apikey": self.api_key
+            }
+            self.logger.info(f"Buscando candles em lote: {len(batch)} símbolos {interval} (limit={limit})")
+            for attempt in range(1, retries + 1):
+                try:
+                    self.limiter.acquire(cost=len(batch))
+                    response = self.session.get(f"{self.base_url}/time_series", params=params, timeout=30)
+                    if self._handle_rate_limit(response):
+                        continue
+                    if response.status_code != 200:
+                        self.logger.warning(f"Tentativa {attempt}/{retries} - Status {response.status_code}")
+                        time.sleep(delay)
+                        continue
+                    data = response.json()
+                except RateLimitExceeded as e:
+                    self.logger.warning(str(e))
+                    return results
+                except RequestException as e:
+                    self.logger.warning(f"Tentativa {attempt}/{retries} - Erro de rede: {str(e)}")
+                    time.sleep(delay)
+                    continue
+                # Com um único símbolo a resposta não vem aninhada
+                per_symbol = {batch[0]: data} if len(batch) == 1 else data
+                for key, entry in per_symbol.items():
+                    name = key.replace("/", "")
+                    if name not in formatted or not isinstance(entry, dict):
+                        continue
+                    if entry.get("status") == "error" or "values" not in entry:
+                        self.logger.warning(f"{name}: {entry.get('message', 'sem dados no lote')}")
+                        continue
+                    candles = self._parse_values(entry["values"])
+                    if candles:
+                        results[formatted[name]] = {
+                            "history": candles,
+                            "close": candles[-1]["close"],
+                            "symbol": name,
+                            "interval": interval
+                        }
+                break
+        return results
+
     def __del__(self):
         self.session.close()
+
+
+class AsyncTwelveDataClient(TwelveDataClient):
+    """Versão asyncio (aiohttp, conector compartilhado) com o mesmo formato de retorno."""
+
+    async def fetch_candles(
+        self,
+        symbol: str,
+        interval: str = "1min",
+        limit: int = 200,
+        retries: int = 3,
+        delay: float = 1.5
+    ) -> Optional[Dict[str, List[Dict]]]:
+        limit = min(limit, 5000)
+        formatted_symbol = symbol.replace("/", "") if "/" in symbol else symbol
+        params = {
+            "symbol": formatted_symbol,
+            "interval": interval,
+            "outputsize": limit,
+            "apikey": self.api_key
+        }
+        self.logger.info(f"Buscando candles (async): {formatted_symbol} {interval} (limit={limit})")
+
+        session = await get_http_session()
+        for attempt in range(1, retries + 1):
+            try:
+                await self.limiter.acquire_async()
+                async with session.get(f"{self.base_url}/time_series", params=params,
+                                       headers={"User-Agent": "TradingBot"},
+                                       timeout=aiohttp.ClientTimeout(total=15)) as response:
+                    if self.limiter.observe(response.headers, response.status):
+                        continue
+                    if response.status != 200:
+                        self.logger.warning(f"Tentativa {attempt}/{retries} - Status {response.status}")
+                        await asyncio.sleep(delay)
+                        continue
+                    data = await response.json(content_type=None)
+
+                if not self._validate_response(data):
+                    await asyncio.sleep(delay)
+                    continue
+
+                candles = self._parse_values(data["values"])
+                if not candles:
+                    self.logger.error("Nenhum candle válido encontrado")
+                    return None
+                return {
+                    "history": candles,
+                    "close": candles[-1]["close"],
+                    "symbol": formatted_symbol,
+                    "interval": interval
+                }
+            except RateLimitExceeded as e:
+                self.logger.warning(str(e))
+                return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.logger.warning(f"Tentativa {attempt}/{retries} - Erro de rede: {str(e)}")
+                await asyncio.sleep(delay)
+
+        self.logger.error(f"Falha após {retries} tentativas")
+        return None
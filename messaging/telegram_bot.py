@@ -10,10 +10,14 @@ from aiohttp import web
 from config import CONFIG
 from utils.signal_logger import log_signal
 from utils.telegram_safe import safe_send
+from data.candle_cache import RollingCandleCache
+from utils.single_flight import SingleFlight
 from strategy.train_model_historic import main as run_training
+from strategy.candlestick_patterns import pattern_names
 
 import pandas as pd
 import os
+import asyncio
 from dotenv import load_dotenv
 
 from datetime import datetime
@@ -79,11 +83,16 @@ def menu_cancel(chat_id):
     return markup
 
 class TelegramNotifier:
-    def __init__(self, token, strategy, data_client):
+    def __init__(self, token, strategy, data_client, signal_runner=None):
         self.bot = Bot(token=token)
         self.dp = Dispatcher(self.bot, storage=MemoryStorage())
         self.strategy = strategy
         self.data_client = data_client
+        self.signal_runner = signal_runner  # BarSignalRunner do feed ao vivo (opcional)
+        # Janela de N candles em memória; cada clique só busca as barras novas
+        self.candle_cache = RollingCandleCache(data_client)
+        # Vários usuários pedindo o mesmo (símbolo, timeframe) na mesma barra: um só cálculo
+        self.signal_flight = SingleFlight("generate_signal")
         self.mode_map = {}
 
         # Handler para comando /start
@@ -308,7 +317,8 @@ class TelegramNotifier:
         async def select_symbol(callback: types.CallbackQuery, state: FSMContext):
             try:
                 await callback.answer()
-                symbol = callback.data.split(":")[1].replace(" OTC", "")
+                feed_symbol = callback.data.split(":")[1]
+                symbol = feed_symbol.replace(" OTC", "")
                 await state.update_data(symbol=symbol)
                 user_data = await state.get_data()
                 timeframe = user_data["timeframe"]
@@ -322,17 +332,16 @@ class TelegramNotifier:
                     parse_mode="Markdown",
                     reply_markup=kb
                 )
-                candles = self.data_client.fetch_candles(symbol, interval=self._map_timeframe(timeframe))
-                if not candles or "history" not in candles:
+                has_data, signal_data = await self._signal_for(symbol, timeframe, feed_symbol)
+                if not has_data:
                     await safe_send(self.bot, callback.from_user.id, get_text("failed_price_data", chat_id=callback.from_user.id), reply_markup=menu_main(callback.from_user.id))
                     return
 
                 # Usa sempre os campos dinâmicos vindos do ensemble
-                signal_data = self.strategy.generate_signal(candles, timeframe=self._map_timeframe(timeframe))
                 if not signal_data:
                     await safe_send(self.bot, callback.from_user.id, get_text("no_signal", chat_id=callback.from_user.id), reply_markup=menu_main(callback.from_user.id))
                 else:
-                    signal_context[callback.from_user.id] = {"symbol": symbol, "timeframe": timeframe}
+                    signal_context[callback.from_user.id] = {"symbol": symbol, "timeframe": timeframe, "feed_symbol": feed_symbol}
                     await self.send_trade_signal(callback.from_user.id, symbol, signal_data)
                 await state.finish()
                 await safe_send(self.bot, callback.from_user.id, get_text("start", chat_id=callback.from_user.id), reply_markup=menu_main(callback.from_user.id))
@@ -349,11 +358,10 @@ class TelegramNotifier:
                     await callback.answer(get_text("no_previous_signal", chat_id=uid), show_alert=True)
                     return
                 ctx = signal_context[uid]
-                candles = self.data_client.fetch_candles(ctx["symbol"], interval=self._map_timeframe(ctx["timeframe"]))
-                if not candles or "history" not in candles:
+                has_data, signal_data = await self._signal_for(ctx["symbol"], ctx["timeframe"], ctx.get("feed_symbol"))
+                if not has_data:
                     await safe_send(self.bot, uid, get_text("no_signal", chat_id=uid))
                     return
-                signal_data = self.strategy.generate_signal(candles, timeframe=self._map_timeframe(ctx["timeframe"]))
                 if signal_data:
                     await self.send_trade_signal(uid, ctx["symbol"], signal_data)
             except Exception as e:
@@ -370,6 +378,28 @@ class TelegramNotifier:
         kb.add(InlineKeyboardButton(get_text("back", chat_id=user_id), callback_data="back_symbols"))
         await message.edit_text(get_text("choose_symbol", chat_id=message.chat.id), reply_markup=kb)
 
+    async def _signal_for(self, symbol, timeframe, feed_symbol=None):
+        """
+        (há dados?, sinal). Com o feed ao vivo ligado, reaproveita o sinal já calculado
+        sobre o último candle fechado; senão busca os candles e roda o ensemble.
+        """
+        if self.signal_runner is not None:
+            cached = self.signal_runner.latest(feed_symbol or symbol, timeframe)
+            if cached:
+                return True, cached
+        interval = self._map_timeframe(timeframe)
+        candles = await self.candle_cache.get(symbol, interval=interval)
+        if not candles or "history" not in candles:
+            return False, None
+        candles["symbol"] = symbol
+        bar = candles["history"][-1]["timestamp"]
+        # Ensemble/ML/filtro são CPU: rodam em thread para não travar o event loop
+        signal = await self.signal_flight.do(
+            (symbol, interval, bar),
+            lambda: asyncio.to_thread(self.strategy.generate_signal, candles, interval)
+        )
+        return True, signal
+
     def _map_timeframe(self, tf):
         """Mapeia o timeframe do usuário para o formato da API"""
         return {
@@ -411,7 +441,8 @@ class TelegramNotifier:
             df.to_csv(SIGNAL_CSV_PATH, index=False)
 
         payout = round(signal_data.get('price', 0) * 0.92, 5)
-        patterns_list = signal_data.get("patterns", [])
+        # Estratégias enviam o bitmask; nomes só são gerados aqui, para exibição
+        patterns_list = signal_data.get("patterns") or pattern_names(signal_data.get("pattern_mask", 0))
         patterns_str = ", ".join([get_text(p, chat_id=chat_id) for p in patterns_list]) if patterns_list else "-"
 
         par = asset
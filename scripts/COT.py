@@ -12,12 +12,8 @@ from bs4 import BeautifulSoup
 import re
 import time
 
-# Import do método de upload para o Google Drive
-from data.google_drive_client import upload_or_update_file
-
-# IDs das pastas do Google Drive
-GDRIVE_FOLDER_ID_RAW = "17Ok0Eo53XvoUYKtr5iMPgd_NkXLtDT85"     # Pasta para ZIP bruto baixado
-GDRIVE_FOLDER_ID_CSV = "1Bv5rwzYMUVuRNSXKSz9zAFidDTCjY8g6"     # Pasta para CSV processado
+# Armazenamento remoto (Drive, diretório local ou S3, conforme CONFIG["blob_store"])
+from data.blob_store import get_blob_store, COT_RAW, COT_CSV
 
 # Configuração de logging
 logging.basicConfig(
@@ -127,10 +123,10 @@ class CotProcessor:
             if not self.download_file(cot_url, cot_zip_path):
                 return False
 
-            # Upload ZIP bruto para pasta específica no Google Drive
+            # Upload ZIP bruto para o bucket cot_raw
             try:
-                upload_or_update_file(cot_zip_path, drive_folder_id=GDRIVE_FOLDER_ID_RAW)
-                logger.info(f"Arquivo ZIP bruto enviado ao Google Drive (pasta RAW)")
+                get_blob_store().put(COT_RAW, cot_zip_path)
+                logger.info(f"Arquivo ZIP bruto enviado ao armazenamento remoto ({COT_RAW})")
             except Exception as e:
                 logger.error(f"Falha ao enviar ZIP bruto: {e}")
 
@@ -150,10 +146,10 @@ class CotProcessor:
             df_parsed.to_csv(output_path, index=False)
             logger.info(f"Dados processados salvos em {output_path}")
 
-            # Upload CSV processado para pasta específica no Google Drive
+            # Upload CSV processado para o bucket cot_csv
             try:
-                upload_or_update_file(output_path, drive_folder_id=GDRIVE_FOLDER_ID_CSV)
-                logger.info(f"CSV processado enviado ao Google Drive (pasta CSV)")
+                get_blob_store().put(COT_CSV, output_path)
+                logger.info(f"CSV processado enviado ao armazenamento remoto ({COT_CSV})")
             except Exception as e:
                 logger.error(f"Falha ao enviar CSV processado: {e}")
 
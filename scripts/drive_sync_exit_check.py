@@ -0,0 +1,51 @@
+# scripts/drive_sync_exit_check.py
+# Confere a promessa do DriveSyncService de esvaziar a fila na saída: um processo
+# filho enfileira um arquivo e termina sem flush; o close() registrado no atexit roda
+# depois do hook de desligamento do concurrent.futures e precisa subir o arquivo mesmo
+# assim. O "Drive" aqui é uma cópia para uma pasta local (só _upload é trocado).
+#
+#   python -m scripts.drive_sync_exit_check
+#
+# Sai com código 1 se o arquivo não chegou ao destino.
+
+import os
+import sys
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import sys, shutil, atexit
+from data.drive_sync import DriveSyncService
+
+class LocalCopy(DriveSyncService):
+    def _lookup_ids(self, files):
+        pass
+
+    def _upload(self, path, folder):
+        shutil.copy(path, sys.argv[2])
+
+sync = LocalCopy(interval=3600, share_with_email=None)
+atexit.register(sync.close, 30)
+sync.enqueue(sys.argv[1], "local")
+"""
+
+
+def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        src, dst = os.path.join(tmp, "queued.bin"), os.path.join(tmp, "uploaded.bin")
+        with open(src, "wb") as f:
+            f.write(os.urandom(1024))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")])))
+        proc = subprocess.run([sys.executable, "-c", CHILD, src, dst], cwd=ROOT, env=env,
+                              capture_output=True, text=True, timeout=120)
+        ok = proc.returncode == 0 and os.path.exists(dst) and open(dst, "rb").read() == open(src, "rb").read()
+        if not ok:
+            print(proc.stderr[-2000:])
+        print("enviado na saída" if ok else "FILA PERDIDA NA SAÍDA")
+        return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+# scripts/feature_vector_parity.py
+# Confere o modo inferência (feature_vector) contra a última linha de build_features:
+# mesmas features numéricas de DEFAULT_FEATURES, em float32. Para cada grupo de janela
+# fixa (inference_rows != None), confere também que só os `rows` candles finais bastam
+# -- é o que valida os lookbacks declarados no registro. Mede o tempo dos dois modos.
+#
+#   python -m scripts.feature_vector_parity                  # candles sintéticos
+#   python -m scripts.feature_vector_parity --symbol EURUSD --tf 1min --bars 500
+#
+# Sai com código 1 se algum valor divergir.
+
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from strategy.feature_engine import (
+    FEATURES, COLUMN_OWNERS, DEFAULT_FEATURES, OHLCV,
+    build_features, feature_vector, inference_rows,
+)
+from scripts.indicator_parity import synthetic_candles, stored_candles
+
+NUMERIC_FEATURES = [c for c in DEFAULT_FEATURES
+                    if c in OHLCV or FEATURES[COLUMN_OWNERS[c]].dtypes[c] != "object"]
+
+
+def last_row(df: pd.DataFrame, features, tf: str) -> np.ndarray:
+    out = build_features(df, features, "EURUSD", tf)
+    return out[features].iloc[-1].astype(float).to_numpy(np.float32)
+
+
+def diverging(features, expected: np.ndarray, got: np.ndarray):
+    same = (expected == got) | (np.isnan(expected) & np.isnan(got))
+    return [(c, float(e), float(g)) for c, e, g, ok in zip(features, expected, got, same) if not ok]
+
+
+def check(df: pd.DataFrame, tf: str) -> bool:
+    t0 = time.perf_counter()
+    expected = last_row(df, NUMERIC_FEATURES, tf)
+    frame_time = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    vector = feature_vector(df, NUMERIC_FEATURES, "EURUSD", tf)
+    vector_time = time.perf_counter() - t0
+
+    bad = diverging(NUMERIC_FEATURES, expected, vector)
+    for column, e, g in bad[:5]:
+        print(f"{column}: DataFrame {e} != vetor {g}")
+
+    windowed = 0
+    for name, feature in FEATURES.items():
+        columns = [c for c in feature.columns if feature.dtypes[c] != "object"]
+        rows = inference_rows(columns) if columns else None
+        if rows is None:
+            continue
+        windowed += 1
+        got = feature_vector(df.iloc[-rows:], columns, "EURUSD", tf)
+        for column, e, g in diverging(columns, last_row(df, columns, tf), got):
+            print(f"{name} com {rows} candles: {column} {e} != {g}")
+            bad.append((column, e, g))
+
+    print(f"{len(df)} candles, {len(NUMERIC_FEATURES)} features, {windowed} grupos de janela fixa")
+    print(f"DataFrame:  {frame_time * 1000:7.1f} ms")
+    print(f"vetor:      {vector_time * 1000:7.1f} ms")
+    print("IDÊNTICO" if not bad else f"DIVERGÊNCIA ({len(bad)} valores)")
+    return not bad
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Features: vetor de inferência x última linha do DataFrame")
+    parser.add_argument("--symbol", default=None, help="usa candles da candle store em vez de dados sintéticos")
+    parser.add_argument("--tf", default="1min")
+    parser.add_argument("--bars", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    if args.symbol:
+        df = stored_candles(args.symbol, args.tf, args.bars)
+    else:
+        df = synthetic_candles(args.bars, args.seed)
+    if df.empty:
+        print("Nenhum candle para conferir")
+        return 1
+    return 0 if check(df, args.tf) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+# scripts/indicator_parity.py
+# Confere o motor incremental (strategy.indicator_stream) contra o batch
+# (TechnicalIndicators.compute_all) candle a candle: valores dentro da tolerância,
+# NaN nas mesmas posições e códigos int8 idênticos. Também confere que o candle em
+# formação (final=False) não altera o estado.
+#
+#   python -m scripts.indicator_parity                       # passeio aleatório sintético
+#   python scripts/indicator_parity.py                        # idem, direto pelo arquivo
+#   python -m scripts.indicator_parity --symbol EURUSD --tf 1min --bars 2000
+#
+# Sai com código 1 se alguma coluna divergir.
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Rodando direto pelo arquivo, sys.path[0] é scripts/: a raiz do repo entra para achar strategy/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from strategy.indicator_globe import TechnicalIndicators
+from strategy.indicator_stream import IndicatorStream
+
+
+def synthetic_candles(bars: int, seed: int = 7) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 1.1 + np.cumsum(rng.normal(0, 0.0015, bars))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.0008, bars))
+    return pd.DataFrame({
+        "timestamp": 1_700_000_000 + 60 * np.arange(bars),
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.integers(1, 500, bars).astype(float),
+    })
+
+
+def stored_candles(symbol: str, tf: str, bars: int) -> pd.DataFrame:
+    from data.candle_store import get_candle_store
+    return pd.DataFrame(get_candle_store().tail(symbol, tf, bars))
+
+
+def _same(a: float, b: float) -> bool:
+    return a == b or (a != a and b != b)
+
+
+def check(df: pd.DataFrame, rtol: float = 1e-7, atol: float = 1e-9) -> bool:
+    t0 = time.perf_counter()
+    batch = TechnicalIndicators.compute_all(df["high"], df["low"], df["close"], df["volume"])
+    batch_time = time.perf_counter() - t0
+
+    stream = IndicatorStream()
+    rows = []
+    forming_ok = True
+    t0 = time.perf_counter()
+    for candle in df.to_dict("records"):
+        # Candle em formação: duas prévias e o fechamento têm de coincidir (estado intacto)
+        preview = stream.update(candle, final=False)
+        again = stream.update(candle, final=False)
+        row = stream.update(candle)
+        forming_ok &= all(_same(preview[k], again[k]) and _same(preview[k], row[k]) for k in row)
+        rows.append(row)
+    stream_time = time.perf_counter() - t0
+
+    ok = forming_ok
+    print(f"{'coluna':<26} {'divergências':>12} {'maior erro':>12}")
+    for column in rows[0]:
+        expected = np.asarray(batch[column], dtype=float)
+        got = np.array([row[column] for row in rows], dtype=float)
+        both_nan = np.isnan(expected) & np.isnan(got)
+        close = np.isclose(got, expected, rtol=rtol, atol=atol) | both_nan
+        if batch[column].dtype == np.int8:
+            close = got == expected
+        bad = int((~close).sum())
+        finite = ~np.isnan(expected) & ~np.isnan(got)
+        err = float(np.max(np.abs(got[finite] - expected[finite]), initial=0.0))
+        if bad:
+            ok = False
+            first = int(np.argmax(~close))
+            print(f"{column:<26} {bad:>12} {err:>12.3g}  (1º no candle {first}: {got[first]} != {expected[first]})")
+        else:
+            print(f"{column:<26} {bad:>12} {err:>12.3g}")
+    per_bar = stream_time / len(df) / 3 * 1e6
+    print(f"\n{len(df)} candles; batch {batch_time * 1000:.1f} ms; incremental ~{per_bar:.0f} µs/candle")
+    print(f"candle em formação sem efeito colateral: {'ok' if forming_ok else 'FALHOU'}")
+    print("PARIDADE OK" if ok else "PARIDADE FALHOU")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paridade indicadores incrementais x batch")
+    parser.add_argument("--symbol", default=None, help="usa candles da candle store em vez de dados sintéticos")
+    parser.add_argument("--tf", default="1min")
+    parser.add_argument("--bars", type=int, default=1500)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    df = stored_candles(args.symbol, args.tf, args.bars) if args.symbol else synthetic_candles(args.bars, args.seed)
+    if len(df) < 60:
+        print(f"Poucos candles ({len(df)}) para conferir paridade")
+        return 1
+    return 0 if check(df) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
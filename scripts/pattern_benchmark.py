@@ -0,0 +1,95 @@
+# scripts/pattern_benchmark.py
+# Confere a detecção vetorizada (pattern_matrix) contra a escalar
+# (detect_candlestick_patterns candle a candle, janela de 6 como nos builders antigos):
+# mesmas listas de padrões, na mesma ordem, e mesma força. Mede o ganho de tempo.
+#
+#   python -m scripts.pattern_benchmark                     # candles sintéticos
+#   python -m scripts.pattern_benchmark --symbol EURUSD --tf 1min --bars 20000
+#
+# Sai com código 1 se alguma linha divergir.
+
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from strategy.candlestick_patterns import (
+    detect_candlestick_patterns, get_pattern_strength,
+    pattern_matrix, pattern_strength_series, pattern_lists,
+)
+from scripts.indicator_parity import synthetic_candles, stored_candles
+
+
+def with_edge_cases(df: pd.DataFrame, seed: int) -> pd.DataFrame:
+    """Acrescenta dojis exatos, candles sem range e aberturas repetidas (separating lines)."""
+    rng = np.random.default_rng(seed)
+    o, h, l, c = (df[col].to_numpy().copy() for col in ("open", "high", "low", "close"))
+    n = len(o)
+    doji = rng.choice(n, n // 10, replace=False)
+    c[doji] = o[doji]
+    same = rng.choice(np.arange(1, n), n // 20, replace=False)
+    o[same] = o[same - 1]
+    h, l = np.maximum.reduce([o, h, c]), np.minimum.reduce([o, l, c])
+    flat = rng.choice(n, n // 50, replace=False)
+    h[flat] = l[flat] = c[flat] = o[flat]
+    return df.assign(open=o, high=h, low=l, close=c)
+
+
+def scalar(df: pd.DataFrame):
+    records = df[["open", "high", "low", "close", "volume"]].to_dict("records")
+    lists, strengths = [], []
+    for i in range(len(records)):
+        patterns = detect_candlestick_patterns(records[max(i - 5, 0):i + 1])
+        lists.append(patterns)
+        strengths.append(get_pattern_strength(patterns))
+    return lists, np.array(strengths)
+
+
+def check(df: pd.DataFrame) -> bool:
+    t0 = time.perf_counter()
+    expected_lists, expected_strength = scalar(df)
+    scalar_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    matrix = pattern_matrix(df["open"], df["high"], df["low"], df["close"])
+    strength = pattern_strength_series(matrix)
+    matrix_time = time.perf_counter() - t0
+    lists = pattern_lists(matrix)
+    lists_time = time.perf_counter() - t0
+
+    bad = [i for i in range(len(df)) if lists[i] != expected_lists[i]]
+    bad_strength = int(np.sum(strength != expected_strength))
+    for i in bad[:5]:
+        print(f"candle {i}: vetorizado {lists[i]} != escalar {expected_lists[i]}")
+    detected = int(matrix.sum())
+    print(f"{len(df)} candles, {detected} padrões detectados")
+    print(f"escalar:     {scalar_time * 1000:9.1f} ms")
+    print(f"vetorizado:  {matrix_time * 1000:9.1f} ms (matriz + força)  -> {scalar_time / matrix_time:.0f}x")
+    print(f"  + listas:  {lists_time * 1000:9.1f} ms                    -> {scalar_time / lists_time:.0f}x")
+    ok = not bad and not bad_strength
+    print(f"linhas divergentes: {len(bad)}; forças divergentes: {bad_strength}")
+    print("IDÊNTICO" if ok else "DIVERGÊNCIA")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Padrões de vela: vetorizado x escalar")
+    parser.add_argument("--symbol", default=None, help="usa candles da candle store em vez de dados sintéticos")
+    parser.add_argument("--tf", default="1min")
+    parser.add_argument("--bars", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+    if args.symbol:
+        df = stored_candles(args.symbol, args.tf, args.bars)
+    else:
+        df = with_edge_cases(synthetic_candles(args.bars, args.seed), args.seed)
+    if df.empty:
+        print("Nenhum candle para conferir")
+        return 1
+    return 0 if check(df) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
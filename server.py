@@ -3,7 +3,11 @@ import os
 import logging
 import asyncio
 from aiohttp import web
-from data.data_client import FallbackDataClient
+from data.async_data_client import AsyncFallbackDataClient
+from data.live_feed import build_live_feed
+from utils.single_flight import single_flight_stats
+from data.rate_governor import governor_snapshot
+from data.drive_sync import get_drive_sync
 from strategy.ensemble_strategy import EnsembleStrategy
 from messaging.telegram_bot import TelegramNotifier
 from config import CONFIG
@@ -22,15 +26,56 @@ def get_env_or_config(key, default=None):
 async def healthcheck(request):
     return web.Response(text="ok", status=200)
 
+async def provider_health(request):
+    # Placar de saúde dos provedores (latência, sucesso, circuit breakers) para métricas
+    return web.json_response(request.app["data_client"].scoreboard.snapshot())
+
+async def coalescing_stats(request):
+    # Computações duplicadas evitadas pelo single-flight (busca e sinal)
+    return web.json_response(single_flight_stats())
+
+async def rate_limits(request):
+    # Cota restante por provedor/chave e quem está esperando por ela
+    return web.json_response(governor_snapshot())
+
+async def drive_sync_stats(request):
+    # Fila de uploads para o Drive (pendentes, uploads colapsados, falhas)
+    return web.json_response(get_drive_sync().snapshot())
+
 async def init_app():
     try:
-        data_client = FallbackDataClient()
+        data_client = AsyncFallbackDataClient()
         strategy = EnsembleStrategy()
-        notifier = TelegramNotifier(CONFIG["telegram"]["bot_token"], strategy, data_client)
+        signal_runner = None
+        if CONFIG["live_feed"]["enabled"]:
+            # Sinais calculados uma vez por candle fechado, a partir do stream de preços
+            feed, source, signal_runner = build_live_feed(strategy, data_client)
+        notifier = TelegramNotifier(CONFIG["telegram"]["bot_token"], strategy, data_client, signal_runner)
 
         app = web.Application()
+        app["data_client"] = data_client
         app.router.add_post(f"/webhook/{notifier.token}", notifier.webhook_handler)
         app.router.add_get("/health", healthcheck)
+        app.router.add_get("/health/providers", provider_health)
+        app.router.add_get("/health/coalescing", coalescing_stats)
+        app.router.add_get("/health/rate_limits", rate_limits)
+        app.router.add_get("/health/drive_sync", drive_sync_stats)
+
+        async def close_data_client(app):
+            await data_client.close()
+            data_client.scoreboard.save()
+        app.on_cleanup.append(close_data_client)
+
+        if signal_runner is not None:
+            async def start_live_feed(app):
+                await source.start()
+                logger.info(f"Feed ao vivo ({CONFIG['live_feed']['source']}) iniciado.")
+
+            async def stop_live_feed(app):
+                await source.stop()
+                await signal_runner.stop()
+            app.on_startup.append(start_live_feed)
+            app.on_cleanup.insert(0, stop_live_feed)
 
         # Seta webhook só se necessário
         await notifier.set_webhook()
@@ -2,7 +2,12 @@
 import numpy as np
 from collections import deque
 from config import CONFIG
-from strategy.candlestick_patterns import detect_patterns, PATTERN_STRENGTH
+from strategy.candlestick_patterns import detect_pattern_mask, pattern_mask, mask_strength
+
+CONFIRM_MASKS = {
+    "up": pattern_mask(CONFIG["candlestick_patterns"]["reversal_up"]),
+    "down": pattern_mask(CONFIG["candlestick_patterns"]["reversal_down"]),
+}
 
 class ADXStrategy:
     def __init__(self, config=None):
@@ -52,26 +57,16 @@ class ADXStrategy:
 
         return adx, plus_di, minus_di
 
-    def _apply_pattern_boost(self, signal, patterns, direction):
-        if not patterns:
+    def _apply_pattern_boost(self, signal, mask, direction):
+        if not mask:
             return signal
-        if direction == "up":
-            relevant_patterns = CONFIG["candlestick_patterns"]["reversal_up"]
-        elif direction == "down":
-            relevant_patterns = CONFIG["candlestick_patterns"]["reversal_down"]
-        else:
-            relevant_patterns = []
-        pattern_strength = sum(
-            PATTERN_STRENGTH.get(p, 0)
-            for p in patterns
-            if p in relevant_patterns
-        )
+        pattern_strength = mask_strength(mask & CONFIRM_MASKS.get(direction, 0))
         if pattern_strength > 0:
             signal["confidence"] = min(
                 95,
                 signal.get("confidence", 70) + int(pattern_strength * 20 * self.pattern_boost)
             )
-            signal["patterns"] = patterns
+            signal["pattern_mask"] = mask
             signal["pattern_strength"] = pattern_strength
         return signal
 
@@ -92,7 +87,7 @@ class ADXStrategy:
             if adx is None:
                 return None
 
-            patterns = detect_patterns(list(self.candle_buffer)[-self.candle_lookback:])
+            mask = detect_pattern_mask(list(self.candle_buffer)[-self.candle_lookback:])
 
             volume_ok = current.get("volume", 0) > prev.get("volume", 0) * self.volume_threshold
             trend_up = plus_di > minus_di
@@ -109,7 +104,7 @@ class ADXStrategy:
                         "confidence": 70 + min(20, int((adx - 25) / 2)),  # 70-90
                         "volume_ok": volume_ok
                     }
-                    signal = self._apply_pattern_boost(signal, patterns, "up")
+                    signal = self._apply_pattern_boost(signal, mask, "up")
                 elif not trend_up and (not price_up or not self.require_trend_confirmation):
                     signal = {
                         "signal": "down",
@@ -119,7 +114,7 @@ class ADXStrategy:
                         "confidence": 75 + min(20, int((adx - 25) / 2)),  # 75-95
                         "volume_ok": volume_ok
                     }
-                    signal = self._apply_pattern_boost(signal, patterns, "down")
+                    signal = self._apply_pattern_boost(signal, mask, "down")
 
             if signal and volume_ok:
                 signal["confidence"] = min(95, signal["confidence"] + 10)
@@ -4,8 +4,9 @@
 # Filtro AI robustecido com controle aprimorado de penalização acumulada
 
 import logging
+from numbers import Integral
 from typing import Dict, List, Optional, Tuple, Union
-from strategy.candlestick_patterns import PATTERN_STRENGTH
+from strategy.candlestick_patterns import PATTERN_ORDER, pattern_mask, mask_strength, pattern_count
 
 # Configuração de logging
 logging.basicConfig(
@@ -18,6 +19,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def _keyword_mask(keywords) -> int:
+    return pattern_mask(p for p in PATTERN_ORDER if any(k in p for k in keywords))
+
+
+# Padrões contrários a cada direção (mesmas palavras-chave de antes) e dojis
+CONTRARY_MASKS = {
+    "up": _keyword_mask(["bear", "engulfing", "shooting", "dark_cloud", "evening_star"]),
+    "down": _keyword_mask(["bull", "hammer", "morning_star", "piercing"]),
+}
+DOJI_MASK = _keyword_mask(["doji"])
+
+
 class SmartAIFilter:
     def __init__(
         self,
@@ -59,24 +72,14 @@ class SmartAIFilter:
         except (ValueError, TypeError):
             return None
 
-    def pattern_strength(self, patterns: List[str], direction: str) -> float:
+    def pattern_strength(self, patterns: Union[int, List[str]], direction: str) -> float:
+        """Força dos padrões contrários à direção (+0.1 por doji); aceita máscara ou lista de nomes."""
         if not patterns or not direction:
             return 0.0
-        total_strength = 0.0
-        valid_direction = direction.lower() in ("up", "down")
-        for pattern in patterns:
-            if not isinstance(pattern, str):
-                continue
-            p_lower = pattern.lower()
-            strength = PATTERN_STRENGTH.get(p_lower, 0.1)
-            if valid_direction and direction.lower() == "up":
-                if any(keyword in p_lower for keyword in ["bear", "engulfing", "shooting", "dark_cloud", "evening_star"]):
-                    total_strength += strength
-            elif valid_direction and direction.lower() == "down":
-                if any(keyword in p_lower for keyword in ["bull", "hammer", "morning_star", "piercing"]):
-                    total_strength += strength
-            if "doji" in p_lower:
-                total_strength += 0.1
+        mask = int(patterns) if isinstance(patterns, Integral) else pattern_mask(
+            p.lower() for p in patterns if isinstance(p, str))
+        total_strength = mask_strength(mask & CONTRARY_MASKS.get(direction.lower(), 0))
+        total_strength += 0.1 * pattern_count(mask & DOJI_MASK)
         return min(total_strength, 5.0)
 
     def _apply_volume_filter(self, signal_data: Dict, volume: float, penalties: List[int]) -> bool:
@@ -95,7 +98,7 @@ class SmartAIFilter:
             return False
         return True
 
-    def _apply_pattern_filter(self, signal_data: Dict, patterns: List[str], direction: str, penalties: List[int]) -> bool:
+    def _apply_pattern_filter(self, signal_data: Dict, patterns: Union[int, List[str]], direction: str, penalties: List[int]) -> bool:
         if not patterns or not direction:
             return True
         pattern_strength = self.pattern_strength(patterns, direction)
@@ -226,7 +229,7 @@ class SmartAIFilter:
                 lambda: self._apply_candle_filter(signal_data, body_ratio, penalties),
                 lambda: self._apply_pattern_filter(
                     signal_data, 
-                    signal_data.get("patterns", []), 
+                    signal_data.get("pattern_mask") or signal_data.get("patterns", []),
                     direction,
                     penalties
                 ),
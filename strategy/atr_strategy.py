@@ -2,7 +2,12 @@
 import numpy as np
 from collections import deque
 from config import CONFIG
-from strategy.candlestick_patterns import detect_patterns, PATTERN_STRENGTH
+from strategy.candlestick_patterns import detect_pattern_mask, pattern_mask, mask_strength
+
+CONFIRM_MASKS = {
+    "up": pattern_mask(CONFIG["candlestick_patterns"]["reversal_up"]),
+    "down": pattern_mask(CONFIG["candlestick_patterns"]["reversal_down"]),
+}
 
 class ATRStrategy:
     def __init__(self, config=None):
@@ -39,26 +44,16 @@ class ATRStrategy:
         atr = np.mean(true_ranges[-self.atr_period:])
         return atr
 
-    def _apply_pattern_boost(self, signal, patterns, direction):
-        if not patterns:
+    def _apply_pattern_boost(self, signal, mask, direction):
+        if not mask:
             return signal
-        if direction == "up":
-            relevant_patterns = CONFIG["candlestick_patterns"]["reversal_up"]
-        elif direction == "down":
-            relevant_patterns = CONFIG["candlestick_patterns"]["reversal_down"]
-        else:
-            relevant_patterns = []
-        pattern_strength = sum(
-            PATTERN_STRENGTH.get(p, 0)
-            for p in patterns
-            if p in relevant_patterns
-        )
+        pattern_strength = mask_strength(mask & CONFIRM_MASKS.get(direction, 0))
         if pattern_strength > 0:
             signal["confidence"] = min(
                 95,
                 signal.get("confidence", 65) + int(pattern_strength * 20 * self.pattern_boost)
             )
-            signal["patterns"] = patterns
+            signal["pattern_mask"] = mask
             signal["pattern_strength"] = pattern_strength
         return signal
 
@@ -84,7 +79,7 @@ class ATRStrategy:
             avg_volume = np.mean(self.volume_buffer[-self.atr_period:])
             volume_ok = not self.require_volume or (float(current.get("volume", 0)) > avg_volume * self.volume_threshold)
 
-            patterns = detect_patterns(list(self.candle_buffer)[-self.candle_lookback:])
+            mask = detect_pattern_mask(list(self.candle_buffer)[-self.candle_lookback:])
 
             signal = None
             if body_size > atr * self.multiplier:
@@ -103,7 +98,7 @@ class ATRStrategy:
                     "price": float(current["close"])
                 }
 
-                signal = self._apply_pattern_boost(signal, patterns, direction)
+                signal = self._apply_pattern_boost(signal, mask, direction)
 
                 if direction == "up":
                     signal.update({
@@ -1,8 +1,8 @@
 #Função principal: Automatizar o fluxo completo de coleta de dados, disparo de treinamento, e upload para o Google Drive.
 #O que faz:
-#Busca dados de candles para vários símbolos/timeframes utilizando um cliente externo (dukascopy_client.cjs).
-#Salva esses dados em CSV.
-#Faz upload dos CSVs e modelos para o Google Drive.
+#Busca dados de candles para vários símbolos/timeframes utilizando o FallbackDataClient (Dukascopy via worker Node persistente + provedores alternativos).
+#Salva esses dados na candle store colunar (data/store).
+#Faz upload dos pedaços diários da store e modelos para o Google Drive (e compacta a store).
 #Periodicamente dispara o treinamento do modelo histórico (train_model_historic.main()).
 #Roda em loop continuamente, mantendo os dados e modelos sempre atualizados.
 
@@ -16,10 +16,14 @@ from datetime import datetime, timedelta
 from concurrent.futures import ThreadPoolExecutor
 from hashlib import md5
 
-from strategy.train_model_historic import main as run_training
+from strategy.train_model_historic import main as run_training, MIN_CANDLES as TRAIN_MIN_CANDLES
 from config import CONFIG
-from data.google_drive_client import upload_or_update_file as upload_file, get_folder_id_for_file
+from data.blob_store import get_blob_store, bucket_for, STATE
 from data.data_client import FallbackDataClient
+from data.chunk_sync import get_chunk_sync
+from data.rate_governor import fetch_priority, SCHEDULED
+from data.derived_timeframes import TimeframeDeriver, derivation_config
+from data.backfill import BackfillEngine
 
 load_dotenv()
 
@@ -83,26 +87,22 @@ uploaded_hashes = load_uploaded_hashes()
 data_client = FallbackDataClient()
 MIN_CANDLES = 50
 
-def merge_and_save_csv(filepath, new_candles):
-    import pandas as pd
-    # Mantém histórico anterior e adiciona apenas candles novos, sem duplicar timestamp
-    if os.path.exists(filepath):
-        try:
-            df_old = pd.read_csv(filepath)
-        except Exception:
-            df_old = pd.DataFrame()
-    else:
-        df_old = pd.DataFrame()
-    df_new = pd.DataFrame(new_candles)
-    if df_new.empty:
-        return
-    if not df_old.empty:
-        df_all = pd.concat([df_old, df_new], ignore_index=True)
-    else:
-        df_all = df_new
-    df_all.drop_duplicates(subset=['timestamp'], keep='last', inplace=True)
-    df_all.sort_values('timestamp', inplace=True)
-    df_all.to_csv(filepath, index=False)
+# Só a resolução base (e o que não dá para derivar, ex.: S1) vai aos provedores
+DERIVATION = derivation_config()
+deriver = TimeframeDeriver(data_client.store, DERIVATION["base"] or "M1", DERIVATION["derived"])
+DERIVED_TIMEFRAMES = [tf for tf in TIMEFRAMES if tf.lower() in deriver.targets]
+FETCHED_TIMEFRAMES = [tf for tf in TIMEFRAMES if tf not in DERIVED_TIMEFRAMES]
+# A base precisa de histórico para o maior derivado ter candles suficientes para treinar
+# (D1 com 7 dias de M1 teria 7 candles)
+BASE_HISTORY_DAYS = max(7, deriver.history_days(max(MIN_CANDLES, TRAIN_MIN_CANDLES))) if DERIVED_TIMEFRAMES else 7
+
+def bootstrap_plan():
+    """{dias de histórico: timeframes} do bootstrap: 7 dias, exceto a base dos derivados."""
+    plan = {}
+    for tf in FETCHED_TIMEFRAMES:
+        days = BASE_HISTORY_DAYS if tf.lower() == deriver.base else 7
+        plan.setdefault(days, []).append(tf)
+    return plan
 
 def get_bootstrap_limit(tf):
     tf_map = {
@@ -112,59 +112,75 @@ def get_bootstrap_limit(tf):
     tf_minutes = tf_map.get(tf.lower(), 1)
     return int(7 * 24 * 60 / tf_minutes)  # 7 dias
 
-# Adicionado parâmetro 'limit' explicitamente. Se None, decide de acordo com prefer_pocket/bootstrap.
-def fetch_and_save(symbol: str, from_dt: datetime, to_dt: datetime, tf: str, prefer_pocket=False, limit=None) -> bool:
-    try:
-        tf_map = {
-            "S1": "s1", "M1": "m1", "M5": "m5", "M15": "m15",
-            "M30": "m30", "H1": "h1", "H4": "h4", "D1": "d1"
-        }
-        interval = tf_map.get(tf.upper(), tf.lower())
-        # Se estamos no bootstrap (prefer_pocket=true), usa get_bootstrap_limit.
-        # Caso contrário, usa NORMAL_LIMIT.
-        if limit is None:
-            limit = get_bootstrap_limit(interval) if prefer_pocket else NORMAL_LIMIT
-        candles_result = data_client.fetch_candles(symbol, interval=interval, limit=limit, prefer_pocket=prefer_pocket)
-        candles = candles_result["history"] if candles_result and "history" in candles_result else None
+def fetch_timeframe(tf: str, prefer_pocket=False, limit=None, priority=SCHEDULED) -> dict:
+    """Todos os símbolos de um timeframe via fetch_many (lotes por provedor)."""
+    interval = tf.lower()
+    if limit is None:
+        limit = get_bootstrap_limit(interval) if prefer_pocket else NORMAL_LIMIT
+    with fetch_priority(priority):
+        fetched = data_client.fetch_many(SYMBOLS, interval=interval, limit=limit)
+    results = {}
+    for symbol in SYMBOLS:
+        result = fetched.get(symbol)
+        candles = result["history"] if result and "history" in result else None
         if not candles or len(candles) < MIN_CANDLES:
             logger.warning(f"Não foi possível obter candles válidos para {symbol} @ {tf} (obtidos: {0 if not candles else len(candles)})")
-            return False
-
-        symbol_clean = symbol.lower().replace(" ", "").replace("/", "")
-        filename = f"{symbol_clean}_{interval}.csv"
-        filepath = os.path.join(DATA_DIR, filename)
-        merge_and_save_csv(filepath, candles)
-        logger.info(f"Saved/merged {len(candles)} rows to {filename}")
-        return True
-
-    except Exception as e:
-        logger.error(f"Unexpected error with {symbol} @ {tf}: {str(e)}", exc_info=True)
-    return False
+            results[(symbol, tf)] = False
+            continue
+        logger.info(f"Fetched {len(candles)} rows for {symbol} @ {interval} (store atualizada)")
+        results[(symbol, tf)] = True
+    return results
 
-# Adicionado parâmetro 'limit' explicitamente e propagado para fetch_and_save.
-def fetch_all_symbols_timeframes(from_dt: datetime, to_dt: datetime, max_workers: int = 6, prefer_pocket=False, limit=None):
-    jobs = []
+# Um fetch_many por timeframe: os provedores com endpoint de lote recebem poucas
+# requisições por ciclo em vez de uma por (símbolo, timeframe).
+def fetch_all_symbols_timeframes(from_dt: datetime, to_dt: datetime, max_workers: int = 6, prefer_pocket=False, limit=None,
+                                 priority=SCHEDULED):
     results = {}
     with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        for symbol in SYMBOLS:
-            for tf in TIMEFRAMES:
-                job = executor.submit(fetch_and_save, symbol, from_dt, to_dt, tf, prefer_pocket, limit)
-                jobs.append(((symbol, tf), job))
-        for (symbol, tf), job in jobs:
+        jobs = [(tf, executor.submit(fetch_timeframe, tf, prefer_pocket, limit, priority)) for tf in FETCHED_TIMEFRAMES]
+        for tf, job in jobs:
             try:
-                results[(symbol, tf)] = job.result()
+                results.update(job.result())
             except Exception as e:
-                logger.error(f"Erro no fetch {symbol} {tf}: {str(e)}")
+                logger.error(f"Erro no fetch {tf}: {str(e)}", exc_info=True)
+                results.update({(symbol, tf): False for symbol in SYMBOLS})
+    results.update(derive_timeframes())
+    return results
+
+def derive_timeframes():
+    """Monta M5…D1 na store a partir do M1 recém-gravado (só o balde em aberto é refeito)."""
+    if not DERIVED_TIMEFRAMES:
+        return {}
+    results = {}
+    for symbol, counts in deriver.derive_all(SYMBOLS).items():
+        for tf in DERIVED_TIMEFRAMES:
+            results[(symbol, tf)] = counts.get(tf.lower(), 0) > 0
+        if counts:
+            logger.info(f"Derived {symbol} from {deriver.base}: {counts}")
     return results
 
 def bootstrap_initial_data():
     if os.path.exists(BOOTSTRAP_FLAG):
         logger.info("Bootstrap já realizado anteriormente. Pulando bootstrap inicial.")
         return False  # não fez bootstrap agora
-    logger.info("Bootstrapping initial data (last 7 days, prefer PocketOption)")
+    logger.info(f"Bootstrapping initial data (last 7 days, {BASE_HISTORY_DAYS} for the derivation base; backfill retomável)")
     now = datetime.utcnow()
-    from_dt = now - timedelta(days=7)
-    fetch_all_symbols_timeframes(from_dt, now, prefer_pocket=True, limit=None)  # Bootstrap: busca máximo
+    # Só as lacunas da store, em pedaços com checkpoint: se cair no meio, a próxima
+    # execução continua do último pedaço concluído em vez de recomeçar
+    engine = BackfillEngine(
+        store=data_client.store,
+        recent_fetch=lambda symbol, tf, limit: data_client.fetch_candles(
+            symbol, interval=tf, limit=min(limit, get_bootstrap_limit(tf)), prefer_pocket=True),
+    )
+    reports = [engine.run(SYMBOLS, tfs, days=days) for days, tfs in bootstrap_plan().items()]
+    report = {k: sum(r[k] for r in reports) for k in ("rows", "seconds", "failed")}
+    report["rows_per_sec"] = round(report["rows"] / report["seconds"], 1) if report["seconds"] else 0.0
+    logger.info(f"Backfill: {report['rows']} rows in {report['seconds']}s ({report['rows_per_sec']} rows/s), "
+                f"{report['failed']} failed chunks")
+    derive_timeframes()
+    if report["failed"]:
+        logger.warning("Bootstrap incompleto; será retomado na próxima execução.")
+        return True
     with open(BOOTSTRAP_FLAG, "w") as f:
         f.write(now.isoformat())
     logger.info("Bootstrap complete.")
@@ -186,43 +202,44 @@ def store_last_retrain_time():
     with open(LAST_RETRAIN_PATH, "w") as f:
         f.write(now)
     try:
-        upload_file(LAST_RETRAIN_PATH)
-        logger.info("Updated last retrain time on Drive")
+        get_blob_store().put(STATE, LAST_RETRAIN_PATH)
+        logger.info("Updated last retrain time on remote storage")
     except Exception as e:
         logger.error(f"Failed to upload retrain time: {str(e)}")
 
-def upload_files_parallel(pattern: str, description: str, max_workers: int = 4):
-    files = glob.glob(pattern)
-    jobs = []
+def upload_files_parallel(pattern: str, description: str):
+    # Concorrência vem de CONFIG["blob_store"]["max_concurrency"]
+    changed = {}
+    for filepath in glob.glob(pattern):
+        filename = os.path.basename(filepath)
+        if filename.endswith((".tmp", ".remote")):
+            continue  # escrita em andamento
+        file_hash = file_md5(filepath)
+        if not file_hash:
+            continue
+        if uploaded_hashes.get(filename) == file_hash:
+            logger.info(f"Skip upload (not changed): {filename}")
+            continue
+        changed[filepath] = file_hash
+    if not changed:
+        return 0
     uploaded = 0
-    changed_hashes = False
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        for filepath in files:
-            filename = os.path.basename(filepath)
-            file_hash = file_md5(filepath)
-            if not file_hash:
-                continue
-            if uploaded_hashes.get(filename) == file_hash:
-                logger.info(f"Skip upload (not changed): {filename}")
-                continue
-            jobs.append(executor.submit(upload_file, filepath))
-            uploaded_hashes[filename] = file_hash
-            changed_hashes = True
-        for idx, job in enumerate(jobs):
-            try:
-                file_id = job.result()
-                logger.info(f"Uploaded {description}: {files[idx]} (ID: {file_id})")
-                uploaded += 1
-            except Exception as e:
-                logger.error(f"Failed to upload {files[idx]}: {str(e)}")
-    if changed_hashes:
+    results = get_blob_store().put_many((bucket_for(path), path) for path in changed)
+    for filepath, error in results.items():
+        if error is not None:
+            logger.error(f"Failed to upload {filepath}: {str(error)}")
+            continue
+        logger.info(f"Uploaded {description}: {filepath}")
+        uploaded_hashes[os.path.basename(filepath)] = changed[filepath]
+        uploaded += 1
+    if uploaded:
         save_uploaded_hashes(uploaded_hashes)
     return uploaded
 
 def main_loop():
     did_bootstrap = bootstrap_initial_data()
     if did_bootstrap:
-        # Primeiro treinamento completo logo após bootstrap (usando todos os CSVs)
+        # Primeiro treinamento completo logo após bootstrap (usando todas as séries da store)
         try:
             logger.info("Primeiro treinamento com todo o histórico baixado (7 dias)")
             run_training()
@@ -243,8 +260,19 @@ def main_loop():
         success_count = sum(1 for v in fetch_results.values() if v)
         logger.info(f"Fetch complete: {success_count} datasets updated.")
 
-        uploaded_csv = upload_files_parallel(f"{DATA_DIR}/*.csv", "CSV files")
-        logger.info(f"Uploaded {uploaded_csv} CSV files.")
+        # Só os pedaços diários alterados desde o último ciclo (e seus índices) sobem
+        uploaded_store = get_chunk_sync().push_all()
+        logger.info(f"Queued {uploaded_store} candle chunk files for Drive sync.")
+
+        # Manutenção da store fora do caminho de gravação: compacta séries fragmentadas e
+        # apaga do remoto os segmentos que a compactação aposentou
+        try:
+            compacted = data_client.store.maintain(
+                delete_remote=lambda name: get_blob_store().delete(bucket_for(name), name))
+            if compacted:
+                logger.info(f"Compacted {len(compacted)} candle series.")
+        except Exception as e:
+            logger.error(f"Store maintenance failed: {str(e)}", exc_info=True)
 
         if should_retrain():
             try:
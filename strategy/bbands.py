@@ -2,7 +2,12 @@
 import numpy as np
 from collections import deque
 from config import CONFIG
-from strategy.candlestick_patterns import detect_patterns, PATTERN_STRENGTH
+from strategy.candlestick_patterns import detect_pattern_mask, pattern_mask, mask_strength
+
+CONFIRM_MASKS = {
+    "up": pattern_mask(CONFIG["candlestick_patterns"]["reversal_up"]),
+    "down": pattern_mask(CONFIG["candlestick_patterns"]["reversal_down"]),
+}
 
 class BollingerStrategy:
     def __init__(self, config=None):
@@ -24,27 +29,17 @@ class BollingerStrategy:
         std = np.std(prices[-self.period:])
         return sma + (self.std_dev * std), sma - (self.std_dev * std), sma
 
-    def _apply_pattern_boost(self, signal, patterns, direction):
-        if not patterns:
+    def _apply_pattern_boost(self, signal, mask, direction):
+        if not mask:
             return signal
         # Usa padrões do CONFIG
-        if direction == "up":
-            relevant_patterns = CONFIG["candlestick_patterns"]["reversal_up"]
-        elif direction == "down":
-            relevant_patterns = CONFIG["candlestick_patterns"]["reversal_down"]
-        else:
-            relevant_patterns = []
-        pattern_strength = sum(
-            PATTERN_STRENGTH.get(p, 0) 
-            for p in patterns 
-            if p in relevant_patterns
-        )
+        pattern_strength = mask_strength(mask & CONFIRM_MASKS.get(direction, 0))
         if pattern_strength > 0:
             signal["confidence"] = min(
-                95, 
+                95,
                 signal.get("confidence", 70) + int(pattern_strength * 20 * self.pattern_boost)
             )
-            signal["patterns"] = patterns
+            signal["pattern_mask"] = mask
             signal["pattern_strength"] = pattern_strength
         return signal
 
@@ -61,7 +56,7 @@ class BollingerStrategy:
             upper, lower, sma = self._calculate_bands()
             if upper is None:
                 return None
-            patterns = detect_patterns(list(self.candle_buffer)[-self.candle_lookback:])
+            mask = detect_pattern_mask(list(self.candle_buffer)[-self.candle_lookback:])
             signal = None
             band_width = upper - lower
 
@@ -73,7 +68,7 @@ class BollingerStrategy:
                     "distance_from_band": lower - current_close,
                     "band_width": band_width
                 }
-                signal = self._apply_pattern_boost(signal, patterns, "up")
+                signal = self._apply_pattern_boost(signal, mask, "up")
             elif current_close > upper:
                 signal = {
                     "signal": "down",
@@ -82,7 +77,7 @@ class BollingerStrategy:
                     "distance_from_band": current_close - upper,
                     "band_width": band_width
                 }
-                signal = self._apply_pattern_boost(signal, patterns, "down")
+                signal = self._apply_pattern_boost(signal, mask, "down")
             if signal:
                 signal.update({
                     "upper_band": upper,
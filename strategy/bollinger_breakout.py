@@ -2,7 +2,13 @@
 import numpy as np
 from collections import deque
 from config import CONFIG
-from strategy.candlestick_patterns import detect_patterns, PATTERN_STRENGTH
+from strategy.candlestick_patterns import detect_pattern_mask, pattern_mask, mask_strength
+
+# Adaptação: usa padrões de reversão do config
+CONFIRM_MASKS = {
+    "call": pattern_mask(CONFIG["candlestick_patterns"]["reversal_up"]),
+    "put": pattern_mask(CONFIG["candlestick_patterns"]["reversal_down"]),
+}
 
 class BollingerBreakoutStrategy:
     def __init__(self, config=None):
@@ -27,25 +33,14 @@ class BollingerBreakoutStrategy:
         lower = ma - (self.std_dev * std)
         return upper, lower, ma
 
-    def _apply_pattern_boost(self, signal, patterns):
-        if not signal or not patterns:
+    def _apply_pattern_boost(self, signal, mask):
+        if not signal or not mask:
             return signal
-        direction = signal["signal"]
-        # Adaptação: usa padrões de reversão do config
-        if direction == "call":
-            confirm_patterns = CONFIG["candlestick_patterns"]["reversal_up"]
-        elif direction == "put":
-            confirm_patterns = CONFIG["candlestick_patterns"]["reversal_down"]
-        else:
-            confirm_patterns = []
-        pattern_strength = 0
-        for pattern in patterns:
-            if pattern in confirm_patterns:
-                pattern_strength += PATTERN_STRENGTH.get(pattern, 0.1)
+        pattern_strength = mask_strength(mask & CONFIRM_MASKS.get(signal["signal"], 0))
         if pattern_strength > 0:
             boost = int(pattern_strength * 20 * self.pattern_boost)
             signal["confidence"] = min(95, signal["confidence"] + boost)
-            signal["patterns"] = patterns
+            signal["pattern_mask"] = mask
             signal["pattern_strength"] = pattern_strength
         return signal
 
@@ -61,7 +56,7 @@ class BollingerBreakoutStrategy:
             upper, lower, ma = self._calculate_bands()
             if upper is None:
                 return None
-            patterns = detect_patterns(list(self.candle_buffer)[-self.candle_lookback:])
+            mask = detect_pattern_mask(list(self.candle_buffer)[-self.candle_lookback:])
             signal = None
             band_width = upper - lower
             band_pct = band_width / ma if ma > 0 else 0
@@ -84,7 +79,7 @@ class BollingerBreakoutStrategy:
                     "distance": current_close - upper
                 }
             if signal:
-                signal = self._apply_pattern_boost(signal, patterns)
+                signal = self._apply_pattern_boost(signal, mask)
                 signal.update({
                     "upper_band": upper,
                     "lower_band": lower,
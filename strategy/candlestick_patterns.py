@@ -1,5 +1,11 @@
 # strategy/candlestick_patterns.py
 # Padrões de candlestick completos com todas as velas da lista fornecida
+# Modo escalar (detect_candlestick_patterns: últimos candles de uma lista) e modo
+# vetorizado (pattern_matrix: todos os candles de uma vez, sobre arrays NumPy).
+
+from collections import namedtuple
+
+import numpy as np
 
 # Dicionário de força/confiança dos padrões atualizado
 PATTERN_STRENGTH = {
@@ -584,6 +590,231 @@ def detect_candlestick_patterns(candles):
 
     return patterns
 
+# ============== MODO VETORIZADO ==============
+# Os mesmos predicados sobre arrays OHLC inteiros: o candle anterior é a visão
+# deslocada de 1 posição, o de antes de 2, etc. Linha i da matriz = resultado de
+# detect_candlestick_patterns(candles[:i + 1]), coluna j = PATTERN_ORDER[j].
+
+# Ordem de detect_candlestick_patterns (mesma ordem das listas de padrões)
+PATTERN_ORDER = (
+    "doji", "dragonfly_doji", "gravestone_doji", "long_legged_doji", "spinning_top", "hammer",
+    "hanging_man", "inverted_hammer", "shooting_star", "marubozu", "belt_hold_bullish", "belt_hold_bearish",
+    "bullish_engulfing", "bearish_engulfing", "piercing_line", "dark_cloud_cover", "tweezer_bottom",
+    "tweezer_top", "bullish_harami", "bearish_harami", "harami_cross", "kicker_bullish", "kicker_bearish",
+    "gap_up", "gap_down", "on_neckline", "separating_lines", "counterattack_bullish", "counterattack_bearish",
+    "morning_star", "evening_star", "three_white_soldiers", "three_black_crows", "three_inside_up",
+    "three_inside_down", "three_outside_up", "three_outside_down", "abandoned_baby_bullish",
+    "abandoned_baby_bearish", "upside_tasuki_gap", "downside_tasuki_gap", "unique_three_river_bottom",
+    "rising_three_methods", "falling_three_methods", "breakaway_bullish", "breakaway_bearish",
+)
+PATTERN_INDEX = {name: j for j, name in enumerate(PATTERN_ORDER)}
+STRENGTH_VECTOR = np.array([PATTERN_STRENGTH.get(p, 0.2) for p in PATTERN_ORDER])
+
+Bars = namedtuple("Bars", "open high low close")
+
+
+def _shift(arr, k):
+    out = np.full(len(arr), np.nan)
+    if k < len(arr):
+        out[k:] = arr[:len(arr) - k]
+    return out
+
+
+def _pmin(a, b):
+    """min(a, b) do Python: b só é escolhido se for estritamente menor."""
+    return np.where(b < a, b, a)
+
+
+def _pmax(a, b):
+    return np.where(b > a, b, a)
+
+
+def _full(c):
+    full = c.high - c.low
+    return np.where(full == 0, 1e-8, full)  # `full or 1e-8`
+
+
+def _v_doji(c, threshold=0.1):
+    return np.abs(c.close - c.open) / _full(c) < threshold
+
+
+def _v_wicks(c):
+    """(corpo, pavio superior, pavio inferior) com max/min(close, open) como no modo escalar."""
+    return (np.abs(c.close - c.open), c.high - _pmax(c.close, c.open), _pmin(c.close, c.open) - c.low)
+
+
+def _v_hammer(c):
+    body = np.abs(c.close - c.open)
+    lower_wick = _pmin(c.open, c.close) - c.low
+    upper_wick = c.high - _pmax(c.open, c.close)
+    return (body / _full(c) < 0.3) & (lower_wick > 2 * body) & (upper_wick < body)
+
+
+def _v_inverted_hammer(c):
+    body = np.abs(c.close - c.open)
+    upper_wick = c.high - _pmax(c.open, c.close)
+    lower_wick = _pmin(c.open, c.close) - c.low
+    return (body / _full(c) < 0.3) & (upper_wick > 2 * body) & (lower_wick < body)
+
+
+def _bull(c):
+    return c.close > c.open
+
+
+def _bear(c):
+    return c.close < c.open
+
+
+def _v_bullish_engulfing(candle, prev):
+    return _bull(candle) & _bear(prev) & (candle.open < prev.close) & (candle.close > prev.open)
+
+
+def _v_bearish_engulfing(candle, prev):
+    return _bear(candle) & _bull(prev) & (candle.open > prev.close) & (candle.close < prev.open)
+
+
+def _v_bullish_harami(candle, prev):
+    return _bear(prev) & _bull(candle) & (candle.open > prev.close) & (candle.close < prev.open)
+
+
+def _v_bearish_harami(candle, prev):
+    return _bull(prev) & _bear(candle) & (candle.open < prev.close) & (candle.close > prev.open)
+
+
+def _single_patterns(c):
+    body, upper_wick, lower_wick = _v_wicks(c)
+    full = _full(c)
+    doji = _v_doji(c)
+    hammer = _v_hammer(c)
+    inverted = _v_inverted_hammer(c)
+    ratio = body / full
+    up_body = c.close - c.open
+    down_body = c.open - c.close
+    return {
+        "doji": doji,
+        "dragonfly_doji": doji & (lower_wick > 2 * body) & (upper_wick < body),
+        "gravestone_doji": doji & (upper_wick > 2 * body) & (lower_wick < body),
+        "long_legged_doji": doji & (upper_wick > 0) & (lower_wick > 0),
+        "spinning_top": (0.2 < ratio) & (ratio < 0.5) & (upper_wick > 0) & (lower_wick > 0),
+        "hammer": hammer,
+        "hanging_man": hammer,
+        "inverted_hammer": inverted,
+        "shooting_star": inverted,
+        "marubozu": (upper_wick / full < 0.02) & (lower_wick / full < 0.02),
+        "belt_hold_bullish": (up_body > 0) & (c.open - c.low <= up_body * 0.1) & (c.high - c.close <= up_body * 0.1),
+        "belt_hold_bearish": (down_body > 0) & (c.high - c.open <= down_body * 0.1) & (c.close - c.low <= down_body * 0.1),
+    }
+
+
+def _two_patterns(candle, prev):
+    mid_prev = (prev.open + prev.close) / 2
+    bull_harami = _v_bullish_harami(candle, prev)
+    bear_harami = _v_bearish_harami(candle, prev)
+    return {
+        "bullish_engulfing": _v_bullish_engulfing(candle, prev),
+        "bearish_engulfing": _v_bearish_engulfing(candle, prev),
+        "piercing_line": _bear(prev) & (candle.open < prev.close) & (candle.close > mid_prev) & (candle.close < prev.open),
+        "dark_cloud_cover": _bull(prev) & (candle.open > prev.close) & (candle.close < mid_prev) & (candle.close > prev.open),
+        "tweezer_bottom": _bear(prev) & _bull(candle) & (np.abs(prev.low - candle.low) / (np.abs(prev.low) + 1e-8) < 0.1),
+        "tweezer_top": _bull(prev) & _bear(candle) & (np.abs(prev.high - candle.high) / (np.abs(prev.high) + 1e-8) < 0.1),
+        "bullish_harami": bull_harami,
+        "bearish_harami": bear_harami,
+        "harami_cross": _v_doji(candle) & (bull_harami | bear_harami),
+        "kicker_bullish": _bear(prev) & (candle.open > prev.close) & _bull(candle),
+        "kicker_bearish": _bull(prev) & (candle.open < prev.close) & _bear(candle),
+        "gap_up": candle.low > prev.high,
+        "gap_down": candle.high < prev.low,
+        "on_neckline": _bear(prev) & (candle.open < prev.close) & (np.abs(candle.close - prev.low) / prev.low < 0.05),
+        "separating_lines": (_bear(prev) & (candle.open == prev.open) & _bull(candle))
+                            | (_bull(prev) & (candle.open == prev.open) & _bear(candle)),
+        "counterattack_bullish": _bear(prev) & (candle.open < prev.close)
+                                 & (np.abs(candle.close - prev.open) < (prev.open - prev.close) * 0.1),
+        "counterattack_bearish": _bull(prev) & (candle.open > prev.close)
+                                 & (np.abs(candle.close - prev.open) < (prev.close - prev.open) * 0.1),
+    }
+
+
+def _three_patterns(prev2, prev1, last, threshold=0.001):
+    bull_engulf = _v_bullish_engulfing(prev1, prev2)
+    bear_engulf = _v_bearish_engulfing(prev1, prev2)
+    mid2 = (prev2.close + prev2.open) / 2
+    return {
+        "morning_star": _bear(prev2) & (np.abs(prev1.close - prev1.open) < (prev2.open - prev2.close) * 0.5)
+                        & _bull(last) & (last.close > mid2),
+        "evening_star": _bull(prev2) & (np.abs(prev1.close - prev1.open) < (prev2.close - prev2.open) * 0.5)
+                        & _bear(last) & (last.close < mid2),
+        "three_white_soldiers": _bull(prev2) & _bull(prev1) & _bull(last)
+                                & (prev2.close < prev1.open) & (prev1.close < last.open),
+        "three_black_crows": _bear(prev2) & _bear(prev1) & _bear(last)
+                             & (prev2.close > prev1.open) & (prev1.close > last.open),
+        "three_inside_up": bear_engulf & (last.close > prev1.close),
+        "three_inside_down": bull_engulf & (last.close < prev1.close),
+        "three_outside_up": bull_engulf & (last.close > prev1.close),
+        "three_outside_down": bear_engulf & (last.close < prev1.close),
+        "abandoned_baby_bullish": _bear(prev2) & _v_doji(prev1) & (prev1.low > prev2.high + threshold)
+                                  & (last.open > prev1.high + threshold) & _bull(last),
+        "abandoned_baby_bearish": _bull(prev2) & _v_doji(prev1) & (prev1.high < prev2.low - threshold)
+                                  & (last.open < prev1.low - threshold) & _bear(last),
+        "upside_tasuki_gap": _bull(prev2) & _bull(prev1) & (prev1.low > prev2.high) & _bear(last)
+                             & (last.open > prev1.close) & (last.close > prev1.open),
+        "downside_tasuki_gap": _bear(prev2) & _bear(prev1) & (prev1.high < prev2.low) & _bull(last)
+                               & (last.open < prev1.close) & (last.close < prev1.open),
+        "unique_three_river_bottom": _bear(prev2) & _v_hammer(prev1) & (prev1.close < prev2.close)
+                                     & (last.open > last.close) & (last.open < prev1.close) & (last.close > prev2.low),
+    }
+
+
+def _five_patterns(a, b, c, d, e):
+    return {
+        "rising_three_methods": _bull(a) & _bear(b) & _bear(c) & _bear(d) & _bull(e) & (e.close > a.close),
+        "falling_three_methods": _bear(a) & _bull(b) & _bull(c) & _bull(d) & _bear(e) & (e.close < a.close),
+        "breakaway_bullish": _bear(a) & _bear(b) & _bear(c) & _bull(d) & _bull(e) & (e.close > a.open),
+        "breakaway_bearish": _bull(a) & _bull(b) & _bull(c) & _bear(d) & _bear(e) & (e.close < a.open),
+    }
+
+
+def pattern_matrix(open_, high, low, close) -> np.ndarray:
+    """
+    Matriz booleana (n_candles, len(PATTERN_ORDER)): padrões detectados em cada candle,
+    idêntica a chamar detect_candlestick_patterns com os candles até ele.
+    """
+    arrays = [np.asarray(x, dtype=np.float64) for x in (open_, high, low, close)]
+    n = len(arrays[0])
+    views = [Bars(*(_shift(x, k) if k else x for x in arrays)) for k in range(5)]
+    position = np.arange(n)
+    found = {}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Padrões de k candles só existem a partir do k-ésimo candle
+        for need, patterns in ((1, _single_patterns(views[0])),
+                               (2, _two_patterns(views[0], views[1])),
+                               (3, _three_patterns(views[2], views[1], views[0])),
+                               (5, _five_patterns(views[4], views[3], views[2], views[1], views[0]))):
+            valid = position >= need - 1
+            for name, mask in patterns.items():
+                found[name] = mask & valid
+    matrix = np.empty((n, len(PATTERN_ORDER)), dtype=bool)
+    for j, name in enumerate(PATTERN_ORDER):
+        matrix[:, j] = found[name]
+    return matrix
+
+
+def pattern_strength_series(matrix: np.ndarray) -> np.ndarray:
+    """get_pattern_strength por linha (mesma ordem de soma do modo escalar)."""
+    strength = np.zeros(len(matrix))
+    for j in range(matrix.shape[1]):
+        strength += np.where(matrix[:, j], STRENGTH_VECTOR[j], 0.0)
+    return strength
+
+
+def pattern_lists(matrix: np.ndarray):
+    """Listas de nomes por linha, como as devolvidas por detect_candlestick_patterns."""
+    rows, cols = np.nonzero(matrix)  # ordem de linha, e dentro da linha ordem de coluna
+    names = [PATTERN_ORDER[j] for j in cols.tolist()]
+    ends = np.cumsum(np.bincount(rows, minlength=len(matrix))).tolist()
+    starts = [0] + ends[:-1]
+    return [names[start:end] for start, end in zip(starts, ends)]
+
+
 REVERSAL_UP = [
     "hammer", "bullish_engulfing", "piercing_line", "morning_star", "tweezer_bottom",
     "bullish_harami", "kicker_bullish", "three_inside_up", "three_outside_up", "gap_up",
@@ -601,5 +832,84 @@ TREND_DOWN = ["three_black_crows", "falling_three_methods", "downside_tasuki_gap
 NEUTRAL = ["doji", "dragonfly_doji", "gravestone_doji", "long_legged_doji", "spinning_top", "marubozu"]
 HYBRID = ["harami_cross"]
 
+# ============== BITMASK ==============
+# Padrões de um candle num inteiro de 64 bits: bit j = PATTERN_ORDER[j]. Grupos viram
+# máscaras, filtro por direção é um AND, contagem é popcount e a força é a soma do
+# vetor STRENGTH_VECTOR nos bits ligados. Nomes só são gerados para exibição.
+
+PATTERN_BITS = {name: 1 << j for j, name in enumerate(PATTERN_ORDER)}
+
+
+def pattern_mask(patterns) -> int:
+    """Lista de nomes -> máscara (nomes desconhecidos são ignorados); máscara pronta passa direto."""
+    if isinstance(patterns, (int, np.integer)):
+        return int(patterns)
+    if isinstance(patterns, (float, np.floating)):
+        return 0 if np.isnan(patterns) else int(patterns)
+    mask = 0
+    for name in patterns or ():
+        mask |= PATTERN_BITS.get(name, 0)
+    return mask
+
+
+def pattern_names(mask) -> list:
+    """Máscara -> nomes, na ordem de detect_candlestick_patterns."""
+    mask = int(mask)
+    names = []
+    while mask:
+        low = mask & -mask
+        names.append(PATTERN_ORDER[low.bit_length() - 1])
+        mask ^= low
+    return names
+
+
+def pattern_count(mask) -> int:
+    return int(mask).bit_count()
+
+
+def mask_strength(mask) -> float:
+    """get_pattern_strength dos padrões da máscara (mesma ordem de soma)."""
+    mask = int(mask)
+    strength = 0
+    while mask:
+        low = mask & -mask
+        strength += STRENGTH_VECTOR[low.bit_length() - 1]
+        mask ^= low
+    return float(strength)
+
+
+def detect_pattern_mask(candles) -> int:
+    """detect_candlestick_patterns já codificado em máscara."""
+    return pattern_mask(detect_candlestick_patterns(candles))
+
+
+def pack_patterns(matrix: np.ndarray) -> np.ndarray:
+    """Matriz de pattern_matrix -> uma máscara uint64 por candle."""
+    padded = np.zeros((len(matrix), 64), dtype=bool)
+    padded[:, :matrix.shape[1]] = matrix
+    return np.packbits(padded, axis=1, bitorder="little").view("<u8").ravel().astype(np.uint64)
+
+
+def unpack_patterns(masks) -> np.ndarray:
+    """Máscaras uint64 -> matriz booleana (n, len(PATTERN_ORDER))."""
+    masks = np.ascontiguousarray(masks, dtype="<u8")
+    bits = np.unpackbits(masks.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    return bits[:, :len(PATTERN_ORDER)].astype(bool)
+
+
+def popcount(masks) -> np.ndarray:
+    """Número de padrões por máscara (popcount vetorizado)."""
+    masks = np.ascontiguousarray(masks, dtype="<u8")
+    return np.unpackbits(masks.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1).astype(np.int8)
+
+
+REVERSAL_UP_MASK = pattern_mask(REVERSAL_UP)
+REVERSAL_DOWN_MASK = pattern_mask(REVERSAL_DOWN)
+TREND_UP_MASK = pattern_mask(TREND_UP)
+TREND_DOWN_MASK = pattern_mask(TREND_DOWN)
+NEUTRAL_MASK = pattern_mask(NEUTRAL)
+HYBRID_MASK = pattern_mask(HYBRID)
+
+
 # Alias para compatibilidade
 detect_patterns = detect_candlestick_patterns
@@ -1,6 +1,10 @@
 #serve para importar os dados do candlestick_patterns.py
 from config import CONFIG
-from strategy.candlestick_patterns import detect_patterns
+from strategy.candlestick_patterns import detect_pattern_mask, pattern_mask, PATTERN_ORDER
+
+UP_MASK = pattern_mask(CONFIG["candlestick_patterns"]["reversal_up"])
+DOWN_MASK = pattern_mask(CONFIG["candlestick_patterns"]["reversal_down"])
+NEUTRAL_MASK = pattern_mask(CONFIG["candlestick_patterns"]["neutral"])
 
 class CandlestickStrategy:
     def generate_signal(self, data):
@@ -8,12 +12,14 @@ class CandlestickStrategy:
         if len(candles) < 3:
             return None
 
-        patterns = detect_patterns(candles)
-        for pattern in reversed(patterns):
-            if pattern in CONFIG["candlestick_patterns"]["reversal_up"]:
-                return {"signal": "up", "pattern": pattern}
-            if pattern in CONFIG["candlestick_patterns"]["reversal_down"]:
-                return {"signal": "down", "pattern": pattern}
-            if pattern in CONFIG["candlestick_patterns"]["neutral"]:
-                return {"signal": "neutral", "pattern": pattern}
-        return None
+        # Último padrão detectado (bit mais alto) entre os grupos de interesse
+        hit = detect_pattern_mask(candles) & (UP_MASK | DOWN_MASK | NEUTRAL_MASK)
+        if not hit:
+            return None
+        bit = 1 << (hit.bit_length() - 1)
+        pattern = PATTERN_ORDER[hit.bit_length() - 1]
+        if bit & UP_MASK:
+            return {"signal": "up", "pattern": pattern}
+        if bit & DOWN_MASK:
+            return {"signal": "down", "pattern": pattern}
+        return {"signal": "neutral", "pattern": pattern}
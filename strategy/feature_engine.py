@@ -0,0 +1,550 @@
+# strategy/feature_engine.py
+# Motor único de features para treino, predição e estratégias. Cada feature é
+# registrada com nome, colunas que produz, entradas (OHLCV ou colunas de outras
+# features), lookback e dtype. Dada a lista `features` salva no modelo, só os
+# grupos necessários (e suas dependências) são calculados.
+#
+# lookback = candles até a primeira linha com todas as colunas do grupo válidas
+# (inclusive estados que comparam com o candle anterior); None = depende da janela inteira
+# (acumulados e resumos da janela: fibonacci, VWAP, OBV, market profile, elliott...).
+# recursive = suavização recursiva (EMA/Wilder, supertrend): o valor válido existe a
+# partir do lookback, mas continua dependendo de todo o histórico anterior.
+#
+# Modo inferência (feature_vector): só a última linha, com cada grupo calculado nas
+# últimas `lookback` linhas; recursivos e de janela inteira usam a janela toda.
+
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from strategy.candlestick_patterns import PATTERN_INDEX, pattern_matrix, pattern_strength_series, pack_patterns, popcount
+from strategy.indicator_globe import TechnicalIndicators, INDICATOR_COLUMNS, CONTEXT_COLUMNS
+from data.fundamental_data import get_cot_feature, get_macro_feature, get_sentiment_feature
+from utils.features_extra import calc_obv, calc_spread
+from utils.aggregation import resample_candles
+
+logger = logging.getLogger(__name__)
+
+OHLCV = ("open", "high", "low", "close", "volume")
+FUNDAMENTAL_TIMEFRAMES = ("h4", "d1")
+
+PATTERN_NAMES = (
+    "bullish_engulfing", "bearish_engulfing", "hammer", "hanging_man", "inverted_hammer", "shooting_star",
+    "morning_star", "evening_star", "piercing_line", "dark_cloud_cover", "three_white_soldiers",
+    "three_black_crows", "abandoned_baby_bullish", "abandoned_baby_bearish", "kicker_bullish", "kicker_bearish",
+    "rising_three_methods", "falling_three_methods", "upside_tasuki_gap", "downside_tasuki_gap",
+    "separating_lines", "doji", "dragonfly_doji", "gravestone_doji", "long_legged_doji", "spinning_top",
+    "marubozu", "bullish_harami", "bearish_harami", "harami_cross", "tweezer_bottom", "tweezer_top",
+    "three_inside_up", "three_inside_down", "three_outside_up", "three_outside_down", "gap_up",
+    "gap_down", "on_neckline", "belt_hold_bullish", "belt_hold_bearish", "counterattack_bullish",
+    "counterattack_bearish", "unique_three_river_bottom", "breakaway_bullish", "breakaway_bearish",
+)
+PATTERN_WINDOW = 5  # padrões de até 5 candles
+
+
+@dataclass(frozen=True)
+class Feature:
+    """Grupo de colunas calculado de uma vez (ex.: 'macd' -> macd_line, macd_histogram...)."""
+    name: str
+    columns: Tuple[str, ...]
+    inputs: Tuple[str, ...]
+    lookback: Optional[int]
+    dtypes: Dict[str, str]  # coluna -> float64 | int8 | uint64 | object
+    compute: Callable[["FeatureFrame"], Dict[str, object]]
+    recursive: bool = False
+
+
+FEATURES: Dict[str, Feature] = {}   # em ordem de registro (dependências antes)
+COLUMN_OWNERS: Dict[str, str] = {}  # coluna -> nome da feature que a produz
+
+
+def register(name: str, columns: Iterable[str], inputs: Iterable[str] = ("close",),
+             lookback: Optional[int] = 1, dtype: str = "float64", dtypes: Optional[Dict[str, str]] = None,
+             recursive: bool = False):
+    """
+    Decorator: registra `fn(frame) -> {coluna: valores}` como feature. `dtype` vale
+    para todas as colunas, exceto as sobrescritas em `dtypes`.
+    """
+    def decorator(fn):
+        columns_ = tuple(columns)
+        column_dtypes = {c: (dtypes or {}).get(c, dtype) for c in columns_}
+        feature = Feature(name, columns_, tuple(inputs), lookback, column_dtypes, fn, recursive)
+        for dep in feature.inputs:
+            if dep not in OHLCV and dep not in COLUMN_OWNERS:
+                raise ValueError(f"Feature {name}: entrada {dep} não registrada")
+        for column in feature.columns:
+            if column in COLUMN_OWNERS:
+                raise ValueError(f"Coluna {column} já produzida por {COLUMN_OWNERS[column]}")
+            COLUMN_OWNERS[column] = name
+        FEATURES[name] = feature
+        return fn
+    return decorator
+
+
+class FeatureFrame:
+    """Entradas de um cálculo: séries OHLCV (índice 0..n-1), colunas já calculadas e contexto."""
+
+    def __init__(self, df: pd.DataFrame, symbol: Optional[str], timeframe: Optional[str]):
+        self.ohlcv = df[list(OHLCV)].reset_index(drop=True)
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.n = len(df)
+        self.computed: Dict[str, object] = {}
+        self._tails: Dict[int, pd.DataFrame] = {}
+
+    def __getitem__(self, column: str) -> pd.Series:
+        if column in self.computed:
+            return pd.Series(self.computed[column])
+        return self.ohlcv[column]
+
+    def tail(self, rows: int) -> "FeatureFrame":
+        """Últimas `rows` linhas das entradas e das colunas já calculadas (modo inferência)."""
+        if rows >= self.n:
+            return self
+        if rows not in self._tails:
+            self._tails[rows] = self.ohlcv.iloc[-rows:].reset_index(drop=True)
+        frame = FeatureFrame.__new__(FeatureFrame)
+        frame.ohlcv, frame.symbol, frame.timeframe, frame.n = self._tails[rows], self.symbol, self.timeframe, rows
+        frame.computed = {column: values[-rows:] for column, values in self.computed.items()}
+        frame._tails = {}
+        return frame
+
+
+# ============== REGISTRO ==============
+
+HLC = ("high", "low", "close")
+
+# TechnicalIndicators.*_series: grupo -> (entradas, lookback, chaves de estado em int8)
+# Estados que comparam com o candle anterior (trend/cross/momentum/acceleration) pedem
+# um candle a mais que o valor principal: stochastic 14+3-1 de %D (+1 do cross), cci
+# 20+1, williams_r 14+1, momentum 10+1 (+1 da aceleração), roc 12+1 (+1 do momentum).
+# Com um a menos, required_lookback subestima a janela e o último estado sai sem o
+# valor anterior.
+INDICATOR_SPECS = {
+    'rsi': (("close",), 14, ('zone', 'trend')),
+    'macd': (("close",), 34, ('momentum',)),
+    'bollinger': (("close",), 20, ('position',)),
+    'atr': (HLC, 14, ('trend',)),
+    'adx': (HLC, 28, ('strength',)),
+    'ichimoku': (HLC, 52, ('cloud_position',)),
+    'fibonacci': (("high", "low"), None, ()),
+    'supertrend': (HLC, 7, ('direction', 'changed')),
+    'stochastic': (HLC, 17, ('state', 'cross')),
+    'cci': (HLC, 21, ('state', 'momentum', 'strength')),
+    'williams_r': (HLC, 15, ('state', 'trend')),
+    'parabolic_sar': (("high", "low"), None, ('trend', 'acceleration')),
+    'momentum': (("close",), 12, ('trend', 'acceleration', 'strength')),
+    'roc': (("close",), 14, ('trend', 'momentum', 'extreme')),
+    'dmi': (HLC, 28, ('trend', 'crossover')),
+    'vwap': (HLC + ("volume",), None, ('relation', 'trend')),
+    'envelope': (("close",), 20, ('position',)),
+}
+# Grupos com média exponencial/Wilder ou estado de tendência carregado candle a candle
+RECURSIVE_SERIES = frozenset({'rsi', 'macd', 'atr', 'adx', 'supertrend', 'dmi', 'trend_context'})
+CONTEXT_SPECS = {
+    'moving_averages': (("close",), 50, ('rating',)),
+    'oscillators': (("rsi_value", "macd_histogram"), 1, ('rating',)),
+    'volatility': (("close",), 120, ('level',)),
+    'volume_status': (("volume",), 20, ('status',)),
+    'sentiment': (("close",), 15, ('sentiment',)),
+    'trend_context': (("close",), 34, ('trend_strength', 'suggestion')),
+}
+
+
+def _series_group(group: str, names: Dict[str, str], inputs: Tuple[str, ...]):
+    method = getattr(TechnicalIndicators, f"{group}_series")
+
+    def compute(frame):
+        values = method(*(frame[c] for c in inputs))
+        return {column: values[key] for key, column in names.items()}
+    return compute
+
+
+def _register_series(specs: Dict, columns: Dict[str, Dict[str, str]]):
+    for group, (inputs, lookback, states) in specs.items():
+        names = columns[group]
+        register(group, names.values(), inputs, lookback, dtypes={names[key]: "int8" for key in states},
+                 recursive=group in RECURSIVE_SERIES)(_series_group(group, names, inputs))
+
+
+_register_series(INDICATOR_SPECS, INDICATOR_COLUMNS)
+
+
+@register("market_profile", ("market_poc", "market_va_low", "market_va_high"), ("close", "volume"), None)
+def _market_profile(frame):
+    # Resumo da janela (histograma de volume): mesmo valor em todas as linhas
+    profile = TechnicalIndicators.get_market_profile(frame["close"], frame["volume"])
+    return {
+        "market_poc": np.full(frame.n, profile["poc"]),
+        "market_va_low": np.full(frame.n, profile["value_area"]["low"]),
+        "market_va_high": np.full(frame.n, profile["value_area"]["high"]),
+    }
+
+
+_register_series(CONTEXT_SPECS, CONTEXT_COLUMNS)
+
+
+@register("elliott", ("elliott_peaks", "elliott_troughs", "elliott_phase", "elliott_wave_counts"),
+          lookback=None, dtype="object")
+def _elliott(frame):
+    elliott = TechnicalIndicators.calc_elliott_wave(frame["close"])
+    return {
+        "elliott_peaks": str(elliott.get("peaks", [])),
+        "elliott_troughs": str(elliott.get("troughs", [])),
+        "elliott_phase": elliott.get("phase", ""),
+        "elliott_wave_counts": str(elliott.get("wave_counts", {})),
+    }
+
+
+@register("zigzag", ("zigzag_peaks", "zigzag_troughs", "zigzag_trend", "zigzag_pattern", "zigzag_retracements"),
+          lookback=None, dtype="object")
+def _zigzag(frame):
+    zz = TechnicalIndicators.calc_zigzag(frame["close"])
+    return {
+        "zigzag_peaks": str(zz.get("peaks", [])),
+        "zigzag_troughs": str(zz.get("troughs", [])),
+        "zigzag_trend": zz.get("trend", ""),
+        "zigzag_pattern": zz.get("pattern", ""),
+        "zigzag_retracements": str(zz.get("retracements", [])),
+    }
+
+
+@register("support_resistance", ("support_lvls", "resistance_lvls", "price_position"),
+          lookback=None, dtype="object")
+def _support_resistance(frame):
+    sr = TechnicalIndicators.get_support_resistance(frame["close"])
+    return {
+        "support_lvls": str(sr.get("support", [])),
+        "resistance_lvls": str(sr.get("resistance", [])),
+        "price_position": sr.get("current_position", ""),
+    }
+
+
+@register("candlestick_patterns", PATTERN_NAMES + ("pattern_strength", "patterns"), OHLCV, PATTERN_WINDOW,
+          dtypes={**dict.fromkeys(PATTERN_NAMES, "int8"), "patterns": "uint64"})
+def _candlestick_patterns(frame):
+    ohlc = frame.ohlcv
+    matrix = pattern_matrix(ohlc["open"], ohlc["high"], ohlc["low"], ohlc["close"])
+    flags = {name: matrix[:, PATTERN_INDEX[name]] for name in PATTERN_NAMES}
+    # patterns: máscara uint64 por candle (bit j = PATTERN_ORDER[j])
+    return {**flags, "pattern_strength": pattern_strength_series(matrix), "patterns": pack_patterns(matrix)}
+
+
+@register("returns", ("returns",), lookback=2)
+def _returns(frame):
+    return {"returns": frame["close"].pct_change()}
+
+
+@register("volatility_std", ("volatility",), ("returns",), 21)
+def _volatility_std(frame):
+    return {"volatility": frame["returns"].rolling(20).std()}
+
+
+for _period in (5, 10, 20, 50):
+    register(f"sma_{_period}", (f"sma_{_period}",), lookback=_period)(
+        lambda frame, p=_period: {f"sma_{p}": frame["close"].rolling(p).mean()})
+for _period in (12, 26):
+    register(f"ema_{_period}", (f"ema_{_period}",), lookback=_period, recursive=True)(
+        lambda frame, p=_period: {f"ema_{p}": frame["close"].ewm(span=p, adjust=False).mean()})
+
+
+@register("obv", ("obv",), ("close", "volume"), None)
+def _obv(frame):
+    return {"obv": calc_obv(frame.ohlcv)}
+
+
+@register("spread", ("spread",), ("high", "low"))
+def _spread(frame):
+    return {"spread": calc_spread(frame.ohlcv)}
+
+
+@register("variation", ("variation",), lookback=2)
+def _variation(frame):
+    close = frame["close"]
+    return {"variation": ((close - close.shift(1)) / close.shift(1)) * 100}
+
+
+def _fundamental(column: str, getter: Callable[[str], float]):
+    def compute(frame):
+        # Só H4/D1 têm dados fundamentalistas com granularidade útil
+        if frame.timeframe and frame.timeframe.lower() in FUNDAMENTAL_TIMEFRAMES:
+            return {column: np.full(frame.n, getter(frame.symbol))}
+        return {column: np.zeros(frame.n)}
+    return compute
+
+
+for _column, _getter in (("cot", get_cot_feature), ("macro", get_macro_feature),
+                         ("sentiment_news", get_sentiment_feature)):
+    register(_column, (_column,), (), 0)(_fundamental(_column, _getter))
+
+
+def _crossed_up(a: pd.Series, b: pd.Series) -> np.ndarray:
+    return ((a > b) & (a.shift(1) <= b.shift(1))).to_numpy().astype(np.int8)
+
+
+@register("diff_sma_5_20", ("diff_sma_5_20",), ("sma_5", "sma_20"), 20)
+def _diff_sma(frame):
+    return {"diff_sma_5_20": frame["sma_5"] - frame["sma_20"]}
+
+
+@register("diff_ema_12_26", ("diff_ema_12_26",), ("ema_12", "ema_26"), 26)
+def _diff_ema(frame):
+    return {"diff_ema_12_26": frame["ema_12"] - frame["ema_26"]}
+
+
+@register("cross_sma_5_20", ("cross_sma_5_20",), ("sma_5", "sma_20"), 21, "int8")
+def _cross_sma(frame):
+    return {"cross_sma_5_20": _crossed_up(frame["sma_5"], frame["sma_20"])}
+
+
+@register("cross_ema_12_26", ("cross_ema_12_26",), ("ema_12", "ema_26"), 27, "int8")
+def _cross_ema(frame):
+    return {"cross_ema_12_26": _crossed_up(frame["ema_12"], frame["ema_26"])}
+
+
+@register("macd_cross", ("macd_cross",), ("macd_line", "macd_signal_line"), 35, "int8")
+def _macd_cross(frame):
+    return {"macd_cross": _crossed_up(frame["macd_line"], frame["macd_signal_line"])}
+
+
+@register("num_patterns", ("num_patterns", "rare_pattern_event"), ("patterns",), PATTERN_WINDOW, "int8")
+def _num_patterns(frame):
+    # Eventos raros: 3+ padrões de vela no mesmo candle
+    counts = popcount(frame.computed["patterns"])
+    return {"num_patterns": counts, "rare_pattern_event": (counts >= 3).astype(np.int8)}
+
+
+@register("true_range", ("true_range",), ("high", "low", "close"), 1)
+def _true_range(frame):
+    high, low, prev_close = frame["high"], frame["low"], frame["close"].shift()
+    ranges = pd.concat([high - low, (high - prev_close).abs(), (low - prev_close).abs()], axis=1)
+    return {"true_range": ranges.max(axis=1)}
+
+
+for _period in (7, 14, 21, 28):
+    register(f"atr_{_period}", (f"atr_{_period}", f"atr_{_period}_pct"), ("true_range", "close"), _period)(
+        lambda frame, p=_period: (lambda atr: {f"atr_{p}": atr, f"atr_{p}_pct": atr / frame["close"]})(
+            frame["true_range"].rolling(p).mean()))
+
+
+def _bollinger_bands(period: int):
+    def compute(frame):
+        close = frame["close"]
+        sma = close.rolling(period).mean()
+        std = close.rolling(period).std()
+        upper, lower = sma + 2 * std, sma - 2 * std
+        return {
+            f"bb_upper_{period}": upper,
+            f"bb_lower_{period}": lower,
+            f"bb_width_{period}": (upper - lower) / sma,
+            f"bb_pct_{period}": (close - lower) / (upper - lower),
+        }
+    return compute
+
+
+for _period in (10, 20, 50):
+    register(f"bb_{_period}", tuple(f"bb_{k}_{_period}" for k in ("upper", "lower", "width", "pct")),
+             lookback=_period)(_bollinger_bands(_period))
+
+
+# Lista de treino (e fallback da predição para modelos sem 'features' salvo)
+DEFAULT_FEATURES: List[str] = [
+    'open', 'high', 'low', 'close', 'volume',
+    'returns', 'volatility',
+    'sma_5', 'sma_10', 'sma_20', 'sma_50',
+    'ema_12', 'ema_26',
+    'rsi_value', 'rsi_zone', 'rsi_trend',
+    'macd_histogram', 'macd_line', 'macd_signal_line', 'macd_momentum',
+    'bb_upper', 'bb_lower', 'bb_width', 'bb_percent_b', 'bb_position',
+    'atr_value', 'atr_ratio', 'atr_trend',
+    'adx_value', 'adx_di_plus', 'adx_di_minus', 'adx_strength',
+    'ichimoku_conversion', 'ichimoku_base', 'ichimoku_leading_a', 'ichimoku_leading_b', 'ichimoku_cloud_position',
+    'fibo_23_6', 'fibo_38_2', 'fibo_50', 'fibo_61_8',
+    'supertrend_value', 'supertrend_direction', 'supertrend_changed',
+    'market_poc', 'market_va_low', 'market_va_high',
+    'stoch_k', 'stoch_d', 'stoch_state', 'stoch_cross',
+    'cci_value', 'cci_state', 'cci_momentum', 'cci_strength',
+    'williamsr_value', 'williamsr_state', 'williamsr_trend',
+    'psar_value', 'psar_trend', 'psar_acceleration',
+    'momentum_value', 'momentum_trend', 'momentum_acceleration', 'momentum_strength',
+    'roc_value', 'roc_trend', 'roc_momentum', 'roc_extreme',
+    'dmi_adx', 'dmi_plus_di', 'dmi_minus_di', 'dmi_trend', 'dmi_crossover',
+    'vwap_value', 'vwap_relation', 'vwap_spread', 'vwap_trend',
+    'envelope_upper', 'envelope_lower', 'envelope_center', 'envelope_position', 'envelope_band_width', 'envelope_percent_center',
+    'elliott_peaks', 'elliott_troughs', 'elliott_phase', 'elliott_wave_counts',
+    'zigzag_peaks', 'zigzag_troughs', 'zigzag_trend', 'zigzag_pattern', 'zigzag_retracements',
+    'ma_rating', 'osc_rating', 'volatility_level', 'volume_status', 'sentiment',
+    'trend_score', 'trend_strength', 'trend_suggestion', 'support_lvls', 'resistance_lvls', 'price_position',
+    'obv', 'spread', 'variation',
+    'cot', 'macro', 'sentiment_news',
+    "diff_sma_5_20", "diff_ema_12_26", "cross_sma_5_20", "cross_ema_12_26", "macd_cross",
+    "num_patterns", "rare_pattern_event",
+    "atr_7", "atr_14", "atr_21", "atr_28", "atr_7_pct", "atr_14_pct", "atr_21_pct", "atr_28_pct",
+    "bb_upper_10", "bb_lower_10", "bb_width_10", "bb_pct_10",
+    "bb_upper_20", "bb_lower_20", "bb_width_20", "bb_pct_20",
+    "bb_upper_50", "bb_lower_50", "bb_width_50", "bb_pct_50",
+    *PATTERN_NAMES,
+    # "patterns" (máscara uint64) fica fora: como número para o modelo não significa nada
+    # e o cast para float32 perde bits; os flags acima já trazem a mesma informação
+    "pattern_strength",
+]
+
+
+# ============== RESOLUÇÃO E CÁLCULO ==============
+
+def resolve(features: Iterable[str]) -> List[str]:
+    """Nomes das features (grupos) necessárias para as colunas pedidas, em ordem de cálculo."""
+    needed = set()
+    stack = [c for c in features if c not in OHLCV]
+    while stack:
+        column = stack.pop()
+        owner = COLUMN_OWNERS.get(column)
+        if owner is None:
+            raise KeyError(f"Feature desconhecida: {column}")
+        if owner not in needed:
+            needed.add(owner)
+            stack.extend(c for c in FEATURES[owner].inputs if c not in OHLCV)
+    return [name for name in FEATURES if name in needed]
+
+
+def required_lookback(features: Iterable[str] = DEFAULT_FEATURES) -> Optional[int]:
+    """Maior lookback entre as features necessárias; None se alguma depende da janela inteira."""
+    lookbacks = [FEATURES[name].lookback for name in resolve(features)]
+    if any(lb is None for lb in lookbacks):
+        return None
+    return max(lookbacks, default=0)
+
+
+def inference_rows(features: Iterable[str] = DEFAULT_FEATURES) -> Optional[int]:
+    """
+    Candles finais que determinam a última linha das features; None se alguma depende
+    da série inteira (janela inteira ou recursiva).
+    """
+    names = resolve(features)
+    if any(FEATURES[name].lookback is None or FEATURES[name].recursive for name in names):
+        return None
+    return max([FEATURES[name].lookback for name in names], default=1)
+
+
+def _check_ohlcv(df: pd.DataFrame):
+    for col in OHLCV:
+        if col not in df.columns:
+            raise ValueError(f"Coluna {col} ausente nos candles")
+
+
+def _compute(frame: FeatureFrame, feature: Feature) -> Dict[str, np.ndarray]:
+    """Calcula um grupo e converte cada coluna para o dtype declarado."""
+    out = {}
+    for column, values in feature.compute(frame).items():
+        dtype = feature.dtypes[column]
+        if dtype == "object":
+            # Resumos da janela (texto) vêm escalares: repetidos em todas as linhas
+            if values is None or isinstance(values, str):
+                values = np.full(frame.n, values, dtype=object)
+            else:
+                values = pd.Series(list(values), dtype=object).to_numpy()
+        else:
+            values = np.asarray(values, dtype=dtype)
+        out[column] = values
+    return out
+
+
+def build_features(df: pd.DataFrame, features: Optional[Iterable[str]] = None,
+                   symbol: Optional[str] = None, timeframe: Optional[str] = None) -> pd.DataFrame:
+    """
+    Acrescenta ao DataFrame de candles as colunas pedidas (todas de DEFAULT_FEATURES se
+    None), calculando só os grupos necessários. Colunas intermediárias não pedidas ficam
+    de fora. Aplica ffill + dropna como os builders antigos.
+    """
+    _check_ohlcv(df)
+    wanted = list(dict.fromkeys(DEFAULT_FEATURES if features is None else features))
+    frame = FeatureFrame(df, symbol, timeframe)
+    for name in resolve(wanted):
+        frame.computed.update(_compute(frame, FEATURES[name]))
+
+    extra = [c for c in wanted if c not in OHLCV and c not in df.columns]
+    out = pd.DataFrame({c: frame.computed[c] for c in extra}, index=df.index) if extra else None
+    df = pd.concat([df, out], axis=1) if out is not None else df.copy()
+    df.ffill(inplace=True)
+    df.dropna(inplace=True)
+    return df
+
+
+def _tail_spans(names: List[str], n: int) -> Dict[str, int]:
+    """
+    Linhas finais em que cada grupo precisa ser calculado para valer na última linha.
+    O lookback declarado já inclui o das entradas, então uma dependência é calculada
+    na mesma janela de quem a consome (ou na sua, se maior).
+    """
+    spans: Dict[str, int] = {}
+    for name in reversed(names):  # dependentes antes das dependências
+        feature = FEATURES[name]
+        whole = feature.lookback is None or feature.recursive
+        span = max(spans.get(name, 1), n if whole else min(n, feature.lookback))
+        spans[name] = span
+        for column in feature.inputs:
+            owner = COLUMN_OWNERS.get(column)
+            if owner is not None:
+                spans[owner] = max(spans.get(owner, 1), span)
+    return spans
+
+
+def _last_valid(values: np.ndarray) -> Optional[float]:
+    """Último valor não nulo como float (ffill da última linha); texto vira NaN."""
+    valid = np.flatnonzero(~pd.isna(values))
+    if not len(valid):
+        return None
+    value = values[valid[-1]]
+    if isinstance(value, str):
+        return float(pd.to_numeric(value, errors="coerce"))
+    return float(value)
+
+
+def feature_vector(df: pd.DataFrame, features: Iterable[str],
+                   symbol: Optional[str] = None, timeframe: Optional[str] = None) -> Optional[np.ndarray]:
+    """
+    Modo inferência: a última linha de build_features(df, features) como vetor float32
+    contíguo, na ordem de `features`. Cada grupo roda só nas linhas finais de que precisa
+    (_tail_spans); o ffill fica limitado a essa janela. None se alguma coluna não tiver
+    valor válido (caso em que o dropna do build_features esvaziaria o DataFrame).
+    """
+    _check_ohlcv(df)
+    features = list(features)
+    frame = FeatureFrame(df, symbol, timeframe)
+    if not frame.n:
+        return None
+    names = resolve(features)
+    spans = _tail_spans(names, frame.n)
+    for name in names:
+        frame.computed.update(_compute(frame.tail(spans[name]), FEATURES[name]))
+
+    vector = np.empty(len(features), dtype=np.float32)
+    for i, column in enumerate(features):
+        values = frame.computed[column] if column in frame.computed else frame.ohlcv[column].to_numpy()
+        value = _last_valid(values)
+        if value is None:
+            return None
+        vector[i] = value
+    return vector
+
+
+def _model_candles(df: pd.DataFrame, timeframe: Optional[str]) -> pd.DataFrame:
+    # S1 é agrupado em 10s antes das features
+    if timeframe and timeframe.lower() in ['s1', '1s']:
+        return resample_candles(df, freq='10S')
+    return df
+
+
+def build_model_features(df: pd.DataFrame, features: Optional[Iterable[str]] = None,
+                         symbol: Optional[str] = None, timeframe: Optional[str] = None) -> pd.DataFrame:
+    """Mesmo cálculo no treino e na predição: S1 é agrupado em 10s antes das features."""
+    return build_features(_model_candles(df, timeframe), features, symbol, timeframe)
+
+
+def build_model_vector(df: pd.DataFrame, features: Iterable[str],
+                       symbol: Optional[str] = None, timeframe: Optional[str] = None) -> Optional[np.ndarray]:
+    """feature_vector com o mesmo pré-processamento de build_model_features."""
+    return feature_vector(_model_candles(df, timeframe), features, symbol, timeframe)
@@ -0,0 +1,755 @@
+import pandas as pd
+import numpy as np
+import ta
+from typing import Tuple, Dict, Union, List
+
+# ============== CÓDIGOS DOS ESTADOS CATEGÓRICOS (int8) ==============
+# Os métodos *_series devolvem os estados (zona, tendência, cruzamento...) como int8;
+# os calc_* (escalares) traduzem o último código de volta para o rótulo de sempre.
+# Os valores batem com os mapeamentos numéricos usados nos builders de features.
+
+ZONE = {'oversold': -1, 'neutral': 0, 'overbought': 1}
+UP_DOWN = {'down': -1, 'up': 1}
+RISING = {'falling': -1, 'rising': 1}
+BULL_BEAR = {'bearish': -1, 'bullish': 1}
+CROSS = {'bearish': -1, 'none': 0, 'bullish': 1}
+STRENGTH = {'weak': 0, 'strong': 1}
+SQUEEZE = {'normal': 0, 'squeeze': 1}
+ABOVE_BELOW = {'below': -1, 'above': 1}
+WITHIN = {'below': -1, 'within': 0, 'above': 1}
+BOOL = {False: 0, True: 1}
+ACCELERATION = {'decreasing': -1, 'steady': 0, 'increasing': 1}
+MOM_ACCELERATION = {'decreasing': -1, 'increasing': 1}
+ROC_MOMENTUM = {'decelerating': -1, 'accelerating': 1}
+EXTREME = {'low': -1, 'normal': 0, 'high': 1}
+CCI_STRENGTH = {'weak': 0, 'moderate': 1, 'strong': 2, 'extreme': 3}
+MOM_STRENGTH = {'weak': 0, 'moderate': 1, 'strong': 2}
+DMI_TREND = {'strong_down': -2, 'weak_down': -1, 'weak_up': 1, 'strong_up': 2}
+RATING = {'sell': -1, 'neutral': 0, 'buy': 1}
+VOLATILITY = {'Low': 0, 'High': 1}
+VOLUME_STATUS = {'Low': 0, 'Normal': 1, 'Spiked': 2}
+SENTIMENT = {'Pessimistic': -1, 'Neutral': 0, 'Optimistic': 1}
+TREND_STRENGTH = {'bearish': -1, 'weak': 0, 'moderate': 1, 'strong': 2}
+SUGGESTION = {'sell': -2, 'hold_bearish': -1, 'neutral': 0, 'hold_bullish': 1, 'buy': 2}
+
+
+# Colunas dos builders de features: grupo (*_series) -> {chave do grupo: nome da coluna}.
+# Compartilhado com o motor incremental (strategy.indicator_stream).
+INDICATOR_COLUMNS = {
+    'rsi': {'value': 'rsi_value', 'zone': 'rsi_zone', 'trend': 'rsi_trend'},
+    'macd': {'histogram': 'macd_histogram', 'macd_line': 'macd_line',
+             'signal_line': 'macd_signal_line', 'momentum': 'macd_momentum'},
+    'bollinger': {k: f'bb_{k}' for k in ('upper', 'lower', 'width', 'percent_b', 'position')},
+    'atr': {k: f'atr_{k}' for k in ('value', 'ratio', 'trend')},
+    'adx': {'adx': 'adx_value', 'di_plus': 'adx_di_plus', 'di_minus': 'adx_di_minus', 'strength': 'adx_strength'},
+    'ichimoku': {k: f'ichimoku_{k}' for k in ('conversion', 'base', 'leading_a', 'leading_b', 'cloud_position')},
+    'fibonacci': {'23.6%': 'fibo_23_6', '38.2%': 'fibo_38_2', '50%': 'fibo_50', '61.8%': 'fibo_61_8'},
+    'supertrend': {k: f'supertrend_{k}' for k in ('value', 'direction', 'changed')},
+    'stochastic': {'k_line': 'stoch_k', 'd_line': 'stoch_d', 'state': 'stoch_state', 'cross': 'stoch_cross'},
+    'cci': {k: f'cci_{k}' for k in ('value', 'state', 'momentum', 'strength')},
+    'williams_r': {k: f'williamsr_{k}' for k in ('value', 'state', 'trend')},
+    'parabolic_sar': {k: f'psar_{k}' for k in ('value', 'trend', 'acceleration')},
+    'momentum': {k: f'momentum_{k}' for k in ('value', 'trend', 'acceleration', 'strength')},
+    'roc': {k: f'roc_{k}' for k in ('value', 'trend', 'momentum', 'extreme')},
+    'dmi': {'adx': 'dmi_adx', 'plus_di': 'dmi_plus_di', 'minus_di': 'dmi_minus_di',
+            'trend': 'dmi_trend', 'crossover': 'dmi_crossover'},
+    'vwap': {k: f'vwap_{k}' for k in ('value', 'relation', 'spread', 'trend')},
+    'envelope': {'upper': 'envelope_upper', 'lower': 'envelope_lower', 'center': 'envelope_center',
+                 'position': 'envelope_position', 'band_width': 'envelope_band_width',
+                 'percent_from_center': 'envelope_percent_center'},
+}
+CONTEXT_COLUMNS = {
+    'moving_averages': {'rating': 'ma_rating'},
+    'oscillators': {'rating': 'osc_rating'},
+    'volatility': {'level': 'volatility_level'},
+    'volume_status': {'status': 'volume_status'},
+    'sentiment': {'sentiment': 'sentiment'},
+    'trend_context': {'trend_score': 'trend_score', 'trend_strength': 'trend_strength',
+                      'suggestion': 'trend_suggestion'},
+}
+
+
+def _columns(results: Dict[str, Dict], names: Dict[str, Dict[str, str]]) -> Dict:
+    return {column: results[group][key] for group, keys in names.items() for key, column in keys.items()}
+
+def _series(values) -> pd.Series:
+    if isinstance(values, pd.Series):
+        return values.reset_index(drop=True).astype(float)
+    return pd.Series(np.asarray(values, dtype=float))
+
+
+def _code(positive, negative=None) -> np.ndarray:
+    """+1 onde `positive`, -1 onde `negative` (ou onde não é positivo, se None), 0 no resto."""
+    positive = np.asarray(positive, dtype=bool)
+    negative = ~positive if negative is None else np.asarray(negative, dtype=bool)
+    return np.where(positive, 1, np.where(negative, -1, 0)).astype(np.int8)
+
+
+def _prev(arr: np.ndarray) -> np.ndarray:
+    out = np.empty_like(arr)
+    if len(arr):
+        out[0] = np.nan
+        out[1:] = arr[:-1]
+    return out
+
+
+def _crossed(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Cruzamento de a sobre b no candle: +1 (alta), -1 (baixa), 0 (nenhum)."""
+    pa, pb = _prev(a), _prev(b)
+    return _code((a > b) & (pa <= pb), (a < b) & (pa >= pb))
+
+
+def _last(series: Dict[str, np.ndarray], rounding: Dict[str, int], labels: Dict[str, Dict]) -> Dict:
+    """Visão escalar: último elemento de cada array, com arredondamento e rótulos."""
+    out = {}
+    for key, arr in series.items():
+        value = arr[-1]
+        if key in labels:
+            out[key] = next(label for label, code in labels[key].items() if code == value)
+        elif key in rounding:
+            out[key] = round(float(value), rounding[key])
+        else:
+            out[key] = value.item() if hasattr(value, 'item') else value
+    return out
+
+
+class TechnicalIndicators:
+    """
+    Agregador avançado de indicadores técnicos com:
+    - Cálculos mais robustos
+    - Novos indicadores importantes
+    - Melhor tratamento de edge cases
+    - Saídas padronizadas
+
+    Cada indicador tem um modo série (*_series: arrays NumPy alinhados aos candles,
+    estados em int8) e o modo escalar de sempre (calc_*: só o último candle).
+    compute_all() monta todas as colunas de uma vez para os builders de features.
+    """
+
+    # ============== INDICADORES EXISTENTES ==============
+
+    @staticmethod
+    def rsi_series(close, period: int = 14) -> Dict[str, np.ndarray]:
+        if len(close) < period:
+            raise ValueError(f"Necessário mínimo {period} períodos para RSI")
+        rsi = ta.momentum.RSIIndicator(_series(close), window=period).rsi().to_numpy()
+        return {
+            'value': rsi,
+            'zone': _code(rsi > 70, rsi < 30),
+            'trend': _code(rsi > _prev(rsi)),
+        }
+
+    @staticmethod
+    def calc_rsi(close: pd.Series, period: int = 14) -> Dict[str, float]:
+        """Calcula RSI com validação e dados adicionais"""
+        return _last(TechnicalIndicators.rsi_series(close, period), {'value': 2},
+                     {'zone': ZONE, 'trend': UP_DOWN})
+
+    @staticmethod
+    def macd_series(close, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+        macd = ta.trend.MACD(_series(close), window_fast=fast, window_slow=slow, window_sign=signal)
+        hist = macd.macd_diff().to_numpy()
+        return {
+            'histogram': hist,
+            'macd_line': macd.macd().to_numpy(),
+            'signal_line': macd.macd_signal().to_numpy(),
+            'momentum': _code(hist > 0),
+        }
+
+    @staticmethod
+    def calc_macd(close: pd.Series,
+                 fast: int = 12,
+                 slow: int = 26,
+                 signal: int = 9) -> Dict[str, float]:
+        """Retorna MACD com análise de momentum"""
+        return _last(TechnicalIndicators.macd_series(close, fast, slow, signal),
+                     {'histogram': 5, 'macd_line': 5, 'signal_line': 5}, {'momentum': BULL_BEAR})
+
+    @staticmethod
+    def bollinger_series(close, period: int = 20, std_dev: int = 2) -> Dict[str, np.ndarray]:
+        bb = ta.volatility.BollingerBands(_series(close), window=period, window_dev=std_dev)
+        width = bb.bollinger_wband().to_numpy()
+        return {
+            'upper': bb.bollinger_hband().to_numpy(),
+            'lower': bb.bollinger_lband().to_numpy(),
+            'width': width,
+            'percent_b': bb.bollinger_pband().to_numpy(),
+            'position': (width < 0.5).astype(np.int8),
+        }
+
+    @staticmethod
+    def calc_bollinger(close: pd.Series, period: int = 20, std_dev: int = 2) -> Dict[str, float]:
+        """Bandas de Bollinger com mais métricas"""
+        return _last(TechnicalIndicators.bollinger_series(close, period, std_dev),
+                     {'upper': 5, 'lower': 5, 'width': 5, 'percent_b': 5}, {'position': SQUEEZE})
+
+    @staticmethod
+    def atr_series(high, low, close, period: int = 14) -> Dict[str, np.ndarray]:
+        close = _series(close)
+        atr = ta.volatility.AverageTrueRange(_series(high), _series(low), close, window=period)
+        values = atr.average_true_range().to_numpy()
+        return {
+            'value': values,
+            'ratio': values / close.to_numpy() * 100,  # ATR%
+            'trend': _code(values > _prev(values)),
+        }
+
+    @staticmethod
+    def calc_atr(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 14) -> Dict[str, float]:
+        """ATR com contexto de volatilidade"""
+        return _last(TechnicalIndicators.atr_series(high, low, close, period),
+                     {'value': 5, 'ratio': 2}, {'trend': RISING})
+
+    @staticmethod
+    def adx_series(high, low, close, period: int = 14) -> Dict[str, np.ndarray]:
+        adx = ta.trend.ADXIndicator(_series(high), _series(low), _series(close), window=period)
+        value = adx.adx().to_numpy()
+        plus, minus = adx.adx_pos().to_numpy(), adx.adx_neg().to_numpy()
+        return {
+            'adx': value,
+            'di_plus': plus,
+            'di_minus': minus,
+            'strength': (value > 25).astype(np.int8),
+            'trend': _code(plus > minus),
+        }
+
+    @staticmethod
+    def calc_adx(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 14) -> Dict[str, float]:
+        """ADX completo com DI+ e DI-"""
+        return _last(TechnicalIndicators.adx_series(high, low, close, period),
+                     {'adx': 2, 'di_plus': 2, 'di_minus': 2}, {'strength': STRENGTH, 'trend': UP_DOWN})
+
+    @staticmethod
+    def ichimoku_series(high, low, close) -> Dict[str, np.ndarray]:
+        ichi = ta.trend.IchimokuIndicator(_series(high), _series(low))
+        leading_a = ichi.ichimoku_a().to_numpy()
+        return {
+            'conversion': ichi.ichimoku_conversion_line().to_numpy(),
+            'base': ichi.ichimoku_base_line().to_numpy(),
+            'leading_a': leading_a,
+            'leading_b': ichi.ichimoku_b().to_numpy(),
+            'cloud_position': _code(_series(close).to_numpy() > leading_a),
+        }
+
+    @staticmethod
+    def calc_ichimoku(high: pd.Series, low: pd.Series, close: pd.Series) -> Dict[str, float]:
+        """Ichimoku Cloud completo"""
+        return _last(TechnicalIndicators.ichimoku_series(high, low, close),
+                     {'conversion': 5, 'base': 5, 'leading_a': 5, 'leading_b': 5},
+                     {'cloud_position': ABOVE_BELOW})
+
+    @staticmethod
+    def fibonacci_series(high, low) -> Dict[str, np.ndarray]:
+        # Máxima/mínima acumuladas: cada candle só enxerga o passado
+        top = np.fmax.accumulate(_series(high).to_numpy())
+        bottom = np.fmin.accumulate(_series(low).to_numpy())
+        diff = top - bottom
+        return {
+            '23.6%': top - diff * 0.236,
+            '38.2%': top - diff * 0.382,
+            '50%': top - diff * 0.5,
+            '61.8%': top - diff * 0.618,
+        }
+
+    @staticmethod
+    def calc_fibonacci(high: pd.Series, low: pd.Series) -> Dict[str, float]:
+        """Níveis de Fibonacci Retracement"""
+        return _last(TechnicalIndicators.fibonacci_series(high, low),
+                     {'23.6%': 5, '38.2%': 5, '50%': 5, '61.8%': 5}, {})
+
+    @staticmethod
+    def supertrend_series(high, low, close, period: int = 7, multiplier: int = 3) -> Dict[str, np.ndarray]:
+        high, low, close = _series(high), _series(low), _series(close)
+        atr = ta.volatility.AverageTrueRange(high, low, close, window=period).average_true_range().to_numpy()
+        hl2 = ((high + low) / 2).to_numpy()
+        basic_upper = (hl2 + multiplier * atr).tolist()
+        basic_lower = (hl2 - multiplier * atr).tolist()
+        closes = close.tolist()
+        n = len(closes)
+        upper, lower = list(basic_upper), list(basic_lower)
+        direction = [1] * n
+        value = [np.nan] * n
+        if n:
+            value[0] = lower[0]
+        # Bandas finais só se movem a favor da tendência; a direção vira quando o fechamento as rompe
+        for i in range(1, n):
+            if not (basic_upper[i] < upper[i - 1] or closes[i - 1] > upper[i - 1]):
+                upper[i] = upper[i - 1]
+            if not (basic_lower[i] > lower[i - 1] or closes[i - 1] < lower[i - 1]):
+                lower[i] = lower[i - 1]
+            if direction[i - 1] == 1:
+                direction[i] = -1 if closes[i] < lower[i] else 1
+            else:
+                direction[i] = 1 if closes[i] > upper[i] else -1
+            value[i] = lower[i] if direction[i] == 1 else upper[i]
+        direction = np.asarray(direction, dtype=np.int8)
+        changed = np.zeros(n, dtype=np.int8)
+        changed[1:] = direction[1:] != direction[:-1]
+        return {'value': np.asarray(value, dtype=float), 'direction': direction, 'changed': changed}
+
+    @staticmethod
+    def calc_supertrend(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 7, multiplier: int = 3) -> Dict[str, Union[float, str]]:
+        """Supertrend com sinal direcional"""
+        return _last(TechnicalIndicators.supertrend_series(high, low, close, period, multiplier),
+                     {'value': 5}, {'direction': UP_DOWN, 'changed': BOOL})
+
+    @staticmethod
+    def get_market_profile(close: pd.Series, volume: pd.Series, bins: int = 20) -> Dict[str, float]:
+        """Perfil de mercado baseado em volume (resumo da janela inteira, sem modo série)"""
+        hist, bin_edges = np.histogram(close, bins=bins, weights=volume)
+        return {
+            'poc': round(bin_edges[np.argmax(hist)], 5),  # Point of Control
+            'value_area': {
+                'low': round(bin_edges[np.argsort(hist)[-3]], 5),  # 3º maior
+                'high': round(bin_edges[np.argsort(hist)[-1]], 5)   # 1º maior
+            }
+        }
+
+    # ============== NOVOS INDICADORES ADICIONADOS ==============
+
+    @staticmethod
+    def stochastic_series(high, low, close, k_period: int = 14, d_period: int = 3) -> Dict[str, np.ndarray]:
+        stoch = ta.momentum.StochasticOscillator(
+            high=_series(high), low=_series(low), close=_series(close),
+            window=k_period, smooth_window=d_period
+        )
+        k, d = stoch.stoch().to_numpy(), stoch.stoch_signal().to_numpy()
+        return {
+            'k_line': k,
+            'd_line': d,
+            'state': _code(k > 80, k < 20),
+            'cross': _crossed(k, d),
+        }
+
+    @staticmethod
+    def calc_stochastic(high: pd.Series, low: pd.Series, close: pd.Series,
+                       k_period: int = 14, d_period: int = 3) -> Dict[str, Union[float, str]]:
+        """Stochastic Oscillator com análise completa"""
+        return _last(TechnicalIndicators.stochastic_series(high, low, close, k_period, d_period),
+                     {'k_line': 2, 'd_line': 2}, {'state': ZONE, 'cross': CROSS})
+
+    @staticmethod
+    def cci_series(high, low, close, period: int = 20) -> Dict[str, np.ndarray]:
+        cci = ta.trend.CCIIndicator(high=_series(high), low=_series(low), close=_series(close), window=period)
+        value = cci.cci().to_numpy()
+        magnitude = np.abs(value)
+        return {
+            'value': value,
+            'state': _code(value > 100, value < -100),
+            'momentum': _code(value > _prev(value)),
+            'strength': np.select([magnitude > 200, magnitude > 150, magnitude > 100], [3, 2, 1], 0).astype(np.int8),
+        }
+
+    @staticmethod
+    def calc_cci(high: pd.Series, low: pd.Series, close: pd.Series,
+                period: int = 20) -> Dict[str, Union[float, str]]:
+        """Commodity Channel Index com análise detalhada"""
+        return _last(TechnicalIndicators.cci_series(high, low, close, period), {'value': 2},
+                     {'state': ZONE, 'momentum': RISING, 'strength': CCI_STRENGTH})
+
+    @staticmethod
+    def williams_r_series(high, low, close, period: int = 14) -> Dict[str, np.ndarray]:
+        williams = ta.momentum.WilliamsRIndicator(high=_series(high), low=_series(low), close=_series(close), lbp=period)
+        value = williams.williams_r().to_numpy()
+        return {
+            'value': value,
+            'state': _code(value > -20, value < -80),
+            'trend': _code(value > _prev(value)),
+        }
+
+    @staticmethod
+    def calc_williams_r(high: pd.Series, low: pd.Series, close: pd.Series,
+                       period: int = 14) -> Dict[str, Union[float, str]]:
+        """Williams %R com análise contextual"""
+        return _last(TechnicalIndicators.williams_r_series(high, low, close, period), {'value': 2},
+                     {'state': ZONE, 'trend': BULL_BEAR})
+
+    @staticmethod
+    def parabolic_sar_series(high, low, step: float = 0.02, max_step: float = 0.2) -> Dict[str, np.ndarray]:
+        high, low = _series(high), _series(low)
+        psar = ta.trend.PSARIndicator(
+            high=high, low=low, close=(high + low) / 2,  # Usa média HL como close
+            step=step, max_step=max_step
+        )
+        value = psar.psar().to_numpy()
+        up = psar.psar_up().to_numpy()
+        prev_up = _prev(up)
+        return {
+            'value': value,
+            'trend': _code(value < high.to_numpy()),
+            'acceleration': _code(up > prev_up, up < prev_up),
+        }
+
+    @staticmethod
+    def calc_parabolic_sar(high: pd.Series, low: pd.Series,
+                          step: float = 0.02, max_step: float = 0.2) -> Dict[str, Union[float, str]]:
+        """Parabolic SAR com análise de tendência"""
+        return _last(TechnicalIndicators.parabolic_sar_series(high, low, step, max_step), {'value': 5},
+                     {'trend': UP_DOWN, 'acceleration': ACCELERATION})
+
+    @staticmethod
+    def momentum_series(close, period: int = 10) -> Dict[str, np.ndarray]:
+        value = ta.momentum.ROCIndicator(close=_series(close), window=period).roc().to_numpy()
+        magnitude = np.abs(value)
+        return {
+            'value': value,
+            'trend': _code(value > 0),
+            'acceleration': _code(value > _prev(value)),
+            'strength': np.select([magnitude > 10, magnitude > 5], [2, 1], 0).astype(np.int8),
+        }
+
+    @staticmethod
+    def calc_momentum(close: pd.Series, period: int = 10) -> Dict[str, Union[float, str]]:
+        """Momentum com análise detalhada"""
+        return _last(TechnicalIndicators.momentum_series(close, period), {'value': 2},
+                     {'trend': UP_DOWN, 'acceleration': MOM_ACCELERATION, 'strength': MOM_STRENGTH})
+
+    @staticmethod
+    def roc_series(close, period: int = 12) -> Dict[str, np.ndarray]:
+        value = ta.momentum.ROCIndicator(close=_series(close), window=period).roc().to_numpy()
+        return {
+            'value': value,
+            'trend': _code(value > 0),
+            'momentum': _code(np.abs(value) > np.abs(_prev(value))),
+            'extreme': _code(value > 15, value < -15),
+        }
+
+    @staticmethod
+    def calc_roc(close: pd.Series, period: int = 12) -> Dict[str, Union[float, str]]:
+        """Rate of Change (ROC) com análise contextual"""
+        return _last(TechnicalIndicators.roc_series(close, period), {'value': 2},
+                     {'trend': UP_DOWN, 'momentum': ROC_MOMENTUM, 'extreme': EXTREME})
+
+    @staticmethod
+    def dmi_series(high, low, close, period: int = 14) -> Dict[str, np.ndarray]:
+        # DMI = ADX + DI+/DI- (o ta expõe tudo no ADXIndicator)
+        adx = TechnicalIndicators.adx_series(high, low, close, period)
+        plus, minus = adx['di_plus'], adx['di_minus']
+        up = plus > minus
+        strong = adx['adx'] > 25
+        return {
+            'adx': adx['adx'],
+            'plus_di': plus,
+            'minus_di': minus,
+            'trend': np.where(up, np.where(strong, 2, 1), np.where(strong & (plus < minus), -2, -1)).astype(np.int8),
+            'crossover': _crossed(plus, minus),
+        }
+
+    @staticmethod
+    def calc_dmi(high: pd.Series, low: pd.Series, close: pd.Series,
+                period: int = 14) -> Dict[str, Union[float, str]]:
+        """Directional Movement Index (DMI) completo"""
+        return _last(TechnicalIndicators.dmi_series(high, low, close, period),
+                     {'adx': 2, 'plus_di': 2, 'minus_di': 2}, {'trend': DMI_TREND, 'crossover': CROSS})
+
+    @staticmethod
+    def vwap_series(high, low, close, volume) -> Dict[str, np.ndarray]:
+        high, low, close, volume = (_series(x).to_numpy() for x in (high, low, close, volume))
+        typical_price = (high + low + close) / 3
+        with np.errstate(invalid='ignore', divide='ignore'):
+            vwap = np.cumsum(typical_price * volume) / np.cumsum(volume)
+            spread = np.abs(close - vwap) / vwap * 100
+        return {
+            'value': vwap,
+            'relation': _code(close > vwap),
+            'spread': spread,
+            'trend': _code(vwap > _prev(vwap)),
+        }
+
+    @staticmethod
+    def calc_vwap(high: pd.Series, low: pd.Series, close: pd.Series,
+                 volume: pd.Series) -> Dict[str, Union[float, str]]:
+        """Volume Weighted Average Price (VWAP) com análise"""
+        return _last(TechnicalIndicators.vwap_series(high, low, close, volume), {'value': 5, 'spread': 2},
+                     {'relation': ABOVE_BELOW, 'trend': RISING})
+
+    @staticmethod
+    def envelope_series(close, period: int = 20, deviation: float = 0.05) -> Dict[str, np.ndarray]:
+        close = _series(close)
+        sma = close.rolling(window=period).mean().to_numpy()
+        upper = sma * (1 + deviation)
+        lower = sma * (1 - deviation)
+        close = close.to_numpy()
+        return {
+            'upper': upper,
+            'lower': lower,
+            'center': sma,
+            'position': _code(close > upper, close < lower),
+            'band_width': upper - lower,
+            'percent_from_center': (close - sma) / sma * 100,
+        }
+
+    @staticmethod
+    def calc_envelope(close: pd.Series, period: int = 20,
+                     deviation: float = 0.05) -> Dict[str, Union[float, str]]:
+        """Envelope Channels com análise completa"""
+        return _last(TechnicalIndicators.envelope_series(close, period, deviation),
+                     {'upper': 5, 'lower': 5, 'center': 5, 'band_width': 5, 'percent_from_center': 2},
+                     {'position': WITHIN})
+
+    @staticmethod
+    def calc_elliott_wave(close: pd.Series, lookback: int = 50) -> Dict[str, Union[str, List[float]]]:
+        """Análise simplificada de Elliott Wave"""
+        if len(close) < lookback:
+            return {'error': 'Not enough data'}
+
+        window = close.iloc[-lookback:]
+        peaks = window[(window.shift(1) < window) & (window.shift(-1) < window)]
+        troughs = window[(window.shift(1) > window) & (window.shift(-1) > window)]
+
+        # Identificação básica de ondas
+        wave_counts = {
+            'impulse_waves': len(peaks),
+            'corrective_waves': len(troughs),
+            'wave_ratios': []
+        }
+
+        if len(peaks) >= 2 and len(troughs) >= 1:
+            for i in range(1, len(peaks)):
+                wave_high = peaks.iloc[i]
+                wave_low = troughs.iloc[i-1] if i <= len(troughs) else peaks.iloc[i-1]
+                ratio = (wave_high - wave_low) / (peaks.iloc[0] - troughs.iloc[0]) if len(troughs) > 0 else 0
+                wave_counts['wave_ratios'].append(round(ratio, 2))
+
+        return {
+            'peaks': peaks.tolist(),
+            'troughs': troughs.tolist(),
+            'phase': 'impulse' if len(peaks) >= 3 else 'correction',
+            'wave_counts': wave_counts
+        }
+
+    @staticmethod
+    def calc_zigzag(close: pd.Series, percent: float = 5) -> Dict[str, Union[List[float], str]]:
+        """Zig Zag Indicator com análise de tendência"""
+        peaks = []
+        troughs = []
+        last_pivot = close.iloc[0]
+        trend = None
+
+        for i in range(1, len(close)):
+            if close.iloc[i] >= last_pivot * (1 + percent/100):
+                if trend != 'up':
+                    troughs.append(last_pivot)
+                    trend = 'up'
+                last_pivot = close.iloc[i]
+            elif close.iloc[i] <= last_pivot * (1 - percent/100):
+                if trend != 'down':
+                    peaks.append(last_pivot)
+                    trend = 'down'
+                last_pivot = close.iloc[i]
+
+        # Análise de padrões
+        pattern = None
+        if len(peaks) >= 2 and len(troughs) >= 2:
+            if peaks[-1] > peaks[-2] and troughs[-1] > troughs[-2]:
+                pattern = 'higher_highs_higher_lows'
+            elif peaks[-1] < peaks[-2] and troughs[-1] < troughs[-2]:
+                pattern = 'lower_highs_lower_lows'
+            elif peaks[-1] > peaks[-2] and troughs[-1] < troughs[-2]:
+                pattern = 'broadening'
+
+        return {
+            'peaks': peaks[-3:],  # Últimos 3 picos
+            'troughs': troughs[-3:],  # Últimos 3 vales
+            'trend': trend,
+            'pattern': pattern,
+            'retracements': [round((peaks[i] - troughs[i]) / peaks[i] * 100, 2)
+                            for i in range(min(len(peaks), len(troughs)))]
+        }
+
+    # ============== RATINGS E ESTADOS AGREGADOS ==============
+
+    @staticmethod
+    def moving_averages_series(close, periods: Tuple[int, ...] = (10, 20, 50)) -> Dict[str, np.ndarray]:
+        close = _series(close)
+        votes = np.zeros(len(close))
+        for period in periods:
+            sma = close.rolling(period, min_periods=1).mean().to_numpy()
+            votes += np.sign(close.to_numpy() - sma)
+        majority = len(periods) // 2 + 1
+        return {'rating': _code(votes >= majority, votes <= -majority)}
+
+    @staticmethod
+    def calc_moving_averages(close: pd.Series) -> Dict[str, str]:
+        """Rating das médias móveis: compra/venda quando o preço está acima/abaixo da maioria delas"""
+        return _last(TechnicalIndicators.moving_averages_series(close), {}, {'rating': RATING})
+
+    @staticmethod
+    def oscillators_series(rsi_value, macd_hist) -> Dict[str, np.ndarray]:
+        rsi_value = np.asarray(rsi_value, dtype=float)
+        macd_hist = np.asarray(macd_hist, dtype=float)
+        score = (rsi_value < 30).astype(int) - (rsi_value > 70) + np.sign(np.nan_to_num(macd_hist))
+        return {'rating': _code(score > 0, score < 0)}
+
+    @staticmethod
+    def calc_oscillators(rsi_value: float, macd_hist: float) -> Dict[str, str]:
+        """Rating dos osciladores: RSI em zona extrema + sinal do histograma MACD"""
+        return _last(TechnicalIndicators.oscillators_series([rsi_value], [macd_hist]), {}, {'rating': RATING})
+
+    @staticmethod
+    def volatility_series(close, window: int = 20, baseline: int = 100) -> Dict[str, np.ndarray]:
+        vol = _series(close).pct_change().rolling(window, min_periods=2).std()
+        reference = vol.rolling(baseline, min_periods=1).mean()
+        return {'level': (vol > reference).to_numpy().astype(np.int8)}
+
+    @staticmethod
+    def calc_volatility(close: pd.Series) -> Dict[str, str]:
+        """Volatilidade atual (desvio dos retornos) acima ou abaixo da média recente"""
+        return _last(TechnicalIndicators.volatility_series(close), {}, {'level': VOLATILITY})
+
+    @staticmethod
+    def volume_status_series(volume, window: int = 20) -> Dict[str, np.ndarray]:
+        volume = _series(volume)
+        average = volume.rolling(window, min_periods=1).mean().to_numpy()
+        volume = volume.to_numpy()
+        return {'status': np.select([volume > 2 * average, volume < 0.5 * average], [2, 0], 1).astype(np.int8)}
+
+    @staticmethod
+    def calc_volume_status(volume: pd.Series) -> Dict[str, str]:
+        """Volume do candle frente à média: Spiked (>2x), Low (<0.5x) ou Normal"""
+        return _last(TechnicalIndicators.volume_status_series(volume), {}, {'status': VOLUME_STATUS})
+
+    @staticmethod
+    def sentiment_series(close, window: int = 14) -> Dict[str, np.ndarray]:
+        up_ratio = (_series(close).diff() > 0).astype(float).rolling(window, min_periods=1).mean().to_numpy()
+        return {'sentiment': _code(up_ratio > 0.6, up_ratio < 0.4)}
+
+    @staticmethod
+    def calc_sentiment(close: pd.Series) -> Dict[str, str]:
+        """Sentimento técnico pela fração de candles de alta na janela"""
+        return _last(TechnicalIndicators.sentiment_series(close), {}, {'sentiment': SENTIMENT})
+
+    # ============== FUNÇÕES AUXILIARES PARA ANÁLISE DE CONTEXTO ==============
+
+    @staticmethod
+    def trend_context_series(close, period: int = 14) -> Dict[str, np.ndarray]:
+        rsi = TechnicalIndicators.rsi_series(close, period)
+        macd = TechnicalIndicators.macd_series(close)
+        adx = TechnicalIndicators.adx_series(close, close, close, period)
+        stoch = TechnicalIndicators.stochastic_series(close, close, close, period, 3)
+        score = (
+            -rsi['zone'] + 0.5 * rsi['trend']
+            + macd['momentum']
+            + 1.5 * adx['strength'] + 0.5 * adx['trend']
+            - stoch['state'] + 0.5 * stoch['cross']
+        ).astype(float)
+        return {
+            'trend_score': score,
+            'trend_strength': np.select([score >= 3, score >= 1, score >= -1], [2, 1, 0], -1).astype(np.int8),
+            'suggestion': np.select([score >= 2, score <= -2, score > 0, score < 0], [2, -2, 1, -1], 0).astype(np.int8),
+            # Componentes, para a lista de fatores da visão escalar
+            'rsi_zone': rsi['zone'], 'rsi_trend': rsi['trend'], 'macd_momentum': macd['momentum'],
+            'adx_strength': adx['strength'], 'adx_trend': adx['trend'],
+            'stoch_state': stoch['state'], 'stoch_cross': stoch['cross'],
+        }
+
+    @staticmethod
+    def get_trend_context(close: pd.Series, period: int = 14) -> Dict[str, Union[float, str]]:
+        """Analisa múltiplos fatores para determinar o contexto da tendência"""
+        ctx = TechnicalIndicators.trend_context_series(close, period)
+        last = {key: int(values[-1]) for key, values in ctx.items() if key not in ('trend_score',)}
+        factors = []
+        if last['rsi_zone'] == 1: factors.append('rsi_overbought')
+        elif last['rsi_zone'] == -1: factors.append('rsi_oversold')
+        factors.append('rsi_up' if last['rsi_trend'] == 1 else 'rsi_down')
+        factors.append('macd_bullish' if last['macd_momentum'] == 1 else 'macd_bearish')
+        if last['adx_strength'] == 1: factors.append('adx_strong')
+        factors.append('adx_up' if last['adx_trend'] == 1 else 'adx_down')
+        if last['stoch_state'] == 1: factors.append('stoch_overbought')
+        elif last['stoch_state'] == -1: factors.append('stoch_oversold')
+        if last['stoch_cross'] == 1: factors.append('stoch_bull_cross')
+        elif last['stoch_cross'] == -1: factors.append('stoch_bear_cross')
+        scalar = _last({k: ctx[k] for k in ('trend_score', 'trend_strength', 'suggestion')},
+                       {'trend_score': 2}, {'trend_strength': TREND_STRENGTH, 'suggestion': SUGGESTION})
+        return {
+            'trend_score': scalar['trend_score'],
+            'trend_strength': scalar['trend_strength'],
+            'confirmed_factors': factors,
+            'suggestion': scalar['suggestion'],
+        }
+
+    @staticmethod
+    def get_support_resistance(close: pd.Series, lookback: int = 100) -> Dict[str, Union[List[float], str]]:
+        """Identifica níveis de suporte e resistência com análise de força"""
+        if len(close) < lookback:
+            return {'error': 'Not enough data'}
+
+        window = close.iloc[-lookback:]
+
+        # Identifica pivôs
+        resistance = window[(window.shift(1) < window) & (window.shift(-1) < window)]
+        support = window[(window.shift(1) > window) & (window.shift(-1) > window)]
+
+        # Filtra os mais significativos
+        significant_r = []
+        significant_s = []
+
+        for level in resistance.unique():
+            touches = len(window[abs(window - level) < 0.005 * level])
+            if touches >= 2:
+                significant_r.append((level, touches))
+
+        for level in support.unique():
+            touches = len(window[abs(window - level) < 0.005 * level])
+            if touches >= 2:
+                significant_s.append((level, touches))
+
+        # Ordena por número de toques
+        significant_r.sort(key=lambda x: x[1], reverse=True)
+        significant_s.sort(key=lambda x: x[1], reverse=True)
+
+        return {
+            'support': [round(level[0], 5) for level in significant_s[:3]],  # Top 3 supports
+            'resistance': [round(level[0], 5) for level in significant_r[:3]],  # Top 3 resistances
+            'current_position': 'near_support' if abs(close.iloc[-1] - significant_s[0][0]) < 0.01 * close.iloc[-1] else
+                              'near_resistance' if abs(close.iloc[-1] - significant_r[0][0]) < 0.01 * close.iloc[-1] else
+                              'mid_range'
+        }
+
+    # ============== MODO SÉRIE COMPLETO ==============
+
+    @staticmethod
+    def compute_all(high, low, close, volume) -> Dict[str, np.ndarray]:
+        """
+        Todas as colunas de indicadores usadas pelos builders de features, cada uma
+        como array alinhado aos candles (estados em int8). Cada indicador é calculado
+        uma única vez por chamada.
+        """
+        high, low, close, volume = _series(high), _series(low), _series(close), _series(volume)
+        ti = TechnicalIndicators
+        rsi = ti.rsi_series(close)
+        macd = ti.macd_series(close)
+        results = {
+            'rsi': rsi,
+            'macd': macd,
+            'bollinger': ti.bollinger_series(close),
+            'atr': ti.atr_series(high, low, close),
+            'adx': ti.adx_series(high, low, close),
+            'ichimoku': ti.ichimoku_series(high, low, close),
+            'fibonacci': ti.fibonacci_series(high, low),
+            'supertrend': ti.supertrend_series(high, low, close),
+            'stochastic': ti.stochastic_series(high, low, close),
+            'cci': ti.cci_series(high, low, close),
+            'williams_r': ti.williams_r_series(high, low, close),
+            'parabolic_sar': ti.parabolic_sar_series(high, low),
+            'momentum': ti.momentum_series(close),
+            'roc': ti.roc_series(close),
+            'dmi': ti.dmi_series(high, low, close),
+            'vwap': ti.vwap_series(high, low, close, volume),
+            'envelope': ti.envelope_series(close),
+            'moving_averages': ti.moving_averages_series(close),
+            'oscillators': ti.oscillators_series(rsi['value'], macd['histogram']),
+            'volatility': ti.volatility_series(close),
+            'volume_status': ti.volume_status_series(volume),
+            'sentiment': ti.sentiment_series(close),
+            'trend_context': ti.trend_context_series(close),
+        }
+        columns = _columns(results, INDICATOR_COLUMNS)
+        # Resumo da janela (histograma de volume): mesmo valor em todas as linhas
+        profile = ti.get_market_profile(close, volume)
+        n = len(close)
+        columns['market_poc'] = np.full(n, profile['poc'])
+        columns['market_va_low'] = np.full(n, profile['value_area']['low'])
+        columns['market_va_high'] = np.full(n, profile['value_area']['high'])
+        columns.update(_columns(results, CONTEXT_COLUMNS))
+        return columns
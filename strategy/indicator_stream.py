@@ -0,0 +1,783 @@
+# strategy/indicator_stream.py
+# Motor incremental de indicadores: um estado por (símbolo, timeframe) atualizado em
+# O(1) a cada candle fechado, em vez de recalcular a janela inteira pelo `ta` a cada
+# sinal. Usa recorrências de Wilder/EMA, média e variância de Welford em janela
+# deslizante e deques monotônicos para máximas/mínimas móveis.
+#
+# update(candle, final=False) calcula os valores do candle em formação sem tocar no
+# estado; o próximo update(final=True) continua do último candle fechado.
+#
+# Os valores e os códigos int8 batem com TechnicalIndicators.compute_all (mesmas
+# colunas), inclusive os zeros de aquecimento que o `ta` devolve no ATR/ADX; a
+# paridade é conferida por scripts/indicator_parity.py. Exceções: o CCI precisa do
+# desvio médio absoluto da janela (O(20) por candle) e o perfil de mercado
+# (histograma da janela inteira) só existe no modo batch.
+
+import math
+import logging
+import threading
+from collections import deque
+from typing import Dict, Iterable, Optional, Tuple
+
+from strategy.indicator_globe import INDICATOR_COLUMNS, CONTEXT_COLUMNS, _columns
+
+logger = logging.getLogger(__name__)
+
+NAN = float("nan")
+
+
+def _isnan(x: float) -> bool:
+    return x != x
+
+
+def _div(a: float, b: float) -> float:
+    """Divisão com a semântica do NumPy (x/0 -> ±inf, 0/0 -> nan) em vez de exceção."""
+    if b == 0:
+        if a == 0 or _isnan(a):
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def _code(positive: bool, negative: Optional[bool] = None) -> int:
+    """Mesma regra do _code vetorizado: +1 / -1 / 0 (NaN compara como False)."""
+    if positive:
+        return 1
+    if negative is None or negative:
+        return -1
+    return 0
+
+
+def _crossed(a: float, b: float, prev_a: float, prev_b: float) -> int:
+    return _code(a > b and prev_a <= prev_b, a < b and prev_a >= prev_b)
+
+
+# ---------- primitivas (step(x, final): final=False não altera o estado) ----------
+
+class _Ema:
+    """EMA como pandas ewm(adjust=False): semeia no primeiro valor válido, ignora NaN."""
+
+    __slots__ = ("alpha", "min_periods", "value", "count")
+
+    def __init__(self, alpha: float, min_periods: int):
+        self.alpha = alpha
+        self.min_periods = min_periods
+        self.value = NAN
+        self.count = 0
+
+    def step(self, x: float, final: bool = True) -> float:
+        if _isnan(x):
+            return self.value if self.count >= self.min_periods else NAN
+        value = x if self.count == 0 else self.value + self.alpha * (x - self.value)
+        count = self.count + 1
+        if final:
+            self.value, self.count = value, count
+        return value if count >= self.min_periods else NAN
+
+
+class _Wilder:
+    """Média de Wilder como no ta (ATR/ADX): semente = média simples dos primeiros n."""
+
+    __slots__ = ("n", "value", "count", "total")
+
+    def __init__(self, n: int):
+        self.n = n
+        self.value = NAN
+        self.count = 0
+        self.total = 0.0
+
+    def step(self, x: float, final: bool = True) -> float:
+        count = self.count + 1
+        total = self.total
+        if count < self.n:
+            total += x
+            value = NAN
+        elif count == self.n:
+            total += x
+            value = total / self.n
+        else:
+            value = (self.value * (self.n - 1) + x) / self.n
+        if final:
+            self.count, self.total, self.value = count, total, value
+        return value
+
+
+class _Window:
+    """
+    Janela deslizante de `size` candles. A média segue o rolling().mean() do pandas
+    (soma de Kahan, sinal corrigido, sequência de valores iguais) e a variância é a de
+    Welford. NaN ocupa lugar na janela mas não entra nas estatísticas.
+    """
+
+    __slots__ = ("size", "min_periods", "values", "state")
+
+    def __init__(self, size: int, min_periods: Optional[int] = None):
+        self.size = size
+        self.min_periods = size if min_periods is None else min_periods
+        self.values = deque()
+        # (válidos, soma, compensação, negativos, média de Welford, m2, último valor, repetições)
+        self.state = (0, 0.0, 0.0, 0, 0.0, 0.0, NAN, 0)
+
+    def step(self, x: float, final: bool = True) -> Tuple[int, float, float]:
+        """(válidos, média, soma dos quadrados dos desvios) da janela com x incluído."""
+        count, total, comp, negatives, mean, m2, last, same = self.state
+        if len(self.values) == self.size:
+            old = self.values[0]
+            if not _isnan(old):
+                y = -old - comp
+                t = total + y
+                comp, total = t - total - y, t
+                negatives -= math.copysign(1.0, old) < 0
+                if count == 1:
+                    count, mean, m2 = 0, 0.0, 0.0
+                else:
+                    count -= 1
+                    delta = old - mean
+                    mean -= delta / count
+                    m2 -= delta * (old - mean)
+        if not _isnan(x):
+            y = x - comp
+            t = total + y
+            comp, total = t - total - y, t
+            negatives += math.copysign(1.0, x) < 0
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+            same = same + 1 if x == last else 1
+            last = x
+        if final:
+            self.values.append(x)
+            if len(self.values) > self.size:
+                self.values.popleft()
+            self.state = (count, total, comp, negatives, mean, m2, last, same)
+        if not count:
+            return 0, NAN, 0.0
+        if same >= count:
+            return count, last, 0.0
+        average = total / count
+        if negatives == 0 and average < 0 or negatives == count and average > 0:
+            average = 0.0
+        return count, average, max(m2, 0.0)
+
+    def mean_of(self, stats: Tuple[int, float, float]) -> float:
+        count, mean, _ = stats
+        return mean if count and count >= self.min_periods else NAN
+
+    def std_of(self, stats: Tuple[int, float, float], ddof: int = 0) -> float:
+        count, _, m2 = stats
+        if not count or count < self.min_periods or count <= ddof:
+            return NAN
+        return math.sqrt(m2 / (count - ddof))
+
+
+class _Extreme:
+    """Máxima (ou mínima) móvel por deque monotônico: O(1) amortizado por candle."""
+
+    __slots__ = ("size", "min_periods", "sign", "items", "count")
+
+    def __init__(self, size: int, maximum: bool = True, min_periods: Optional[int] = None):
+        self.size = size
+        self.min_periods = size if min_periods is None else min_periods
+        self.sign = 1.0 if maximum else -1.0
+        self.items = deque()  # (índice, valor), do melhor para o pior
+        self.count = 0
+
+    def step(self, x: float, final: bool = True) -> float:
+        i = self.count
+        start = i - self.size + 1  # primeiro índice que continua na janela
+        items = self.items
+        if final:
+            while items and items[-1][1] * self.sign <= x * self.sign:
+                items.pop()
+            items.append((i, x))
+            if items[0][0] < start:
+                items.popleft()
+            self.count = i + 1
+            best = items[0][1]
+        else:
+            front = items[0] if items and items[0][0] >= start else (items[1] if len(items) > 1 else None)
+            best = x if front is None or front[1] * self.sign < x * self.sign else front[1]
+        return best if min(i + 1, self.size) >= self.min_periods else NAN
+
+
+class _Lag:
+    """Valor de n candles atrás (NaN até existir)."""
+
+    __slots__ = ("values",)
+
+    def __init__(self, n: int):
+        self.values = deque(maxlen=n)
+
+    def step(self, x: float, final: bool = True) -> float:
+        old = self.values[0] if len(self.values) == self.values.maxlen else NAN
+        if final:
+            self.values.append(x)
+        return old
+
+
+# ---------- indicadores (mesmos parâmetros e chaves dos *_series) ----------
+
+class _Rsi:
+    def __init__(self, period: int = 14):
+        self.up = _Ema(1 / period, period)
+        self.down = _Ema(1 / period, period)
+        self.prev_close = NAN
+        self.prev = NAN
+
+    def step(self, close: float, final: bool) -> Dict:
+        # Como no ta, o diff ausente do 1º candle vira 0 (diff.where(diff > 0, 0.0))
+        diff = close - self.prev_close
+        up = self.up.step(diff if diff > 0 else 0.0, final)
+        down = self.down.step(-diff if diff < 0 else 0.0, final)
+        if _isnan(down):
+            rsi = NAN
+        elif down == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - 100 / (1 + up / down)
+        out = {'value': rsi, 'zone': _code(rsi > 70, rsi < 30), 'trend': _code(rsi > self.prev)}
+        if final:
+            self.prev_close, self.prev = close, rsi
+        return out
+
+
+class _Macd:
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = _Ema(2 / (fast + 1), fast)
+        self.slow = _Ema(2 / (slow + 1), slow)
+        self.signal = _Ema(2 / (signal + 1), signal)
+
+    def step(self, close: float, final: bool) -> Dict:
+        line = self.fast.step(close, final) - self.slow.step(close, final)
+        signal = self.signal.step(line, final)
+        hist = line - signal
+        return {'histogram': hist, 'macd_line': line, 'signal_line': signal, 'momentum': _code(hist > 0)}
+
+
+class _Bollinger:
+    def __init__(self, period: int = 20, std_dev: int = 2):
+        self.window = _Window(period)
+        self.std_dev = std_dev
+
+    def step(self, close: float, final: bool) -> Dict:
+        stats = self.window.step(close, final)
+        mavg, std = self.window.mean_of(stats), self.window.std_of(stats)
+        upper, lower = mavg + self.std_dev * std, mavg - self.std_dev * std
+        width = _div(upper - lower, mavg) * 100
+        percent_b = (close - lower) / (upper - lower) if upper != lower and not _isnan(upper) else NAN
+        return {'upper': upper, 'lower': lower, 'width': width, 'percent_b': percent_b,
+                'position': 1 if width < 0.5 else 0}
+
+
+def _true_range(high: float, low: float, prev_close: float) -> float:
+    # Como o ta: máximo das três distâncias, ignorando as que dependem do close anterior ausente
+    if _isnan(prev_close):
+        return high - low
+    return max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+
+class _Atr:
+    def __init__(self, period: int = 14):
+        self.wilder = _Wilder(period)
+        self.prev_close = NAN
+        self.prev = NAN
+
+    def value(self, high: float, low: float, close: float, final: bool) -> float:
+        atr = self.wilder.step(_true_range(high, low, self.prev_close), final)
+        if final:
+            self.prev_close = close
+        return 0.0 if _isnan(atr) else atr  # o ta devolve 0 no aquecimento
+
+    def step(self, high: float, low: float, close: float, final: bool) -> Dict:
+        atr = self.value(high, low, close, final)
+        out = {'value': atr, 'ratio': _div(atr, close) * 100, 'trend': _code(atr > self.prev)}
+        if final:
+            self.prev = atr
+        return out
+
+
+class _Adx:
+    """ADX/DI do ta: somas de Wilder a partir do 2º candle; zeros no aquecimento."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.tr = _Wilder(period)
+        self.pos = _Wilder(period)
+        self.neg = _Wilder(period)
+        self.adx = _Wilder(period)
+        self.prev_bar = None  # (high, low, close)
+        self.bars = 0
+
+    def step(self, high: float, low: float, close: float, final: bool) -> Dict:
+        adx = di_plus = di_minus = 0.0
+        if self.prev_bar is not None:
+            prev_high, prev_low, prev_close = self.prev_bar
+            tr = max(high, prev_close) - min(low, prev_close)
+            up, down = high - prev_high, prev_low - low
+            tr_avg = self.tr.step(tr, final)
+            pos_avg = self.pos.step(up if up > down and up > 0 else 0.0, final)
+            neg_avg = self.neg.step(down if down > up and down > 0 else 0.0, final)
+            if not _isnan(tr_avg):
+                plus = 100 * pos_avg / tr_avg if tr_avg != 0 else 0.0
+                minus = 100 * neg_avg / tr_avg if tr_avg != 0 else 0.0
+                dx = 100 * abs((plus - minus) / (plus + minus)) if plus + minus != 0 else 0.0
+                smoothed = self.adx.step(dx, final)
+                adx = 0.0 if _isnan(smoothed) else smoothed
+                if self.bars > self.period:  # o ta só publica DI a partir do candle period+1
+                    di_plus, di_minus = plus, minus
+        if final:
+            self.prev_bar = (high, low, close)
+            self.bars += 1
+        return {'adx': adx, 'di_plus': di_plus, 'di_minus': di_minus,
+                'strength': 1 if adx > 25 else 0, 'trend': _code(di_plus > di_minus)}
+
+
+class _Ichimoku:
+    def __init__(self, conversion: int = 9, base: int = 26, span_b: int = 52):
+        self.conv_high, self.conv_low = _Extreme(conversion), _Extreme(conversion, maximum=False)
+        self.base_high, self.base_low = _Extreme(base), _Extreme(base, maximum=False)
+        self.span_high = _Extreme(span_b, min_periods=1)
+        self.span_low = _Extreme(span_b, maximum=False, min_periods=1)
+
+    def step(self, high: float, low: float, close: float, final: bool) -> Dict:
+        conversion = 0.5 * (self.conv_high.step(high, final) + self.conv_low.step(low, final))
+        base = 0.5 * (self.base_high.step(high, final) + self.base_low.step(low, final))
+        leading_a = 0.5 * (conversion + base)
+        leading_b = 0.5 * (self.span_high.step(high, final) + self.span_low.step(low, final))
+        return {'conversion': conversion, 'base': base, 'leading_a': leading_a, 'leading_b': leading_b,
+                'cloud_position': _code(close > leading_a)}
+
+
+class _Fibonacci:
+    def __init__(self):
+        self.top = NAN
+        self.bottom = NAN
+
+    def step(self, high: float, low: float, final: bool) -> Dict:
+        top = high if _isnan(self.top) else max(self.top, high)
+        bottom = low if _isnan(self.bottom) else min(self.bottom, low)
+        if final:
+            self.top, self.bottom = top, bottom
+        diff = top - bottom
+        return {'23.6%': top - diff * 0.236, '38.2%': top - diff * 0.382,
+                '50%': top - diff * 0.5, '61.8%': top - diff * 0.618}
+
+
+class _Supertrend:
+    def __init__(self, period: int = 7, multiplier: int = 3):
+        self.atr = _Atr(period)
+        self.multiplier = multiplier
+        self.state = None  # (upper, lower, direction, close)
+
+    def step(self, high: float, low: float, close: float, final: bool) -> Dict:
+        atr = self.atr.value(high, low, close, final)
+        hl2 = (high + low) / 2
+        upper, lower = hl2 + self.multiplier * atr, hl2 - self.multiplier * atr
+        if self.state is None:
+            direction, changed = 1, 0
+        else:
+            prev_upper, prev_lower, prev_direction, prev_close = self.state
+            if not (upper < prev_upper or prev_close > prev_upper):
+                upper = prev_upper
+            if not (lower > prev_lower or prev_close < prev_lower):
+                lower = prev_lower
+            if prev_direction == 1:
+                direction = -1 if close < lower else 1
+            else:
+                direction = 1 if close > upper else -1
+            changed = int(direction != prev_direction)
+        if final:
+            self.state = (upper, lower, direction, close)
+        return {'value': lower if direction == 1 else upper, 'direction': direction, 'changed': changed}
+
+
+class _Stochastic:
+    def __init__(self, k_period: int = 14, d_period: int = 3):
+        self.high = _Extreme(k_period)
+        self.low = _Extreme(k_period, maximum=False)
+        self.d = _Window(d_period)
+        self.prev = (NAN, NAN)
+
+    def step(self, high: float, low: float, close: float, final: bool) -> Dict:
+        highest, lowest = self.high.step(high, final), self.low.step(low, final)
+        k = _div(100 * (close - lowest), highest - lowest)
+        d = self.d.mean_of(self.d.step(k, final))
+        out = {'k_line': k, 'd_line': d, 'state': _code(k > 80, k < 20),
+               'cross': _crossed(k, d, *self.prev)}
+        if final:
+            self.prev = (k, d)
+        return out
+
+
+class _Cci:
+    def __init__(self, period: int = 20, constant: float = 0.015):
+        self.window = _Window(period)
+        self.constant = constant
+        self.prev = NAN
+
+    def step(self, high: float, low: float, close: float, final: bool) -> Dict:
+        typical = (high + low + close) / 3.0
+        values = self.window.values
+        stats = self.window.step(typical, final)
+        mean = self.window.mean_of(stats)
+        if _isnan(mean):
+            cci = NAN
+        else:
+            # Desvio médio absoluto: único passo O(janela) do motor
+            window = list(values)
+            if not final:
+                window = (window[1:] if len(window) == self.window.size else window) + [typical]
+            mad = sum(abs(x - mean) for x in window) / len(window)
+            cci = _div(typical - mean, self.constant * mad)
+        magnitude = abs(cci)
+        strength = 3 if magnitude > 200 else 2 if magnitude > 150 else 1 if magnitude > 100 else 0
+        out = {'value': cci, 'state': _code(cci > 100, cci < -100), 'momentum': _code(cci > self.prev),
+               'strength': strength}
+        if final:
+            self.prev = cci
+        return out
+
+
+class _WilliamsR:
+    def __init__(self, period: int = 14):
+        self.high = _Extreme(period)
+        self.low = _Extreme(period, maximum=False)
+        self.prev = NAN
+
+    def step(self, high: float, low: float, close: float, final: bool) -> Dict:
+        highest, lowest = self.high.step(high, final), self.low.step(low, final)
+        value = _div(-100 * (highest - close), highest - lowest)
+        out = {'value': value, 'state': _code(value > -20, value < -80), 'trend': _code(value > self.prev)}
+        if final:
+            self.prev = value
+        return out
+
+
+class _ParabolicSar:
+    """Mesmo laço do PSARIndicator do ta (close = média HL), um candle por vez."""
+
+    def __init__(self, step: float = 0.02, max_step: float = 0.2):
+        self.step_size = step
+        self.max_step = max_step
+        self.bars = 0
+        self.up_trend = True
+        self.af = step
+        self.up_trend_high = NAN
+        self.down_trend_low = NAN
+        self.psar = NAN
+        self.highs = (NAN, NAN)  # (i-2, i-1)
+        self.lows = (NAN, NAN)
+        self.prev_up = NAN
+
+    def step(self, high: float, low: float, final: bool) -> Dict:
+        up_trend, af = self.up_trend, self.af
+        up_trend_high, down_trend_low = self.up_trend_high, self.down_trend_low
+        psar_up = NAN
+        if self.bars == 0:
+            up_trend_high, down_trend_low = high, low
+        if self.bars < 2:
+            psar = (high + low) / 2
+        else:
+            reversal = False
+            if up_trend:
+                psar = self.psar + af * (up_trend_high - self.psar)
+                if low < psar:
+                    reversal = True
+                    psar = up_trend_high
+                    down_trend_low = low
+                    af = self.step_size
+                else:
+                    if high > up_trend_high:
+                        up_trend_high = high
+                        af = min(af + self.step_size, self.max_step)
+                    low2, low1 = self.lows
+                    if low2 < psar:
+                        psar = low2
+                    elif low1 < psar:
+                        psar = low1
+            else:
+                psar = self.psar - af * (self.psar - down_trend_low)
+                if high > psar:
+                    reversal = True
+                    psar = down_trend_low
+                    up_trend_high = high
+                    af = self.step_size
+                else:
+                    if low < down_trend_low:
+                        down_trend_low = low
+                        af = min(af + self.step_size, self.max_step)
+                    high2, high1 = self.highs
+                    if high2 > psar:
+                        psar = high2
+                    elif high1 > psar:
+                        psar = high1
+            up_trend = up_trend != reversal
+            if up_trend:
+                psar_up = psar
+        out = {'value': psar, 'trend': _code(psar < high),
+               'acceleration': _code(psar_up > self.prev_up, psar_up < self.prev_up)}
+        if final:
+            self.bars += 1
+            self.up_trend, self.af = up_trend, af
+            self.up_trend_high, self.down_trend_low = up_trend_high, down_trend_low
+            self.psar = psar
+            self.highs = (self.highs[1], high)
+            self.lows = (self.lows[1], low)
+            self.prev_up = psar_up
+        return out
+
+
+class _Roc:
+    def __init__(self, period: int):
+        self.lag = _Lag(period)
+        self.prev = NAN
+
+    def value(self, close: float, final: bool) -> float:
+        old = self.lag.step(close, final)
+        return _div(close - old, old) * 100
+
+
+class _Momentum(_Roc):
+    def __init__(self, period: int = 10):
+        super().__init__(period)
+
+    def step(self, close: float, final: bool) -> Dict:
+        value = self.value(close, final)
+        magnitude = abs(value)
+        out = {'value': value, 'trend': _code(value > 0), 'acceleration': _code(value > self.prev),
+               'strength': 2 if magnitude > 10 else 1 if magnitude > 5 else 0}
+        if final:
+            self.prev = value
+        return out
+
+
+class _RateOfChange(_Roc):
+    def __init__(self, period: int = 12):
+        super().__init__(period)
+
+    def step(self, close: float, final: bool) -> Dict:
+        value = self.value(close, final)
+        out = {'value': value, 'trend': _code(value > 0), 'momentum': _code(abs(value) > abs(self.prev)),
+               'extreme': _code(value > 15, value < -15)}
+        if final:
+            self.prev = value
+        return out
+
+
+def _dmi(adx: Dict, prev: Tuple[float, float]) -> Dict:
+    plus, minus, strong = adx['di_plus'], adx['di_minus'], adx['adx'] > 25
+    if plus > minus:
+        trend = 2 if strong else 1
+    else:
+        trend = -2 if strong and plus < minus else -1
+    return {'adx': adx['adx'], 'plus_di': plus, 'minus_di': minus, 'trend': trend,
+            'crossover': _crossed(plus, minus, *prev)}
+
+
+class _Vwap:
+    def __init__(self):
+        self.price_volume = 0.0
+        self.volume = 0.0
+        self.prev = NAN
+
+    def step(self, high: float, low: float, close: float, volume: float, final: bool) -> Dict:
+        price_volume = self.price_volume + (high + low + close) / 3 * volume
+        total_volume = self.volume + volume
+        vwap = _div(price_volume, total_volume)
+        out = {'value': vwap, 'relation': _code(close > vwap), 'spread': _div(abs(close - vwap), vwap) * 100,
+               'trend': _code(vwap > self.prev)}
+        if final:
+            self.price_volume, self.volume, self.prev = price_volume, total_volume, vwap
+        return out
+
+
+class _Envelope:
+    def __init__(self, period: int = 20, deviation: float = 0.05):
+        self.window = _Window(period)
+        self.deviation = deviation
+
+    def step(self, close: float, final: bool) -> Dict:
+        sma = self.window.mean_of(self.window.step(close, final))
+        upper, lower = sma * (1 + self.deviation), sma * (1 - self.deviation)
+        return {'upper': upper, 'lower': lower, 'center': sma, 'position': _code(close > upper, close < lower),
+                'band_width': upper - lower, 'percent_from_center': _div(close - sma, sma) * 100}
+
+
+class _Context:
+    """Ratings e estados agregados (moving_averages ... trend_context)."""
+
+    def __init__(self):
+        self.smas = [_Window(period, min_periods=1) for period in (10, 20, 50)]
+        self.returns = _Window(20, min_periods=2)
+        self.volatility = _Window(100, min_periods=1)
+        self.volume = _Window(20, min_periods=1)
+        self.ups = _Window(14, min_periods=1)
+        self.adx = _Adx(14)
+        self.stochastic = _Stochastic(14, 3)
+        self.prev_close = NAN
+
+    def step(self, close: float, volume: float, rsi: Dict, macd: Dict, final: bool) -> Dict:
+        votes = 0
+        for window in self.smas:
+            diff = close - window.mean_of(window.step(close, final))
+            votes += (diff > 0) - (diff < 0)
+        hist = macd['histogram']
+        hist_sign = 0 if _isnan(hist) else (hist > 0) - (hist < 0)
+        score = (rsi['value'] < 30) - (rsi['value'] > 70) + hist_sign
+
+        change = _div(close - self.prev_close, self.prev_close)
+        vol = self.returns.std_of(self.returns.step(change, final), ddof=1)
+        reference = self.volatility.mean_of(self.volatility.step(vol, final))
+        average_volume = self.volume.mean_of(self.volume.step(volume, final))
+        up_ratio = self.ups.mean_of(self.ups.step(1.0 if close > self.prev_close else 0.0, final))
+
+        adx = self.adx.step(close, close, close, final)
+        stoch = self.stochastic.step(close, close, close, final)
+        trend_score = float(
+            -rsi['zone'] + 0.5 * rsi['trend'] + macd['momentum']
+            + 1.5 * adx['strength'] + 0.5 * adx['trend']
+            - stoch['state'] + 0.5 * stoch['cross']
+        )
+        if final:
+            self.prev_close = close
+        return {
+            'moving_averages': {'rating': _code(votes >= 2, votes <= -2)},
+            'oscillators': {'rating': _code(score > 0, score < 0)},
+            'volatility': {'level': 1 if vol > reference else 0},
+            'volume_status': {'status': 2 if volume > 2 * average_volume else 0 if volume < 0.5 * average_volume else 1},
+            'sentiment': {'sentiment': _code(up_ratio > 0.6, up_ratio < 0.4)},
+            'trend_context': {
+                'trend_score': trend_score,
+                'trend_strength': 2 if trend_score >= 3 else 1 if trend_score >= 1 else 0 if trend_score >= -1 else -1,
+                'suggestion': 2 if trend_score >= 2 else -2 if trend_score <= -2 else
+                              1 if trend_score > 0 else -1 if trend_score < 0 else 0,
+            },
+        }
+
+
+# ---------- estado por série ----------
+
+class IndicatorStream:
+    """Todos os indicadores de uma série (símbolo, timeframe), atualizados candle a candle."""
+
+    def __init__(self):
+        self.rsi = _Rsi()
+        self.macd = _Macd()
+        self.bollinger = _Bollinger()
+        self.atr = _Atr()
+        self.adx = _Adx()
+        self.ichimoku = _Ichimoku()
+        self.fibonacci = _Fibonacci()
+        self.supertrend = _Supertrend()
+        self.stochastic = _Stochastic()
+        self.cci = _Cci()
+        self.williams_r = _WilliamsR()
+        self.parabolic_sar = _ParabolicSar()
+        self.momentum = _Momentum()
+        self.roc = _RateOfChange()
+        self.vwap = _Vwap()
+        self.envelope = _Envelope()
+        self.context = _Context()
+        self.prev_di = (NAN, NAN)
+        self.bars = 0
+        self.last_ts: Optional[int] = None
+        self.values: Dict[str, float] = {}
+
+    def update(self, candle: Dict, final: bool = True) -> Dict[str, float]:
+        """
+        Aplica um candle e devolve {coluna: valor} com os nomes de compute_all
+        (sem market_*). final=False: candle em formação, o estado não muda.
+        """
+        ts = candle.get("timestamp")
+        if final and ts is not None and self.last_ts is not None and ts <= self.last_ts:
+            return self.values  # candle repetido/atrasado
+        high, low, close = float(candle["high"]), float(candle["low"]), float(candle["close"])
+        volume = float(candle.get("volume", 0.0))
+
+        rsi = self.rsi.step(close, final)
+        macd = self.macd.step(close, final)
+        adx = self.adx.step(high, low, close, final)
+        results = {
+            'rsi': rsi,
+            'macd': macd,
+            'bollinger': self.bollinger.step(close, final),
+            'atr': self.atr.step(high, low, close, final),
+            'adx': adx,
+            'ichimoku': self.ichimoku.step(high, low, close, final),
+            'fibonacci': self.fibonacci.step(high, low, final),
+            'supertrend': self.supertrend.step(high, low, close, final),
+            'stochastic': self.stochastic.step(high, low, close, final),
+            'cci': self.cci.step(high, low, close, final),
+            'williams_r': self.williams_r.step(high, low, close, final),
+            'parabolic_sar': self.parabolic_sar.step(high, low, final),
+            'momentum': self.momentum.step(close, final),
+            'roc': self.roc.step(close, final),
+            'dmi': _dmi(adx, self.prev_di),
+            'vwap': self.vwap.step(high, low, close, volume, final),
+            'envelope': self.envelope.step(close, final),
+        }
+        results.update(self.context.step(close, volume, rsi, macd, final))
+        columns = _columns(results, INDICATOR_COLUMNS)
+        columns.update(_columns(results, CONTEXT_COLUMNS))
+        if final:
+            self.prev_di = (adx['di_plus'], adx['di_minus'])
+            self.bars += 1
+            self.last_ts = ts
+            self.values = columns
+        return columns
+
+    def seed(self, candles: Iterable[Dict]) -> Dict[str, float]:
+        for candle in candles:
+            self.update(candle)
+        return self.values
+
+
+class IndicatorStreams:
+    """
+    Estados por (símbolo, timeframe) alimentados pelos candles fechados do LiveFeed.
+    Uma série nova (ou cujo histórico foi semeado depois) é reconstruída a partir do
+    histórico do feed; daí em diante cada candle custa O(1).
+    """
+
+    def __init__(self, feed=None):
+        self.feed = feed
+        self._streams: Dict[Tuple[str, str], IndicatorStream] = {}
+        self._lock = threading.Lock()
+        if feed is not None:
+            feed.subscribe(self.on_bar_closed)
+
+    def get(self, symbol: str, tf: str) -> IndicatorStream:
+        with self._lock:
+            stream = self._streams.get((symbol, tf))
+            if stream is None:
+                stream = self._streams[(symbol, tf)] = IndicatorStream()
+            return stream
+
+    def on_bar_closed(self, symbol: str, tf: str, candle: Dict):
+        stream = self.get(symbol, tf)
+        history = self.feed.history(symbol, tf) if self.feed is not None else []
+        try:
+            if len(history) > stream.bars + 1:
+                # Histórico semeado com candles que o estado não viu: reconstrói
+                fresh = IndicatorStream()
+                fresh.seed(history)
+                with self._lock:
+                    self._streams[(symbol, tf)] = fresh
+            else:
+                stream.update(candle)
+        except Exception as e:
+            logger.warning(f"Indicadores incrementais falharam ({symbol} {tf}): {e}")
+
+    def latest(self, symbol: str, tf: str) -> Dict[str, float]:
+        """Valores do último candle fechado (vazio se a série ainda não tem candles)."""
+        stream = self._streams.get((symbol, tf))
+        return dict(stream.values) if stream is not None else {}
+
+    def forming(self, symbol: str, tf: str) -> Dict[str, float]:
+        """Valores provisórios com o candle em formação do feed (não altera o estado)."""
+        stream = self._streams.get((symbol, tf))
+        bar = self.feed.current(symbol, tf) if self.feed is not None else None
+        if stream is None or bar is None:
+            return self.latest(symbol, tf)
+        return stream.update(bar, final=False)
@@ -1,6 +1,10 @@
-limport numpy as np
 from config import CONFIG
-from strategy.candlestick_patterns import PATTERN_STRENGTH
+from strategy.candlestick_patterns import pattern_mask, mask_strength
+
+CONFIRM_MASKS = {
+    "up": pattern_mask(CONFIG["candlestick_patterns"]["reversal_up"]),
+    "down": pattern_mask(CONFIG["candlestick_patterns"]["reversal_down"]),
+}
 
 class MACDReversalStrategy:
     def __init__(self, config=None):
@@ -23,9 +27,6 @@ class MACDReversalStrategy:
             prev_hist = prev["macd_histogram"]
 
             price = last["close"]
-            high = last["high"]
-            low = last["low"]
-            volume = last["volume"]
 
             # Critérios de reversão MACD
             result_signal = None
@@ -42,29 +43,22 @@ class MACDReversalStrategy:
 
             # BOOST: padrões de vela
             if result_signal:
-                patterns = last.get("patterns", [])
-                result_signal = self._apply_pattern_boost(result_signal, patterns)
+                mask = pattern_mask(last.get("patterns", 0))  # bitmask do feature_engine (ou lista de nomes)
+                result_signal = self._apply_pattern_boost(result_signal, mask)
 
             return result_signal
         except Exception as e:
             print(f"MACDReversal error: {str(e)}")
             return None
 
-    def _apply_pattern_boost(self, signal, patterns):
-        if not signal or not patterns:
+    def _apply_pattern_boost(self, signal, mask):
+        if not signal or not mask:
             return signal
-        direction = signal["signal"]
-        if direction == "up":
-            confirm_patterns = CONFIG["candlestick_patterns"]["reversal_up"]
-        elif direction == "down":
-            confirm_patterns = CONFIG["candlestick_patterns"]["reversal_down"]
-        else:
-            confirm_patterns = []
-        pattern_strength = sum(PATTERN_STRENGTH.get(p, 0.1) for p in patterns if p in confirm_patterns)
+        pattern_strength = mask_strength(mask & CONFIRM_MASKS.get(signal["signal"], 0))
         if pattern_strength > 0:
             boost = int(pattern_strength * 20 * self.pattern_boost)
             signal["confidence"] = min(100, signal.get("confidence", 70) + boost)
-            signal["patterns"] = patterns
+            signal["pattern_mask"] = mask
             signal["pattern_strength"] = pattern_strength
         return signal
 
@@ -1,7 +1,16 @@
 import numpy as np
 from collections import deque
 from config import CONFIG
-from strategy.candlestick_patterns import detect_patterns, PATTERN_STRENGTH
+from strategy.candlestick_patterns import detect_pattern_mask, pattern_mask, mask_strength
+
+# Price Action aceita todos (reversão, tendência, neutro)
+CONFIRM_MASK = pattern_mask(
+    CONFIG["candlestick_patterns"]["reversal_up"] +
+    CONFIG["candlestick_patterns"]["reversal_down"] +
+    CONFIG["candlestick_patterns"]["trend_up"] +
+    CONFIG["candlestick_patterns"]["trend_down"] +
+    CONFIG["candlestick_patterns"]["neutral"]
+)
 
 class EnhancedPriceActionStrategy:
     def __init__(self, config=None):
@@ -56,26 +65,15 @@ class EnhancedPriceActionStrategy:
         cond3 = candles[-1]['close'] > candles[-2]['close'] > candles[-3]['close']
         return cond1 and cond2 and cond3
 
-    def _apply_pattern_boost(self, signal, patterns):
-        if not signal or not patterns:
+    def _apply_pattern_boost(self, signal, mask):
+        if not signal or not mask:
             return signal
-        # Price Action aceita todos (reversão, tendência, neutro)
-        confirm_patterns = (
-            CONFIG["candlestick_patterns"]["reversal_up"] +
-            CONFIG["candlestick_patterns"]["reversal_down"] +
-            CONFIG["candlestick_patterns"]["trend_up"] +
-            CONFIG["candlestick_patterns"]["trend_down"] +
-            CONFIG["candlestick_patterns"]["neutral"]
-        )
-        pattern_strength = 0
-        for pattern in patterns:
-            if pattern in confirm_patterns:
-                pattern_strength += PATTERN_STRENGTH.get(pattern, 0.1)
+        pattern_strength = mask_strength(mask & CONFIRM_MASK)
         if pattern_strength > 0:
             boost = int(pattern_strength * 20 * self.pattern_boost)
             # se já tiver confiança, soma, senão usa 70 como base
             signal["confidence"] = min(100, signal.get("confidence", 70) + boost)
-            signal["patterns"] = patterns
+            signal["pattern_mask"] = mask
             signal["pattern_strength"] = pattern_strength
         return signal
 
@@ -108,8 +106,8 @@ class EnhancedPriceActionStrategy:
                         }
                     }
                     # BOOST
-                    patterns = detect_patterns(candles[-self.candle_lookback:])
-                    return self._apply_pattern_boost(signal, patterns)
+                    mask = detect_pattern_mask(candles[-self.candle_lookback:])
+                    return self._apply_pattern_boost(signal, mask)
 
             # Evening Star
             if evening_star:
@@ -125,8 +123,8 @@ class EnhancedPriceActionStrategy:
                             "volume_ratio": candles[-1]['volume'] / avg_volume if avg_volume else 0
                         }
                     }
-                    patterns = detect_patterns(candles[-self.candle_lookback:])
-                    return self._apply_pattern_boost(signal, patterns)
+                    mask = detect_pattern_mask(candles[-self.candle_lookback:])
+                    return self._apply_pattern_boost(signal, mask)
 
             # Three White Soldiers
             if three_soldiers:
@@ -141,8 +139,8 @@ class EnhancedPriceActionStrategy:
                             "consecutive_bodies": 3
                         }
                     }
-                    patterns = detect_patterns(candles[-self.candle_lookback:])
-                    return self._apply_pattern_boost(signal, patterns)
+                    mask = detect_pattern_mask(candles[-self.candle_lookback:])
+                    return self._apply_pattern_boost(signal, mask)
 
             # Three Black Crows
             if three_crows:
@@ -157,8 +155,8 @@ class EnhancedPriceActionStrategy:
                             "consecutive_bodies": 3
                         }
                     }
-                    patterns = detect_patterns(candles[-self.candle_lookback:])
-                    return self._apply_pattern_boost(signal, patterns)
+                    mask = detect_pattern_mask(candles[-self.candle_lookback:])
+                    return self._apply_pattern_boost(signal, mask)
 
             # ==== Padrões básicos (como na versão clássica) ====
             current = candles[-1]
@@ -177,38 +175,38 @@ class EnhancedPriceActionStrategy:
             # DOJI: Corpo muito pequeno, indecisão
             if body / total_range < self.pattern_config['doji']['max_body_ratio']:
                 signal = {"signal": None, "pattern": "doji"}
-                patterns = detect_patterns(candles[-self.candle_lookback:])
-                return self._apply_pattern_boost(signal, patterns)
+                mask = detect_pattern_mask(candles[-self.candle_lookback:])
+                return self._apply_pattern_boost(signal, mask)
 
             # HAMMER / HANGING MAN
             if body / total_range < self.pattern_config['hammer']['max_body_ratio'] and lower_wick / (body + 1e-8) > self.pattern_config['hammer']['min_wick_ratio']:
                 direction = "up" if close > open_ else "down"
                 pattern = "hammer" if direction == "up" else "hanging_man"
                 signal = {"signal": "up" if pattern == "hammer" else "down", "pattern": pattern}
-                patterns = detect_patterns(candles[-self.candle_lookback:])
-                return self._apply_pattern_boost(signal, patterns)
+                mask = detect_pattern_mask(candles[-self.candle_lookback:])
+                return self._apply_pattern_boost(signal, mask)
 
             # ENGULFING BULLISH
             if close > open_ and prev["close"] < prev["open"] and close > prev["open"] and open_ < prev["close"]:
                 signal = {"signal": "up", "pattern": "bullish_engulfing"}
-                patterns = detect_patterns(candles[-self.candle_lookback:])
-                return self._apply_pattern_boost(signal, patterns)
+                mask = detect_pattern_mask(candles[-self.candle_lookback:])
+                return self._apply_pattern_boost(signal, mask)
 
             # ENGULFING BEARISH
             if close < open_ and prev["close"] > prev["open"] and close < prev["open"] and open_ > prev["close"]:
                 signal = {"signal": "down", "pattern": "bearish_engulfing"}
-                patterns = detect_patterns(candles[-self.candle_lookback:])
-                return self._apply_pattern_boost(signal, patterns)
+                mask = detect_pattern_mask(candles[-self.candle_lookback:])
+                return self._apply_pattern_boost(signal, mask)
 
             # PIN BAR (forte rejeição de preço)
             if upper_wick > body * self.min_wick_ratio and lower_wick < body * 0.3:
                 signal = {"signal": "down", "pattern": "pinbar_top"}
-                patterns = detect_patterns(candles[-self.candle_lookback:])
-                return self._apply_pattern_boost(signal, patterns)
+                mask = detect_pattern_mask(candles[-self.candle_lookback:])
+                return self._apply_pattern_boost(signal, mask)
             elif lower_wick > body * self.min_wick_ratio and upper_wick < body * 0.3:
                 signal = {"signal": "up", "pattern": "pinbar_bottom"}
-                patterns = detect_patterns(candles[-self.candle_lookback:])
-                return self._apply_pattern_boost(signal, patterns)
+                mask = detect_pattern_mask(candles[-self.candle_lookback:])
+                return self._apply_pattern_boost(signal, mask)
 
             return None
 
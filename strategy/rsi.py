@@ -1,6 +1,10 @@
-import numpy as np
 from config import CONFIG
-from strategy.candlestick_patterns import PATTERN_STRENGTH
+from strategy.candlestick_patterns import pattern_mask, mask_strength
+
+CONFIRM_MASKS = {
+    "up": pattern_mask(CONFIG["candlestick_patterns"]["reversal_up"]),
+    "down": pattern_mask(CONFIG["candlestick_patterns"]["reversal_down"]),
+}
 
 class RSIStrategy:
     def __init__(self, config=None):
@@ -25,7 +29,7 @@ class RSIStrategy:
 
             rsi = last["rsi_value"]
             volume = last["volume"]
-            patterns = last.get("patterns", [])
+            mask = pattern_mask(last.get("patterns", 0))  # bitmask do feature_engine (ou lista de nomes)
             pattern_strength = last.get("pattern_strength", 0)
             close = last["close"]
 
@@ -56,21 +60,11 @@ class RSIStrategy:
                 }
 
             # Aplica boost por padrões de vela
-            if signal and patterns:
-                direction = signal["signal"]
-                if direction == "up":
-                    confirm_patterns = CONFIG["candlestick_patterns"]["reversal_up"]
-                elif direction == "down":
-                    confirm_patterns = CONFIG["candlestick_patterns"]["reversal_down"]
-                else:
-                    confirm_patterns = []
-                boost = sum(
-                    PATTERN_STRENGTH.get(p, 0)
-                    for p in patterns if p in confirm_patterns
-                )
+            if signal and mask:
+                boost = mask_strength(mask & CONFIRM_MASKS.get(signal["signal"], 0))
                 if boost > 0:
                     signal["confidence"] = min(95, signal["confidence"] + int(boost * 15 * self.pattern_boost))
-                    signal["patterns"] = patterns
+                    signal["pattern_mask"] = mask
                     signal["pattern_strength"] = pattern_strength
 
             if signal and signal.get("confidence", 0) >= self.min_confidence:
@@ -1,7 +1,12 @@
 import numpy as np
 from collections import deque
 from config import CONFIG
-from strategy.candlestick_patterns import PATTERN_STRENGTH, detect_patterns
+from strategy.candlestick_patterns import detect_pattern_mask, pattern_mask, mask_strength
+
+CONFIRM_MASKS = {
+    "up": pattern_mask(CONFIG["candlestick_patterns"]["reversal_up"]),
+    "down": pattern_mask(CONFIG["candlestick_patterns"]["reversal_down"]),
+}
 
 class AggressiveRSIMA:
     def __init__(self, config=None):
@@ -37,23 +42,13 @@ class AggressiveRSIMA:
     def _calculate_ma(self, prices):
         return np.mean(prices[-self.ma_period:])
 
-    def _apply_pattern_boost(self, signal, patterns):
-        if not signal or not patterns:
+    def _apply_pattern_boost(self, signal, mask):
+        if not signal or not mask:
             return signal
-        direction = signal["signal"]
-        if direction == "up":
-            confirm_patterns = CONFIG["candlestick_patterns"]["reversal_up"]
-        elif direction == "down":
-            confirm_patterns = CONFIG["candlestick_patterns"]["reversal_down"]
-        else:
-            confirm_patterns = []
-        pattern_strength = 0
-        for pattern in patterns:
-            if pattern in confirm_patterns:
-                pattern_strength += PATTERN_STRENGTH.get(pattern, 0)
+        pattern_strength = mask_strength(mask & CONFIRM_MASKS.get(signal["signal"], 0))
         if pattern_strength > 0:
             signal["confidence"] = min(100, signal.get("confidence", 70) + int(pattern_strength * 20 * self.pattern_boost))
-            signal["patterns"] = patterns
+            signal["pattern_mask"] = mask
             signal["pattern_strength"] = pattern_strength
         return signal
 
@@ -92,8 +87,8 @@ class AggressiveRSIMA:
                 signal = self._package("down", history, strength, current_rsi, current_ma)
             # BOOST
             if signal:
-                patterns = detect_patterns(history[-self.candle_lookback:])
-                signal = self._apply_pattern_boost(signal, patterns)
+                mask = detect_pattern_mask(history[-self.candle_lookback:])
+                signal = self._apply_pattern_boost(signal, mask)
             return signal
         except Exception as e:
             print(f"Error in AggressiveRSIMA: {e}")
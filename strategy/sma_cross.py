@@ -1,6 +1,12 @@
 import numpy as np
 from config import CONFIG
-from strategy.candlestick_patterns import detect_patterns, PATTERN_STRENGTH
+from strategy.candlestick_patterns import detect_pattern_mask, pattern_mask, mask_strength
+
+# Usa padrões de continuação e neutros
+CONFIRM_MASKS = {
+    "up": pattern_mask(CONFIG["candlestick_patterns"]["trend_up"] + CONFIG["candlestick_patterns"]["neutral"]),
+    "down": pattern_mask(CONFIG["candlestick_patterns"]["trend_down"] + CONFIG["candlestick_patterns"]["neutral"]),
+}
 
 class SMACrossStrategy:
     def __init__(self, short_period=5, long_period=10, min_history=20, confirmation_candles=3, candle_lookback=3, pattern_boost=0.2):
@@ -48,8 +54,8 @@ class SMACrossStrategy:
                         self.trend = "down"
 
             if signal:
-                patterns = detect_patterns(candles[-self.candle_lookback:])
-                signal = self._apply_pattern_boost(signal, patterns)
+                mask = detect_pattern_mask(candles[-self.candle_lookback:])
+                signal = self._apply_pattern_boost(signal, mask)
                 signal.update({
                     "sma_short": sma_short,
                     "sma_long": sma_long,
@@ -66,25 +72,16 @@ class SMACrossStrategy:
             print(f"Error in SMACrossStrategy: {e}")
             return None
 
-    def _apply_pattern_boost(self, signal, patterns):
-        if not signal or not patterns:
+    def _apply_pattern_boost(self, signal, mask):
+        if not signal or not mask:
             return signal
-        direction = signal["signal"]
-        # Usa padrões de continuação e neutros
-        if direction == "up":
-            confirm_patterns = CONFIG["candlestick_patterns"]["trend_up"] + CONFIG["candlestick_patterns"]["neutral"]
-        else:
-            confirm_patterns = CONFIG["candlestick_patterns"]["trend_down"] + CONFIG["candlestick_patterns"]["neutral"]
-
-        pattern_strength = 0
-        for pattern in patterns:
-            if pattern in confirm_patterns:
-                pattern_strength += PATTERN_STRENGTH.get(pattern, 0.1)
+        direction = "up" if signal["signal"] == "up" else "down"
+        pattern_strength = mask_strength(mask & CONFIRM_MASKS[direction])
 
         if pattern_strength > 0:
             boost = int(pattern_strength * 20 * self.pattern_boost)
             signal["confidence"] = min(100, signal.get("confidence", 70) + boost)
-            signal["patterns"] = patterns
+            signal["pattern_mask"] = mask
             signal["pattern_strength"] = pattern_strength
 
         return signal
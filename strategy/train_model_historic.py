@@ -19,14 +19,11 @@ from sklearn.model_selection import TimeSeriesSplit
 
 # Indicadores e padrões do seu projeto
 from strategy.ml_utils import add_indicators
-from strategy.candlestick_patterns import detect_candlestick_patterns, get_pattern_strength
+from strategy.feature_engine import build_model_features, DEFAULT_FEATURES
 
 # Google Drive utilities
-from data.google_drive_client import upload_or_update_file as upload_file, download_file, find_file_id, get_folder_id_for_file
-
-from data.fundamental_data import get_cot_feature, get_macro_feature, get_sentiment_feature
-from utils.features_extra import calc_obv, calc_spread
-from utils.aggregation import resample_candles
+from data.blob_store import get_blob_store, MODELS
+from data.candle_store import get_candle_store, split_series_key
 
 logging.basicConfig(
     level=logging.INFO,
@@ -58,58 +55,37 @@ def get_symbol_and_timeframe_from_filename(filename):
         return symbol, tf
     return None, None
 
-def ensure_local_file(filename, folder="data"):
-    local_path = os.path.join(folder, filename)
-    if not os.path.exists(local_path):
+def migrate_legacy_csvs(folder=DATA_DIR):
+    """Importa CSVs antigos data/{symbol}_{tf}.csv para a candle store (uma vez por série)"""
+    store = get_candle_store()
+    for filepath in glob.glob(os.path.join(folder, "*.csv")):
+        symbol, tf = get_symbol_and_timeframe_from_filename(filepath)
+        if not symbol or not tf or store.has_series(symbol, tf):
+            continue
         try:
-            logger.info(f"⬇️ Baixando {filename} do Google Drive...")
-            download_file(filename, local_path, drive_folder_id=get_folder_id_for_file(filename))
-            logger.info(f"✅ Baixado {filename} do Google Drive.")
+            store.import_csv(filepath, symbol, tf)
+            logger.info(f"📦 CSV legado {os.path.basename(filepath)} migrado para a candle store")
         except Exception as e:
-            logger.error(f"⚠️ Não foi possível baixar {filename}: {e}")
-    return local_path
+            logger.error(f"⚠️ Falha ao migrar {filepath}: {e}")
 
 class DataProcessor:
     """Processamento seguro de dados temporais para trading"""
 
     @staticmethod
-    def load_and_validate_data(filepath: str) -> Optional[pd.DataFrame]:
+    def load_and_validate_data(symbol: str, tf: str) -> Optional[pd.DataFrame]:
+        """Carrega a série da candle store (já ordenada e sem timestamps duplicados)"""
         try:
-            df = pd.read_csv(filepath)
-            required_cols = {"timestamp", "open", "high", "low", "close", "volume"}
-            if not required_cols.issubset(df.columns):
-                raise ValueError(f"Arquivo {filepath} não contém colunas necessárias")
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            df.sort_values("timestamp", inplace=True)
-            df = df.reset_index(drop=True)
+            df = get_candle_store().read_df(symbol, tf)
+            if df.empty:
+                return None
+            df["timestamp"] = pd.to_datetime(df["timestamp"], unit="s")
             if df.isnull().values.any():
-                logger.warning(f"Dados ausentes encontrados em {filepath}")
+                logger.warning(f"Dados ausentes encontrados em {symbol}_{tf}")
             return df
         except Exception as e:
-            logger.error(f"Erro ao carregar {filepath}: {str(e)}", exc_info=True)
+            logger.error(f"Erro ao carregar {symbol}_{tf}: {str(e)}", exc_info=True)
             return None
 
-    @staticmethod
-    def merge_and_save_candles(filepath, new_candles):
-        # Mantém histórico anterior e adiciona apenas candles novos, sem duplicar timestamp
-        if os.path.exists(filepath):
-            try:
-                df_old = pd.read_csv(filepath)
-            except Exception:
-                df_old = pd.DataFrame()
-        else:
-            df_old = pd.DataFrame()
-        df_new = pd.DataFrame(new_candles)
-        if df_new.empty:
-            return
-        if not df_old.empty:
-            df_all = pd.concat([df_old, df_new], ignore_index=True)
-        else:
-            df_all = df_new
-        df_all.drop_duplicates(subset=['timestamp'], keep='last', inplace=True)
-        df_all.sort_values('timestamp', inplace=True)
-        df_all.to_csv(filepath, index=False)
-
     @staticmethod
     def create_target_variable(df: pd.DataFrame, future_bars: int = 1) -> pd.DataFrame:
         """Cria variável target para previsão de tendência"""
@@ -141,333 +117,15 @@ class FeatureEngineer:
     }
 
     @staticmethod
-    def add_technical_indicators(df: pd.DataFrame, timeframe: str = None, symbol: str = None) -> pd.DataFrame:
-        # --- Agrupamento de S1 em 10s ---
-        if timeframe and timeframe.lower() in ['s1', '1s']:
-            df = resample_candles(df, freq='10S')
-
-        df = df.copy()
-        closes = pd.Series(df["close"].values)
-        highs = pd.Series(df["high"].values)
-        lows = pd.Series(df["low"].values)
-        volumes = pd.Series(df["volume"].values)
-
-        # ==== INDICADORES ENRIQUECIDOS ====
-        # RSI
-        rsi = TechnicalIndicators.calc_rsi(closes)
-        df["rsi_value"] = rsi["value"]
-        df["rsi_zone"] = rsi["zone"]
-        df["rsi_trend"] = rsi["trend"]
-
-        # MACD
-        macd = TechnicalIndicators.calc_macd(closes)
-        df["macd_histogram"] = macd["histogram"]
-        df["macd_line"] = macd["macd_line"]
-        df["macd_signal_line"] = macd["signal_line"]
-        df["macd_momentum"] = macd["momentum"]
-
-        # Bollinger Bands
-        bb = TechnicalIndicators.calc_bollinger(closes)
-        df["bb_upper"] = bb["upper"]
-        df["bb_lower"] = bb["lower"]
-        df["bb_width"] = bb["width"]
-        df["bb_percent_b"] = bb["percent_b"]
-        df["bb_position"] = bb["position"]
-
-        # ATR
-        atr = TechnicalIndicators.calc_atr(highs, lows, closes)
-        df["atr_value"] = atr["value"]
-        df["atr_ratio"] = atr["ratio"]
-        df["atr_trend"] = atr["trend"]
-
-        # ADX
-        adx = TechnicalIndicators.calc_adx(highs, lows, closes)
-        df["adx_value"] = adx["adx"]
-        df["adx_di_plus"] = adx["di_plus"]
-        df["adx_di_minus"] = adx["di_minus"]
-        df["adx_strength"] = adx["strength"]
-
-        # Ichimoku
-        ichimoku = TechnicalIndicators.calc_ichimoku(highs, lows, closes)
-        df["ichimoku_conversion"] = ichimoku["conversion"]
-        df["ichimoku_base"] = ichimoku["base"]
-        df["ichimoku_leading_a"] = ichimoku["leading_a"]
-        df["ichimoku_leading_b"] = ichimoku["leading_b"]
-        df["ichimoku_cloud_position"] = ichimoku["cloud_position"]
-
-        # Fibonacci
-        fibo = TechnicalIndicators.calc_fibonacci(highs, lows)
-        df["fibo_23_6"] = fibo["23.6%"]
-        df["fibo_38_2"] = fibo["38.2%"]
-        df["fibo_50"] = fibo["50%"]
-        df["fibo_61_8"] = fibo["61.8%"]
-
-        # Supertrend
-        supertrend = TechnicalIndicators.calc_supertrend(highs, lows, closes)
-        df["supertrend_value"] = supertrend["value"]
-        df["supertrend_direction"] = supertrend["direction"]
-        df["supertrend_changed"] = supertrend["changed"]
-
-        # Market Profile
-        mprofile = TechnicalIndicators.get_market_profile(closes, volumes)
-        df["market_poc"] = mprofile["poc"]
-        df["market_va_low"] = mprofile["value_area"]["low"]
-        df["market_va_high"] = mprofile["value_area"]["high"]
-
-        # Stochastic
-        stoch = TechnicalIndicators.calc_stochastic(highs, lows, closes)
-        df["stoch_k"] = stoch["k_line"]
-        df["stoch_d"] = stoch["d_line"]
-        df["stoch_state"] = stoch["state"]
-        df["stoch_cross"] = stoch["cross"]
-
-        # CCI
-        cci = TechnicalIndicators.calc_cci(highs, lows, closes)
-        df["cci_value"] = cci["value"]
-        df["cci_state"] = cci["state"]
-        df["cci_momentum"] = cci["momentum"]
-        df["cci_strength"] = cci["strength"]
-
-        # Williams %R
-        wr = TechnicalIndicators.calc_williams_r(highs, lows, closes)
-        df["williamsr_value"] = wr["value"]
-        df["williamsr_state"] = wr["state"]
-        df["williamsr_trend"] = wr["trend"]
-
-        # Parabolic SAR
-        psar = TechnicalIndicators.calc_parabolic_sar(highs, lows)
-        df["psar_value"] = psar["value"]
-        df["psar_trend"] = psar["trend"]
-        df["psar_acceleration"] = psar["acceleration"]
-
-        # Momentum
-        mom = TechnicalIndicators.calc_momentum(closes)
-        df["momentum_value"] = mom["value"]
-        df["momentum_trend"] = mom["trend"]
-        df["momentum_acceleration"] = mom["acceleration"]
-        df["momentum_strength"] = mom["strength"]
-
-        # ROC
-        roc = TechnicalIndicators.calc_roc(closes)
-        df["roc_value"] = roc["value"]
-        df["roc_trend"] = roc["trend"]
-        df["roc_momentum"] = roc["momentum"]
-        df["roc_extreme"] = roc["extreme"]
-
-        # DMI
-        dmi = TechnicalIndicators.calc_dmi(highs, lows, closes)
-        df["dmi_adx"] = dmi["adx"]
-        df["dmi_plus_di"] = dmi["plus_di"]
-        df["dmi_minus_di"] = dmi["minus_di"]
-        df["dmi_trend"] = dmi["trend"]
-        df["dmi_crossover"] = dmi["crossover"]
-
-        # VWAP
-        vwap = TechnicalIndicators.calc_vwap(highs, lows, closes, volumes)
-        df["vwap_value"] = vwap["value"]
-        df["vwap_relation"] = vwap["relation"]
-        df["vwap_spread"] = vwap["spread"]
-        df["vwap_trend"] = vwap["trend"]
-
-        # Envelope
-        envelope = TechnicalIndicators.calc_envelope(closes)
-        df["envelope_upper"] = envelope["upper"]
-        df["envelope_lower"] = envelope["lower"]
-        df["envelope_center"] = envelope["center"]
-        df["envelope_position"] = envelope["position"]
-        df["envelope_band_width"] = envelope["band_width"]
-        df["envelope_percent_center"] = envelope["percent_from_center"]
-
-        # Elliott Wave
-        elliott = TechnicalIndicators.calc_elliott_wave(closes)
-        df["elliott_peaks"] = str(elliott.get("peaks", []))
-        df["elliott_troughs"] = str(elliott.get("troughs", []))
-        df["elliott_phase"] = elliott.get("phase", "")
-        df["elliott_wave_counts"] = str(elliott.get("wave_counts", {}))
-
-        # Zigzag
-        zz = TechnicalIndicators.calc_zigzag(closes)
-        df["zigzag_peaks"] = str(zz.get("peaks", []))
-        df["zigzag_troughs"] = str(zz.get("troughs", []))
-        df["zigzag_trend"] = zz.get("trend", "")
-        df["zigzag_pattern"] = zz.get("pattern", "")
-        df["zigzag_retracements"] = str(zz.get("retracements", []))
-
-        # ========= AUXILIARES CONTEXTUAIS =========
-        ma_rating = TechnicalIndicators.calc_moving_averages(closes)
-        osc_rating = TechnicalIndicators.calc_oscillators(rsi["value"], macd["histogram"])
-        vol = TechnicalIndicators.calc_volatility(closes)
-        volstat = TechnicalIndicators.calc_volume_status(volumes)
-        sentiment = TechnicalIndicators.calc_sentiment(closes)
-        trendctx = TechnicalIndicators.get_trend_context(closes)
-        sr = TechnicalIndicators.get_support_resistance(closes)
-        df["ma_rating"] = ma_rating["rating"]
-        df["osc_rating"] = osc_rating["rating"]
-        df["volatility_level"] = vol["level"]
-        df["volume_status"] = volstat["status"]
-        df["sentiment"] = sentiment["sentiment"]
-        df["trend_score"] = trendctx["trend_score"]
-        df["trend_strength"] = trendctx["trend_strength"]
-        df["trend_suggestion"] = trendctx["suggestion"]
-        df["support_lvls"] = str(sr.get("support", []))
-        df["resistance_lvls"] = str(sr.get("resistance", []))
-        df["price_position"] = sr.get("current_position", "")
-
-        # Rolling indicators
-        df['returns'] = df['close'].pct_change()
-        df['volatility'] = df['returns'].rolling(20).std()
-        for period in [5, 10, 20, 50]:
-            df[f'sma_{period}'] = df['close'].rolling(period).mean()
-        for period in [12, 26]:
-            df[f'ema_{period}'] = df['close'].ewm(span=period, adjust=False).mean()
-
-        # OBV, spread, variation, etc
-        df["obv"] = calc_obv(df)
-        df["spread"] = calc_spread(df)
-        df["variation"] = ((df["close"] - df["close"].shift(1)) / df["close"].shift(1)) * 100
-
-        # Fundamentalistas para H4/D1
-        if timeframe and timeframe.lower() in ['h4', 'd1']:
-            df["cot"] = get_cot_feature(symbol)
-            df["macro"] = get_macro_feature(symbol)
-            df["sentiment_news"] = get_sentiment_feature(symbol)
-        else:
-            for col in ["cot", "macro", "sentiment_news"]:
-                df[col] = 0
-        
-        # PADRÕES DE VELA:
-        pattern_list = [
-            "bullish_engulfing", "bearish_engulfing", "hammer", "hanging_man", "inverted_hammer", "shooting_star",
-            "morning_star", "evening_star", "piercing_line", "dark_cloud_cover","three_white_soldiers",
-            "three_black_crows", "abandoned_baby_bullish", "abandoned_baby_bearish", "kicker_bullish", "kicker_bearish",
-            "rising_three_methods", "falling_three_methods", "upside_tasuki_gap", "downside_tasuki_gap",
-            "separating_lines", "doji", "dragonfly_doji", "gravestone_doji", "long_legged_doji", "spinning_top",
-            "marubozu", "bullish_harami", "bearish_harami", "harami_cross", "tweezer_bottom", "tweezer_top",
-            "three_inside_up", "three_inside_down", "three_outside_up", "three_outside_down", "gap_up",
-            "gap_down", "on_neckline", "belt_hold_bullish", "belt_hold_bearish", "counterattack_bullish",
-            "counterattack_bearish", "unique_three_river_bottom", "breakaway_bullish", "breakaway_bearish",
-            "pattern_strength", "patterns",
-        ]
-        for pattern in pattern_list:
-            df[pattern] = 0
-        pattern_strengths = []
-        patterns_col = []
-        for i in range(len(df)):
-            candles = df.iloc[max(i-5, 0):i+1][["open", "high", "low", "close", "volume"]].to_dict("records")
-            patterns = detect_candlestick_patterns(candles)
-            patterns_col.append(patterns)
-            for pattern in pattern_list:
-                if pattern in patterns:
-                    df.at[df.index[i], pattern] = 1
-            pattern_strengths.append(get_pattern_strength(patterns))
-        df["pattern_strength"] = pattern_strengths
-        df["patterns"] = patterns_col
-
-        # Mapeamento para valores numéricos compatíveis com o restante do bot
-        ma_mapping = {"buy": 1, "sell": -1, "neutral": 0}
-        osc_mapping = {"buy": 1, "sell": -1, "neutral": 0}
-        vol_mapping = {"High": 1, "Low": 0}
-        volstat_mapping = {"Spiked": 2, "Normal": 1, "Low": 0}
-        sentiment_mapping = {"Optimistic": 1, "Neutral": 0, "Pessimistic": -1}
-        trend_mapping = {"strong": 2, "moderate": 1, "weak": 0, "bearish": -1}
-        zone_mapping = {"overbought": 1, "neutral": 0, "oversold": -1}
-        df["ma_rating"] = df["ma_rating"].map(ma_mapping)
-        df["osc_rating"] = df["osc_rating"].map(osc_mapping)
-        df["volatility_level"] = df["volatility_level"].map(vol_mapping)
-        df["volume_status"] = df["volume_status"].map(volstat_mapping)
-        df["sentiment"] = df["sentiment"].map(sentiment_mapping)
-        df["rsi_zone"] = df["rsi_zone"].map(zone_mapping)
-        df["trend_strength"] = df["trend_strength"].map(trend_mapping)
-
-        # Diferença entre médias móveis (curta e longa)
-        df['diff_sma_5_20'] = df['sma_5'] - df['sma_20']
-        df['diff_ema_12_26'] = df['ema_12'] - df['ema_26']
-
-        # Cruzamento de médias móveis (flag booleana)
-        df['cross_sma_5_20'] = ((df['sma_5'] > df['sma_20']) & (df['sma_5'].shift(1) <= df['sma_20'].shift(1))).astype(int)
-        df['cross_ema_12_26'] = ((df['ema_12'] > df['ema_26']) & (df['ema_12'].shift(1) <= df['ema_26'].shift(1))).astype(int)
-
-        # Cruzamento MACD/Signal
-        df['macd_cross'] = ((df['macd_line'] > df['macd_signal_line']) & (df['macd_line'].shift(1) <= df['macd_signal_line'].shift(1))).astype(int)
-
-        # Supondo que você já tem uma lista de padrões em cada candle em df['patterns']
-        df['num_patterns'] = df['patterns'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-        df['rare_pattern_event'] = (df['num_patterns'] >= 3).astype(int)
-
-        # ATR para múltiplos períodos
-        for period in [7, 14, 21, 28]:
-            tr1 = df['high'] - df['low']
-            tr2 = abs(df['high'] - df['close'].shift())
-            tr3 = abs(df['low'] - df['close'].shift())
-            true_range = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-            df[f'atr_{period}'] = true_range.rolling(period).mean()
-            # Você pode criar também a razão ATR/close para cada período:
-            df[f'atr_{period}_pct'] = df[f'atr_{period}'] / df['close']
-
-        # Bandas de Bollinger para múltiplos períodos
-        for period in [10, 20, 50]:
-            sma = df['close'].rolling(period).mean()
-            std = df['close'].rolling(period).std()
-            df[f'bb_upper_{period}'] = sma + 2 * std
-            df[f'bb_lower_{period}'] = sma - 2 * std
-            df[f'bb_width_{period}'] = (df[f'bb_upper_{period}'] - df[f'bb_lower_{period}']) / sma
-            df[f'bb_pct_{period}'] = (df['close'] - df[f'bb_lower_{period}']) / (df[f'bb_upper_{period}'] - df[f'bb_lower_{period}'])
-      
-        df.ffill(inplace=True)
-        df.dropna(inplace=True)
-        return df
+    def add_technical_indicators(df: pd.DataFrame, timeframe: str = None, symbol: str = None,
+                                 features: Optional[List[str]] = None) -> pd.DataFrame:
+        """Mesmo motor de features da predição (strategy.feature_engine)."""
+        return build_model_features(df, features, symbol=symbol, timeframe=timeframe)
 
     @staticmethod
     def get_feature_columns() -> List[str]:
-        """Lista de features para treino - ajuste para compatibilidade"""
-        return [
-            'open', 'high', 'low', 'close', 'volume',
-            'returns', 'volatility',
-            'sma_5', 'sma_10', 'sma_20', 'sma_50',
-            'ema_12', 'ema_26',
-            'rsi_value', 'rsi_zone', 'rsi_trend',
-            'macd_histogram', 'macd_line', 'macd_signal_line', 'macd_momentum',
-            'bb_upper', 'bb_lower', 'bb_width', 'bb_percent_b', 'bb_position',
-            'atr_value', 'atr_ratio', 'atr_trend',
-            'adx_value', 'adx_di_plus', 'adx_di_minus', 'adx_strength',
-            'ichimoku_conversion', 'ichimoku_base', 'ichimoku_leading_a', 'ichimoku_leading_b', 'ichimoku_cloud_position',
-            'fibo_23_6', 'fibo_38_2', 'fibo_50', 'fibo_61_8',
-            'supertrend_value', 'supertrend_direction', 'supertrend_changed',
-            'market_poc', 'market_va_low', 'market_va_high',
-            'stoch_k', 'stoch_d', 'stoch_state', 'stoch_cross',
-            'cci_value', 'cci_state', 'cci_momentum', 'cci_strength',
-            'williamsr_value', 'williamsr_state', 'williamsr_trend',
-            'psar_value', 'psar_trend', 'psar_acceleration',
-            'momentum_value', 'momentum_trend', 'momentum_acceleration', 'momentum_strength',
-            'roc_value', 'roc_trend', 'roc_momentum', 'roc_extreme',
-            'dmi_adx', 'dmi_plus_di', 'dmi_minus_di', 'dmi_trend', 'dmi_crossover',
-            'vwap_value', 'vwap_relation', 'vwap_spread', 'vwap_trend',
-            'envelope_upper', 'envelope_lower', 'envelope_center', 'envelope_position', 'envelope_band_width', 'envelope_percent_center',
-            'elliott_peaks', 'elliott_troughs', 'elliott_phase', 'elliott_wave_counts',
-            'zigzag_peaks', 'zigzag_troughs', 'zigzag_trend', 'zigzag_pattern', 'zigzag_retracements',
-            'ma_rating', 'osc_rating', 'volatility_level', 'volume_status', 'sentiment',
-            'trend_score', 'trend_strength', 'trend_suggestion', 'support_lvls', 'resistance_lvls', 'price_position',
-            'obv', 'spread', 'variation',
-            'cot', 'macro', 'sentiment_news',
-            "diff_sma_5_20", "diff_ema_12_26", "cross_sma_5_20", "cross_ema_12_26", "macd_cross",
-            "num_patterns", "rare_pattern_event",
-            "atr_7", "atr_14", "atr_21", "atr_28", "atr_7_pct", "atr_14_pct", "atr_21_pct", "atr_28_pct",
-            "bb_upper_10", "bb_lower_10", "bb_width_10", "bb_pct_10",
-            "bb_upper_20", "bb_lower_20", "bb_width_20", "bb_pct_20",
-            "bb_upper_50", "bb_lower_50", "bb_width_50", "bb_pct_50",
-        
-            # PADRÕES DE VELA
-            "bullish_engulfing", "bearish_engulfing", "hammer", "hanging_man", "inverted_hammer", "shooting_star",
-            "morning_star", "evening_star", "piercing_line", "dark_cloud_cover","three_white_soldiers",
-            "three_black_crows", "abandoned_baby_bullish", "abandoned_baby_bearish", "kicker_bullish", "kicker_bearish",
-            "rising_three_methods", "falling_three_methods", "upside_tasuki_gap", "downside_tasuki_gap",
-            "separating_lines", "doji", "dragonfly_doji", "gravestone_doji", "long_legged_doji", "spinning_top",
-            "marubozu", "bullish_harami", "bearish_harami", "harami_cross", "tweezer_bottom", "tweezer_top",
-            "three_inside_up", "three_inside_down", "three_outside_up", "three_outside_down", "gap_up",
-            "gap_down", "on_neckline", "belt_hold_bullish", "belt_hold_bearish", "counterattack_bullish",
-            "counterattack_bearish", "unique_three_river_bottom", "breakaway_bullish", "breakaway_bearish",
-            "pattern_strength", "patterns",
-        ]
+        """Lista de features para treino (salva junto do modelo)"""
+        return list(DEFAULT_FEATURES)
 
     @staticmethod
     def create_feature_pipeline() -> Pipeline:
@@ -537,25 +195,21 @@ def ensure_latest_model(symbol, tf):
     path = os.path.join(MODEL_DIR, filename)
     if not os.path.exists(path):
         try:
-            logger.info(f"⬇️ Baixando modelo {filename} do Google Drive...")
-            download_file(filename, path, drive_folder_id=get_folder_id_for_file(filename))
-            logger.info(f"✅ Modelo {filename} baixado do Google Drive.")
+            logger.info(f"⬇️ Baixando modelo {filename} do armazenamento remoto...")
+            get_blob_store().get(MODELS, filename, path)
+            logger.info(f"✅ Modelo {filename} baixado.")
         except Exception as e:
             logger.error(f"⚠️ Não foi possível baixar {filename}: {e}")
 
-def train_pipeline(filepath: str) -> Optional[Dict]:
-    """Pipeline completo para um arquivo de dados"""
+def train_pipeline(symbol: str, tf: str) -> Optional[Dict]:
+    """Pipeline completo para uma série da candle store"""
     from data.data_client import FallbackDataClient
     try:
-        logger.info(f"Iniciando processamento para: {filepath}")
-        df = DataProcessor.load_and_validate_data(filepath)
-        symbol, tf = get_symbol_and_timeframe_from_filename(os.path.basename(filepath))
-        if not symbol or not tf:
-            logger.warning(f"Arquivo com nome inesperado: {filepath}")
-            return None
+        logger.info(f"Iniciando processamento para: {symbol}_{tf}")
+        df = DataProcessor.load_and_validate_data(symbol, tf)
 
         if df is None or len(df) < MIN_CANDLES:
-            logger.warning(f"Arquivo {filepath} inválido ou com poucos dados ({0 if df is None else len(df)} linhas). Buscando candles frescos...")
+            logger.warning(f"Série {symbol}_{tf} inválida ou com poucos dados ({0 if df is None else len(df)} linhas). Buscando candles frescos...")
             fallback_client = FallbackDataClient()
             interval = tf
             candles_result = fallback_client.fetch_candles(symbol, interval=interval, limit=500)
@@ -563,14 +217,17 @@ def train_pipeline(filepath: str) -> Optional[Dict]:
             if not candles or len(candles) < MIN_CANDLES:
                 logger.error(f"Não foi possível obter candles válidos para {symbol}/{tf}. Abortando.")
                 return None
-            DataProcessor.merge_and_save_candles(filepath, candles)
-            df = DataProcessor.load_and_validate_data(filepath)
+            # fetch_candles já acrescenta os candles na store
+            df = DataProcessor.load_and_validate_data(symbol, tf)
+            if df is None or len(df) < MIN_CANDLES:
+                logger.error(f"Série {symbol}_{tf} continua sem dados suficientes. Abortando.")
+                return None
 
         logger.info(f"Processando dados para {symbol}/{tf} ({len(df)} registros)")
-        df = FeatureEngineer.add_technical_indicators(df, timeframe=tf, symbol=symbol)
+        trainer = ModelTrainer()
+        df = FeatureEngineer.add_technical_indicators(df, timeframe=tf, symbol=symbol, features=trainer.features)
         df = DataProcessor.create_target_variable(df, future_bars=3)
         train_df, test_df = DataProcessor.temporal_split(df, test_size=0.2)
-        trainer = ModelTrainer()
         X_train, y_train = trainer.prepare_data(train_df)
         model = trainer.train_model(X_train, y_train)
         X_test, y_test = trainer.prepare_data(test_df)
@@ -579,10 +236,10 @@ def train_pipeline(filepath: str) -> Optional[Dict]:
         logger.info(f"Modelo treinado e salvo em: {model_path}")
         logger.info("Relatório de classificação:\n%s", evaluation["classification_report"])
         try:
-            file_id = upload_file(model_path)
-            logger.info(f"☁️ Arquivo {os.path.basename(model_path)} enviado ao Google Drive! ID: {file_id}")
+            file_id = get_blob_store().put(MODELS, model_path)
+            logger.info(f"☁️ Arquivo {os.path.basename(model_path)} enviado! ID: {file_id}")
         except Exception as e:
-            logger.error(f"⚠️ Falha ao enviar {os.path.basename(model_path)} ao Google Drive: {e}")
+            logger.error(f"⚠️ Falha ao enviar {os.path.basename(model_path)}: {e}")
         return {
             "symbol": symbol,
             "timeframe": tf,
@@ -592,30 +249,30 @@ def train_pipeline(filepath: str) -> Optional[Dict]:
             "test_samples": len(test_df)
         }
     except Exception as e:
-        logger.error(f"Erro no pipeline para {filepath}: {str(e)}", exc_info=True)
+        logger.error(f"Erro no pipeline para {symbol}_{tf}: {str(e)}", exc_info=True)
         return None
         
 def main():
     """Fluxo principal"""
     try:
         logger.info("Iniciando pipeline de treinamento de modelos")
-        data_files = glob.glob(os.path.join(DATA_DIR, "*.csv"))
-        if not data_files:
-            logger.error(f"Nenhum arquivo CSV encontrado em {DATA_DIR}")
+        migrate_legacy_csvs()
+        series = get_candle_store().series()
+        if not series:
+            logger.error("Nenhuma série encontrada na candle store")
             return
-        logger.info(f"Encontrados {len(data_files)} arquivos para processamento")
+        logger.info(f"Encontradas {len(series)} séries para processamento")
         results = []
         now = datetime.utcnow()
-        for filepath in data_files:
-            symbol, tf = get_symbol_and_timeframe_from_filename(os.path.basename(filepath))
+        for key in series:
+            symbol, tf = split_series_key(key)
             if not symbol or not tf:
-                logger.warning(f"Pulo arquivo com nome inesperado: {filepath}")
+                logger.warning(f"Pulo série com nome inesperado: {key}")
                 continue
             interval = RETRAIN_INTERVALS.get(tf, 60)
             last = LAST_RETRAIN_TIMES.get((symbol, tf))
             if not last or (now - last).total_seconds() >= interval:
-                ensure_local_file(os.path.basename(filepath), folder=DATA_DIR)
-                result = train_pipeline(filepath)
+                result = train_pipeline(symbol, tf)
                 if result:
                     results.append(result)
                 LAST_RETRAIN_TIMES[(symbol, tf)] = now
@@ -1,5 +1,11 @@
 from config import CONFIG
-from strategy.candlestick_patterns import detect_patterns, PATTERN_STRENGTH
+from strategy.candlestick_patterns import detect_pattern_mask, pattern_mask, mask_strength
+
+# Usa padrões de reversão e indecisão
+CONFIRM_MASKS = {
+    "up": pattern_mask(CONFIG["candlestick_patterns"]["reversal_up"] + CONFIG["candlestick_patterns"]["neutral"]),
+    "down": pattern_mask(CONFIG["candlestick_patterns"]["reversal_down"] + CONFIG["candlestick_patterns"]["neutral"]),
+}
 
 class WickReversalStrategy:
     def __init__(self, config=None):
@@ -44,7 +50,7 @@ class WickReversalStrategy:
                 )
 
             # Detecta padrões de vela nos últimos candles
-            patterns = detect_patterns(history[-self.candle_lookback:])
+            mask = detect_pattern_mask(history[-self.candle_lookback:])
             wick_signal = None
 
             if lower_wick > body_size * self.wick_ratio and body_size / (upper_wick + 1e-8) > self.min_body_ratio:
@@ -59,7 +65,7 @@ class WickReversalStrategy:
                     strength = "medium"
 
                 signal = self._package(wick_signal, history, strength)
-                signal = self._apply_pattern_boost(signal, patterns)
+                signal = self._apply_pattern_boost(signal, mask)
                 return signal
 
             return None
@@ -68,25 +74,16 @@ class WickReversalStrategy:
             print(f"Error in WickReversalStrategy: {e}")
             return None
 
-    def _apply_pattern_boost(self, signal, patterns):
-        if not signal or not patterns:
+    def _apply_pattern_boost(self, signal, mask):
+        if not signal or not mask:
             return signal
-        direction = signal["signal"]
-        # Usa padrões de reversão e indecisão
-        if direction == "up":
-            confirm_patterns = CONFIG["candlestick_patterns"]["reversal_up"] + CONFIG["candlestick_patterns"]["neutral"]
-        else:
-            confirm_patterns = CONFIG["candlestick_patterns"]["reversal_down"] + CONFIG["candlestick_patterns"]["neutral"]
-
-        pattern_strength = 0
-        for pattern in patterns:
-            if pattern in confirm_patterns:
-                pattern_strength += PATTERN_STRENGTH.get(pattern, 0.1)
+        direction = "up" if signal["signal"] == "up" else "down"
+        pattern_strength = mask_strength(mask & CONFIRM_MASKS[direction])
 
         if pattern_strength > 0:
             boost = int(pattern_strength * 20 * self.pattern_boost)  # até 20%
             signal["confidence"] = min(100, signal["confidence"] + boost)
-            signal["patterns"] = patterns
+            signal["pattern_mask"] = mask
             signal["pattern_strength"] = pattern_strength
 
         return signal
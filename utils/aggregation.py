@@ -1,21 +1,101 @@
+#utils/aggregation.py
+# Reamostragem OHLCV vetorizada em NumPy: cada candle cai no balde
+# timestamp // período e cada balde vira open=primeiro, high=máx, low=mín,
+# close=último, volume=soma. Sem groupby/resample do pandas.
+import numpy as np
 import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+OHLCV_FIELDS = ("open", "high", "low", "close", "volume")
+
+
+def resample_ohlcv(ts, open_, high, low, close, volume, period):
+    """
+    Agrupa candles (timestamps inteiros já ordenados) em baldes de `period`
+    (mesma unidade dos timestamps). Só os baldes com candles aparecem.
+    Devolve (ts_do_balde, open, high, low, close, volume) como arrays NumPy.
+    """
+    ts = np.asarray(ts, dtype=np.int64)
+    if not len(ts):
+        empty = np.empty(0, dtype=np.float64)
+        return ts[:0], empty, empty, empty, empty, empty
+    buckets = (ts // period) * period
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+    return (
+        buckets[starts],
+        np.asarray(open_, dtype=np.float64)[starts],
+        np.maximum.reduceat(np.asarray(high, dtype=np.float64), starts),
+        np.minimum.reduceat(np.asarray(low, dtype=np.float64), starts),
+        np.asarray(close, dtype=np.float64)[ends],
+        np.add.reduceat(np.asarray(volume, dtype=np.float64), starts),
+    )
+
+
+def resample_array(arr, period):
+    """Array estruturado (timestamp em segundos + OHLCV) -> mesmo dtype reamostrado em `period` segundos."""
+    if len(arr) > 1 and np.any(arr["timestamp"][1:] < arr["timestamp"][:-1]):
+        arr = np.sort(arr, order="timestamp", kind="stable")
+    ts, o, h, l, c, v = resample_ohlcv(arr["timestamp"], *(arr[f] for f in OHLCV_FIELDS), period)
+    out = np.zeros(len(ts), dtype=arr.dtype)
+    out["timestamp"] = ts
+    for name, values in zip(OHLCV_FIELDS, (o, h, l, c, v)):
+        out[name] = values
+    return out
+
+
+class IncrementalResampler:
+    """
+    Reamostragem contínua de uma série base (ex.: M1 -> H1). Guarda só as linhas base
+    do último balde (o que ainda pode mudar): cada update() recalcula esse balde mais
+    os novos, nunca a série inteira. Linhas anteriores ao balde em aberto são ignoradas.
+    """
+
+    def __init__(self, period: int):
+        self.period = period
+        self.pending = None   # linhas base do último balde
+        self.last_ts = None   # último timestamp base visto
+
+    def update(self, rows):
+        """
+        Recebe linhas base novas (array estruturado) e devolve os baldes afetados,
+        o último deles possivelmente ainda em formação.
+        """
+        if not len(rows):
+            return rows[:0]
+        rows = np.sort(rows, order="timestamp", kind="stable")
+        if self.pending is not None:
+            open_bucket = (int(self.pending["timestamp"][0]) // self.period) * self.period
+            rows = rows[rows["timestamp"] >= open_bucket]
+            # Linha base revisada (mesmo timestamp) substitui a anterior
+            kept = self.pending[~np.isin(self.pending["timestamp"], rows["timestamp"])]
+            rows = np.sort(np.concatenate([kept, rows]), order="timestamp", kind="stable")
+        if not len(rows):
+            return rows[:0]
+        result = resample_array(rows, self.period)
+        self.pending = rows[rows["timestamp"] >= result["timestamp"][-1]]
+        self.last_ts = int(rows["timestamp"][-1])
+        return result
+
 
 def resample_candles(df, freq='10S'):
     """
     Agrupa candles de 1s em janelas de freq (ex: '10S' para 10 segundos).
-    Requer df com índice datetime e colunas open/high/low/close/volume.
+    Requer df com índice datetime ou coluna timestamp e colunas open/high/low/close/volume.
     """
-    df = df.copy()
-    if not isinstance(df.index, pd.DatetimeIndex):
-        df['timestamp'] = pd.to_datetime(df['timestamp'])
-        df.set_index('timestamp', inplace=True)
-    ohlc_dict = {
-        'open': 'first',
-        'high': 'max',
-        'low': 'min',
-        'close': 'last',
-        'volume': 'sum'
-    }
-    resampled = df.resample(freq).agg(ohlc_dict).dropna()
-    resampled.reset_index(inplace=True)
-    return resampled
+    if isinstance(df.index, pd.DatetimeIndex):
+        index = df.index
+    elif pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+        index = pd.DatetimeIndex(df['timestamp'])
+    else:
+        index = pd.DatetimeIndex(pd.to_datetime(df['timestamp']))
+    order = np.argsort(index.asi8, kind="stable")
+    values = {col: df[col].to_numpy(dtype=np.float64)[order] for col in OHLCV_FIELDS}
+    ts, o, h, l, c, v = resample_ohlcv(index.asi8[order], *(values[f] for f in OHLCV_FIELDS),
+                                       to_offset(freq).nanos)
+    resampled = pd.DataFrame({
+        'timestamp': pd.DatetimeIndex(ts.astype('datetime64[ns]'), tz='UTC').tz_convert(index.tz)
+        if index.tz else ts.astype('datetime64[ns]'),
+        'open': o, 'high': h, 'low': l, 'close': c, 'volume': v,
+    })
+    return resampled.dropna().reset_index(drop=True)
@@ -1,29 +1,33 @@
 import os
 import pandas as pd
-from data.google_drive_client import download_file, list_files_in_drive_folder
+from data.blob_store import get_blob_store, COT_CSV
 
 COT_DATA_DIR = "cot_data"
-GDRIVE_FOLDER_ID_CSV = "1Bv5rwzYMUVuRNSXKSz9zAFidDTCjY8g6"
 
 def get_latest_cot_drive():
-    """Busca o cot_processed_*.csv mais recente do Google Drive e faz download para cot_data/."""
-    files = list_files_in_drive_folder(GDRIVE_FOLDER_ID_CSV)
-    cot_files = [f for f in files if f['name'].startswith('cot_processed_') and f['name'].endswith('.csv')]
+    """Busca o cot_processed_*.csv mais recente do armazenamento remoto e faz download para cot_data/."""
+    store = get_blob_store()
+    try:
+        files = store.list(COT_CSV, prefix='cot_processed_')
+    except Exception as e:
+        print(f"[COT UTILS] Erro ao listar arquivos COT: {e}")
+        return None
+    cot_files = [f for f in files if f['name'].endswith('.csv')]
     if not cot_files:
-        print("[COT UTILS] Nenhum arquivo cot_processed encontrado no Drive.")
+        print("[COT UTILS] Nenhum arquivo cot_processed encontrado no armazenamento remoto.")
         return None
-    # Ordena pelo modifiedTime (YYYY-MM-DDTHH:MM:SS.sssZ ou similar)
-    latest = max(cot_files, key=lambda f: f['modifiedTime'])
+    # O nome carrega a versão (cot_processed_AAAAMMDD_HHMM.csv)
+    latest = max(cot_files, key=lambda f: f['name'])
     local_path = os.path.join(COT_DATA_DIR, latest['name'])
     if not os.path.exists(COT_DATA_DIR):
         os.makedirs(COT_DATA_DIR, exist_ok=True)
-    download_file(latest['name'], local_path, drive_folder_id=GDRIVE_FOLDER_ID_CSV)
+    store.get(COT_CSV, latest['name'], local_path)
     return local_path
 
 def get_latest_cot(symbol):
     """
     Busca o valor COT mais recente para o símbolo informado.
-    Tenta localmente, senão faz download do Drive.
+    Tenta localmente, senão faz download do armazenamento remoto.
     """
     if not os.path.exists(COT_DATA_DIR):
         os.makedirs(COT_DATA_DIR, exist_ok=True)
@@ -35,7 +39,7 @@ def get_latest_cot(symbol):
         latest_file = sorted(files)[-1]
         csv_path = os.path.join(COT_DATA_DIR, latest_file)
     if not csv_path or not os.path.exists(csv_path):
-        print("[COT UTILS] Nenhum arquivo COT disponível localmente ou no Drive.")
+        print("[COT UTILS] Nenhum arquivo COT disponível localmente ou no armazenamento remoto.")
         return None
     try:
         df = pd.read_csv(csv_path)
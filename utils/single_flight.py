@@ -0,0 +1,53 @@
+# utils/single_flight.py
+# Coalescência de requisições concorrentes: chamadores com a mesma chave enquanto uma
+# computação está em voo aguardam essa mesma computação em vez de repeti-la. Nada é
+# guardado depois que ela termina (não é cache). Cada chamador recebe sua própria
+# cópia do resultado, pois quem envia o sinal acrescenta campos no dicionário.
+
+import copy
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+_registry: Dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    def __init__(self, name: str, copy_result: bool = True):
+        self.name = name
+        self.copy_result = copy_result
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.stats = {"calls": 0, "executions": 0, "coalesced": 0, "errors": 0}
+        _registry[name] = self
+
+    def _done(self, key: Hashable, future: asyncio.Future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled() and future.exception() is not None:
+            self.stats["errors"] += 1
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Executa factory() uma vez por chave em voo; os demais chamadores compartilham o resultado."""
+        self.stats["calls"] += 1
+        future = self._inflight.get(key)
+        if future is None:
+            self.stats["executions"] += 1
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f, key=key: self._done(key, f))
+        else:
+            self.stats["coalesced"] += 1
+            logger.debug(f"[{self.name}] aguardando computação em voo para {key}")
+        # shield: se um chamador desistir, a computação segue para os demais
+        result = await asyncio.shield(future)
+        return copy.deepcopy(result) if self.copy_result else result
+
+    def snapshot(self) -> Dict:
+        return dict(self.stats, in_flight=len(self._inflight))
+
+
+def single_flight_stats() -> Dict[str, Dict]:
+    """Métricas de todas as instâncias (duplicatas evitadas = coalesced)."""
+    return {name: flight.snapshot() for name, flight in _registry.items()}